@@ -0,0 +1,230 @@
+"""Batched analytics events from ``docs/analytics.yaml``.
+
+:meth:`AnalyticsEmitter.emit` appends one tuple to a bounded in-memory
+queue and returns; it never takes a lock, touches the disk or waits.  When
+the queue is full the event is dropped and counted instead, so a flood of
+``button_click`` events cannot block the turn loop or grow memory.
+
+A background worker drains the queue every ``flush_interval`` seconds (or
+as soon as a full batch is waiting), serialises each batch to JSON lines
+and appends it to ``events.jsonl.gz`` as one gzip member.  Once that file
+passes ``max_bytes`` it is rotated to ``events.1.jsonl.gz`` ... keeping
+``backups`` old files.  Multi-member gzip files read back normally with
+``gzip.open``.
+
+Each line holds ``ts``, ``event`` and ``session``; the caller's extra
+fields go under ``data``, so they can never overwrite those three.  An
+event whose fields cannot be serialised is dropped and counted under
+``"unserializable"`` instead of stopping the worker.
+"""
+from __future__ import annotations
+
+from collections import Counter, deque
+from dataclasses import dataclass, field
+import gzip
+import json
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Deque, FrozenSet, List, Optional, Tuple, Union
+
+from game_data import REPO_ROOT, parse_source
+
+
+CONFIG_PATH = REPO_ROOT / "docs" / "analytics.yaml"
+SINK_NAME = "events"
+DEFAULT_CAPACITY = 10_000
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_MAX_BYTES = 1 << 20
+DEFAULT_BACKUPS = 5
+
+# (unix time, event id, session id, extra fields)
+Event = Tuple[float, str, str, Optional[dict]]
+
+
+@dataclass(frozen=True)
+class AnalyticsConfig:
+    enabled: bool
+    events: FrozenSet[str]
+    consent_required: bool = False
+
+
+def load_config(path: Path = CONFIG_PATH) -> AnalyticsConfig:
+    section = parse_source(path).get("analytics", {})
+    return AnalyticsConfig(
+        enabled=bool(section.get("enabled", False)),
+        events=frozenset(event["id"] for event in section.get("events", [])),
+        consent_required=bool(section.get("consentRequired", False)),
+    )
+
+
+class RotatingGzipSink:
+    """Appends gzip members to ``<name>.jsonl.gz`` and rotates it by size."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        name: str = SINK_NAME,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.path = self.directory / f"{name}.jsonl.gz"
+        self.size = self.path.stat().st_size if self.path.exists() else 0
+        self.rotations = 0
+
+    def backup_path(self, index: int) -> Path:
+        return self.directory / f"{self.name}.{index}.jsonl.gz"
+
+    def write(self, lines: List[str]) -> int:
+        payload = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=6)
+        with open(self.path, "ab") as handle:
+            handle.write(payload)
+        self.size += len(payload)
+        if self.size >= self.max_bytes:
+            self.rotate()
+        return len(payload)
+
+    def rotate(self) -> None:
+        if self.backups <= 0:
+            self.path.unlink()
+        else:
+            for index in range(self.backups - 1, 0, -1):
+                if self.backup_path(index).exists():
+                    os.replace(self.backup_path(index), self.backup_path(index + 1))
+            os.replace(self.path, self.backup_path(1))
+        self.size = 0
+        self.rotations += 1
+
+
+@dataclass
+class AnalyticsStats:
+    emitted: int = 0
+    written: int = 0
+    batches: int = 0
+    bytes_written: int = 0
+    peak_queue: int = 0
+    write_errors: int = 0
+    dropped: Counter = field(default_factory=Counter)
+
+    def report(self) -> dict:
+        return {
+            "emitted": self.emitted,
+            "written": self.written,
+            "batches": self.batches,
+            "bytes_written": self.bytes_written,
+            "peak_queue": self.peak_queue,
+            "write_errors": self.write_errors,
+            "dropped": dict(self.dropped),
+        }
+
+
+class AnalyticsEmitter:
+    """Bounded, non-blocking event queue with a batching writer thread."""
+
+    def __init__(
+        self,
+        sink: RotatingGzipSink,
+        events: FrozenSet[str],
+        capacity: int = DEFAULT_CAPACITY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+    ) -> None:
+        self.sink = sink
+        self.events = events
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats = AnalyticsStats()
+        self._queue: Deque[Event] = deque()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="analytics", daemon=True)
+        self._thread.start()
+
+    def emit(self, event: str, session: str, data: Optional[dict] = None) -> None:
+        """Queue ``event``; drops (and counts) it when the queue is full."""
+
+        if event not in self.events:
+            raise ValueError(f"unknown analytics event {event!r}")
+        queue = self._queue
+        depth = len(queue)
+        if depth >= self.capacity or self._closed:
+            self.stats.dropped[event] += 1
+            return
+        queue.append((time.time(), event, session, data))
+        self.stats.emitted += 1
+        if depth + 1 == self.batch_size:
+            self._wake.set()
+
+    def close(self) -> None:
+        """Stop the worker after writing everything still queued."""
+
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closing = self._closed
+            self._drain()
+            if closing:
+                return
+
+    def _drain(self) -> None:
+        queue = self._queue
+        stats = self.stats
+        stats.peak_queue = max(stats.peak_queue, len(queue))
+        while queue:
+            batch: List[str] = []
+            while queue and len(batch) < self.batch_size:
+                ts, event, session, data = queue.popleft()
+                record = {"ts": round(ts, 3), "event": event, "session": session}
+                if data:
+                    record["data"] = data
+                try:
+                    batch.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+                except (TypeError, ValueError):
+                    stats.dropped["unserializable"] += 1
+            if not batch:
+                continue
+            try:
+                stats.bytes_written += self.sink.write(batch)
+            except OSError:
+                stats.write_errors += 1
+                stats.dropped["write_error"] += len(batch)
+                continue
+            stats.written += len(batch)
+            stats.batches += 1
+
+
+def open_emitter(directory: Union[str, Path], config: Optional[AnalyticsConfig] = None, **options) -> Optional[AnalyticsEmitter]:
+    """An emitter writing under ``directory``, or ``None`` if analytics are disabled."""
+
+    config = config or load_config()
+    if not config.enabled or config.consent_required:
+        return None
+    return AnalyticsEmitter(RotatingGzipSink(directory), config.events, **options)
+
+
+def read_events(directory: Union[str, Path], name: str = SINK_NAME) -> List[dict]:
+    """Every stored event, oldest file first."""
+
+    directory = Path(directory)
+    paths = sorted(directory.glob(f"{name}.*.jsonl.gz"), key=lambda path: -int(path.name.split(".")[1]))
+    paths.append(directory / f"{name}.jsonl.gz")
+    records: List[dict] = []
+    for path in paths:
+        if path.exists():
+            with gzip.open(path, "rt", encoding="utf-8") as handle:
+                records.extend(json.loads(line) for line in handle if line.strip())
+    return records
+
@@ -0,0 +1,664 @@
+"""Vectorised struct-of-arrays battle kernel.
+
+:class:`BatchBattle` keeps HP, ST, attack, defense, element index, front
+indices, guard flags and potion counts for ``N`` battles in NumPy arrays and advances all
+of them one turn at a time with masked vector operations.  The rules are a
+line-by-line port of ``BattleState`` (``ensure_actor_ready``,
+``handle_forced_swap``, ``calculate_damage``, ``apply_guard`` and
+``apply_backline_regen``) plus the turn loop of :func:`simulation.run_battle`,
+so the two engines produce identical outcomes for the same seed.
+
+Player commands come from a vectorised policy.  ``"attack"`` always attacks;
+``"random"`` derives each command from a counter-based hash of
+``(seed, battle, turn)`` so :class:`HashedRandomPolicy` can replay the exact
+same stream on the object engine.
+
+NumPy is optional for the rest of the game; importing this module without
+it raises an ``ImportError`` that says so.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError as exc:  # pragma: no cover - depends on the environment
+    raise ImportError("batch_engine requires NumPy: pip install numpy") from exc
+
+from damage_tables import NEUTRAL
+from data_registry import current_data
+from game import (
+    ATTACK_ST_COST,
+    BACKLINE_ST_REGEN,
+    DEFEND_ST_REFUND,
+    MIN_ACTION_ST,
+    VOLUNTARY_SWAP_COST,
+    BattleState,
+    Combatant,
+    Party,
+    default_enemy_party,
+    default_inventory,
+    default_player_party,
+    load_items,
+)
+from simulation import (
+    ATTACK,
+    DEFAULT_MAX_TURNS,
+    DEFEND,
+    Action,
+    SimulationSummary,
+    run_battle,
+)
+
+
+PLAYER = 0
+ENEMY = 1
+
+# Player command codes; codes >= ACTION_SWAP_BASE swap to member ``code - ACTION_SWAP_BASE``.
+ACTION_ATTACK = 0
+ACTION_DEFEND = 1
+ACTION_ITEM = 2
+ACTION_SWAP_BASE = 3
+
+WINNER_DRAW = 0
+WINNER_PLAYER = 1
+WINNER_ENEMY = 2
+WINNER_NAMES = {WINNER_DRAW: "draw", WINNER_PLAYER: "player", WINNER_ENEMY: "enemy"}
+
+POTION_ID = "potion_small"
+# Per-member ``(side, member, battle)`` tables, copied and compacted together.
+MEMBER_TABLES = ("hp", "st", "max_hp", "max_st", "attack", "defense", "element")
+# monsters.json parties whose elements hit each other for 0.5x and 1.5x;
+# --verify also checks them so the element multiplier stays in parity.
+TYPED_PLAYER_IDS = ("mon_flame_drake", "mon_gale_rogue", "mon_frost_wisp")
+TYPED_ENEMY_IDS = ("mon_tide_stalker", "mon_terra_guardian", "mon_storm_jaguar")
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+
+# --- Shared command stream ------------------------------------------------
+
+
+def hashed_action(seed: int, battle: int, turn: int, choices: int) -> int:
+    """Scalar twin of :func:`hashed_actions` (splitmix64 finaliser)."""
+
+    z = (seed * _GOLDEN + battle * _MIX1 + turn * _MIX2) & _MASK64
+    z = ((z ^ (z >> 30)) * _MIX1) & _MASK64
+    z = ((z ^ (z >> 27)) * _MIX2) & _MASK64
+    z ^= z >> 31
+    return z % choices
+
+
+def hashed_actions(seed: int, battles: "np.ndarray", turns: "np.ndarray", choices: int) -> "np.ndarray":
+    """Vectorised :func:`hashed_action`; uint64 arithmetic wraps like the mask."""
+
+    # Scalar uint64 products warn on overflow (arrays wrap silently), so the
+    # seed term is mixed in Python ints.
+    z = (
+        np.uint64((seed * _GOLDEN) & _MASK64)
+        + battles.astype(np.uint64) * np.uint64(_MIX1)
+        + turns.astype(np.uint64) * np.uint64(_MIX2)
+    )
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+    z ^= z >> np.uint64(31)
+    return (z % np.uint64(choices)).astype(np.int64)
+
+
+def decode_action(code: int) -> Action:
+    if code == ACTION_ATTACK:
+        return ATTACK
+    if code == ACTION_DEFEND:
+        return DEFEND
+    if code == ACTION_ITEM:
+        return ("item", POTION_ID)
+    return ("swap", code - ACTION_SWAP_BASE)
+
+
+class HashedRandomPolicy:
+    """Object-engine policy that replays the batch ``"random"`` stream.
+
+    One instance drives exactly one battle; it counts its own calls because
+    ``run_battle`` asks the policy once per player turn.
+    """
+
+    def __init__(self, seed: int, battle: int) -> None:
+        self.seed = seed
+        self.battle = battle
+        self.turn = 0
+
+    def __call__(self, state: BattleState, rng: object) -> Action:
+        choices = ACTION_SWAP_BASE + len(state.player_party.members)
+        code = hashed_action(self.seed, self.battle, self.turn, choices)
+        self.turn += 1
+        return decode_action(code)
+
+
+# --- Kernel ---------------------------------------------------------------
+
+
+class BatchBattle:
+    """``N`` independent battles stored as ``(side, member, battle)`` arrays.
+
+    Each ``table[side, member]`` row is a contiguous vector over battles, so
+    every rule runs as a handful of in-place ufuncs with ``where=`` masks.
+    Finished battles record their results immediately, drop out of the
+    ``live`` mask, and are compacted away once they make up half the rows.
+    """
+
+    def __init__(
+        self,
+        player_parties: Sequence[Party],
+        enemy_parties: Sequence[Party],
+        potions: Sequence[int],
+    ) -> None:
+        if not (len(player_parties) == len(enemy_parties) == len(potions)):
+            raise ValueError("player_parties, enemy_parties and potions must have the same length")
+        sides = (player_parties, enemy_parties)
+        self.members = len(player_parties[0].members)
+        if any(len(party.members) != self.members for parties in sides for party in parties):
+            raise ValueError("every party in a batch must have the same number of members")
+
+        def table(attr: str, convert: Callable[[object], int] = int) -> "np.ndarray":
+            return np.array(
+                [
+                    [[convert(getattr(party.members[slot], attr)) for party in parties] for slot in range(self.members)]
+                    for parties in sides
+                ],
+                dtype=np.int32,
+            )
+
+        self.hp = table("current_hp")
+        self.st = table("current_st")
+        self.max_hp = table("max_hp")
+        self.max_st = table("max_st")
+        self.attack = table("attack")
+        self.defense = table("defense")
+        chart = current_data().element_chart
+        self.element_index = chart.index
+        self.element = table("element", self.element_of)
+        # calculate_damage's multiplier in half steps, [attacker element, defender element].
+        self.element_steps = np.array(chart.half_steps, dtype=np.int32).reshape(chart.size, chart.size)
+        self.front = np.array([[party.front_index for party in parties] for parties in sides], dtype=np.intp)
+        self.potions = np.array(potions, dtype=np.int32)
+        self.heal_amount = load_items()[POTION_ID].heal_amount
+        self._reset(len(player_parties))
+
+    def element_of(self, element: object) -> int:
+        return self.element_index[NEUTRAL if element is None else element]
+
+    def _reset(self, size: int) -> None:
+        self.size = size
+        self.guard = np.zeros((2, size), dtype=bool)
+        self.live = np.ones(size, dtype=bool)
+        self.live_turns = np.zeros(size, dtype=np.int32)
+        self.battle_ids = np.arange(size)
+        # Key of each row's ``"random"`` command stream; defaults to the row.
+        self.streams = self.battle_ids.astype(np.uint64)
+        self._front_cache: List[Optional[Dict[str, object]]] = [None, None]
+
+        self.turns = np.zeros(size, dtype=np.int32)
+        self.winner = np.full(size, WINNER_DRAW, dtype=np.int8)
+        self.remaining_hp = np.zeros((2, size), dtype=np.int64)
+        self.remaining_st = np.zeros((2, size), dtype=np.int64)
+
+    @classmethod
+    def from_template(
+        cls,
+        player_party: Party,
+        enemy_party: Party,
+        battles: int,
+        inventory: Optional[Dict[str, int]] = None,
+    ) -> "BatchBattle":
+        """Replicate one matchup ``battles`` times (only potions are modelled)."""
+
+        inventory = default_inventory() if inventory is None else inventory
+        batch = cls([player_party], [enemy_party], [inventory.get(POTION_ID, 0)])
+        for name in MEMBER_TABLES:
+            setattr(batch, name, np.repeat(getattr(batch, name), battles, axis=2))
+        batch.front = np.repeat(batch.front, battles, axis=1)
+        batch.potions = np.repeat(batch.potions, battles)
+        batch._reset(battles)
+        return batch
+
+    @classmethod
+    def from_lineups(
+        cls,
+        roster: Sequence[Combatant],
+        player_lineups: "np.ndarray",
+        enemy_lineups: "np.ndarray",
+        potions: int = 0,
+        streams: Optional["np.ndarray"] = None,
+    ) -> "BatchBattle":
+        """One battle per row of two ``(battles, members)`` arrays of roster indexes.
+
+        Every party leads with its first member.  ``streams`` optionally keys
+        each battle's ``"random"`` command stream independently of its row.
+        """
+
+        template = Party(label="", members=list(roster[:1]) * player_lineups.shape[1])
+        batch = cls([template], [template], [potions])
+        lineups = np.stack([player_lineups.T, enemy_lineups.T])
+        for name, attr in (
+            ("hp", "max_hp"),
+            ("st", "max_st"),
+            ("max_hp", "max_hp"),
+            ("max_st", "max_st"),
+            ("attack", "attack"),
+            ("defense", "defense"),
+        ):
+            stats = np.array([getattr(member, attr) for member in roster], dtype=np.int32)
+            setattr(batch, name, stats[lineups])
+        elements = np.array([batch.element_of(member.element) for member in roster], dtype=np.int32)
+        batch.element = elements[lineups]
+        batch.front = np.zeros((2, lineups.shape[2]), dtype=np.intp)
+        batch.potions = np.full(lineups.shape[2], potions, dtype=np.int32)
+        batch._reset(lineups.shape[2])
+        if streams is not None:
+            batch.streams = np.asarray(streams, dtype=np.uint64)
+        return batch
+
+    # ------------------------------------------------------------------
+    # Rule primitives; ``mask`` selects the rows a rule applies to.
+    # ------------------------------------------------------------------
+    def _front_index(self, side: int) -> Dict[str, object]:
+        """Per-slot front masks, flat gather offsets and static front stats.
+
+        Cached until the side's front changes.
+        """
+
+        cached = self._front_cache[side]
+        if cached is None:
+            front = self.front[side]
+            cached = {
+                "masks": [front == slot for slot in range(self.members)],
+                "flat": front * len(front) + np.arange(len(front)),
+            }
+            self._front_cache[side] = cached
+        return cached
+
+    def _front_masks(self, side: int) -> List["np.ndarray"]:
+        return self._front_index(side)["masks"]
+
+    def _front_stat(self, name: str, side: int) -> "np.ndarray":
+        """Front value of a table that never changes mid-battle (attack/defense/element)."""
+
+        cached = self._front_index(side)
+        if name not in cached:
+            cached[name] = self._front_values(getattr(self, name), side)
+        return cached[name]
+
+    def _set_front(self, side: int, rows: "np.ndarray", target: "np.ndarray") -> None:
+        self.front[side, rows] = target
+        self._front_cache[side] = None
+
+    def _front_values(self, table: "np.ndarray", side: int) -> "np.ndarray":
+        return table[side].reshape(-1).take(self._front_index(side)["flat"])
+
+    def _front_ready(self, side: int) -> "np.ndarray":
+        return (self._front_values(self.hp, side) > 0) & (self._front_values(self.st, side) >= MIN_ACTION_ST)
+
+    def _defeated(self, side: int) -> "np.ndarray":
+        defeated = self.hp[side, 0] <= 0
+        for slot in range(1, self.members):
+            defeated &= self.hp[side, slot] <= 0
+        return defeated
+
+    def _none_can_act(self, side: int) -> "np.ndarray":
+        """Mirror ``Party.none_can_act``."""
+
+        alive = np.zeros(len(self.live), dtype=bool)
+        ready = alive.copy()
+        for slot in range(self.members):
+            member_alive = self.hp[side, slot] > 0
+            alive |= member_alive
+            ready |= member_alive & (self.st[side, slot] >= MIN_ACTION_ST)
+        return alive & ~ready
+
+    def first_available_backliner(self, side: int, rows: "np.ndarray") -> "np.ndarray":
+        """Mirror ``Party.first_available_backliner`` for ``rows``; ``-1`` means none."""
+
+        front = self.front[side, rows]
+        hp = self.hp[side][:, rows]
+        st = self.st[side][:, rows]
+        any_alive = np.full(len(rows), -1, dtype=np.intp)
+        with_st = np.full(len(rows), -1, dtype=np.intp)
+        ready = np.full(len(rows), -1, dtype=np.intp)
+        for slot in reversed(range(self.members)):
+            alive = (front != slot) & (hp[slot] > 0)
+            any_alive[alive] = slot
+            with_st[alive & (st[slot] > 0)] = slot
+            ready[alive & (st[slot] >= MIN_ACTION_ST)] = slot
+        return np.where(ready >= 0, ready, np.where(with_st >= 0, with_st, any_alive))
+
+    def forced_swap(self, side: int, mask: "np.ndarray") -> "np.ndarray":
+        """Mirror ``handle_forced_swap`` for fronts that are KO'd or ST-locked."""
+
+        rows = np.flatnonzero(mask)
+        target = self.first_available_backliner(side, rows)
+        found = target >= 0
+        moved = rows[found]
+        self._set_front(side, moved, target[found])
+        self.guard[side, moved] = False
+        swapped = np.zeros(len(mask), dtype=bool)
+        swapped[moved] = True
+        return swapped
+
+    def ensure_ready(self, side: int, mask: "np.ndarray") -> "np.ndarray":
+        """Mirror ``ensure_actor_ready``."""
+
+        ready = self._front_ready(side)
+        stuck = mask & ~ready
+        if stuck.any():
+            swapped = self.forced_swap(side, stuck)
+            ready |= swapped & self._front_ready(side)
+        return mask & ready
+
+    def _adjust_front(
+        self,
+        table: "np.ndarray",
+        side: int,
+        mask: "np.ndarray",
+        delta: int,
+        cap: Optional["np.ndarray"] = None,
+    ) -> None:
+        """Add ``delta`` to the front member's entry, optionally capped."""
+
+        if not mask.any():
+            return
+        step = np.int32(delta)
+        masks = self._front_masks(side)
+        for slot in range(self.members):
+            row = table[side, slot]
+            row += (mask & masks[slot]) * step
+            if cap is not None:
+                np.minimum(row, cap[side, slot], out=row)
+
+    def strike(self, side: int, mask: "np.ndarray") -> None:
+        """Front of ``side`` attacks the opposing front (ST already checked)."""
+
+        if not mask.any():
+            return
+        foe = 1 - side
+        self._adjust_front(self.st, side, mask, -ATTACK_ST_COST)
+        damage = np.maximum(1, self._front_stat("attack", side) - self._front_stat("defense", foe))
+        steps = self.element_steps[self._front_stat("element", side), self._front_stat("element", foe)]
+        damage = np.maximum(1, damage * steps // 2)
+        damage = np.where(self.guard[foe], np.maximum(1, damage // 2), damage)
+        self.guard[foe] &= ~mask
+        damage *= mask
+        defender = self._front_masks(foe)
+        for slot in range(self.members):
+            row = self.hp[foe, slot]
+            row -= damage * defender[slot]
+            np.maximum(row, 0, out=row)
+        knocked_out = mask & (self._front_values(self.hp, foe) <= 0)
+        if knocked_out.any():
+            self.forced_swap(foe, knocked_out)
+
+    def regen_backline(self, side: int, mask: "np.ndarray") -> None:
+        """Mirror ``apply_backline_regen``."""
+
+        masks = self._front_masks(side)
+        for slot in range(self.members):
+            row = self.st[side, slot]
+            row += (mask & ~masks[slot] & (self.hp[side, slot] > 0)) * np.int32(BACKLINE_ST_REGEN)
+            np.minimum(row, self.max_st[side, slot], out=row)
+
+    # ------------------------------------------------------------------
+    # Actions
+    # ------------------------------------------------------------------
+    def player_attack(self, mask: "np.ndarray") -> "np.ndarray":
+        performed = self.ensure_ready(PLAYER, mask)
+        performed &= self._front_values(self.st, PLAYER) >= ATTACK_ST_COST
+        self.strike(PLAYER, performed)
+        return performed
+
+    def player_defend(self, mask: "np.ndarray") -> "np.ndarray":
+        resting = mask & self._none_can_act(PLAYER)
+        performed = self.ensure_ready(PLAYER, mask & ~resting) | (resting & (self._front_values(self.hp, PLAYER) > 0))
+        self.guard[PLAYER] |= performed
+        self._adjust_front(self.st, PLAYER, performed, DEFEND_ST_REFUND, self.max_st)
+        return performed
+
+    def player_use_item(self, mask: "np.ndarray") -> "np.ndarray":
+        performed = mask & (self.potions > 0)
+        self._adjust_front(self.hp, PLAYER, performed, self.heal_amount, self.max_hp)
+        np.subtract(self.potions, 1, out=self.potions, where=performed)
+        return performed
+
+    def player_swap(self, mask: "np.ndarray", target: "np.ndarray") -> "np.ndarray":
+        front = self.front[PLAYER]
+        target_alive = np.zeros(len(front), dtype=bool)
+        for slot in range(self.members):
+            target_alive |= (target == slot) & (self.hp[PLAYER, slot] > 0)
+        performed = (
+            mask
+            & (self._front_values(self.st, PLAYER) >= VOLUNTARY_SWAP_COST)
+            & (target != front)
+            & target_alive
+        )
+        self._adjust_front(self.st, PLAYER, performed, -VOLUNTARY_SWAP_COST)
+        rows = np.flatnonzero(performed)
+        self._set_front(PLAYER, rows, target[rows])
+        self.guard[PLAYER] &= ~performed
+        return performed
+
+    def enemy_take_turn(self, mask: "np.ndarray") -> None:
+        acting = self.ensure_ready(ENEMY, mask)
+        tired = acting & (self._front_values(self.st, ENEMY) < ATTACK_ST_COST)
+        self.guard[ENEMY] |= tired
+        self._adjust_front(self.st, ENEMY, tired, DEFEND_ST_REFUND, self.max_st)
+        self.strike(ENEMY, acting & ~tired)
+
+    # ------------------------------------------------------------------
+    # Turn loop
+    # ------------------------------------------------------------------
+    def policy_codes(self, policy: str, seed: int) -> "np.ndarray":
+        if policy == "attack":
+            return np.full(len(self.live), ACTION_ATTACK, dtype=np.intp)
+        if policy == "random":
+            return hashed_actions(seed, self.streams, self.live_turns, ACTION_SWAP_BASE + self.members)
+        raise ValueError(f"unknown batch policy: {policy!r}")
+
+    def step(self, policy: str = "attack", seed: int = 0, max_turns: int = DEFAULT_MAX_TURNS) -> int:
+        """Advance every live battle by one player turn; return how many remain."""
+
+        live = self.live
+        codes = self.policy_codes(policy, seed)
+        attack = live & (codes == ACTION_ATTACK)
+        performed = self.player_attack(attack)
+        performed |= self.player_defend(live & (codes == ACTION_DEFEND))
+        performed |= self.player_use_item(live & (codes == ACTION_ITEM))
+        swap = live & (codes >= ACTION_SWAP_BASE)
+        if swap.any():
+            performed |= self.player_swap(swap, codes - ACTION_SWAP_BASE)
+        fallback = live & ~performed & ~attack
+        if fallback.any():
+            performed |= self.player_attack(fallback)
+        resting = live & ~performed
+        if resting.any():
+            performed |= self.player_defend(resting)
+
+        self.live_turns += performed
+        self.regen_backline(PLAYER, performed)
+        enemy_turn = performed & ~self._defeated(PLAYER) & ~self._defeated(ENEMY)
+        self.enemy_take_turn(enemy_turn)
+        self.regen_backline(ENEMY, enemy_turn)
+        finished = live & (
+            ~enemy_turn | self._defeated(PLAYER) | self._defeated(ENEMY) | (self.live_turns >= max_turns)
+        )
+        if finished.any():
+            self._retire(finished)
+        return int(np.count_nonzero(self.live))
+
+    def _retire(self, finished: "np.ndarray") -> None:
+        """Record results for ``finished`` rows, then compact if they dominate."""
+
+        ids = self.battle_ids[finished]
+        self.turns[ids] = self.live_turns[finished]
+        player_lost = self._defeated(PLAYER)[finished]
+        enemy_lost = self._defeated(ENEMY)[finished]
+        self.winner[ids] = np.where(enemy_lost, WINNER_PLAYER, np.where(player_lost, WINNER_ENEMY, WINNER_DRAW))
+        for side in (PLAYER, ENEMY):
+            self.remaining_hp[side, ids] = self.hp[side][:, finished].sum(axis=0)
+            self.remaining_st[side, ids] = self.st[side][:, finished].sum(axis=0)
+        self.live &= ~finished
+
+        live_count = int(np.count_nonzero(self.live))
+        if live_count * 2 > len(self.live):
+            return
+        keep = self.live
+        for name in MEMBER_TABLES:
+            setattr(self, name, np.ascontiguousarray(getattr(self, name)[:, :, keep]))
+        self.front = np.ascontiguousarray(self.front[:, keep])
+        self.guard = np.ascontiguousarray(self.guard[:, keep])
+        self.potions = self.potions[keep]
+        self.live_turns = self.live_turns[keep]
+        self.battle_ids = self.battle_ids[keep]
+        self.streams = self.streams[keep]
+        self.live = np.ones(live_count, dtype=bool)
+        self._front_cache = [None, None]
+
+    def run(self, policy: str = "attack", seed: int = 0, max_turns: int = DEFAULT_MAX_TURNS) -> None:
+        finished = self.live & (
+            (self.live_turns >= max_turns) | self._defeated(PLAYER) | self._defeated(ENEMY)
+        )
+        if finished.any():
+            self._retire(finished)
+        while len(self.live) and self.step(policy, seed, max_turns):
+            pass
+
+    def summary(self) -> SimulationSummary:
+        """Reduce the finished batch into the object engine's summary type."""
+
+        summary = SimulationSummary(
+            battles=self.size,
+            player_wins=int((self.winner == WINNER_PLAYER).sum()),
+            enemy_wins=int((self.winner == WINNER_ENEMY).sum()),
+            draws=int((self.winner == WINNER_DRAW).sum()),
+            total_turns=int(self.turns.sum()),
+            player_hp=int(self.remaining_hp[PLAYER].sum()),
+            player_st=int(self.remaining_st[PLAYER].sum()),
+            enemy_hp=int(self.remaining_hp[ENEMY].sum()),
+            enemy_st=int(self.remaining_st[ENEMY].sum()),
+        )
+        if self.size:
+            summary.min_turns = int(self.turns.min())
+            summary.max_turns = int(self.turns.max())
+        return summary
+
+
+# --- Entry points ---------------------------------------------------------
+
+
+def simulate_batch(
+    battles: int,
+    policy: str = "attack",
+    *,
+    seed: int = 0,
+    player_party: Optional[Party] = None,
+    enemy_party: Optional[Party] = None,
+    inventory: Optional[Dict[str, int]] = None,
+    max_turns: int = DEFAULT_MAX_TURNS,
+) -> BatchBattle:
+    batch = BatchBattle.from_template(
+        player_party or default_player_party(),
+        enemy_party or default_enemy_party(),
+        battles,
+        inventory,
+    )
+    batch.run(policy, seed, max_turns)
+    return batch
+
+
+def monster_party(label: str, monster_ids: Sequence[str]) -> Party:
+    """Party of ``monsters.json`` records (with their elements), first id in front."""
+
+    from damage_tables import monster_combatant
+
+    records = {record["id"]: record for record in current_data().bundle.document("monsters.json")["monsters"]}
+    return Party(label=label, members=[monster_combatant(records[monster_id]) for monster_id in monster_ids])
+
+
+def default_parties() -> Tuple[Party, Party]:
+    return default_player_party(), default_enemy_party()
+
+
+def typed_parties() -> Tuple[Party, Party]:
+    return monster_party("Typed A", TYPED_PLAYER_IDS), monster_party("Typed B", TYPED_ENEMY_IDS)
+
+
+def verify_against_scalar(
+    battles: int,
+    policy: str = "random",
+    seed: int = 0,
+    parties: Callable[[], Tuple[Party, Party]] = default_parties,
+) -> List[int]:
+    """Return the battle indices where the batch and object engines disagree.
+
+    ``parties`` builds a fresh ``(player, enemy)`` pair for every battle.
+    """
+
+    player_party, enemy_party = parties()
+    batch = simulate_batch(battles, policy, seed=seed, player_party=player_party, enemy_party=enemy_party)
+    mismatches: List[int] = []
+    for index in range(battles):
+        scalar_policy = HashedRandomPolicy(seed, index) if policy == "random" else (lambda state, rng: ATTACK)
+        outcome = run_battle(*parties(), scalar_policy)
+        expected = (
+            WINNER_NAMES[int(batch.winner[index])],
+            int(batch.turns[index]),
+            int(batch.remaining_hp[PLAYER, index]),
+            int(batch.remaining_st[PLAYER, index]),
+            int(batch.remaining_hp[ENEMY, index]),
+            int(batch.remaining_st[ENEMY, index]),
+        )
+        actual = (
+            outcome.winner,
+            outcome.turns,
+            outcome.player_hp,
+            outcome.player_st,
+            outcome.enemy_hp,
+            outcome.enemy_st,
+        )
+        if expected != actual:
+            mismatches.append(index)
+    return mismatches
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run battles on the vectorised NumPy kernel.")
+    parser.add_argument("--battles", type=int, default=1_000_000, help="number of battles to simulate")
+    parser.add_argument("--policy", choices=["attack", "random"], default="random", help="player policy")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the hashed random policy")
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS, help="turn cap before a draw")
+    parser.add_argument("--verify", type=int, default=0, metavar="N", help="cross-check the first N battles against BattleState")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    started = time.perf_counter()
+    batch = simulate_batch(args.battles, args.policy, seed=args.seed, max_turns=args.max_turns)
+    elapsed = time.perf_counter() - started
+    summary = batch.summary()
+    report = summary.report()
+    print(f"battles: {summary.battles} in {elapsed:.2f}s ({summary.battles / max(elapsed, 1e-9):,.0f} battles/s)")
+    print(f"win rate: {summary.win_rate:.2%} (wins {summary.player_wins} / losses {summary.enemy_wins} / draws {summary.draws})")
+    print(f"turns: mean {report['mean_turns']:.2f}, min {summary.min_turns}, max {summary.max_turns}")
+    if args.verify:
+        for name, parties in (("default", default_parties), ("typed", typed_parties)):
+            mismatches = verify_against_scalar(args.verify, args.policy, args.seed, parties)
+            if mismatches:
+                raise SystemExit(f"batch/object mismatch in {len(mismatches)} {name} battles, first: {mismatches[:10]}")
+        print(f"verified {args.verify} default and {args.verify} typed battles against BattleState")
+
+
+if __name__ == "__main__":
+    main()
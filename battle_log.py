@@ -0,0 +1,198 @@
+"""Structured battle events and pluggable log sinks.
+
+``BattleState`` records what happened as compact tuples of the form
+``(kind, *fields)`` instead of building display strings.  Text is only
+produced when a sink actually asks for it, through the compiled message
+catalog (:mod:`messages`), so headless runs that plug in a
+:class:`NullSink` pay almost nothing for logging.
+"""
+from __future__ import annotations
+
+from collections import deque
+import json
+from pathlib import Path
+from typing import IO, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from messages import MESSAGE_KEYS, MESSAGE_PARAMS, Catalog, Msg, load_catalog
+
+
+Event = Tuple  # (kind, *fields)
+
+
+class EventKind:
+    """Integer tags stored in the first slot of every event tuple."""
+
+    ATTACK = 0
+    KO = 1
+    GUARD = 2
+    ENEMY_GUARD = 3
+    FORCED_SWAP = 4
+    NO_SWAP_TARGET = 5
+    REGEN = 6
+    SWAP = 7
+    ITEM = 8
+    CANNOT_ACT = 9
+    NO_FIGHTERS = 10
+    ST_SHORT = 11
+    NO_ITEM = 12
+    NO_ITEM_TARGET = 13
+    SWAP_NO_FRONT = 14
+    SWAP_ST_SHORT = 15
+    SWAP_ALREADY_FRONT = 16
+    SWAP_TARGET_DOWN = 17
+    SWAP_FAILED = 18
+
+
+class EventSpec(NamedTuple):
+    name: str
+    fields: Tuple[str, ...]
+    message: int
+
+
+def _spec(name: str, message: int) -> EventSpec:
+    return EventSpec(name, MESSAGE_PARAMS.get(message, ()), message)
+
+
+EVENT_SPECS: Dict[int, EventSpec] = {
+    EventKind.ATTACK: _spec("attack", Msg.LOG_ATTACK),
+    EventKind.KO: _spec("ko", Msg.LOG_KO),
+    EventKind.GUARD: _spec("guard", Msg.LOG_GUARD),
+    EventKind.ENEMY_GUARD: _spec("enemy_guard", Msg.LOG_ENEMY_GUARD),
+    EventKind.FORCED_SWAP: _spec("forced_swap", Msg.LOG_FORCED_SWAP),
+    EventKind.NO_SWAP_TARGET: _spec("no_swap_target", Msg.LOG_NO_SWAP_TARGET),
+    EventKind.REGEN: _spec("regen", Msg.LOG_REGEN),
+    EventKind.SWAP: _spec("swap", Msg.LOG_SWAP),
+    EventKind.ITEM: _spec("item", Msg.LOG_ITEM),
+    EventKind.CANNOT_ACT: _spec("cannot_act", Msg.LOG_CANNOT_ACT),
+    EventKind.NO_FIGHTERS: _spec("no_fighters", Msg.LOG_NO_FIGHTERS),
+    EventKind.ST_SHORT: _spec("st_short", Msg.LOG_ST_SHORT),
+    EventKind.NO_ITEM: _spec("no_item", Msg.LOG_NO_ITEM),
+    EventKind.NO_ITEM_TARGET: _spec("no_item_target", Msg.LOG_NO_ITEM_TARGET),
+    EventKind.SWAP_NO_FRONT: _spec("swap_no_front", Msg.LOG_SWAP_NO_FRONT),
+    EventKind.SWAP_ST_SHORT: _spec("swap_st_short", Msg.LOG_SWAP_ST_SHORT),
+    EventKind.SWAP_ALREADY_FRONT: _spec("swap_already_front", Msg.LOG_SWAP_ALREADY_FRONT),
+    EventKind.SWAP_TARGET_DOWN: _spec("swap_target_down", Msg.LOG_SWAP_TARGET_DOWN),
+    EventKind.SWAP_FAILED: _spec("swap_failed", Msg.LOG_SWAP_FAILED),
+}
+
+
+def event_fields(event: Event) -> Dict[str, object]:
+    """Return the named fields of ``event``; message-id fields become catalog keys."""
+
+    fields = dict(zip(EVENT_SPECS[event[0]].fields, event[1:]))
+    if "reason" in fields:
+        fields["reason"] = MESSAGE_KEYS[fields["reason"]]
+    return fields
+
+
+def format_event(event: Event, catalog: Optional[Catalog] = None) -> str:
+    """Render ``event`` as the player-facing log line."""
+
+    catalog = catalog or load_catalog()
+    kind = event[0]
+    message = EVENT_SPECS[kind].message
+    if kind == EventKind.REGEN:
+        return catalog.format(message, event[1], " / ".join(f"{name}+{amount}" for name, amount in event[2]))
+    if kind == EventKind.FORCED_SWAP or kind == EventKind.NO_SWAP_TARGET:
+        *args, reason = event[1:]
+        return catalog.format(message, *args, catalog.text(reason))
+    return catalog.format(message, *event[1:])
+
+
+# --- Sinks ----------------------------------------------------------------
+
+
+class LogSink:
+    """Receives every event a battle emits.
+
+    ``enabled`` lets the producer skip building events entirely when nobody
+    is listening.
+    """
+
+    enabled = True
+
+    def record(self, event: Event) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullSink(LogSink):
+    """Discards everything; used by simulations."""
+
+    enabled = False
+
+    def record(self, event: Event) -> None:
+        pass
+
+
+class ConsoleSink(LogSink):
+    """Writes each event as text, matching the original CLI output."""
+
+    def __init__(self, write: Callable[[str], None] = print, catalog: Optional[Catalog] = None) -> None:
+        self.write = write
+        self.catalog = catalog or load_catalog()
+
+    def record(self, event: Event) -> None:
+        self.write(format_event(event, self.catalog))
+
+
+class RingBufferSink(LogSink):
+    """Keeps only the most recent ``capacity`` events."""
+
+    def __init__(self, capacity: int = 256) -> None:
+        self.buffer: Deque[Event] = deque(maxlen=capacity)
+
+    def record(self, event: Event) -> None:
+        self.buffer.append(event)
+
+    def events(self) -> List[Event]:
+        return list(self.buffer)
+
+    def lines(self, catalog: Optional[Catalog] = None) -> List[str]:
+        return [format_event(event, catalog) for event in self.buffer]
+
+    def clear(self) -> None:
+        self.buffer.clear()
+
+
+class JsonlSink(LogSink):
+    """Appends one JSON object per event to a file."""
+
+    def __init__(self, target: Union[str, Path, IO[str]]) -> None:
+        if isinstance(target, (str, Path)):
+            self._fh: IO[str] = open(target, "a", encoding="utf-8")
+            self._owns_file = True
+        else:
+            self._fh = target
+            self._owns_file = False
+
+    def record(self, event: Event) -> None:
+        payload = {"event": EVENT_SPECS[event[0]].name}
+        payload.update(event_fields(event))
+        self._fh.write(json.dumps(payload, ensure_ascii=False))
+        self._fh.write("\n")
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._fh.close()
+        else:
+            self._fh.flush()
+
+
+class FanoutSink(LogSink):
+    """Forwards each event to several sinks."""
+
+    def __init__(self, sinks: Iterable[LogSink]) -> None:
+        self.sinks = [sink for sink in sinks if sink.enabled]
+        self.enabled = bool(self.sinks)
+
+    def record(self, event: Event) -> None:
+        for sink in self.sinks:
+            sink.record(event)
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
@@ -0,0 +1,74 @@
+"""Precompiled element chart.
+
+``data/types.json`` is compiled once into a dense ``(E + 1) x (E + 1)``
+table of multipliers in half steps (``1`` = 0.5x, ``2`` = 1.0x, ``3`` =
+1.5x); the extra last row/column is ``neutral``, which always uses
+``defaultMultiplier``.  :class:`game.BattleState` gives every member its row
+number (``Combatant.element_id``), so resolving a hit is one flat array read
+with no dicts or string compares.
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from game import Combatant
+
+
+NEUTRAL = "neutral"
+HALF_STEPS = {0.5: 1, 1.0: 2, 1.5: 3}
+
+
+# --- Element chart --------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class ElementChart:
+    """Dense effectiveness lookup indexed by element number."""
+
+    ids: Tuple[str, ...]
+    index: Dict[str, int]
+    half_steps: array  # row-major, len(ids) x len(ids)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    def half_step(self, attacker: int, defender: int) -> int:
+        return self.half_steps[attacker * len(self.ids) + defender]
+
+    def multiplier(self, attacker: str, defender: str) -> float:
+        return self.half_step(self.index[attacker], self.index[defender]) / 2
+
+    def element_index(self, element: Optional[str]) -> int:
+        """Row of ``element``; ``None`` (no element) is neutral."""
+
+        return self.index[NEUTRAL if element is None else element]
+
+
+def compile_element_chart(types_data: dict) -> ElementChart:
+    ids = tuple(element["id"] for element in types_data.get("elements", [])) + (NEUTRAL,)
+    index = {element_id: idx for idx, element_id in enumerate(ids)}
+    default = HALF_STEPS[types_data.get("defaultMultiplier", 1.0)]
+    half_steps = array("b", [default]) * (len(ids) * len(ids))
+    for row in types_data.get("effectiveness", []):
+        half_steps[index[row["attacker"]] * len(ids) + index[row["defender"]]] = HALF_STEPS[row["multiplier"]]
+    return ElementChart(ids=ids, index=index, half_steps=half_steps)
+
+
+# --- Monsters -------------------------------------------------------------
+
+
+def monster_combatant(record: dict, name: Optional[str] = None) -> Combatant:
+    """Build a :class:`Combatant` from a ``monsters.json`` record."""
+
+    return Combatant(
+        name=name or record["name"],
+        max_hp=record["hp"],
+        max_st=record["st"],
+        attack=record["atk"],
+        defense=record["def"],
+        magic=record["mag"],
+        element=record["type"],
+    )
@@ -0,0 +1,406 @@
+"""Hot-reloadable game data: immutable snapshots of ``data/``.
+
+:func:`current_data` returns the process's current :class:`DataSnapshot`:
+the compiled :mod:`game_data` bundle plus the item, enemy and stage tables
+built from it.  A snapshot never changes; a reload builds a whole new one
+and swaps it in with a single reference assignment, so readers never see a
+half-updated registry.  ``Game`` pins the snapshot when a battle starts,
+which keeps battles in flight on the data they started with while new
+battles pick up the new one.
+
+:meth:`DataRegistry.watch` polls the source files' size and mtime from a
+daemon thread.  When one changes, the thread reads every source once,
+validates it with the ``tools/validate_data.py`` rules (types, monsters,
+moves) plus the item/enemy/stage checks below, writes the bundle and only
+then swaps.  Invalid data is rejected and reported in
+:attr:`DataRegistry.stats`; the running snapshot stays in place and the
+next edit is picked up without a restart.  Parsing and compiling happen on
+the watcher thread, so the turn loop never waits on a reload.
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+import hashlib
+from pathlib import Path
+import threading
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from game_data import BUNDLE_PATH, DATA_DIR, SOURCES, GameData, GameDataError, load_game_data, parse_text, write_bundle
+
+if TYPE_CHECKING:
+    from damage_tables import ElementChart
+    from game import Item, MemberSpec
+
+
+DEFAULT_POLL_INTERVAL = 1.0
+# Items the screens refer to by id.
+REQUIRED_ITEMS = ("potion_small",)
+
+# (size, mtime_ns) per source file, in SOURCES order.
+Signature = Tuple[Tuple[int, int], ...]
+
+
+class DataValidationError(ValueError):
+    """Raised when changed data fails validation; ``errors`` lists every problem."""
+
+    def __init__(self, errors: List[str]) -> None:
+        super().__init__(f"{len(errors)} data error(s): {errors[0]}" if errors else "invalid data")
+        self.errors = errors
+
+
+@dataclass(frozen=True)
+class WaveSpec:
+    enemy: str
+    count: int
+
+
+@dataclass(frozen=True)
+class StageSpec:
+    id: str
+    name: str
+    waves: Tuple[WaveSpec, ...]
+
+
+@dataclass(frozen=True, eq=False)
+class DataSnapshot:
+    """One consistent, read-only version of the game data."""
+
+    version: int
+    bundle: GameData
+    items: Mapping[str, "Item"]
+    enemies: Mapping[str, "MemberSpec"]
+    stages: Mapping[str, StageSpec]
+    default_enemy_members: Tuple["MemberSpec", ...]
+    element_chart: "ElementChart"
+
+    @classmethod
+    def from_bundle(cls, bundle: GameData, version: int = 0) -> "DataSnapshot":
+        from damage_tables import compile_element_chart
+        from game import DEFAULT_ENEMY_IDS, DEFAULT_ENEMY_MEMBERS, Item
+
+        enemies = {
+            record["id"]: (record["name"], record["hp"], record["st"], record["atk"], record["def"])
+            for record in bundle.records("enemies")
+        }
+        if all(enemy_id in enemies for enemy_id in DEFAULT_ENEMY_IDS):
+            default_enemy_members = tuple(enemies[enemy_id] for enemy_id in DEFAULT_ENEMY_IDS)
+        else:
+            default_enemy_members = DEFAULT_ENEMY_MEMBERS
+        element_chart = compile_element_chart(bundle.document("types.json"))
+        return cls(
+            version=version,
+            bundle=bundle,
+            items=MappingProxyType(
+                {
+                    record["id"]: Item(id=record["id"], name=record["name"], heal_amount=record["healAmount"])
+                    for record in bundle.records("items")
+                }
+            ),
+            enemies=MappingProxyType(enemies),
+            stages=MappingProxyType(
+                {
+                    stage["id"]: StageSpec(
+                        id=stage["id"],
+                        name=stage["name"],
+                        waves=tuple(WaveSpec(enemy=wave["enemy"], count=wave["count"]) for wave in stage["waves"]),
+                    )
+                    for stage in bundle.document("stages.yaml")["stages"]
+                }
+            ),
+            default_enemy_members=default_enemy_members,
+            element_chart=element_chart,
+        )
+
+
+# --- Validation -----------------------------------------------------------
+
+
+def require(condition: bool, message: str, errors: List[str]) -> None:
+    if not condition:
+        errors.append(message)
+
+
+def _is_name(value: object) -> bool:
+    return isinstance(value, str) and bool(value)
+
+
+def validate_items(data: dict) -> List[str]:
+    items = data.get("items", [])
+    errors: List[str] = []
+    ids = [item.get("id") for item in items]
+    require(len(set(ids)) == len(ids), "items.yaml ids must be unique", errors)
+    missing = [item_id for item_id in REQUIRED_ITEMS if item_id not in ids]
+    require(not missing, f"items.yaml must define: {', '.join(missing)}", errors)
+    for idx, item in enumerate(items):
+        prefix = f"items[{idx}]"
+        for key in ("id", "name", "type", "description"):
+            require(_is_name(item.get(key)), f"{prefix}.{key} must be a non-empty string", errors)
+        heal = item.get("healAmount")
+        require(isinstance(heal, int) and heal > 0, f"{prefix}.healAmount must be an integer > 0", errors)
+    return errors
+
+
+def validate_enemies(data: dict) -> List[str]:
+    from game import DEFAULT_ENEMY_IDS
+
+    enemies = data.get("enemies", [])
+    errors: List[str] = []
+    ids = [enemy.get("id") for enemy in enemies]
+    require(len(set(ids)) == len(ids), "enemies.yaml ids must be unique", errors)
+    missing = [enemy_id for enemy_id in DEFAULT_ENEMY_IDS if enemy_id not in ids]
+    require(not missing, f"enemies.yaml must define the default encounter: {', '.join(missing)}", errors)
+    for idx, enemy in enumerate(enemies):
+        prefix = f"enemies[{idx}]"
+        for key in ("id", "name", "ai"):
+            require(_is_name(enemy.get(key)), f"{prefix}.{key} must be a non-empty string", errors)
+        for stat in ("hp", "st", "atk", "def"):
+            value = enemy.get(stat)
+            require(isinstance(value, int), f"{prefix}.{stat} must be an integer", errors)
+            if stat in ("hp", "st"):
+                require(isinstance(value, int) and value > 0, f"{prefix}.{stat} must be > 0", errors)
+            else:
+                require(isinstance(value, int) and value >= 0, f"{prefix}.{stat} must be >= 0", errors)
+    return errors
+
+
+def validate_stages(data: dict, enemy_ids: Sequence[str]) -> List[str]:
+    from stages import MAX_WAVE_SIZE
+
+    stages = data.get("stages", [])
+    errors: List[str] = []
+    ids = [stage.get("id") for stage in stages]
+    require(len(set(ids)) == len(ids), "stages.yaml ids must be unique", errors)
+    for idx, stage in enumerate(stages):
+        prefix = f"stages[{idx}]"
+        require(_is_name(stage.get("id")), f"{prefix}.id must be a non-empty string", errors)
+        require(_is_name(stage.get("name")), f"{prefix}.name must be a non-empty string", errors)
+        for enemy in stage.get("enemies", []):
+            require(enemy in enemy_ids, f"{prefix}.enemies '{enemy}' must exist in enemies.yaml", errors)
+        waves = stage.get("waves", [])
+        require(bool(waves), f"{prefix} must have at least one wave", errors)
+        for wave_idx, wave in enumerate(waves):
+            wave_prefix = f"{prefix}.waves[{wave_idx}]"
+            count = wave.get("count")
+            require(
+                isinstance(count, int) and 1 <= count <= MAX_WAVE_SIZE,
+                f"{wave_prefix}.count must be between 1 and {MAX_WAVE_SIZE}",
+                errors,
+            )
+            require(wave.get("enemy") in enemy_ids, f"{wave_prefix}.enemy '{wave.get('enemy')}' must exist in enemies.yaml", errors)
+    return errors
+
+
+def validate_documents(documents: Dict[str, dict]) -> List[str]:
+    """Every problem in a full set of parsed sources (empty when valid)."""
+
+    from tools import validate_data
+
+    types = documents["types.json"]
+    type_ids = validate_data.element_ids(types)
+    errors = validate_data.validate_types(types)
+    errors += validate_data.validate_monsters(type_ids, documents["monsters.json"])
+    errors += validate_data.validate_moves(type_ids, documents["moves.json"])
+    errors += validate_items(documents["items.yaml"])
+    errors += validate_enemies(documents["enemies.yaml"])
+    enemy_ids = [enemy.get("id") for enemy in documents["enemies.yaml"].get("enemies", [])]
+    errors += validate_stages(documents["stages.yaml"], enemy_ids)
+    return errors
+
+
+def build_snapshot(
+    version: int,
+    data_dir: Path = DATA_DIR,
+    bundle_path: Path = BUNDLE_PATH,
+) -> DataSnapshot:
+    """Read, validate and compile ``data_dir`` into a new snapshot.
+
+    Raises :class:`DataValidationError` without touching the bundle when
+    anything is invalid.
+    """
+
+    raw = {name: (data_dir / name).read_bytes() for name in SOURCES}
+    documents: Dict[str, dict] = {}
+    errors: List[str] = []
+    for name, payload in raw.items():
+        try:
+            documents[name] = parse_text(name, payload.decode("utf-8"))
+        except Exception as exc:  # json/yaml syntax errors, bad encodings, missing PyYAML
+            errors.append(f"{name} cannot be parsed: {exc}")
+    if not errors:
+        try:
+            errors = validate_documents(documents)
+        except (AttributeError, KeyError, TypeError) as exc:
+            errors = [f"data has an unexpected shape: {exc!r}"]
+    if errors:
+        raise DataValidationError(errors)
+    digests = [hashlib.sha256(raw[name]).digest() for name in SOURCES]
+    try:
+        write_bundle(bundle_path, digests, documents)
+    except (KeyError, TypeError, ValueError) as exc:
+        raise DataValidationError([f"data cannot be compiled: {exc!r}"]) from exc
+    return DataSnapshot.from_bundle(GameData(bundle_path), version)
+
+
+# --- Registry -------------------------------------------------------------
+
+
+@dataclass
+class ReloadStats:
+    checks: int = 0
+    reloads: int = 0
+    rejected: int = 0
+    version: int = 0
+    last_reload_ms: float = 0.0
+    last_errors: List[str] = field(default_factory=list)
+
+    def report(self) -> dict:
+        return {
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "rejected": self.rejected,
+            "version": self.version,
+            "last_reload_ms": round(self.last_reload_ms, 3),
+            "last_errors": list(self.last_errors),
+        }
+
+
+class DataRegistry:
+    """Holds the current snapshot and optionally watches the sources for edits."""
+
+    def __init__(
+        self,
+        data_dir: Path = DATA_DIR,
+        bundle_path: Path = BUNDLE_PATH,
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> None:
+        self.data_dir = data_dir
+        self.bundle_path = bundle_path
+        self.interval = interval
+        self.stats = ReloadStats()
+        self._snapshot: Optional[DataSnapshot] = None
+        self._signature: Optional[Signature] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> DataSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = DataSnapshot.from_bundle(
+                        load_game_data() if self.data_dir == DATA_DIR and self.bundle_path == BUNDLE_PATH
+                        else GameData(self._compiled_bundle())
+                    )
+                snapshot = self._snapshot
+        return snapshot
+
+    def _compiled_bundle(self) -> Path:
+        from game_data import bundle_is_current, compile_bundle
+
+        if not bundle_is_current(self.data_dir, self.bundle_path):
+            compile_bundle(self.data_dir, self.bundle_path)
+        return self.bundle_path
+
+    def signature(self) -> Signature:
+        stats = [(self.data_dir / name).stat() for name in SOURCES]
+        return tuple((stat.st_size, stat.st_mtime_ns) for stat in stats)
+
+    def reload(self) -> bool:
+        """Swap in the data on disk if it changed; returns whether it did.
+
+        Invalid data raises :class:`DataValidationError` and leaves the
+        current snapshot in place.
+        """
+
+        self.current
+        with self._lock:
+            current = self._snapshot
+            assert current is not None
+            started = time.perf_counter()
+            digests = [hashlib.sha256((self.data_dir / name).read_bytes()).digest() for name in SOURCES]
+            if digests == current.bundle.digests:
+                return False
+            try:
+                snapshot = build_snapshot(current.version + 1, self.data_dir, self.bundle_path)
+            except DataValidationError as exc:
+                self.stats.rejected += 1
+                self.stats.last_errors = exc.errors
+                raise
+            self._snapshot = snapshot
+            self.stats.reloads += 1
+            self.stats.version = snapshot.version
+            self.stats.last_errors = []
+            self.stats.last_reload_ms = (time.perf_counter() - started) * 1000
+            return True
+
+    def poll(self) -> bool:
+        """Reload if any source's size or mtime changed since the last poll."""
+
+        self.stats.checks += 1
+        try:
+            signature = self.signature()
+        except OSError:
+            return False
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            return self.reload()
+        except (DataValidationError, OSError, GameDataError):
+            return False
+
+    def watch(self) -> None:
+        """Start polling on a daemon thread (idempotent)."""
+
+        if self._thread is not None:
+            return
+        self._signature = self.signature()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watch", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+
+REGISTRY = DataRegistry()
+
+
+def current_data() -> DataSnapshot:
+    """The process-wide snapshot of the shipped ``data/`` directory."""
+
+    return REGISTRY.current
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Validate data/ as a hot reload would and report the result.")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--bundle", type=Path, default=BUNDLE_PATH, help="where to write the compiled bundle")
+    args = parser.parse_args(argv)
+    started = time.perf_counter()
+    try:
+        snapshot = build_snapshot(1, args.data_dir, args.bundle)
+    except DataValidationError as exc:
+        for error in exc.errors:
+            print(f"error: {error}")
+        raise SystemExit(1)
+    print(
+        f"ok: {len(snapshot.items)} items, {len(snapshot.enemies)} enemies, {len(snapshot.stages)} stages "
+        f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""Enemy AI compiled from the ``docs/ai.yaml`` state machine.
+
+The design document describes the enemy turn as a small state machine whose
+transitions are guarded by condition strings such as ``"hp <= 30 or st <
+15"``.  :func:`load_ai` parses the YAML once and compiles it into a
+:class:`DecisionTable`; the strings are never looked at again.
+
+Every action state returns to the start state at ``turn_end`` /
+``after_swap``, so one turn's decision is a pure function of the values the
+conditions read (see :data:`FEATURES`).  Each comparison in the document is
+``<feature expression> <op> <integer>``, so the integer constants split every
+feature into a few buckets inside which no condition can change.  The
+compiler walks the state machine once per combination of buckets and stores
+the resulting action in a flat table.  At run time a decision is one
+:func:`bisect.bisect_right` per feature plus one table lookup.
+
+Action states map onto the engine's enemy commands:
+
+* ``Attack`` / ``Defend`` -> ``("attack",)`` / ``("defend",)``;
+* ``VoluntarySwap`` -> ``("swap", index)`` for the healthiest backliner
+  with at least :data:`VOLUNTARY_SWAP_MIN_ST` ST;
+* ``HeavySkill`` -> ``("attack",)``, since the engine has no skill command;
+* ``ForcedSwap`` and "no transition matched" -> the fixed attack-or-guard
+  rule.  ``BattleState.enemy_take_turn`` already performs forced swaps
+  before asking the policy.
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+from bisect import bisect_right
+from dataclasses import dataclass
+from itertools import product
+import operator
+from pathlib import Path
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from game import ATTACK_ST_COST, BattleState, EnemyAction
+
+
+AI_PATH = Path(__file__).resolve().parent / "docs" / "ai.yaml"
+
+START_STATE = "EvaluateFrontline"
+ELSE_CONDITIONS = frozenset({"otherwise", "else"})
+EVENT_CONDITIONS = frozenset({"turn_end", "after_swap"})
+VOLUNTARY_SWAP_MIN_ST = 20
+
+# Table cells hold one of these codes.
+RULE, ATTACK_CODE, DEFEND_CODE, SWAP_CODE = range(4)
+ACTION_STATES: Dict[str, int] = {
+    "Attack": ATTACK_CODE,
+    "Defend": DEFEND_CODE,
+    "HeavySkill": ATTACK_CODE,
+    "VoluntarySwap": SWAP_CODE,
+    "ForcedSwap": RULE,
+}
+
+ATTACK: EnemyAction = ("attack",)
+DEFEND: EnemyAction = ("defend",)
+
+# Observation tuple layout (see :func:`observe`).
+OBS_HP, OBS_ST, OBS_PLAYER_HP, OBS_BACKLINE, OBS_BEST_INDEX, OBS_BEST_HP, OBS_BEST_ST = range(7)
+Observation = Tuple[Optional[int], ...]
+
+FEATURES: Dict[str, int] = {
+    "hp": OBS_HP,
+    "st": OBS_ST,
+    "current.hp": OBS_HP,
+    "current.st": OBS_ST,
+    "player_front_hp": OBS_PLAYER_HP,
+    "backline_available": OBS_BACKLINE,
+    "backline_best.hp": OBS_BEST_HP,
+    "backline_best.st": OBS_BEST_ST,
+}
+OPTIONAL_FEATURES = frozenset({OBS_BEST_HP, OBS_BEST_ST})
+
+COMPARISONS: Dict[type, Callable[[int, int], bool]] = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+MIRRORED = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE, ast.Eq: ast.Eq, ast.NotEq: ast.NotEq}
+
+Getter = Callable[[Observation], Optional[int]]
+Values = Sequence[Optional[int]]
+Predicate = Callable[[Values], bool]
+
+
+class AIError(ValueError):
+    """Raised when ``ai.yaml`` cannot be compiled."""
+
+
+def observe(state: BattleState) -> Observation:
+    """The values the ``ai.yaml`` conditions can read, for the enemy to move."""
+
+    enemy = state.enemy_party
+    front = enemy.front()
+    player_front = state.player_party.front()
+    backline = False
+    best_index = best_hp = best_st = None
+    for index in enemy.available_backliner_indexes():
+        backline = True
+        member = enemy.members[index]
+        if member.current_st >= VOLUNTARY_SWAP_MIN_ST and (best_hp is None or member.current_hp > best_hp):
+            best_index, best_hp, best_st = index, member.current_hp, member.current_st
+    return (
+        front.current_hp if front is not None else 0,
+        front.current_st if front is not None else 0,
+        player_front.current_hp if player_front is not None else 0,
+        int(backline),
+        best_index,
+        best_hp,
+        best_st,
+    )
+
+
+# --- Condition compiler ---------------------------------------------------
+
+
+def _feature_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return f"{node.value.id}.{node.attr}"
+    return None
+
+
+class _Compiler:
+    """Turns condition strings into predicates over feature buckets.
+
+    Feature expressions (``hp``, ``backline_best.st - current.st``) are
+    interned by their source text; each gets a getter over an
+    :data:`Observation` and collects the integer boundaries at which some
+    comparison on it flips.
+    """
+
+    def __init__(self) -> None:
+        self.keys: Dict[str, int] = {}
+        self.getters: List[Getter] = []
+        self.optional: List[bool] = []
+        self.bounds: List[set] = []
+
+    def condition(self, text: str) -> Predicate:
+        try:
+            tree = ast.parse(text, mode="eval").body
+        except SyntaxError as exc:
+            raise AIError(f"cannot parse condition {text!r}: {exc.msg}") from None
+        return self._boolean(tree, text)
+
+    def _boolean(self, node: ast.AST, text: str) -> Predicate:
+        if isinstance(node, ast.BoolOp):
+            parts = [self._boolean(value, text) for value in node.values]
+            if isinstance(node.op, ast.And):
+                return lambda values: all(part(values) for part in parts)
+            return lambda values: any(part(values) for part in parts)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = self._boolean(node.operand, text)
+            return lambda values: not inner(values)
+        if isinstance(node, ast.Compare):
+            return self._compare(node, text)
+        # A bare feature is true when non-zero, i.e. ``feature >= 1``.
+        slot = self._feature(node, text)
+        self.bounds[slot].add(1)
+        return lambda values: values[slot] is not None and values[slot] >= 1
+
+    def _compare(self, node: ast.Compare, text: str) -> Predicate:
+        if len(node.ops) != 1:
+            raise AIError(f"chained comparisons are not supported: {text!r}")
+        op, left, right = type(node.ops[0]), node.left, node.comparators[0]
+        if isinstance(left, ast.Constant) and op in MIRRORED:
+            op, left, right = MIRRORED[op], right, left
+        if op not in COMPARISONS:
+            raise AIError(f"unsupported comparison in {text!r}")
+        if not isinstance(right, ast.Constant) or type(right.value) is not int:
+            raise AIError(f"comparisons must be against an integer: {text!r}")
+        slot, limit, compare = self._feature(left, text), right.value, COMPARISONS[op]
+        # Integer points where the comparison's truth value can change.
+        self.bounds[slot].update((limit, limit + 1))
+        return lambda values: values[slot] is not None and compare(values[slot], limit)
+
+    def _feature(self, node: ast.AST, text: str) -> int:
+        key = ast.unparse(node)
+        slot = self.keys.get(key)
+        if slot is None:
+            getter, optional = self._getter(node, text)
+            slot = self.keys[key] = len(self.getters)
+            self.getters.append(getter)
+            self.optional.append(optional)
+            self.bounds.append(set())
+        return slot
+
+    def _getter(self, node: ast.AST, text: str) -> Tuple[Getter, bool]:
+        if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.Add, ast.Sub)):
+            left, left_optional = self._getter(node.left, text)
+            right, right_optional = self._getter(node.right, text)
+            combine = operator.add if isinstance(node.op, ast.Add) else operator.sub
+
+            def getter(obs: Observation) -> Optional[int]:
+                a, b = left(obs), right(obs)
+                return None if a is None or b is None else combine(a, b)
+
+            return getter, left_optional or right_optional
+        if isinstance(node, ast.Constant) and type(node.value) is int:
+            value = node.value
+            return (lambda obs: value), False
+        name = _feature_name(node)
+        if name not in FEATURES:
+            raise AIError(f"unknown value {ast.unparse(node)!r} in condition {text!r}")
+        index = FEATURES[name]
+        return operator.itemgetter(index), index in OPTIONAL_FEATURES
+
+
+# --- Decision table -------------------------------------------------------
+
+
+@dataclass(frozen=True, eq=False)
+class DecisionTable:
+    """``ai.yaml`` compiled to a flat action table over feature buckets.
+
+    ``getters[i]`` reads feature ``i`` from an :data:`Observation`;
+    ``bounds[i]`` are its sorted bucket boundaries and ``strides[i]`` its
+    weight in the table index.  Optional features (missing when no
+    backliner qualifies) get one extra bucket at the end.  Tables loaded
+    from a file pickle as that path and recompile in worker processes.
+    """
+
+    getters: Tuple[Getter, ...]
+    bounds: Tuple[Tuple[int, ...], ...]
+    strides: Tuple[int, ...]
+    cells: bytes
+    version: str = ""
+    source: str = ""
+
+    def __reduce__(self):
+        if not self.source:
+            raise TypeError("only DecisionTables loaded from a file can be pickled")
+        return load_ai, (Path(self.source),)
+
+    def lookup(self, obs: Observation) -> int:
+        index = 0
+        for getter, bounds, stride in zip(self.getters, self.bounds, self.strides):
+            value = getter(obs)
+            bucket = len(bounds) + 1 if value is None else bisect_right(bounds, value)
+            index += bucket * stride
+        return self.cells[index]
+
+    def __call__(self, state: BattleState) -> EnemyAction:
+        obs = observe(state)
+        code = self.lookup(obs)
+        if code == ATTACK_CODE:
+            return ATTACK
+        if code == DEFEND_CODE:
+            return DEFEND
+        if code == SWAP_CODE and obs[OBS_BEST_INDEX] is not None:
+            return ("swap", obs[OBS_BEST_INDEX])
+        return ATTACK if obs[OBS_ST] >= ATTACK_ST_COST else DEFEND
+
+
+def _states(document: dict) -> Dict[str, List[Tuple[str, str]]]:
+    try:
+        entries = document["ai"]["states"]
+    except (KeyError, TypeError):
+        raise AIError("ai.yaml must define ai.states") from None
+    states: Dict[str, List[Tuple[str, str]]] = {}
+    for entry in entries:
+        name = entry.get("name")
+        if not name or name in states:
+            raise AIError(f"missing or duplicate state name: {name!r}")
+        states[name] = [(str(t["to"]), str(t["condition"]).strip()) for t in entry.get("transitions") or ()]
+    for name, transitions in states.items():
+        for target, _ in transitions:
+            if target not in states:
+                raise AIError(f"state {name} moves to unknown state {target}")
+    if START_STATE not in states:
+        raise AIError(f"ai.yaml has no {START_STATE} state")
+    return states
+
+
+def compile_ai(document: dict, version: str = "", source: str = "") -> DecisionTable:
+    """Compile a parsed ``ai.yaml`` document into a :class:`DecisionTable`."""
+
+    states = _states(document)
+    compiler = _Compiler()
+    machine: Dict[str, List[Tuple[str, Predicate]]] = {}
+    for name, transitions in states.items():
+        if name in ACTION_STATES:
+            continue
+        compiled: List[Tuple[str, Predicate]] = []
+        for target, condition in transitions:
+            if condition in ELSE_CONDITIONS:
+                compiled.append((target, lambda values: True))
+            elif condition in EVENT_CONDITIONS:
+                raise AIError(f"decision state {name} waits on event {condition!r}")
+            else:
+                compiled.append((target, compiler.condition(condition)))
+        machine[name] = compiled
+
+    def decide(values: Values) -> int:
+        state = START_STATE
+        for _ in range(len(states) + 1):
+            if state in ACTION_STATES:
+                return ACTION_STATES[state]
+            state = next((target for target, test in machine[state] if test(values)), None)
+            if state is None:
+                return RULE
+        raise AIError("ai.yaml decision states loop without reaching an action")
+
+    bounds = tuple(tuple(sorted(points)) for points in compiler.bounds)
+    # Bucket b of a feature is [bounds[b-1], bounds[b]); pick its lowest value.
+    samples: List[List[Optional[int]]] = []
+    for points, optional in zip(bounds, compiler.optional):
+        values: List[Optional[int]] = [points[0] - 1] + list(points)
+        if optional:
+            values.append(None)
+        samples.append(values)
+    strides: List[int] = []
+    size = 1
+    for values in reversed(samples):
+        strides.append(size)
+        size *= len(values)
+    strides.reverse()
+    cells = bytes(decide(values) for values in product(*samples))
+    assert len(cells) == size
+    return DecisionTable(
+        getters=tuple(compiler.getters),
+        bounds=bounds,
+        strides=tuple(strides),
+        cells=cells,
+        version=version,
+        source=source,
+    )
+
+
+def load_ai(path: Path = AI_PATH) -> DecisionTable:
+    """Parse ``path`` once and compile it."""
+
+    from game_data import file_digest, parse_source
+
+    return compile_ai(parse_source(path), version=file_digest(path).hex()[:12], source=str(path))
+
+
+# --- Policy selection -----------------------------------------------------
+
+
+ENEMY_AIS = ("rule", "yaml")
+_DEFAULT_TABLE: Optional[DecisionTable] = None
+
+
+def enemy_policy(name: str) -> Optional[DecisionTable]:
+    """The enemy policy for ``name``; ``None`` is the built-in fixed rule."""
+
+    global _DEFAULT_TABLE
+    if name == "rule":
+        return None
+    if name == "yaml":
+        if _DEFAULT_TABLE is None:
+            _DEFAULT_TABLE = load_ai()
+        return _DEFAULT_TABLE
+    raise AIError(f"unknown enemy AI {name!r}; choose from {', '.join(ENEMY_AIS)}")
+
+
+# --- CLI ------------------------------------------------------------------
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    from simulation import POLICIES
+
+    parser = argparse.ArgumentParser(description="Compile docs/ai.yaml and compare it against the fixed enemy rule.")
+    parser.add_argument("--ai", default=str(AI_PATH), help="state machine document to compile")
+    parser.add_argument("--battles", type=int, default=2000, help="battles per enemy AI")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy", help="player policy")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for randomised policies")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from battle_log import NullSink
+    from game import default_enemy_party, default_player_party
+    from simulation import POLICIES, SimulationSummary, battle_rng, run_battle
+
+    args = parse_args(argv)
+    started = time.perf_counter()
+    table = load_ai(Path(args.ai))
+    compile_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"compiled {args.ai} ({table.version}) in {compile_ms:.1f} ms: "
+        f"{len(table.bounds)} features, {len(table.cells)} cells"
+    )
+    policy = POLICIES[args.policy]
+    for label, enemy in (("rule", None), ("yaml", table)):
+        summary = SimulationSummary()
+        started = time.perf_counter()
+        for index in range(args.battles):
+            summary.add(
+                run_battle(
+                    default_player_party(),
+                    default_enemy_party(),
+                    policy,
+                    rng=battle_rng(args.seed, index),
+                    enemy_policy=enemy,
+                )
+            )
+        elapsed = time.perf_counter() - started
+        print(f"{label}: player win rate {summary.win_rate:.2%} ({summary.battles} battles, {elapsed:.2f} s)")
+
+    state = BattleState(
+        player_party=default_player_party(),
+        enemy_party=default_enemy_party(),
+        player_inventory={},
+        sink=NullSink(),
+    )
+    decisions = 100_000
+    started = time.perf_counter()
+    for _ in range(decisions):
+        table(state)
+    elapsed = time.perf_counter() - started
+    print(f"yaml: {decisions / elapsed:,.0f} decisions/s ({elapsed / decisions * 1e6:.2f} us each)")
+
+
+if __name__ == "__main__":
+    main()
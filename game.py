@@ -10,7 +10,24 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 import os
-from typing import Dict, List, Optional
+import random
+import sys
+import threading
+import zlib
+from typing import TYPE_CHECKING, Callable, Dict, Generator, List, Mapping, Optional, Tuple, Union
+
+from battle_log import ConsoleSink, EventKind, LogSink, NullSink
+from data_registry import DataSnapshot, current_data
+from messages import Catalog, Msg, load_catalog
+from seeds import SeedStream, parse_seed, random_seed, splitmix64
+
+if TYPE_CHECKING:
+    from analytics import AnalyticsEmitter
+    from damage_tables import ElementChart
+    from replay import ReplayRecorder
+    from savegame import AutosaveWriter, SaveData
+    from stages import StageRun
+    from terminal import Terminal
 
 
 # --- Core data models -----------------------------------------------------
@@ -21,9 +38,10 @@ ATTACK_ST_COST = 5
 DEFEND_ST_REFUND = 3
 VOLUNTARY_SWAP_COST = 10
 BACKLINE_ST_REGEN = 3
+NULL_SINK = NullSink()
 
 
-@dataclass
+@dataclass(slots=True)
 class Combatant:
     """Represents a participant in the battle."""
 
@@ -32,30 +50,47 @@ class Combatant:
     max_st: int
     attack: int
     defense: int
+    magic: int = 0
+    element: Optional[str] = None
     current_hp: int = field(init=False)
     current_st: int = field(init=False)
+    # Set by BattleState.enable_hashing(); HP/ST changes then update the hash.
+    hasher: Optional["ZobristHash"] = field(default=None, init=False, repr=False, compare=False)
+    hash_slot: int = field(default=0, init=False, repr=False, compare=False)
+    # Row of ``element`` in the battle's element chart; set by BattleState, -1 until then.
+    element_id: int = field(default=-1, init=False, repr=False, compare=False)
 
     def __post_init__(self) -> None:
         self.current_hp = self.max_hp
         self.current_st = self.max_st
 
     def take_damage(self, amount: int) -> None:
-        self.current_hp = max(0, self.current_hp - amount)
+        before = self.current_hp
+        self.current_hp = max(0, before - amount)
+        if self.hasher is not None:
+            self.hasher.toggle(HASH_HP, self.hash_slot, before, self.current_hp)
 
     def heal(self, amount: int) -> int:
         before = self.current_hp
         self.current_hp = min(self.max_hp, self.current_hp + amount)
+        if self.hasher is not None:
+            self.hasher.toggle(HASH_HP, self.hash_slot, before, self.current_hp)
         return self.current_hp - before
 
     def spend_st(self, amount: int) -> bool:
         if self.current_st < amount:
             return False
+        before = self.current_st
         self.current_st -= amount
+        if self.hasher is not None:
+            self.hasher.toggle(HASH_ST, self.hash_slot, before, self.current_st)
         return True
 
     def regen_st(self, amount: int) -> int:
         before = self.current_st
         self.current_st = min(self.max_st, self.current_st + amount)
+        if self.hasher is not None:
+            self.hasher.toggle(HASH_ST, self.hash_slot, before, self.current_st)
         return self.current_st - before
 
     @property
@@ -67,13 +102,15 @@ class Combatant:
         return self.current_st < MIN_ACTION_ST
 
 
-@dataclass
+@dataclass(slots=True)
 class Party:
     """Represents a 3-member party with a designated frontline."""
 
     label: str
     members: List[Combatant]
     front_index: int = 0
+    hasher: Optional["ZobristHash"] = field(default=None, init=False, repr=False, compare=False)
+    hash_slot: int = field(default=0, init=False, repr=False, compare=False)
 
     def front(self) -> Optional[Combatant]:
         if 0 <= self.front_index < len(self.members):
@@ -91,6 +128,12 @@ class Party:
         return indexes
 
     def first_available_backliner(self) -> Optional[int]:
+        """Forced-swap target: the first backliner that can act, else one with any ST, else any alive."""
+
+        for idx in self.backline_indexes():
+            member = self.members[idx]
+            if member.is_alive and not member.is_exhausted:
+                return idx
         for idx in self.backline_indexes():
             member = self.members[idx]
             if member.is_alive and member.current_st > 0:
@@ -102,12 +145,30 @@ class Party:
 
     def swap_to(self, index: int) -> Optional[Combatant]:
         if 0 <= index < len(self.members) and self.members[index].is_alive:
+            if self.hasher is not None:
+                self.hasher.toggle(HASH_FRONT, self.hash_slot, self.front_index, index)
             self.front_index = index
             return self.front()
         return None
 
+    def none_can_act(self) -> bool:
+        """Every living member is exhausted (false once the party is defeated)."""
+
+        alive = False
+        for member in self.members:
+            if member.is_alive:
+                if not member.is_exhausted:
+                    return False
+                alive = True
+        return alive
+
     def all_defeated(self) -> bool:
-        return all(not member.is_alive for member in self.members)
+        # Plain loop: checked several times per turn, and a generator
+        # expression here allocates a frame on every call.
+        for member in self.members:
+            if member.is_alive:
+                return False
+        return True
 
 
 @dataclass
@@ -122,88 +183,330 @@ class Item:
 # --- Game data ------------------------------------------------------------
 
 
+# (name, max_hp, max_st, attack, defense), in Combatant field order.
+MemberSpec = Tuple[str, int, int, int, int]
+
+DEFAULT_PLAYER_LABEL = "Hero Squad"
+DEFAULT_PLAYER_MEMBERS: Tuple[MemberSpec, ...] = (
+    ("Hero", 100, 50, 20, 10),
+    ("Archer", 80, 65, 24, 6),
+    ("Mage", 70, 80, 28, 4),
+)
+DEFAULT_ENEMY_LABEL = "Forest Ambush"
+# enemies.yaml ids of the default encounter; DEFAULT_ENEMY_MEMBERS is the
+# shipped data, used when a bundle lacks them.
+DEFAULT_ENEMY_IDS = ("slime", "goblin", "bat")
+DEFAULT_ENEMY_MEMBERS: Tuple[MemberSpec, ...] = (
+    ("Slime", 50, 40, 10, 5),
+    ("Goblin", 70, 55, 15, 7),
+    ("Bat", 40, 30, 12, 3),
+)
+
+
 def default_player_party() -> Party:
     """Create the 3-member hero party from the gameplay doc."""
 
-    members = [
-        Combatant(name="Hero", max_hp=100, max_st=50, attack=20, defense=10),
-        Combatant(name="Archer", max_hp=80, max_st=65, attack=24, defense=6),
-        Combatant(name="Mage", max_hp=70, max_st=80, attack=28, defense=4),
-    ]
-    return Party(label="Hero Squad", members=members, front_index=0)
+    members = [Combatant(*spec) for spec in DEFAULT_PLAYER_MEMBERS]
+    return Party(label=DEFAULT_PLAYER_LABEL, members=members, front_index=0)
 
 
 def default_enemy_party() -> Party:
-    """Create the Forest Ambush enemy party."""
+    """Create the Forest Ambush enemy party from the current ``enemies.yaml``."""
+
+    members = [Combatant(*spec) for spec in current_data().default_enemy_members]
+    return Party(label=DEFAULT_ENEMY_LABEL, members=members, front_index=0)
+
+
+def default_inventory() -> Dict[str, int]:
+    """Return the item counts the player starts each battle with."""
+
+    return {"potion_small": 1}
+
+
+def load_items() -> Mapping[str, Item]:
+    """Return available items for the player's inventory.
+
+    Read-only view of the current :mod:`data_registry` snapshot, so it
+    follows hot reloads of ``items.yaml``.
+    """
+
+    return current_data().items
+
+
+# --- Object pool ----------------------------------------------------------
+
+
+DEFAULT_POOL_SIZE = 1024
+
+
+class CombatantPool:
+    """Recycles ``Combatant`` and ``Party`` objects between battles.
+
+    :meth:`party` hands out a party at full HP/ST built from member specs,
+    reusing released objects (and their ``members`` list) when available;
+    :meth:`release` returns a party and its members once nothing refers to
+    them any more.  At most ``max_free`` released parties are kept, so a
+    burst of finished or hibernated sessions does not pin its peak memory.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_free: int = DEFAULT_POOL_SIZE) -> None:
+        self._combatants: List[Combatant] = []
+        self._parties: List[Party] = []
+        self._lock = threading.Lock()
+        self.max_free = max_free
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, spec: MemberSpec) -> Combatant:
+        with self._lock:
+            member = self._combatants.pop() if self._combatants else None
+        if member is None:
+            self.created += 1
+            return Combatant(*spec)
+        self.reused += 1
+        member.name, member.max_hp, member.max_st, member.attack, member.defense = spec
+        member.magic = 0
+        member.element = None
+        member.element_id = -1
+        member.current_hp = member.max_hp
+        member.current_st = member.max_st
+        member.hasher = None
+        member.hash_slot = 0
+        return member
+
+    def party(self, label: str, specs: Tuple[MemberSpec, ...]) -> Party:
+        with self._lock:
+            party = self._parties.pop() if self._parties else None
+        if party is None:
+            return Party(label=label, members=[self.acquire(spec) for spec in specs], front_index=0)
+        party.label = label
+        party.front_index = 0
+        party.hasher = None
+        party.hash_slot = 0
+        for spec in specs:
+            party.members.append(self.acquire(spec))
+        return party
+
+    def release(self, party: Party) -> None:
+        with self._lock:
+            if len(self._parties) >= self.max_free:
+                return
+            self._combatants.extend(party.members)
+            party.members.clear()
+            self._parties.append(party)
+
 
-    members = [
-        Combatant(name="Slime", max_hp=50, max_st=40, attack=10, defense=5),
-        Combatant(name="Goblin", max_hp=70, max_st=55, attack=15, defense=7),
-        Combatant(name="Bat", max_hp=40, max_st=30, attack=12, defense=3),
-    ]
-    return Party(label="Forest Ambush", members=members, front_index=0)
+POOL = CombatantPool()
 
 
-def load_items() -> Dict[str, Item]:
-    """Return available items for the player's inventory."""
+# --- State hashing --------------------------------------------------------
 
-    potion = Item(id="potion_small", name="Small Potion", heal_amount=20)
-    return {potion.id: potion}
+
+HASH_HP = 0
+HASH_ST = 1
+HASH_FRONT = 2
+HASH_GUARD = 3
+HASH_ITEM = 4
+
+ZOBRIST_SEED = 0x9E3779B97F4A7C15
+PARTY_HASH_SLOTS = {"player": 0, "enemy": 1}
+MEMBER_SLOT_STRIDE = 64
+
+_zobrist_tables: Dict[Tuple[int, int], List[int]] = {}
+
+
+def zobrist_keys(feature: int, slot: int, upto: int) -> List[int]:
+    """Keys for ``feature`` values ``0..upto`` at ``slot`` (same in every process)."""
+
+    keys = _zobrist_tables.get((feature, slot))
+    if keys is None:
+        keys = _zobrist_tables[(feature, slot)] = []
+    base = ZOBRIST_SEED ^ (feature << 56) ^ (slot << 32)
+    while len(keys) <= upto:
+        keys.append(splitmix64(base ^ len(keys)))
+    return keys
+
+
+def item_hash_key(item_id: str, count: int) -> int:
+    """Key for holding ``count`` of ``item_id``; an empty slot hashes like a missing one."""
+
+    if count == 0:
+        return 0
+    return zobrist_keys(HASH_ITEM, zlib.crc32(item_id.encode("utf-8")) & 0xFFFFFF, count)[count]
+
+
+class ZobristHash:
+    """64-bit hash of a battle's mutable state, updated one change at a time."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: int = 0) -> None:
+        self.value = value
+
+    def toggle(self, feature: int, slot: int, before: int, after: int) -> None:
+        if before != after:
+            keys = _zobrist_tables.get((feature, slot))
+            if keys is None or len(keys) <= max(before, after):
+                keys = zobrist_keys(feature, slot, max(before, after))
+            self.value ^= keys[before] ^ keys[after]
+
+
+# Snapshot layout: player front, enemy front, player guard, enemy guard, then
+# (hp, st) per player member, (hp, st) per enemy member, one count per
+# inventory item (in BattleState.item_ids order) and finally the hash (or
+# None when hashing is off).
+Snapshot = Tuple[Optional[int], ...]
 
 
 # --- Combat logic ---------------------------------------------------------
 
 
-def calculate_damage(attacker: Combatant, defender: Combatant) -> int:
-    """Calculate damage according to the formula in the design doc."""
+def calculate_damage(attacker: Combatant, defender: Combatant, chart: Optional[ElementChart] = None) -> int:
+    """Calculate damage according to the formula in the design doc.
 
-    return max(1, attacker.attack - defender.defense)
+    ``max(1, atk - def)`` is scaled by the ``types.json`` multiplier of the
+    attacker's element against the defender's (members without an element
+    are neutral) and floored at 1 again.  The multiplier is read from the
+    flat chart by the members' ``element_id``; members that never joined a
+    battle are looked up by element name.
+    """
 
+    if chart is None:
+        chart = current_data().element_chart
+    attacker_id = attacker.element_id if attacker.element_id >= 0 else chart.element_index(attacker.element)
+    defender_id = defender.element_id if defender.element_id >= 0 else chart.element_index(defender.element)
+    steps = chart.half_steps[attacker_id * chart.size + defender_id]
+    return max(1, max(1, attacker.attack - defender.defense) * steps // 2)
 
-@dataclass
-class BattleLogEntry:
-    message: str
+
+# An enemy policy picks the enemy's command once its front is ready to act:
+# ("attack",), ("defend",) or ("swap", index).
+EnemyAction = Tuple
+EnemyPolicy = Callable[["BattleState"], EnemyAction]
 
 
 class BattleState:
-    """Tracks the current state of an ongoing battle."""
+    """Tracks the current state of an ongoing battle.
+
+    Everything that happens is emitted as a structured event to ``sink``
+    (see :mod:`battle_log`); the console sink reproduces the CLI output.
+    Enemy turns follow the fixed attack-or-guard rule unless an
+    ``enemy_policy`` is supplied.  ``rng`` is the battle's random stream;
+    rules and policies that need randomness must draw from it so seeded
+    sessions replay exactly.  ``rng`` may also be a :class:`seeds.SeedStream`;
+    its ``random.Random`` (a few KB of Mersenne state) is then only built
+    the first time :attr:`rng` is read, so battles that never draw from it
+    stay small.  ``items`` and ``element_chart`` default to the current
+    :mod:`data_registry` snapshot; every member's ``element_id`` is set to
+    its row in ``element_chart``.
+    """
+
+    __slots__ = (
+        "player_party",
+        "enemy_party",
+        "player_inventory",
+        "sink",
+        "log_enabled",
+        "enemy_policy",
+        "rng_source",
+        "_rng",
+        "items",
+        "element_chart",
+        "guard_flags",
+        "item_ids",
+        "hasher",
+    )
 
     def __init__(
         self,
         player_party: Party,
         enemy_party: Party,
         player_inventory: Dict[str, int],
+        sink: Optional[LogSink] = None,
+        enemy_policy: Optional[EnemyPolicy] = None,
+        rng: Union[random.Random, SeedStream, None] = None,
+        items: Optional[Mapping[str, Item]] = None,
+        element_chart: Optional[ElementChart] = None,
     ) -> None:
         self.player_party = player_party
         self.enemy_party = enemy_party
         self.player_inventory = player_inventory
+        self.sink = ConsoleSink() if sink is None else sink
+        self.log_enabled = self.sink.enabled
+        self.enemy_policy = enemy_policy
+        self.rng_source = rng if isinstance(rng, SeedStream) else None
+        self._rng = rng if isinstance(rng, random.Random) else None
+        self.items = load_items() if items is None else items
+        self.element_chart = chart = current_data().element_chart if element_chart is None else element_chart
+        for party in (player_party, enemy_party):
+            for member in party.members:
+                member.element_id = chart.element_index(member.element)
         self.guard_flags = {"player": False, "enemy": False}
-        self.log: List[BattleLogEntry] = []
+        self.item_ids: Tuple[str, ...] = tuple(player_inventory)
+        self.hasher: Optional[ZobristHash] = None
+
+    @property
+    def rng(self) -> random.Random:
+        if self._rng is None:
+            self._rng = random.Random(0) if self.rng_source is None else self.rng_source.random()
+        return self._rng
+
+    @rng.setter
+    def rng(self, value: random.Random) -> None:
+        self._rng = value
+
+    @property
+    def rng_started(self) -> bool:
+        """Whether :attr:`rng` has been built (and so may have been drawn from)."""
+
+        return self._rng is not None
 
     # ------------------------------------------------------------------
     # Utility helpers
     # ------------------------------------------------------------------
-    def add_log(self, message: str) -> None:
-        self.log.append(BattleLogEntry(message))
-        print(message)
+    def emit(self, kind: int, *fields: object) -> None:
+        if self.log_enabled:
+            self.sink.record((kind, *fields))
+
+    def set_guard(self, label: str, value: bool) -> None:
+        if self.hasher is not None and self.guard_flags[label] != value:
+            self.hasher.toggle(HASH_GUARD, PARTY_HASH_SLOTS[label], int(not value), int(value))
+        self.guard_flags[label] = value
+
+    def set_item_count(self, item_id: str, count: int) -> None:
+        if self.hasher is not None:
+            self.hasher.value ^= item_hash_key(item_id, self.player_inventory.get(item_id, 0)) ^ item_hash_key(
+                item_id, count
+            )
+        if item_id not in self.item_ids:
+            self.item_ids += (item_id,)
+        self.player_inventory[item_id] = count
 
     def apply_guard(self, damage: int, target_label: str) -> int:
         if not self.guard_flags[target_label]:
             return damage
         reduced = max(1, damage // 2)
-        self.guard_flags[target_label] = False
+        self.set_guard(target_label, False)
         return reduced
 
+    def resolve_damage(self, attacker: Combatant, defender: Combatant, target_label: str) -> int:
+        """Apply one hit from ``attacker`` to ``defender`` and return the damage dealt."""
+
+        damage = calculate_damage(attacker, defender, self.element_chart)
+        damage = self.apply_guard(damage, target_label)
+        defender.take_damage(damage)
+        return damage
+
     def ensure_actor_ready(self, party: Party, label: str) -> bool:
         front = party.front()
         if front and front.is_alive and not front.is_exhausted:
             return True
 
-        reason = ""
         if front is None or not front.is_alive:
-            reason = "戦闘不能"
+            reason = Msg.REASON_KO
         else:
-            reason = "ST切れ"
+            reason = Msg.REASON_EXHAUSTED
         swapped = self.handle_forced_swap(party, reason)
         if swapped:
             new_front = party.front()
@@ -211,45 +514,48 @@ class BattleState:
                 return True
         if label == "player":
             if front and front.is_exhausted:
-                self.add_log(f"{front.name}はSTが不足して行動できない！")
+                self.emit(EventKind.CANNOT_ACT, front.name)
             else:
-                self.add_log(f"{party.label}には戦えるメンバーがいない！")
+                self.emit(EventKind.NO_FIGHTERS, party.label)
         return False
 
-    def handle_forced_swap(self, party: Party, reason: str) -> bool:
+    def handle_forced_swap(self, party: Party, reason: int) -> bool:
+        """``reason`` is a :class:`messages.Msg` id (``REASON_KO``/``REASON_EXHAUSTED``)."""
+
         outgoing = party.front()
-        if outgoing and outgoing.is_alive and not outgoing.is_exhausted and reason == "ST切れ":
+        if outgoing and outgoing.is_alive and not outgoing.is_exhausted and reason == Msg.REASON_EXHAUSTED:
             return False
         idx = party.first_available_backliner()
         if idx is None:
-            if reason:
-                self.add_log(f"{party.label}は{reason}だが交代要員がいない！")
+            self.emit(EventKind.NO_SWAP_TARGET, party.label, reason)
             return False
         new_front = party.swap_to(idx)
         if new_front:
             if party is self.player_party:
-                self.guard_flags["player"] = False
+                self.set_guard("player", False)
             else:
-                self.guard_flags["enemy"] = False
-            reason_text = f"{reason}のため" if reason else ""
-            self.add_log(
-                f"【強制交代】{new_front.name}が{reason_text}{party.label}の前衛に出てきた！"
-            )
+                self.set_guard("enemy", False)
+            self.emit(EventKind.FORCED_SWAP, party.label, new_front.name, reason)
             return True
         return False
 
     def apply_backline_regen(self, party: Party) -> None:
-        gains: List[str] = []
+        if not self.log_enabled:
+            for idx in party.backline_indexes():
+                member = party.members[idx]
+                if member.is_alive:
+                    member.regen_st(BACKLINE_ST_REGEN)
+            return
+        gains: List[Tuple[str, int]] = []
         for idx in party.backline_indexes():
             member = party.members[idx]
             if not member.is_alive:
                 continue
             restored = member.regen_st(BACKLINE_ST_REGEN)
             if restored > 0:
-                gains.append(f"{member.name}+{restored}")
+                gains.append((member.name, restored))
         if gains:
-            joined = " / ".join(gains)
-            self.add_log(f"{party.label}の後衛がSTを回復: {joined}")
+            self.sink.record((EventKind.REGEN, party.label, tuple(gains)))
 
     # ------------------------------------------------------------------
     # Player actions
@@ -262,66 +568,65 @@ class BattleState:
         if not attacker or not defender:
             return False
         if not attacker.spend_st(ATTACK_ST_COST):
-            self.add_log("STが不足しています。")
+            self.emit(EventKind.ST_SHORT)
             return False
-        damage = calculate_damage(attacker, defender)
-        damage = self.apply_guard(damage, "enemy")
-        defender.take_damage(damage)
-        self.add_log(f"{attacker.name}のこうげき！ {defender.name}に{damage}のダメージ！")
+        damage = self.resolve_damage(attacker, defender, "enemy")
+        self.emit(EventKind.ATTACK, "player", attacker.name, defender.name, damage)
         if not defender.is_alive:
-            self.add_log(f"{defender.name}はたおれた！")
-            self.handle_forced_swap(self.enemy_party, "戦闘不能")
+            self.emit(EventKind.KO, "enemy", defender.name)
+            self.handle_forced_swap(self.enemy_party, Msg.REASON_KO)
         return True
 
     def player_defend(self) -> bool:
-        if not self.ensure_actor_ready(self.player_party, "player"):
+        # With nobody left who can act, guarding is how the front rests;
+        # otherwise no command could ever use the turn again.
+        if not self.player_party.none_can_act() and not self.ensure_actor_ready(self.player_party, "player"):
             return False
         actor = self.player_party.front()
-        assert actor
-        self.guard_flags["player"] = True
+        if actor is None or not actor.is_alive:
+            return False
+        self.set_guard("player", True)
         restored = actor.regen_st(DEFEND_ST_REFUND)
-        self.add_log(
-            f"{actor.name}はぼうぎょのたいせい！ 次の被ダメージ半減。 STが{restored}回復した。"
-        )
+        self.emit(EventKind.GUARD, actor.name, restored)
         return True
 
     def player_use_item(self, item_id: str) -> bool:
         remaining = self.player_inventory.get(item_id, 0)
         if remaining <= 0:
-            self.add_log("アイテムがありません！")
+            self.emit(EventKind.NO_ITEM)
             return False
         front = self.player_party.front()
         if not front:
-            self.add_log("使える味方がいません。")
+            self.emit(EventKind.NO_ITEM_TARGET)
             return False
-        item = load_items()[item_id]
+        item = self.items[item_id]
         healed = front.heal(item.heal_amount)
-        self.player_inventory[item_id] = remaining - 1
-        self.add_log(f"{front.name}は{item.name}を使った！ HPが{healed}回復した。")
+        self.set_item_count(item_id, remaining - 1)
+        self.emit(EventKind.ITEM, front.name, item.name, healed)
         return True
 
     def player_swap(self, target_index: int) -> bool:
         front = self.player_party.front()
         if not front:
-            self.add_log("交代できる味方がいません。")
+            self.emit(EventKind.SWAP_NO_FRONT)
             return False
         if front.current_st < VOLUNTARY_SWAP_COST:
-            self.add_log("ST不足で交代できません。")
+            self.emit(EventKind.SWAP_ST_SHORT)
             return False
         if target_index == self.player_party.front_index:
-            self.add_log("すでに前衛です。")
+            self.emit(EventKind.SWAP_ALREADY_FRONT)
             return False
         if target_index not in self.player_party.available_backliner_indexes():
-            self.add_log("その味方は戦闘不能です。")
+            self.emit(EventKind.SWAP_TARGET_DOWN)
             return False
         front.spend_st(VOLUNTARY_SWAP_COST)
         outgoing = front
         incoming = self.player_party.swap_to(target_index)
         if incoming:
-            self.guard_flags["player"] = False
-            self.add_log(f"{outgoing.name}と{incoming.name}が入れ替わった！")
+            self.set_guard("player", False)
+            self.emit(EventKind.SWAP, outgoing.name, incoming.name)
             return True
-        self.add_log("交代に失敗しました。")
+        self.emit(EventKind.SWAP_FAILED)
         return False
 
     # ------------------------------------------------------------------
@@ -334,21 +639,59 @@ class BattleState:
         defender = self.player_party.front()
         if not attacker or not defender:
             return
+        if self.enemy_policy is not None:
+            action = self.enemy_policy(self)
+            if self.perform_enemy_action(action):
+                return
         if attacker.current_st < ATTACK_ST_COST:
-            self.guard_flags["enemy"] = True
-            restored = attacker.regen_st(DEFEND_ST_REFUND)
-            self.add_log(
-                f"{attacker.name}は体勢を立て直している… STが{restored}回復。次の被ダメージ半減。"
-            )
+            self.enemy_defend()
         else:
-            attacker.spend_st(ATTACK_ST_COST)
-            damage = calculate_damage(attacker, defender)
-            damage = self.apply_guard(damage, "player")
-            defender.take_damage(damage)
-            self.add_log(f"{attacker.name}のこうげき！ {defender.name}に{damage}のダメージ！")
-            if not defender.is_alive:
-                self.add_log(f"{defender.name}はたおれた！")
-                self.handle_forced_swap(self.player_party, "戦闘不能")
+            self.enemy_attack()
+
+    def perform_enemy_action(self, action: EnemyAction) -> bool:
+        kind = action[0]
+        if kind == "attack":
+            return self.enemy_attack()
+        if kind == "defend":
+            return self.enemy_defend()
+        if kind == "swap":
+            return self.enemy_swap(action[1])
+        raise ValueError(f"unknown enemy action: {kind!r}")
+
+    def enemy_attack(self) -> bool:
+        attacker = self.enemy_party.front()
+        defender = self.player_party.front()
+        if not attacker or not defender or not attacker.spend_st(ATTACK_ST_COST):
+            return False
+        damage = self.resolve_damage(attacker, defender, "player")
+        self.emit(EventKind.ATTACK, "enemy", attacker.name, defender.name, damage)
+        if not defender.is_alive:
+            self.emit(EventKind.KO, "player", defender.name)
+            self.handle_forced_swap(self.player_party, Msg.REASON_KO)
+        return True
+
+    def enemy_defend(self) -> bool:
+        actor = self.enemy_party.front()
+        if not actor:
+            return False
+        self.set_guard("enemy", True)
+        restored = actor.regen_st(DEFEND_ST_REFUND)
+        self.emit(EventKind.ENEMY_GUARD, actor.name, restored)
+        return True
+
+    def enemy_swap(self, target_index: int) -> bool:
+        front = self.enemy_party.front()
+        if not front or front.current_st < VOLUNTARY_SWAP_COST:
+            return False
+        if target_index not in self.enemy_party.available_backliner_indexes():
+            return False
+        front.spend_st(VOLUNTARY_SWAP_COST)
+        incoming = self.enemy_party.swap_to(target_index)
+        if not incoming:
+            return False
+        self.set_guard("enemy", False)
+        self.emit(EventKind.SWAP, front.name, incoming.name)
+        return True
 
     # ------------------------------------------------------------------
     def end_player_turn(self) -> None:
@@ -360,6 +703,97 @@ class BattleState:
     def is_battle_over(self) -> bool:
         return self.player_party.all_defeated() or self.enemy_party.all_defeated()
 
+    # ------------------------------------------------------------------
+    # Snapshots and hashing
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Snapshot:
+        """Pack every mutable value of the battle into a flat tuple."""
+
+        values: List[Optional[int]] = [
+            self.player_party.front_index,
+            self.enemy_party.front_index,
+            int(self.guard_flags["player"]),
+            int(self.guard_flags["enemy"]),
+        ]
+        for party in (self.player_party, self.enemy_party):
+            for member in party.members:
+                values.append(member.current_hp)
+                values.append(member.current_st)
+        inventory = self.player_inventory
+        for item_id in self.item_ids:
+            values.append(inventory.get(item_id, 0))
+        values.append(None if self.hasher is None else self.hasher.value)
+        return tuple(values)
+
+    def restore(self, snapshot: Snapshot) -> None:
+        """Return to ``snapshot`` (taken from this state) in O(members)."""
+
+        self.player_party.front_index = snapshot[0]
+        self.enemy_party.front_index = snapshot[1]
+        self.guard_flags["player"] = bool(snapshot[2])
+        self.guard_flags["enemy"] = bool(snapshot[3])
+        pos = 4
+        for party in (self.player_party, self.enemy_party):
+            for member in party.members:
+                member.current_hp = snapshot[pos]
+                member.current_st = snapshot[pos + 1]
+                pos += 2
+        inventory = self.player_inventory
+        stored = len(snapshot) - 1 - pos
+        for idx, item_id in enumerate(self.item_ids):
+            # Items first seen after the snapshot was taken were not held then.
+            inventory[item_id] = snapshot[pos + idx] if idx < stored else 0
+        pos += stored
+        if self.hasher is not None:
+            self.hasher.value = snapshot[pos] if snapshot[pos] is not None else self.compute_hash()
+
+    def compute_hash(self) -> int:
+        """Hash the current state from scratch."""
+
+        value = 0
+        for label, party in (("player", self.player_party), ("enemy", self.enemy_party)):
+            party_slot = PARTY_HASH_SLOTS[label]
+            value ^= zobrist_keys(HASH_FRONT, party_slot, party.front_index)[party.front_index]
+            value ^= zobrist_keys(HASH_GUARD, party_slot, 1)[int(self.guard_flags[label])]
+            for idx, member in enumerate(party.members):
+                slot = party_slot * MEMBER_SLOT_STRIDE + idx
+                value ^= zobrist_keys(HASH_HP, slot, member.current_hp)[member.current_hp]
+                value ^= zobrist_keys(HASH_ST, slot, member.current_st)[member.current_st]
+        for item_id, count in self.player_inventory.items():
+            value ^= item_hash_key(item_id, count)
+        return value
+
+    def enable_hashing(self) -> int:
+        """Start tracking the Zobrist hash incrementally and return its value.
+
+        Code that assigns HP/ST/front indexes directly instead of going
+        through the ``Combatant``/``Party``/``BattleState`` methods must call
+        :meth:`rehash` afterwards.
+        """
+
+        if self.hasher is None:
+            self.hasher = ZobristHash()
+            for label, party in (("player", self.player_party), ("enemy", self.enemy_party)):
+                party.hasher = self.hasher
+                party.hash_slot = PARTY_HASH_SLOTS[label]
+                for idx, member in enumerate(party.members):
+                    member.hasher = self.hasher
+                    member.hash_slot = party.hash_slot * MEMBER_SLOT_STRIDE + idx
+        return self.rehash()
+
+    def rehash(self) -> int:
+        assert self.hasher is not None
+        self.hasher.value = self.compute_hash()
+        return self.hasher.value
+
+    @property
+    def zobrist(self) -> int:
+        """Current state hash (hashing is enabled on first use)."""
+
+        if self.hasher is None:
+            return self.enable_hashing()
+        return self.hasher.value
+
 
 # --- State machine --------------------------------------------------------
 
@@ -371,161 +805,468 @@ class GameState:
     RESULT = "Result"
 
 
+# A screen is a generator that yields the valid inputs of each prompt and
+# receives the player's (stripped) response.
+Screen = Generator[List[str], str, None]
+
+
 class Game:
-    """Main game class implementing the state machine."""
+    """Main game class implementing the state machine.
+
+    Screens never block: they yield prompts (see :data:`Screen`) and all
+    output goes through ``write``, so :meth:`run` can drive them from the
+    terminal while :mod:`server` drives many sessions from asyncio.
+
+    Battles draw their random streams from ``seed``; when a ``recorder`` is
+    attached, every accepted prompt choice and each battle's final state
+    hash are recorded so the session can be replayed (see :mod:`replay`).
+    With ``stage`` set, each battle plays that stage's waves from
+    :mod:`stages` back to back.  Parties come from :data:`POOL` and are
+    returned to it when the next battle starts.  Each battle pins the
+    current :mod:`data_registry` snapshot (items, enemies, stages), so a hot
+    reload only affects battles that start after it.  With ``save_path`` set,
+    progress and settings are loaded from that save (if it exists) and an
+    autosave is queued on the background writer after every turn (see
+    :mod:`savegame`).  An ``analytics`` emitter receives the
+    ``docs/analytics.yaml`` events; emitting never blocks (see
+    :mod:`analytics`).  All text comes from the :mod:`messages` catalog for
+    the saved ``language``.  With a ``terminal`` (see :mod:`terminal`),
+    output is buffered into one write per prompt and the battle status can
+    be redrawn as a diff against the previous turn.  An idle session can be
+    packed into a few hundred bytes and rebuilt later at the same prompt
+    (see :mod:`hibernation`).  ``enemy_policy`` replaces the fixed enemy
+    rule in every battle, e.g. the compiled ``docs/ai.yaml`` table from
+    :mod:`enemy_ai`.  A ``headless`` game produces no text at all: battles
+    log to a :class:`battle_log.NullSink` and the screens skip formatting,
+    which is how :mod:`replay` re-runs sessions.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        recorder: Optional["ReplayRecorder"] = None,
+        write: Callable[[str], None] = print,
+        stage: Optional[str] = None,
+        save_path: Optional[str] = None,
+        autosave: Optional["AutosaveWriter"] = None,
+        analytics: Optional["AnalyticsEmitter"] = None,
+        terminal: Optional["Terminal"] = None,
+        enemy_policy: Optional[EnemyPolicy] = None,
+        headless: bool = False,
+    ) -> None:
+        if stage is not None:
+            from stages import get_stage
+
+            get_stage(stage)
+        self.stage_id = stage
+        self.stage_run: Optional["StageRun"] = None
+        self.seed = random_seed() if seed is None else seed
+        self.seeds = SeedStream(self.seed)
+        self.battle_count = 0
+        self.recorder = recorder
+        self.enemy_policy = enemy_policy
+        self.terminal = terminal
+        self.write = write if terminal is None else terminal.write
+        self.headless = headless
         self.state = GameState.BOOT
         self.player_party: Optional[Party] = None
         self.enemy_party: Optional[Party] = None
         self.inventory: Dict[str, int] = {}
-        self.last_result: Optional[str] = None
+        self.last_result: Optional[int] = None
         self.battle_state: Optional[BattleState] = None
+        self.wins = 0
+        self.losses = 0
+        self.language = "ja"
+        self.volume = 1.0
+        self.analytics = analytics
+        self.session_id = f"{random_seed():016x}"
+        # Choices accepted since the last top-level prompt; replaying them
+        # from that prompt returns a hibernated session to a nested one.
+        self.resume_inputs: List[str] = []
+        self.save_path = save_path
+        self.autosave_writer = autosave
+        self.catalog: Catalog = load_catalog(self.language)
+        if save_path is not None:
+            from savegame import autosave_writer, load_save
+
+            if self.autosave_writer is None:
+                self.autosave_writer = autosave_writer()
+            if os.path.exists(save_path):
+                self.apply_save(load_save(save_path))
+        self.data: DataSnapshot = current_data()
+
+    def apply_save(self, saved: "SaveData") -> None:
+        """Take progress and settings from a loaded save."""
+
+        self.wins, self.losses = saved.wins, saved.losses
+        self.language, self.volume = saved.language, saved.volume
+        self.catalog = load_catalog(self.language)
 
     def run(self) -> None:
+        """Play a session on the terminal."""
+
+        session = self.session()
+        terminal = self.terminal
+        try:
+            next(session)
+            while True:
+                if terminal is not None:
+                    terminal.flush("> ")
+                    line = input()
+                else:
+                    line = input("> ")
+                session.send(line.strip())
+        except StopIteration:
+            pass
+        finally:
+            if terminal is not None:
+                terminal.flush()
+
+    def session(self) -> Screen:
+        """The whole Boot -> Title -> Battle -> Result loop as one screen."""
+
         self.state = GameState.BOOT
-        print("ゲームを起動しています...")
+        if self.analytics is not None:
+            self.analytics.emit("start_game", self.session_id)
+        self.say(Msg.BOOT)
         self.transition(GameState.TITLE)
+        yield from self.resume()
+
+    def resume(self) -> Screen:
+        """The screen loop from the current state (see :mod:`hibernation`)."""
+
         while True:
             if self.state == GameState.TITLE:
-                if not self.title_screen():
+                if not (yield from self.title_screen()):
                     break
             elif self.state == GameState.BATTLE:
-                self.battle_screen()
+                yield from self.battle_screen()
             elif self.state == GameState.RESULT:
-                self.result_screen()
+                yield from self.result_screen()
             else:
                 break
 
     def transition(self, next_state: str) -> None:
         self.state = next_state
 
+    def say(self, message: int, *args: object) -> None:
+        if not self.headless:
+            self.write(self.catalog.format(message, *args))
+
+    def heading(self, message: int) -> None:
+        if not self.headless:
+            self.write("\n" + self.catalog.text(message))
+
+    def menu(self, *messages: int) -> None:
+        if self.headless:
+            return
+        for index, message in enumerate(messages, start=1):
+            self.say(Msg.MENU_OPTION, index, self.catalog.text(message))
+
     # --- Screen implementations -----------------------------------------
 
-    def title_screen(self) -> bool:
-        print("\n=== タイトル画面 ===")
-        print("1) スタート")
-        print("2) 終了")
-        choice = self.prompt(["1", "2"])
+    def title_screen(self) -> Generator[List[str], str, bool]:
+        self.heading(Msg.TITLE_HEADER)
+        self.menu(Msg.TITLE_START, Msg.TITLE_EXIT)
+        choice = yield from self.prompt(["1", "2"])
         if choice == "1":
             self.start_battle()
             self.transition(GameState.BATTLE)
             return True
-        print("ゲームを終了します。")
+        self.say(Msg.TITLE_QUIT)
         return False
 
     def start_battle(self) -> None:
-        self.player_party = default_player_party()
-        self.enemy_party = default_enemy_party()
-        self.inventory = {"potion_small": 1}
+        self.release_parties()
+        self.data = current_data()
+        self.player_party = POOL.party(DEFAULT_PLAYER_LABEL, DEFAULT_PLAYER_MEMBERS)
+        self.inventory = default_inventory()
+        if self.stage_id is None:
+            enemy_party = POOL.party(DEFAULT_ENEMY_LABEL, self.data.default_enemy_members)
+        else:
+            from stages import StageRun, get_stage
+
+            self.stage_run = StageRun(get_stage(self.stage_id, self.data), data=self.data)
+            enemy_party = self.stage_run.next_wave()
+        self.begin_wave(enemy_party)
+        if self.analytics is not None:
+            self.analytics.emit("start_battle", self.session_id, {"battle": self.battle_count, "stage": self.stage_id})
+
+    def begin_wave(self, enemy_party: Party) -> None:
+        assert self.player_party
+        self.enemy_party = enemy_party
         self.battle_state = BattleState(
             player_party=self.player_party,
             enemy_party=self.enemy_party,
             player_inventory=self.inventory,
+            sink=NULL_SINK if self.headless else ConsoleSink(self.write, self.catalog),
+            rng=self.seeds.split(self.battle_count),
+            items=self.data.items,
+            element_chart=self.data.element_chart,
+            enemy_policy=self.enemy_policy,
         )
-        print(f"\n{self.enemy_party.label}とのバトルがはじまった！")
-
-    def battle_screen(self) -> None:
+        self.battle_count += 1
+        if self.terminal is not None:
+            self.terminal.reset("battle")
+        if not self.headless:
+            self.write("\n" + self.catalog.format(Msg.BATTLE_START, self.enemy_party.label))
+
+    def release_parties(self) -> None:
+        """Return the previous battle's parties (and any preloaded wave) to the pool."""
+
+        if self.stage_run is not None:
+            self.stage_run.close()
+            self.stage_run = None
+        for party in (self.player_party, self.enemy_party):
+            if party is not None:
+                POOL.release(party)
+        self.player_party = None
+        self.enemy_party = None
+        self.battle_state = None
+
+    def battle_screen(self) -> Screen:
         assert self.battle_state
-        while not self.battle_state.is_battle_over():
-            self.render_battle_ui()
-            command = self.prompt(["1", "2", "3", "4"])
-            action_performed = False
-            if command == "1":
-                action_performed = self.battle_state.player_attack()
-            elif command == "2":
-                action_performed = self.battle_state.player_defend()
-            elif command == "3":
-                action_performed = self.battle_state.player_use_item("potion_small")
-            elif command == "4":
-                action_performed = self.handle_player_swap()
-            if not action_performed:
-                continue
-            self.battle_state.end_player_turn()
-            if self.battle_state.is_battle_over():
+        while True:
+            while not self.battle_state.is_battle_over():
+                self.render_battle_ui()
+                command = yield from self.prompt(["1", "2", "3", "4"])
+                if (yield from self.player_command(command)):
+                    self.finish_turn()
+            if not self.advance_wave():
                 break
+        self.finish_battle()
+        if self.analytics is not None:
+            self.analytics.emit(
+                "player_win" if self.last_result == Msg.RESULT_WIN else "player_lose",
+                self.session_id,
+                {"battle": self.battle_count, "stage": self.stage_id},
+            )
+
+    def advance_wave(self) -> bool:
+        """Start the stage's next wave if the current one was won."""
+
+        run = self.stage_run
+        assert self.player_party and self.enemy_party
+        if run is None or not run.has_next_wave() or self.player_party.all_defeated():
+            return False
+        self.say(Msg.WAVE_CLEARED, self.enemy_party.label)
+        POOL.release(self.enemy_party)
+        self.begin_wave(run.next_wave())
+        return True
+
+    def player_command(self, command: str) -> Generator[List[str], str, bool]:
+        """Apply a battle command; returns whether it used up the player's turn."""
+
+        assert self.battle_state
+        if command == "1":
+            return self.battle_state.player_attack()
+        if command == "2":
+            return self.battle_state.player_defend()
+        if command == "3":
+            return self.battle_state.player_use_item("potion_small")
+        if command == "4":
+            return (yield from self.handle_player_swap())
+        return False
+
+    def finish_turn(self) -> None:
+        """Close the player's turn and, unless the battle ended, play the enemy's."""
+
+        assert self.battle_state
+        self.battle_state.end_player_turn()
+        if not self.battle_state.is_battle_over():
             self.battle_state.enemy_take_turn()
             self.battle_state.end_enemy_turn()
-        assert self.player_party and self.enemy_party
+        self.autosave()
+
+    def autosave(self) -> None:
+        """Queue a snapshot for the background writer; no file I/O happens here."""
+
+        if self.autosave_writer is None or self.save_path is None or self.player_party is None:
+            return
+        from savegame import SaveData
+
+        self.autosave_writer.submit(
+            self.save_path,
+            SaveData.capture(self.player_party, self.inventory, self.wins, self.losses, self.language, self.volume),
+        )
+
+    def finish_battle(self) -> None:
+        assert self.player_party and self.enemy_party and self.battle_state
+        if self.recorder is not None:
+            self.recorder.record_battle_end(self.battle_state.zobrist)
         if not self.player_party.all_defeated():
-            self.last_result = "勝利"
-            print(f"{self.enemy_party.label}にしょうりした！")
+            self.last_result = Msg.RESULT_WIN
+            self.wins += 1
+            self.say(Msg.BATTLE_WON, self.enemy_party.label)
+            if self.stage_run is not None:
+                self.say(Msg.STAGE_CLEARED, self.stage_run.stage.name)
         else:
-            self.last_result = "敗北"
-            print("パーティーはぜんめつしてしまった...！")
+            self.last_result = Msg.RESULT_LOSE
+            self.losses += 1
+            self.say(Msg.PARTY_WIPED)
+        self.autosave()
         self.transition(GameState.RESULT)
 
     def render_battle_ui(self) -> None:
         assert self.player_party and self.enemy_party
-        print("\n=== バトル ===")
-        self.render_party(self.player_party, show_st=True)
-        self.render_party(self.enemy_party, show_st=False)
-        item = load_items()["potion_small"]
-        item_count = self.inventory.get(item.id, 0)
-        print("コマンド: 1) こうげき  2) ぼうぎょ  3) アイテム  4) こうたい")
-        print(f"所持アイテム: {item.name} x{item_count}")
+        if self.headless:
+            return
+        catalog = self.catalog
+        item = self.data.items["potion_small"]
+        lines = ["\n" + catalog.text(Msg.BATTLE_HEADER)]
+        lines += self.party_lines(self.player_party, show_st=True)
+        lines += self.party_lines(self.enemy_party, show_st=False)
+        lines.append(
+            catalog.format(
+                Msg.BATTLE_COMMANDS,
+                catalog.text(Msg.CMD_ATTACK),
+                catalog.text(Msg.CMD_DEFEND),
+                catalog.text(Msg.CMD_ITEM),
+                catalog.text(Msg.CMD_SWAP),
+            )
+        )
+        lines.append(catalog.format(Msg.ITEM_COUNT, item.name, self.inventory.get(item.id, 0)))
+        if self.terminal is not None:
+            self.terminal.frame("battle", lines)
+        else:
+            for line in lines:
+                self.write(line)
 
     def render_party(self, party: Party, show_st: bool) -> None:
-        role_label = "プレイヤー" if party is self.player_party else "てき"
-        print(f"[{role_label}] {party.label}")
+        if self.headless:
+            return
+        for line in self.party_lines(party, show_st):
+            self.write(line)
+
+    def party_lines(self, party: Party, show_st: bool) -> List[str]:
+        catalog = self.catalog
+        role_label = catalog.text(Msg.ROLE_PLAYER if party is self.player_party else Msg.ROLE_ENEMY)
+        lines = [catalog.format(Msg.PARTY_HEADER, role_label, party.label)]
         for idx, member in enumerate(party.members):
-            role = "前衛" if idx == party.front_index else "後衛"
-            status = "(戦闘不能)" if not member.is_alive else ""
+            position = catalog.text(Msg.POSITION_FRONT if idx == party.front_index else Msg.POSITION_BACK)
+            status = catalog.text(Msg.STATUS_DOWN) if not member.is_alive else ""
             st_text = (
-                f" ST {member.current_st}/{member.max_st}"
+                catalog.format(Msg.MEMBER_ST, member.current_st, member.max_st)
                 if show_st and member.is_alive
                 else ""
             )
-            print(
-                f" - {role}: {member.name} {status} HP {member.current_hp}/{member.max_hp}{st_text}"
+            lines.append(
+                catalog.format(Msg.MEMBER_LINE, position, member.name, status, member.current_hp, member.max_hp, st_text)
             )
+        return lines
 
-    def result_screen(self) -> None:
+    def result_screen(self) -> Screen:
         assert self.player_party and self.enemy_party and self.last_result
-        print("\n=== リザルト ===")
-        print(f"結果: {self.last_result}")
+        self.heading(Msg.RESULT_HEADER)
+        self.say(Msg.RESULT_LINE, self.catalog.text(self.last_result))
         self.render_party(self.player_party, show_st=True)
         self.render_party(self.enemy_party, show_st=False)
-        print("1) タイトルにもどる")
-        print("2) 終了")
-        choice = self.prompt(["1", "2"])
+        self.menu(Msg.RESULT_TO_TITLE, Msg.TITLE_EXIT)
+        choice = yield from self.prompt(["1", "2"])
         if choice == "1":
             self.transition(GameState.TITLE)
         else:
-            print("ゲームを終了します。さようなら！")
+            self.say(Msg.GOODBYE)
             self.transition("Exit")
 
-    def handle_player_swap(self) -> bool:
+    def handle_player_swap(self) -> Generator[List[str], str, bool]:
         assert self.player_party and self.battle_state
         candidates = self.player_party.available_backliner_indexes()
         if not candidates:
-            print("後衛に健常者がいません。")
+            self.say(Msg.SWAP_NO_CANDIDATE)
             return False
-        print("交代したいメンバーをえらんでください。")
+        self.say(Msg.SWAP_PROMPT)
         option_map: Dict[str, int] = {}
         for display_idx, member_index in enumerate(candidates, start=1):
+            option_map[str(display_idx)] = member_index
+            if self.headless:
+                continue
             member = self.player_party.members[member_index]
-            print(
-                f" {display_idx}) {member.name} HP {member.current_hp}/{member.max_hp} ST {member.current_st}/{member.max_st}"
+            self.say(
+                Msg.SWAP_OPTION,
+                display_idx,
+                member.name,
+                member.current_hp,
+                member.max_hp,
+                member.current_st,
+                member.max_st,
             )
-            option_map[str(display_idx)] = member_index
-        choice = self.prompt(list(option_map.keys()))
+        choice = yield from self.prompt(list(option_map.keys()), nested=True)
         return self.battle_state.player_swap(option_map[choice])
 
-    @staticmethod
-    def prompt(valid_inputs: List[str]) -> str:
+    def prompt(self, valid_inputs: List[str], nested: bool = False) -> Generator[List[str], str, str]:
+        if not nested:
+            self.resume_inputs.clear()
         while True:
-            response = input("> ").strip()
+            response = yield valid_inputs
+            if self.analytics is not None:
+                self.analytics.emit("button_click", self.session_id, {"screen": self.state, "input": response})
             if response in valid_inputs:
+                if self.recorder is not None:
+                    self.recorder.record_choice(valid_inputs.index(response))
+                self.resume_inputs.append(response)
                 return response
-            print(f"{', '.join(valid_inputs)} の中から選択してください。")
+            if not self.headless:
+                self.say(Msg.INVALID_CHOICE, ", ".join(valid_inputs))
 
 
 def main() -> None:
-    if os.getenv("GAME_SEED"):
-        print("GAME_SEED is currently unused in this CLI prototype.")
-    game = Game()
-    game.run()
+    from game_data import GameDataError
+    from terminal import RENDER_MODES, Terminal
+
+    try:
+        current_data()
+    except GameDataError as exc:
+        raise SystemExit(f"{exc} (see requirements.txt)") from None
+    seed_text = os.getenv("GAME_SEED")
+    seed = parse_seed(seed_text) if seed_text else random_seed()
+    replay_path = os.getenv("GAME_REPLAY")
+    stage = os.getenv("GAME_STAGE") or None
+    if replay_path and stage:
+        raise SystemExit("GAME_REPLAY records the default encounter only; unset GAME_STAGE")
+    enemy_ai = os.getenv("GAME_ENEMY_AI") or "rule"
+    if replay_path and enemy_ai != "rule":
+        raise SystemExit("GAME_REPLAY records the fixed enemy rule only; unset GAME_ENEMY_AI")
+    from enemy_ai import AIError, enemy_policy
+
+    try:
+        policy = enemy_policy(enemy_ai)
+    except AIError as exc:
+        raise SystemExit(f"GAME_ENEMY_AI: {exc}") from None
+    recorder = None
+    if replay_path:
+        from replay import ReplayRecorder
+
+        recorder = ReplayRecorder(seed)
+    save_path = os.getenv("GAME_SAVE") or None
+    analytics_dir = os.getenv("GAME_ANALYTICS")
+    emitter = None
+    if analytics_dir:
+        from analytics import open_emitter
+
+        emitter = open_emitter(analytics_dir)
+    render = os.getenv("GAME_RENDER") or ("diff" if sys.stdout.isatty() else "full")
+    if render not in RENDER_MODES:
+        raise SystemExit(f"GAME_RENDER must be one of: {', '.join(RENDER_MODES)}")
+    game = Game(
+        seed=seed,
+        recorder=recorder,
+        stage=stage,
+        save_path=save_path,
+        analytics=emitter,
+        terminal=Terminal(diff=render == "diff"),
+        enemy_policy=policy,
+    )
+    try:
+        game.run()
+    finally:
+        if emitter is not None:
+            emitter.close()
+        if game.autosave_writer is not None:
+            game.autosave_writer.flush()
+        if recorder is not None and replay_path:
+            final_hash = game.battle_state.zobrist if game.battle_state else 0
+            recorder.save(replay_path, final_hash)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,455 @@
+"""Compiled game-data bundle shared by every consumer.
+
+All battle datasets (``types.json``, ``moves.json``, ``monsters.json``,
+``enemies.yaml``, ``items.yaml`` and ``stages.yaml``) are compiled into one
+binary file with an interned string table and column-major ``int32`` tables.
+Processes memory-map the bundle instead of parsing JSON/YAML, so worker
+pools share the same pages and cold boot only pays for hashing the sources.
+The bundle is rebuilt whenever a source file's SHA-256 no longer matches the
+digest stored in its header.
+
+Layout (little endian, every section 4-byte aligned)::
+
+    magic "GDB1", u16 version, u16 source count, 32-byte digest per source
+    u32 string count, u32 blob size, u32 offsets[count + 1], utf-8 blob
+    u32 table count, then per table:
+        u32 name, u32 rows, u32 cols, (u32 column name, u32 kind) * cols,
+        int32 values column by column
+
+String columns hold indices into the string table; ``kind`` is ``0`` for
+integers and ``1`` for strings.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+import struct
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - depends on the environment
+    yaml = None
+
+
+REPO_ROOT = Path(__file__).resolve().parent
+DATA_DIR = REPO_ROOT / "data"
+BUNDLE_PATH = Path(os.getenv("GAME_DATA_BUNDLE", REPO_ROOT / ".cache" / "game_data.bin"))
+
+SOURCES = ("types.json", "moves.json", "monsters.json", "enemies.yaml", "items.yaml", "stages.yaml")
+
+MAGIC = b"GDB1"
+VERSION = 2
+INT = 0
+STR = 1
+
+Column = Tuple[str, int]
+TableData = Tuple[Sequence[Column], List[Sequence[object]]]
+
+# Multipliers are stored in half steps so the bundle stays integer-only.
+HALF_STEPS = {0.5: 1, 1.0: 2, 1.5: 3}
+INT32_RANGE = range(-(1 << 31), 1 << 31)
+
+TABLE_COLUMNS: Dict[str, Tuple[Column, ...]] = {
+    "elements": (("id", STR), ("name_ja", STR), ("name_en", STR), ("icon", STR)),
+    "effectiveness": (("attacker", STR), ("defender", STR), ("multiplier", INT)),
+    "types_meta": (("defaultMultiplier", INT),),
+    "moves": (
+        ("id", STR), ("name", STR), ("type", STR), ("power", INT), ("stCost", INT), ("element", STR), ("hits", INT),
+    ),
+    "monsters": (
+        ("id", STR), ("name", STR), ("hp", INT), ("st", INT), ("atk", INT), ("def", INT), ("mag", INT),
+        ("spd", INT), ("type", STR),
+    ),
+    "enemies": (("id", STR), ("name", STR), ("hp", INT), ("st", INT), ("atk", INT), ("def", INT), ("ai", STR)),
+    "items": (("id", STR), ("name", STR), ("type", STR), ("healAmount", INT), ("description", STR)),
+    "stages": (("id", STR), ("name", STR)),
+    "stage_enemies": (("stage", STR), ("enemy", STR)),
+    "stage_waves": (("stage", STR), ("count", INT), ("enemy", STR)),
+}
+
+
+class GameDataError(RuntimeError):
+    """Raised when the data sources cannot be compiled or the bundle is corrupt."""
+
+
+class DataRecordError(GameDataError, ValueError):
+    """Raised when a source record is missing a field or holds a value the bundle cannot store."""
+
+
+# --- Source parsing -------------------------------------------------------
+
+
+def file_digest(path: Path) -> bytes:
+    return hashlib.sha256(path.read_bytes()).digest()
+
+
+def parse_source(path: Path) -> dict:
+    return parse_text(path.name, path.read_text(encoding="utf-8"))
+
+
+def parse_text(name: str, text: str) -> dict:
+    """Parse a source file's text; ``name`` decides JSON or YAML."""
+
+    if name.endswith(".json"):
+        return json.loads(text)
+    if yaml is None:
+        raise GameDataError(f"PyYAML is required to compile {name}: pip install pyyaml")
+    return yaml.safe_load(text) or {}
+
+
+def _where(source: str, key: str, index: int, record: object) -> str:
+    label = record.get("id") if isinstance(record, dict) else None
+    return f"{source}: {key}[{index}]" + (f" ({label!r})" if isinstance(label, str) else "")
+
+
+def _records(source: str, document: object, key: str) -> List[object]:
+    if not isinstance(document, dict):
+        raise DataRecordError(f"{source}: expected a mapping at the top level")
+    records = document.get(key, [])
+    if not isinstance(records, list):
+        raise DataRecordError(f"{source}: {key!r} must be a list")
+    return records
+
+
+def _field(where: str, record: object, name: str, kind: Optional[int]) -> object:
+    """``record[name]`` checked against a column ``kind`` (``None``: a mapping)."""
+
+    if not isinstance(record, dict) or name not in record:
+        raise DataRecordError(f"{where} has no {name!r}")
+    value = record[name]
+    if kind == STR:
+        valid = isinstance(value, str)
+    elif kind == INT:
+        valid = isinstance(value, int) and not isinstance(value, bool) and value in INT32_RANGE
+    else:
+        valid = isinstance(value, dict)
+    if not valid:
+        expected = {STR: "a string", INT: "a 32-bit integer", None: "a mapping"}[kind]
+        raise DataRecordError(f"{where}: {name!r} must be {expected}, got {value!r}")
+    return value
+
+
+def _half_steps(where: str, record: dict, name: str, default: Optional[float] = None) -> int:
+    """``record[name]`` as a multiplier in half steps (see :data:`HALF_STEPS`)."""
+
+    value = record.get(name, default)
+    if value is None:
+        raise DataRecordError(f"{where} has no {name!r}")
+    steps = HALF_STEPS.get(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if steps is None:
+        raise DataRecordError(f"{where}: {name!r} must be one of {sorted(HALF_STEPS)}, got {value!r}")
+    return steps
+
+
+def _rows(source: str, document: object, key: str, table: str) -> List[Sequence[object]]:
+    rows = []
+    for index, record in enumerate(_records(source, document, key)):
+        where = _where(source, key, index, record)
+        rows.append(tuple(_field(where, record, name, kind) for name, kind in TABLE_COLUMNS[table]))
+    return rows
+
+
+def build_tables(documents: Dict[str, dict]) -> Dict[str, TableData]:
+    """Flatten the parsed source documents into bundle tables.
+
+    Raises :class:`DataRecordError`, naming the file and record, when a
+    record lacks a column or holds a value of the wrong kind.
+    """
+
+    types = documents["types.json"]
+    elements = []
+    for index, element in enumerate(_records("types.json", types, "elements")):
+        where = _where("types.json", "elements", index, element)
+        name = _field(where, element, "name", None)
+        elements.append(
+            (
+                _field(where, element, "id", STR),
+                _field(where, name, "ja", STR),
+                _field(where, name, "en", STR),
+                _field(where, element, "icon", STR),
+            )
+        )
+    effectiveness = []
+    for index, row in enumerate(_records("types.json", types, "effectiveness")):
+        where = _where("types.json", "effectiveness", index, row)
+        effectiveness.append(
+            (
+                _field(where, row, "attacker", STR),
+                _field(where, row, "defender", STR),
+                _half_steps(where, row, "multiplier"),
+            )
+        )
+    stages = _records("stages.yaml", documents["stages.yaml"], "stages")
+    stage_enemies = []
+    stage_waves = []
+    for index, stage in enumerate(stages):
+        where = _where("stages.yaml", "stages", index, stage)
+        stage_id = _field(where, stage, "id", STR)
+        for enemy_index, enemy in enumerate(_records(where, stage, "enemies")):
+            if not isinstance(enemy, str):
+                raise DataRecordError(f"{where}: enemies[{enemy_index}] must be a string, got {enemy!r}")
+            stage_enemies.append((stage_id, enemy))
+        for wave_index, wave in enumerate(_records(where, stage, "waves")):
+            wave_where = f"{where} waves[{wave_index}]"
+            stage_waves.append((stage_id, _field(wave_where, wave, "count", INT), _field(wave_where, wave, "enemy", STR)))
+    raw: Dict[str, List[Sequence[object]]] = {
+        "elements": elements,
+        "effectiveness": effectiveness,
+        "types_meta": [(_half_steps("types.json", types, "defaultMultiplier", 1.0),)],
+        "moves": _rows("moves.json", documents["moves.json"], "moves", "moves"),
+        "monsters": _rows("monsters.json", documents["monsters.json"], "monsters", "monsters"),
+        "enemies": _rows("enemies.yaml", documents["enemies.yaml"], "enemies", "enemies"),
+        "items": _rows("items.yaml", documents["items.yaml"], "items", "items"),
+        "stages": _rows("stages.yaml", documents["stages.yaml"], "stages", "stages"),
+        "stage_enemies": stage_enemies,
+        "stage_waves": stage_waves,
+    }
+    return {name: (TABLE_COLUMNS[name], rows) for name, rows in raw.items()}
+
+
+# --- Bundle writing -------------------------------------------------------
+
+
+def _pad(buffer: bytearray) -> None:
+    buffer.extend(b"\0" * (-len(buffer) % 4))
+
+
+def encode_bundle(digests: Sequence[bytes], tables: Dict[str, TableData]) -> bytes:
+    strings: List[str] = []
+    interned: Dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        index = interned.get(value)
+        if index is None:
+            index = interned[value] = len(strings)
+            strings.append(value)
+        return index
+
+    encoded_tables = []
+    for name, (columns, rows) in tables.items():
+        values: List[int] = []
+        for col, (_, kind) in enumerate(columns):
+            for row in rows:
+                value = row[col]
+                values.append(intern(value) if kind == STR else int(value))
+        header = [intern(name), len(rows), len(columns)]
+        for column_name, kind in columns:
+            header.extend((intern(column_name), kind))
+        encoded_tables.append((header, values))
+
+    out = bytearray(struct.pack("<4sHH", MAGIC, VERSION, len(digests)))
+    for digest in digests:
+        out.extend(digest)
+    blobs = [value.encode("utf-8") for value in strings]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    out.extend(struct.pack(f"<II{len(offsets)}I", len(strings), offsets[-1], *offsets))
+    out.extend(b"".join(blobs))
+    _pad(out)
+    out.extend(struct.pack("<I", len(encoded_tables)))
+    for header, values in encoded_tables:
+        out.extend(struct.pack(f"<{len(header)}I", *header))
+        out.extend(struct.pack(f"<{len(values)}i", *values))
+    return bytes(out)
+
+
+def compile_bundle(data_dir: Path = DATA_DIR, bundle_path: Path = BUNDLE_PATH) -> None:
+    """Parse every source and atomically (re)write the bundle."""
+
+    paths = [data_dir / name for name in SOURCES]
+    digests = [file_digest(path) for path in paths]
+    documents = {path.name: parse_source(path) for path in paths}
+    write_bundle(bundle_path, digests, documents)
+
+
+def write_bundle(bundle_path: Path, digests: Sequence[bytes], documents: Dict[str, dict]) -> None:
+    """Atomically write the bundle for already parsed ``documents``."""
+
+    payload = encode_bundle(digests, build_tables(documents))
+    bundle_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = bundle_path.with_name(f"{bundle_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, bundle_path)
+
+
+# --- Bundle reading -------------------------------------------------------
+
+
+class Table:
+    """Zero-copy view over one column-major table in the bundle."""
+
+    def __init__(self, data: "GameData", name: str, rows: int, columns: List[Column], values: memoryview) -> None:
+        self.data = data
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.column_index = {column: idx for idx, (column, _) in enumerate(columns)}
+        self._values = values
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> memoryview:
+        """Raw ``int32`` values (string columns hold interned ids)."""
+
+        col = self.column_index[name]
+        return self._values[col * self.rows:(col + 1) * self.rows]
+
+    def records(self) -> List[dict]:
+        decoded = []
+        for col, (_, kind) in enumerate(self.columns):
+            values = self._values[col * self.rows:(col + 1) * self.rows]
+            decoded.append([self.data.string(v) for v in values] if kind == STR else list(values))
+        names = [name for name, _ in self.columns]
+        return [dict(zip(names, row)) for row in zip(*decoded)]
+
+
+class GameData:
+    """Memory-mapped bundle with lazily decoded strings and tables."""
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        magic, version, source_count = struct.unpack_from("<4sHH", view, 0)
+        if magic != MAGIC or version != VERSION:
+            raise GameDataError(f"{path} is not a version {VERSION} game data bundle")
+        pos = 8
+        self.digests = [bytes(view[pos + 32 * i:pos + 32 * (i + 1)]) for i in range(source_count)]
+        pos += 32 * source_count
+
+        string_count, blob_size = struct.unpack_from("<II", view, pos)
+        pos += 8
+        self._offsets = view[pos:pos + 4 * (string_count + 1)].cast("I")
+        pos += 4 * (string_count + 1)
+        self._blob = view[pos:pos + blob_size]
+        pos += blob_size + (-blob_size % 4)
+        self._strings: List[Optional[str]] = [None] * string_count
+        self._interned: Optional[Dict[str, int]] = None
+
+        self.tables: Dict[str, Table] = {}
+        (table_count,) = struct.unpack_from("<I", view, pos)
+        pos += 4
+        for _ in range(table_count):
+            name_id, rows, cols = struct.unpack_from("<III", view, pos)
+            pos += 12
+            spec = struct.unpack_from(f"<{2 * cols}I", view, pos)
+            pos += 8 * cols
+            columns = [(self.string(spec[2 * i]), spec[2 * i + 1]) for i in range(cols)]
+            size = 4 * rows * cols
+            table = Table(self, self.string(name_id), rows, columns, view[pos:pos + size].cast("i"))
+            self.tables[table.name] = table
+            pos += size
+        self._records: Dict[str, List[dict]] = {}
+        self._documents: Dict[str, dict] = {}
+
+    def string(self, index: int) -> str:
+        value = self._strings[index]
+        if value is None:
+            value = str(self._blob[self._offsets[index]:self._offsets[index + 1]], "utf-8")
+            self._strings[index] = value
+        return value
+
+    def intern_id(self, value: str) -> int:
+        """Return the interned id of ``value`` (``KeyError`` if absent)."""
+
+        if self._interned is None:
+            self._interned = {self.string(i): i for i in range(len(self._strings))}
+        return self._interned[value]
+
+    def records(self, table: str) -> List[dict]:
+        """Decoded rows of ``table``, cached; treat them as read-only."""
+
+        cached = self._records.get(table)
+        if cached is None:
+            cached = self._records[table] = self.tables[table].records()
+        return cached
+
+    def document(self, source: str) -> dict:
+        """Rebuild the JSON-shaped document for a JSON/YAML source file name."""
+
+        cached = self._documents.get(source)
+        if cached is None:
+            cached = self._documents[source] = self._build_document(source)
+        return cached
+
+    def _build_document(self, source: str) -> dict:
+        if source == "types.json":
+            return {
+                "elements": [
+                    {"id": row["id"], "name": {"ja": row["name_ja"], "en": row["name_en"]}, "icon": row["icon"]}
+                    for row in self.records("elements")
+                ],
+                "effectiveness": [
+                    {"attacker": row["attacker"], "defender": row["defender"], "multiplier": row["multiplier"] / 2}
+                    for row in self.records("effectiveness")
+                ],
+                "defaultMultiplier": self.records("types_meta")[0]["defaultMultiplier"] / 2,
+            }
+        if source == "stages.yaml":
+            stages = []
+            for row in self.records("stages"):
+                stage = dict(row)
+                stage["enemies"] = [r["enemy"] for r in self.records("stage_enemies") if r["stage"] == row["id"]]
+                stage["waves"] = [
+                    {"count": r["count"], "enemy": r["enemy"]}
+                    for r in self.records("stage_waves")
+                    if r["stage"] == row["id"]
+                ]
+                stages.append(stage)
+            return {"stages": stages}
+        key = Path(source).stem
+        if key not in ("moves", "monsters", "enemies", "items"):
+            raise KeyError(source)
+        return {key: [dict(row) for row in self.records(key)]}
+
+    def close(self) -> None:
+        self.tables.clear()
+        self._offsets.release()
+        self._blob.release()
+        self._map.close()
+
+
+def bundle_is_current(data_dir: Path = DATA_DIR, bundle_path: Path = BUNDLE_PATH) -> bool:
+    if not bundle_path.exists():
+        return False
+    with bundle_path.open("rb") as fh:
+        header = fh.read(8 + 32 * len(SOURCES))
+    if len(header) < 8 or struct.unpack_from("<4sHH", header, 0) != (MAGIC, VERSION, len(SOURCES)):
+        return False
+    for i, name in enumerate(SOURCES):
+        if header[8 + 32 * i:8 + 32 * (i + 1)] != file_digest(data_dir / name):
+            return False
+    return True
+
+
+def open_game_data(data_dir: Path = DATA_DIR, bundle_path: Path = BUNDLE_PATH) -> GameData:
+    """Map the bundle, compiling it first if any source changed."""
+
+    if not bundle_is_current(data_dir, bundle_path):
+        compile_bundle(data_dir, bundle_path)
+    return GameData(bundle_path)
+
+
+@lru_cache(maxsize=None)
+def load_game_data() -> GameData:
+    """The process-wide bundle for the shipped ``data/`` directory."""
+
+    return open_game_data()
+
+
+def main() -> None:
+    compile_bundle()
+    data = GameData(BUNDLE_PATH)
+    summary = ", ".join(f"{name}={len(table)}" for name, table in data.tables.items())
+    print(f"wrote {BUNDLE_PATH} ({BUNDLE_PATH.stat().st_size} bytes): {summary}")
+
+
+if __name__ == "__main__":
+    main()
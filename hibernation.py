@@ -0,0 +1,381 @@
+"""Idle-session hibernation: pack a waiting :class:`game.Game` into bytes.
+
+A session that sits at a prompt holds its ``Game``, the screen generator
+and two pooled parties.  :meth:`SessionImage.capture` copies the state
+those screens read (progress, parties, inventory, guard flags, the current
+screen and stage wave) into one immutable tuple; :func:`rehydrate` builds a
+fresh ``Game`` from it and advances :meth:`Game.resume` back to the same
+prompt, discarding the re-rendered output.  A nested prompt (the swap
+menu) is reached by replaying the choices the player made since the last
+top-level prompt (``Game.resume_inputs``) with analytics muted.
+
+The battle's ``random.Random`` is only stored if something drew from it;
+otherwise it is rebuilt from the session seed like any other battle.  A
+rebuilt battle reads items and later waves from the current
+:mod:`data_registry` snapshot; member stats travel in the image.
+
+Binary layout (little endian)::
+
+    magic "HIB1", u16 version, u8 screen, u8 flags, u64 seed, u64 session id,
+    u32 battle count, u32 wins, u32 losses, i32 wave index, u16 last result,
+    f32 volume, then language, stage id ("" for none), u16 item count and
+    (item id, u32 count) per item, player and enemy party when flagged,
+    625 u32 + f64 of random state when flagged, u8 input count and inputs
+
+Strings are a u16 byte length followed by UTF-8; a party is its label,
+u8 front index, u8 member count and per member its name and six u32 stats
+(as in :mod:`savegame`).  :class:`HibernationStore` keeps one such file per
+hibernated session.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import random
+import shutil
+import struct
+import tempfile
+from typing import TYPE_CHECKING, Callable, List, NamedTuple, Optional, Tuple, Union
+
+from battle_log import ConsoleSink
+from game import POOL, BattleState, EnemyPolicy, Game, GameState, Party, Screen
+from messages import load_catalog
+from savegame import MemberState, PartyState, autosave_writer, write_file
+
+if TYPE_CHECKING:
+    from analytics import AnalyticsEmitter
+
+
+MAGIC = b"HIB1"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBQQIIIiHf")
+STRING_SIZE = struct.Struct("<H")
+U32 = struct.Struct("<I")
+PARTY_HEADER = struct.Struct("<BB")
+MEMBER_STATS = struct.Struct("<6I")
+RNG_WORDS = struct.Struct("<625I")
+GAUSS = struct.Struct("<d")
+
+SCREENS = (GameState.TITLE, GameState.BATTLE, GameState.RESULT)
+
+FLAG_PLAYER = 1
+FLAG_ENEMY = 2
+FLAG_BATTLE = 4
+FLAG_RNG = 8
+FLAG_GAUSS = 16
+FLAG_PLAYER_GUARD = 32
+FLAG_ENEMY_GUARD = 64
+
+# Random.getstate(): (version, 624 state words + position, next gauss value)
+RandomState = Tuple[int, Tuple[int, ...], Optional[float]]
+
+
+class HibernateError(ValueError):
+    """Raised for sessions that cannot be captured and for invalid images."""
+
+
+class SessionImage(NamedTuple):
+    """Everything needed to rebuild a session waiting at a prompt."""
+
+    seed: int
+    session_id: str
+    screen: str
+    battle_count: int
+    wins: int
+    losses: int
+    language: str
+    volume: float
+    stage_id: Optional[str] = None
+    wave_index: int = -1
+    last_result: int = 0
+    items: Tuple[Tuple[str, int], ...] = ()
+    player: Optional[PartyState] = None
+    enemy: Optional[PartyState] = None
+    in_battle: bool = False
+    guards: Tuple[bool, bool] = (False, False)
+    rng_state: Optional[RandomState] = None
+    inputs: Tuple[str, ...] = ()
+
+    @classmethod
+    def capture(cls, game: Game) -> "SessionImage":
+        if game.state not in SCREENS:
+            raise HibernateError(f"cannot hibernate a session in state {game.state!r}")
+        battle = game.battle_state
+        in_battle = battle is not None and game.state == GameState.BATTLE
+        return cls(
+            seed=game.seed,
+            session_id=game.session_id,
+            screen=game.state,
+            battle_count=game.battle_count,
+            wins=game.wins,
+            losses=game.losses,
+            language=game.language,
+            volume=game.volume,
+            stage_id=game.stage_id,
+            wave_index=game.stage_run.wave_index if game.stage_run is not None else -1,
+            last_result=game.last_result or 0,
+            items=tuple(game.inventory.items()),
+            player=None if game.player_party is None else PartyState.capture(game.player_party),
+            enemy=None if game.enemy_party is None else PartyState.capture(game.enemy_party),
+            in_battle=in_battle,
+            guards=(battle.guard_flags["player"], battle.guard_flags["enemy"]) if in_battle else (False, False),
+            rng_state=battle.rng.getstate() if in_battle and battle.rng_started else None,
+            inputs=tuple(game.resume_inputs),
+        )
+
+    # --- Binary -----------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        flags = 0
+        if self.player is not None:
+            flags |= FLAG_PLAYER
+        if self.enemy is not None:
+            flags |= FLAG_ENEMY
+        if self.in_battle:
+            flags |= FLAG_BATTLE
+        if self.rng_state is not None:
+            flags |= FLAG_RNG
+            if self.rng_state[2] is not None:
+                flags |= FLAG_GAUSS
+        if self.guards[0]:
+            flags |= FLAG_PLAYER_GUARD
+        if self.guards[1]:
+            flags |= FLAG_ENEMY_GUARD
+        parts: List[bytes] = [
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                SCREENS.index(self.screen),
+                flags,
+                self.seed,
+                int(self.session_id, 16),
+                self.battle_count,
+                self.wins,
+                self.losses,
+                self.wave_index,
+                self.last_result,
+                self.volume,
+            ),
+            _string(self.language),
+            _string(self.stage_id or ""),
+            STRING_SIZE.pack(len(self.items)),
+        ]
+        for item_id, count in self.items:
+            parts.append(_string(item_id) + U32.pack(count))
+        for party in (self.player, self.enemy):
+            if party is not None:
+                parts.append(_party(party))
+        if self.rng_state is not None:
+            parts.append(RNG_WORDS.pack(*self.rng_state[1]))
+            if self.rng_state[2] is not None:
+                parts.append(GAUSS.pack(self.rng_state[2]))
+        parts.append(bytes((len(self.inputs),)))
+        parts.extend(_string(choice) for choice in self.inputs)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SessionImage":
+        reader = _Reader(data)
+        (magic, version, screen, flags, seed, session_id, battle_count, wins, losses, wave_index, last_result, volume) = (
+            reader.unpack(HEADER)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise HibernateError(f"not a version {VERSION} session image")
+        if screen >= len(SCREENS):
+            raise HibernateError(f"unknown screen {screen}")
+        language = reader.string()
+        stage_id = reader.string() or None
+        (item_count,) = reader.unpack(STRING_SIZE)
+        items = tuple((reader.string(), reader.unpack(U32)[0]) for _ in range(item_count))
+        player = reader.party() if flags & FLAG_PLAYER else None
+        enemy = reader.party() if flags & FLAG_ENEMY else None
+        rng_state: Optional[RandomState] = None
+        if flags & FLAG_RNG:
+            words = reader.unpack(RNG_WORDS)
+            gauss = reader.unpack(GAUSS)[0] if flags & FLAG_GAUSS else None
+            rng_state = (3, words, gauss)
+        (input_count,) = reader.take(1)
+        inputs = tuple(reader.string() for _ in range(input_count))
+        if reader.pos != len(data):
+            raise HibernateError("session image has trailing bytes")
+        return cls(
+            seed=seed,
+            session_id=f"{session_id:016x}",
+            screen=SCREENS[screen],
+            battle_count=battle_count,
+            wins=wins,
+            losses=losses,
+            language=language,
+            volume=volume,
+            stage_id=stage_id,
+            wave_index=wave_index,
+            last_result=last_result,
+            items=items,
+            player=player,
+            enemy=enemy,
+            in_battle=bool(flags & FLAG_BATTLE),
+            guards=(bool(flags & FLAG_PLAYER_GUARD), bool(flags & FLAG_ENEMY_GUARD)),
+            rng_state=rng_state,
+            inputs=inputs,
+        )
+
+
+def _string(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return STRING_SIZE.pack(len(raw)) + raw
+
+
+def _party(party: PartyState) -> bytes:
+    return b"".join(
+        [_string(party.label), PARTY_HEADER.pack(party.front_index, len(party.members))]
+        + [
+            _string(m.name) + MEMBER_STATS.pack(m.max_hp, m.max_st, m.attack, m.defense, m.current_hp, m.current_st)
+            for m in party.members
+        ]
+    )
+
+
+class _Reader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def take(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise HibernateError("session image is truncated")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        return fmt.unpack(self.take(fmt.size))
+
+    def string(self) -> str:
+        (size,) = self.unpack(STRING_SIZE)
+        try:
+            return self.take(size).decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise HibernateError("session image has an invalid string") from exc
+
+    def party(self) -> PartyState:
+        label = self.string()
+        front_index, member_count = self.unpack(PARTY_HEADER)
+        members = tuple(MemberState(self.string(), *self.unpack(MEMBER_STATS)) for _ in range(member_count))
+        return PartyState(label, front_index, members)
+
+
+# --- Rehydration ----------------------------------------------------------
+
+
+def restore_party(state: PartyState) -> Party:
+    """A pooled party with ``state``'s members, HP/ST and front index."""
+
+    party = POOL.party(state.label, tuple(m[:5] for m in state.members))
+    party.front_index = state.front_index
+    for member, saved in zip(party.members, state.members):
+        member.current_hp = saved.current_hp
+        member.current_st = saved.current_st
+    return party
+
+
+def rehydrate(
+    image: SessionImage,
+    write: Callable[[str], None] = print,
+    save_path: Optional[str] = None,
+    analytics: Optional["AnalyticsEmitter"] = None,
+    enemy_policy: Optional[EnemyPolicy] = None,
+) -> Tuple[Game, Screen]:
+    """A new ``Game`` and its session generator, waiting at ``image``'s prompt.
+
+    Output produced while getting there goes to ``write``; callers that
+    already showed that prompt should discard it.  The image does not carry
+    the enemy AI, so pass the session's original ``enemy_policy``.
+    """
+
+    game = Game(seed=image.seed, write=write, stage=image.stage_id, enemy_policy=enemy_policy)
+    if save_path is not None:
+        game.save_path = save_path
+        game.autosave_writer = autosave_writer()
+    game.session_id = image.session_id
+    game.state = image.screen
+    game.battle_count = image.battle_count
+    game.wins, game.losses = image.wins, image.losses
+    game.language, game.volume = image.language, image.volume
+    game.catalog = load_catalog(image.language)
+    game.last_result = image.last_result or None
+    game.inventory = dict(image.items)
+    if image.player is not None:
+        game.player_party = restore_party(image.player)
+    if image.enemy is not None:
+        game.enemy_party = restore_party(image.enemy)
+    if image.in_battle:
+        if game.player_party is None or game.enemy_party is None:
+            raise HibernateError("session image is in battle without both parties")
+        if image.stage_id is not None:
+            from stages import StageRun, get_stage
+
+            game.stage_run = StageRun(get_stage(image.stage_id), start=image.wave_index + 1)
+        battle = BattleState(
+            player_party=game.player_party,
+            enemy_party=game.enemy_party,
+            player_inventory=game.inventory,
+            sink=ConsoleSink(game.write, game.catalog),
+            rng=game.seeds.split(image.battle_count - 1),
+            items=game.data.items,
+            element_chart=game.data.element_chart,
+            enemy_policy=enemy_policy,
+        )
+        battle.guard_flags["player"], battle.guard_flags["enemy"] = image.guards
+        if image.rng_state is not None:
+            battle.rng = random.Random()
+            battle.rng.setstate(image.rng_state)
+        game.battle_state = battle
+    session = game.resume()
+    next(session)
+    for choice in image.inputs:
+        session.send(choice)
+    game.analytics = analytics
+    return game, session
+
+
+# --- Store ----------------------------------------------------------------
+
+
+class HibernationStore:
+    """One image file per hibernated session in ``directory``.
+
+    Without a directory a private temporary one is used and removed by
+    :meth:`close`.  Images are only meaningful to the process that wrote
+    them, so nothing is fsynced.
+    """
+
+    def __init__(self, directory: Union[str, Path, None] = None) -> None:
+        self.owned = directory is None
+        self.directory = Path(tempfile.mkdtemp(prefix="hibernate-") if directory is None else directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}.hib"
+
+    def put(self, key: str, image: SessionImage) -> int:
+        payload = image.to_bytes()
+        write_file(self.path(key), payload, fsync=False)
+        return len(payload)
+
+    def take(self, key: str) -> SessionImage:
+        """Load and delete ``key``'s image."""
+
+        path = self.path(key)
+        data = path.read_bytes()
+        os.unlink(path)
+        return SessionImage.from_bytes(data)
+
+    def discard(self, key: str) -> None:
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        if self.owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
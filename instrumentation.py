@@ -0,0 +1,162 @@
+"""Opt-in timing and allocation metrics for :class:`game.BattleState` phases.
+
+Nothing in :mod:`game` refers to this module.  :func:`enable` replaces the
+instrumented methods on the class with wrappers, and :func:`disable` puts
+the originals back, so a process that never enables instrumentation runs
+exactly the uninstrumented code.
+
+Each phase records its call count, a latency histogram and the number of
+memory blocks still allocated when it returns (``sys.getallocatedblocks``
+delta, summed over calls that grew it).  Timings are inclusive: the
+``end_*_turn`` phases include the ``apply_backline_regen`` they call.
+Metrics export as Prometheus text (:func:`prometheus_text`) or a JSON
+snapshot (:func:`snapshot`).
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+import functools
+import json
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from game import BattleState
+
+
+PHASES = (
+    "ensure_actor_ready",
+    "handle_forced_swap",
+    "resolve_damage",
+    "apply_backline_regen",
+    "end_player_turn",
+    "end_enemy_turn",
+)
+
+# Upper bucket bounds in seconds; an implicit +Inf bucket follows.
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2)
+
+
+class PhaseMetrics:
+    """Counters for one instrumented method."""
+
+    __slots__ = ("name", "calls", "seconds", "bucket_counts", "allocated_blocks")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)
+        self.allocated_blocks = 0
+
+    def observe(self, seconds: float, blocks: int) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.bucket_counts[bisect_left(BUCKETS, seconds)] += 1
+        if blocks > 0:
+            self.allocated_blocks += blocks
+
+    def cumulative_buckets(self) -> List[int]:
+        total = 0
+        cumulative = []
+        for count in self.bucket_counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "mean_us": self.seconds / self.calls * 1e6 if self.calls else 0.0,
+            "buckets": dict(zip([str(bound) for bound in BUCKETS] + ["+Inf"], self.cumulative_buckets())),
+            "allocated_blocks": self.allocated_blocks,
+        }
+
+
+_lock = threading.Lock()
+_originals: Dict[str, Callable] = {}
+_metrics: Dict[str, PhaseMetrics] = {name: PhaseMetrics(name) for name in PHASES}
+
+
+def _wrap(func: Callable, metrics: PhaseMetrics) -> Callable:
+    perf_counter = time.perf_counter
+    allocated_blocks = sys.getallocatedblocks
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = perf_counter()
+        blocks = allocated_blocks()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # Read the block count before the elapsed-time float exists.
+            blocks = allocated_blocks() - blocks
+            metrics.observe(perf_counter() - started, blocks)
+
+    wrapper.__wrapped_phase__ = metrics.name
+    return wrapper
+
+
+def enable(phases: Optional[Sequence[str]] = None) -> None:
+    """Start recording ``phases`` (default: all) on every ``BattleState``."""
+
+    with _lock:
+        for name in phases or PHASES:
+            if name not in _metrics:
+                raise ValueError(f"unknown phase: {name!r}")
+            if name in _originals:
+                continue
+            _originals[name] = getattr(BattleState, name)
+            setattr(BattleState, name, _wrap(_originals[name], _metrics[name]))
+
+
+def disable() -> None:
+    """Restore the original, uninstrumented methods."""
+
+    with _lock:
+        for name, func in _originals.items():
+            setattr(BattleState, name, func)
+        _originals.clear()
+
+
+def is_enabled() -> bool:
+    return bool(_originals)
+
+
+def reset() -> None:
+    with _lock:
+        for name in PHASES:
+            _metrics[name] = PhaseMetrics(name)
+        for name in _originals:
+            setattr(BattleState, name, _wrap(_originals[name], _metrics[name]))
+
+
+def snapshot() -> Dict[str, object]:
+    return {
+        "enabled": is_enabled(),
+        "timestamp": time.time(),
+        "phases": {name: metrics.to_dict() for name, metrics in _metrics.items()},
+    }
+
+
+def snapshot_json() -> str:
+    return json.dumps(snapshot(), indent=2)
+
+
+def prometheus_text() -> str:
+    lines = [
+        "# HELP battle_phase_seconds Time spent in BattleState phases.",
+        "# TYPE battle_phase_seconds histogram",
+    ]
+    for name, metrics in _metrics.items():
+        for bound, count in zip([repr(bound) for bound in BUCKETS] + ["+Inf"], metrics.cumulative_buckets()):
+            lines.append(f'battle_phase_seconds_bucket{{phase="{name}",le="{bound}"}} {count}')
+        lines.append(f'battle_phase_seconds_sum{{phase="{name}"}} {metrics.seconds!r}')
+        lines.append(f'battle_phase_seconds_count{{phase="{name}"}} {metrics.calls}')
+    lines.append("# HELP battle_phase_allocated_blocks_total Memory blocks still allocated when a phase returns.")
+    lines.append("# TYPE battle_phase_allocated_blocks_total counter")
+    for name, metrics in _metrics.items():
+        lines.append(f'battle_phase_allocated_blocks_total{{phase="{name}"}} {metrics.allocated_blocks}')
+    return "\n".join(lines) + "\n"
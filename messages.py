@@ -0,0 +1,196 @@
+"""Localized message catalog compiled from ``docs/loc_<language>.csv``.
+
+Code refers to text by the integer ids in :class:`Msg`; the CSV ``key``
+column holds the same names.  :func:`load_catalog` reads a language's CSV
+once and compiles every template into a positional formatter: named
+fields such as ``{party}`` are rewritten to indexes in the order given by
+:data:`MESSAGE_PARAMS`, so formatting is one ``str.format(*args)`` call
+with no keyword dict.  Battle events stay structured tuples until a text
+sink renders them (:func:`battle_log.format_event`), so headless runs
+never touch the catalog.
+
+A second language only needs ``docs/loc_<language>.csv``; keys it lacks
+fall back to Japanese.
+"""
+from __future__ import annotations
+
+import csv
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_data import REPO_ROOT
+
+
+LOC_DIR = REPO_ROOT / "docs"
+DEFAULT_LANGUAGE = "ja"
+
+
+class CatalogError(ValueError):
+    """Raised for missing or malformed localization tables."""
+
+
+class Msg:
+    """Interned message ids; each name is a ``key`` in the localization CSV."""
+
+    TITLE_START = 1
+    TITLE_EXIT = 2
+    CMD_ATTACK = 3
+    CMD_DEFEND = 4
+    CMD_ITEM = 5
+    CMD_SWAP = 6
+    BOOT = 7
+    TITLE_HEADER = 8
+    MENU_OPTION = 9
+    TITLE_QUIT = 10
+    BATTLE_START = 11
+    WAVE_CLEARED = 12
+    BATTLE_WON = 13
+    STAGE_CLEARED = 14
+    PARTY_WIPED = 15
+    BATTLE_HEADER = 16
+    BATTLE_COMMANDS = 17
+    ITEM_COUNT = 18
+    PARTY_HEADER = 19
+    ROLE_PLAYER = 20
+    ROLE_ENEMY = 21
+    POSITION_FRONT = 22
+    POSITION_BACK = 23
+    STATUS_DOWN = 24
+    MEMBER_LINE = 25
+    MEMBER_ST = 26
+    RESULT_HEADER = 27
+    RESULT_LINE = 28
+    RESULT_WIN = 29
+    RESULT_LOSE = 30
+    RESULT_TO_TITLE = 31
+    GOODBYE = 32
+    SWAP_NO_CANDIDATE = 33
+    SWAP_PROMPT = 34
+    SWAP_OPTION = 35
+    INVALID_CHOICE = 36
+    REASON_KO = 37
+    REASON_EXHAUSTED = 38
+    LOG_ATTACK = 39
+    LOG_KO = 40
+    LOG_GUARD = 41
+    LOG_ENEMY_GUARD = 42
+    LOG_FORCED_SWAP = 43
+    LOG_NO_SWAP_TARGET = 44
+    LOG_REGEN = 45
+    LOG_SWAP = 46
+    LOG_ITEM = 47
+    LOG_CANNOT_ACT = 48
+    LOG_NO_FIGHTERS = 49
+    LOG_ST_SHORT = 50
+    LOG_NO_ITEM = 51
+    LOG_NO_ITEM_TARGET = 52
+    LOG_SWAP_NO_FRONT = 53
+    LOG_SWAP_ST_SHORT = 54
+    LOG_SWAP_ALREADY_FRONT = 55
+    LOG_SWAP_TARGET_DOWN = 56
+    LOG_SWAP_FAILED = 57
+
+
+MESSAGE_KEYS: Dict[int, str] = {value: name for name, value in vars(Msg).items() if name.isupper()}
+
+# Positional order of each template's fields; messages not listed take none.
+MESSAGE_PARAMS: Dict[int, Tuple[str, ...]] = {
+    Msg.MENU_OPTION: ("index", "label"),
+    Msg.BATTLE_START: ("party",),
+    Msg.WAVE_CLEARED: ("party",),
+    Msg.BATTLE_WON: ("party",),
+    Msg.STAGE_CLEARED: ("stage",),
+    Msg.BATTLE_COMMANDS: ("attack", "defend", "item", "swap"),
+    Msg.ITEM_COUNT: ("item", "count"),
+    Msg.PARTY_HEADER: ("role", "party"),
+    Msg.MEMBER_LINE: ("position", "name", "status", "hp", "max_hp", "st"),
+    Msg.MEMBER_ST: ("st", "max_st"),
+    Msg.RESULT_LINE: ("result",),
+    Msg.SWAP_OPTION: ("index", "name", "hp", "max_hp", "st", "max_st"),
+    Msg.INVALID_CHOICE: ("choices",),
+    # Battle log events, in battle_log.EVENT_SPECS field order.
+    Msg.LOG_ATTACK: ("side", "attacker", "defender", "damage"),
+    Msg.LOG_KO: ("side", "name"),
+    Msg.LOG_GUARD: ("name", "restored"),
+    Msg.LOG_ENEMY_GUARD: ("name", "restored"),
+    Msg.LOG_FORCED_SWAP: ("party", "incoming", "reason"),
+    Msg.LOG_NO_SWAP_TARGET: ("party", "reason"),
+    Msg.LOG_REGEN: ("party", "gains"),
+    Msg.LOG_SWAP: ("outgoing", "incoming"),
+    Msg.LOG_ITEM: ("name", "item", "healed"),
+    Msg.LOG_CANNOT_ACT: ("name",),
+    Msg.LOG_NO_FIGHTERS: ("party",),
+}
+
+
+def compile_template(template: str, params: Tuple[str, ...], key: str = "") -> Callable[..., str]:
+    """Rewrite ``{name}`` fields to positional indexes; returns a bound ``str.format``."""
+
+    parts: List[str] = []
+    try:
+        parsed = list(Formatter().parse(template))
+    except ValueError as exc:
+        raise CatalogError(f"{key}: malformed template {template!r}: {exc}") from exc
+    for literal, field_name, format_spec, conversion in parsed:
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field_name is None:
+            continue
+        if field_name not in params:
+            raise CatalogError(f"{key}: unknown field {{{field_name}}}; expected one of {params}")
+        parts.append("{" + str(params.index(field_name)))
+        if conversion:
+            parts.append("!" + conversion)
+        if format_spec:
+            parts.append(":" + format_spec)
+        parts.append("}")
+    return "".join(parts).format
+
+
+def read_table(path: Path) -> Dict[str, str]:
+    """``key -> text`` from a localization CSV (``key,text,context``)."""
+
+    with path.open(encoding="utf-8", newline="") as fh:
+        reader = csv.DictReader(fh)
+        if not reader.fieldnames or not {"key", "text"} <= set(reader.fieldnames):
+            raise CatalogError(f"{path.name} needs 'key' and 'text' columns")
+        return {row["key"]: row["text"] for row in reader if row.get("key")}
+
+
+class Catalog:
+    """Compiled formatters for one language, indexed by message id."""
+
+    def __init__(self, language: str, table: Dict[str, str], fallback: Optional["Catalog"] = None) -> None:
+        self.language = language
+        self.table = table
+        self._formatters: List[Callable[..., str]] = [str] * (max(MESSAGE_KEYS) + 1)
+        missing = []
+        for message, key in MESSAGE_KEYS.items():
+            template = table.get(key)
+            if template is None:
+                if fallback is None:
+                    missing.append(key)
+                    continue
+                self._formatters[message] = fallback._formatters[message]
+                continue
+            self._formatters[message] = compile_template(template, MESSAGE_PARAMS.get(message, ()), key)
+        if missing:
+            raise CatalogError(f"loc_{language}.csv is missing keys: {', '.join(missing)}")
+
+    def format(self, message: int, *args: object) -> str:
+        return self._formatters[message](*args)
+
+    def text(self, message: int) -> str:
+        return self._formatters[message]()
+
+
+@lru_cache(maxsize=None)
+def load_catalog(language: str = DEFAULT_LANGUAGE) -> Catalog:
+    """The compiled catalog for ``language``; built once per process."""
+
+    path = LOC_DIR / f"loc_{language}.csv"
+    if not path.exists():
+        raise CatalogError(f"no localization table for {language!r} ({path.name})")
+    fallback = None if language == DEFAULT_LANGUAGE else load_catalog(DEFAULT_LANGUAGE)
+    return Catalog(language, read_table(path), fallback)
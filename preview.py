@@ -0,0 +1,277 @@
+"""What-if previews of every player command for the battle UI.
+
+:func:`preview_actions` answers "what happens if I pick this?" for all of
+the player's legal commands at once: attack, defend, each held item and a
+swap to each available backliner, each followed by the enemy's reply,
+exactly as ``Game.finish_turn`` would play them.
+
+The live battle is never touched.  One detached copy of it is made per call
+(fresh ``Party``/``Combatant`` objects, no hashing, a sink that only keeps
+events, and a copy of the battle's random stream), and every command is run
+on that copy and rolled back with ``BattleState.snapshot`` / ``restore``.
+Nothing is written to the battle's log.
+
+The enemy reply comes from the battle's own ``enemy_policy`` (or the fixed
+rule), so the preview matches what will happen for deterministic policies.
+Time-budgeted policies, those with a ``decide(state, budget_ms)`` method
+such as :class:`search_ai.SearchPolicy`, share one budget of
+:data:`PREVIEW_BUDGET_MS` across all the replies of a preview instead of
+spending their full per-move budget on each; a reply whose share runs out
+falls back to the fixed rule.  They may therefore decide differently on
+the real turn, and any state they keep (tables, stats) sees the preview
+calls.
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import replace
+import random
+import time
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from battle_log import Event, EventKind, LogSink
+from game import BattleState, EnemyAction, Party
+from simulation import ATTACK, DEFEND, Action, perform_action
+
+
+MemberDelta = Tuple[int, int]  # (hp change, st change)
+
+# Time all budgeted enemy replies of one preview may take together: half of
+# a 60 FPS frame (docs/perf_budget.md), leaving the rest for the UI.
+PREVIEW_BUDGET_MS = 8.0
+
+
+class ActionPreview(NamedTuple):
+    """Predicted result of one player command plus the enemy's reply.
+
+    Deltas are listed per member in party order.  ``*_ko`` and
+    ``*_forced_swap`` report whether any member of that side was knocked out
+    or forced out of the front during the round; ``enemy_reply`` is
+    ``"attack"``, ``"defend"``, ``"swap"`` or ``None`` when the enemy did not
+    act (for example because the battle ended).
+    """
+
+    action: Action
+    player_delta: Tuple[MemberDelta, ...]
+    enemy_delta: Tuple[MemberDelta, ...]
+    player_front: int
+    enemy_front: int
+    player_ko: bool
+    enemy_ko: bool
+    player_forced_swap: bool
+    enemy_forced_swap: bool
+    enemy_reply: Optional[str]
+    battle_over: bool
+
+
+class EventBuffer(LogSink):
+    """Keeps the raw event tuples of one previewed round."""
+
+    def __init__(self) -> None:
+        self.events: List[Event] = []
+
+    def record(self, event: Event) -> None:
+        self.events.append(event)
+
+
+class SharedBudget:
+    """Enemy policy for a preview copy: each reply gets an even share of what is left.
+
+    ``pending`` is the number of commands still to preview, the current one
+    included; :func:`preview_actions` sets it before each command.
+    """
+
+    def __init__(self, decide: Callable[[BattleState, float], EnemyAction], budget_ms: float) -> None:
+        self.decide = decide
+        self.deadline = time.perf_counter() + budget_ms / 1000
+        self.pending = 1
+
+    def __call__(self, state: BattleState) -> EnemyAction:
+        remaining_ms = max(0.0, self.deadline - time.perf_counter()) * 1000
+        return self.decide(state, remaining_ms / max(1, self.pending))
+
+
+def copy_party(party: Party) -> Party:
+    """Detached copy of ``party`` with the same HP/ST and front, without hashing."""
+
+    members = []
+    for member in party.members:
+        clone = replace(member)
+        clone.current_hp = member.current_hp
+        clone.current_st = member.current_st
+        members.append(clone)
+    return Party(label=party.label, members=members, front_index=party.front_index)
+
+
+def detached_copy(state: BattleState, sink: LogSink) -> BattleState:
+    """A copy of ``state`` that shares nothing mutable with it."""
+
+    if state.rng_started:
+        rng = random.Random()
+        rng.setstate(state.rng.getstate())
+    else:
+        # Built lazily from the same seed, like the live battle would.
+        rng = state.rng_source
+    clone = BattleState(
+        player_party=copy_party(state.player_party),
+        enemy_party=copy_party(state.enemy_party),
+        player_inventory=dict(state.player_inventory),
+        sink=sink,
+        enemy_policy=state.enemy_policy,
+        rng=rng,
+        items=state.items,
+        element_chart=state.element_chart,
+    )
+    clone.guard_flags = dict(state.guard_flags)
+    return clone
+
+
+def candidate_actions(state: BattleState) -> List[Action]:
+    """Every command the player could pick; illegal ones are dropped by the preview."""
+
+    actions: List[Action] = [ATTACK, DEFEND]
+    actions.extend(("item", item_id) for item_id, count in state.player_inventory.items() if count > 0)
+    actions.extend(("swap", idx) for idx in state.player_party.available_backliner_indexes())
+    return actions
+
+
+def _deltas(before: Tuple, after: Tuple, start: int, size: int) -> Tuple[MemberDelta, ...]:
+    return tuple(
+        (after[pos] - before[pos], after[pos + 1] - before[pos + 1]) for pos in range(start, start + 2 * size, 2)
+    )
+
+
+def preview_actions(state: BattleState, budget_ms: float = PREVIEW_BUDGET_MS) -> List[ActionPreview]:
+    """Preview every legal player command in ``state`` in one pass.
+
+    Commands the engine would refuse (not enough ST, nobody able to act)
+    are left out, so the result lists exactly the choices that end the
+    player's turn.  Returns an empty list once the battle is over.
+    ``budget_ms`` is shared by the replies of a time-budgeted enemy policy.
+    """
+
+    if state.is_battle_over():
+        return []
+    buffer = EventBuffer()
+    sim = detached_copy(state, buffer)
+    decide = getattr(state.enemy_policy, "decide", None)
+    budget = None
+    if decide is not None:
+        budget = sim.enemy_policy = SharedBudget(decide, budget_ms)
+    player_label, enemy_label = sim.player_party.label, sim.enemy_party.label
+    player_size, enemy_size = len(sim.player_party.members), len(sim.enemy_party.members)
+    base = sim.snapshot()
+    rng_state = sim.rng.getstate() if sim.rng_started else None
+    previews: List[ActionPreview] = []
+    actions = candidate_actions(sim)
+    for index, action in enumerate(actions):
+        if budget is not None:
+            budget.pending = len(actions) - index
+        events = buffer.events
+        events.clear()
+        if perform_action(sim, action):
+            sim.end_player_turn()
+            enemy_events = len(events)
+            if not sim.is_battle_over():
+                sim.enemy_take_turn()
+                sim.end_enemy_turn()
+            after = sim.snapshot()
+            player_ko = enemy_ko = player_forced = enemy_forced = False
+            reply = None
+            for index, event in enumerate(events):
+                kind = event[0]
+                if kind == EventKind.KO:
+                    if event[1] == "player":
+                        player_ko = True
+                    else:
+                        enemy_ko = True
+                elif kind == EventKind.FORCED_SWAP:
+                    if event[1] == player_label:
+                        player_forced = True
+                    elif event[1] == enemy_label:
+                        enemy_forced = True
+                elif index >= enemy_events and reply is None:
+                    if kind == EventKind.ATTACK:
+                        reply = "attack"
+                    elif kind == EventKind.ENEMY_GUARD:
+                        reply = "defend"
+                    elif kind == EventKind.SWAP:
+                        reply = "swap"
+            previews.append(
+                ActionPreview(
+                    action=action,
+                    player_delta=_deltas(base, after, 4, player_size),
+                    enemy_delta=_deltas(base, after, 4 + 2 * player_size, enemy_size),
+                    player_front=after[0],
+                    enemy_front=after[1],
+                    player_ko=player_ko,
+                    enemy_ko=enemy_ko,
+                    player_forced_swap=player_forced,
+                    enemy_forced_swap=enemy_forced,
+                    enemy_reply=reply,
+                    battle_over=sim.is_battle_over(),
+                )
+            )
+        sim.restore(base)
+        if sim.rng_started:
+            if rng_state is None:
+                rng_state = _initial_rng_state(state)
+            sim.rng.setstate(rng_state)
+    return previews
+
+
+def _initial_rng_state(state: BattleState) -> tuple:
+    """State of the random stream ``state`` would build on first use."""
+
+    if state.rng_source is not None:
+        return state.rng_source.random().getstate()
+    return random.Random(0).getstate()
+
+
+# --- CLI ------------------------------------------------------------------
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Preview every player command through a default battle.")
+    parser.add_argument("--battles", type=int, default=50, help="battles to play (always attacking)")
+    parser.add_argument("--show", type=int, default=1, help="print the previews of this many turns")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from battle_log import NullSink
+    from game import default_enemy_party, default_inventory, default_player_party
+
+    args = parse_args(argv)
+    samples: List[float] = []
+    for _ in range(args.battles):
+        state = BattleState(
+            player_party=default_player_party(),
+            enemy_party=default_enemy_party(),
+            player_inventory=default_inventory(),
+            sink=NullSink(),
+        )
+        while not state.is_battle_over():
+            started = time.perf_counter()
+            previews = preview_actions(state)
+            samples.append(time.perf_counter() - started)
+            if len(samples) <= args.show:
+                for preview in previews:
+                    print(preview)
+            if not state.player_attack():
+                break
+            state.end_player_turn()
+            if state.is_battle_over():
+                break
+            state.enemy_take_turn()
+            state.end_enemy_turn()
+    samples.sort()
+    mean = sum(samples) / len(samples)
+    print(
+        f"{len(samples)} previews: mean {mean * 1e6:.0f} us, "
+        f"p99 {samples[int(len(samples) * 0.99)] * 1e6:.0f} us, max {samples[-1] * 1e6:.0f} us"
+    )
+
+
+if __name__ == "__main__":
+    main()
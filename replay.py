@@ -0,0 +1,200 @@
+"""Compact session replays and a headless replay runner.
+
+A replay stores the session seed, every accepted ``Game.prompt`` choice (as
+its index among the valid inputs, one byte each) and the Zobrist hash of
+each battle's final state.  Record one by setting ``GAME_REPLAY=path`` when
+running :mod:`game`.
+
+Binary layout (little endian)::
+
+    magic "RPL1", u16 version, u16 reserved, u64 seed, u64 final state hash,
+    u32 battle count, u32 choice count,
+    u64 hash per finished battle, u8 choice per prompt
+
+The runner plays the choice stream through ``Game.session`` itself, so it
+follows every screen exactly as a live session would, and checks the hashes
+it reaches against the recorded ones.  The game runs headless: no screen or
+battle log text is ever formatted.
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import struct
+import sys
+import time
+from typing import List, Optional, Sequence, Tuple, Union
+
+from game import Game
+
+
+MAGIC = b"RPL1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQII")
+
+
+class ReplayError(ValueError):
+    """Raised for files that are not valid replays."""
+
+
+@dataclass
+class Replay:
+    seed: int
+    choices: bytes
+    battle_hashes: List[int] = field(default_factory=list)
+    final_hash: int = 0
+
+    def to_bytes(self) -> bytes:
+        return b"".join(
+            (
+                HEADER.pack(MAGIC, VERSION, 0, self.seed, self.final_hash, len(self.battle_hashes), len(self.choices)),
+                struct.pack(f"<{len(self.battle_hashes)}Q", *self.battle_hashes),
+                self.choices,
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        if len(data) < HEADER.size:
+            raise ReplayError("replay is truncated")
+        magic, version, _, seed, final_hash, battles, choices = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError(f"not a version {VERSION} replay")
+        pos = HEADER.size
+        if len(data) != pos + 8 * battles + choices:
+            raise ReplayError("replay size does not match its header")
+        hashes = list(struct.unpack_from(f"<{battles}Q", data, pos))
+        pos += 8 * battles
+        return cls(seed=seed, choices=bytes(data[pos:pos + choices]), battle_hashes=hashes, final_hash=final_hash)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "Replay":
+        return cls.from_bytes(Path(path).read_bytes())
+
+
+class ReplayRecorder:
+    """Collects a live session's choices; see :class:`game.Game`."""
+
+    def __init__(self, seed: int) -> None:
+        self.seed = seed
+        self.choices = bytearray()
+        self.battle_hashes: List[int] = []
+
+    def record_choice(self, index: int) -> None:
+        self.choices.append(index)
+
+    def record_battle_end(self, state_hash: int) -> None:
+        self.battle_hashes.append(state_hash)
+
+    def replay(self, final_hash: int = 0) -> Replay:
+        return Replay(self.seed, bytes(self.choices), list(self.battle_hashes), final_hash)
+
+    def save(self, path: Union[str, Path], final_hash: int = 0) -> None:
+        Path(path).write_bytes(self.replay(final_hash).to_bytes())
+
+
+# --- Headless runner ------------------------------------------------------
+
+
+@dataclass
+class ReplayResult:
+    battle_hashes: List[int]
+    final_hash: int
+    choices_used: int
+
+    def matches(self, replay: Replay) -> bool:
+        return (
+            self.battle_hashes == replay.battle_hashes
+            and self.final_hash == replay.final_hash
+            and self.choices_used == len(replay.choices)
+        )
+
+
+def discard(text: str) -> None:
+    """``Game.write`` for headless runs: the screens' text is thrown away."""
+
+
+def run_replay(replay: Replay) -> ReplayResult:
+    """Re-execute ``replay`` by feeding its choices to ``Game.session``."""
+
+    recorder = ReplayRecorder(replay.seed)
+    game = Game(seed=replay.seed, recorder=recorder, write=discard, headless=True)
+    session = game.session()
+    used = 0
+    try:
+        valid_inputs = next(session)
+        for choice in replay.choices:
+            if choice >= len(valid_inputs):
+                break
+            used += 1
+            valid_inputs = session.send(valid_inputs[choice])
+    except StopIteration:
+        pass
+    finally:
+        session.close()
+    final_hash = game.battle_state.zobrist if game.battle_state is not None else 0
+    game.release_parties()
+    return ReplayResult(recorder.battle_hashes, final_hash, used)
+
+
+def verify_paths(paths: Sequence[Path], repeat: int = 1) -> List[Path]:
+    """Run every replay ``repeat`` times and return the mismatching paths."""
+
+    replays = [(path, Replay.load(path)) for path in paths]
+    failures: List[Path] = []
+    for _ in range(repeat):
+        for path, replay in replays:
+            if not run_replay(replay).matches(replay) and path not in failures:
+                failures.append(path)
+    return failures
+
+
+def verify_corpus(paths: Sequence[Path], repeat: int = 1, workers: int = 1) -> List[Path]:
+    """:func:`verify_paths` split across ``workers`` processes."""
+
+    if workers <= 1 or len(paths) <= 1:
+        return verify_paths(paths, repeat)
+    shards: List[Tuple[Path, ...]] = [tuple(paths[i::workers]) for i in range(workers)]
+    failures: List[Path] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard_failures in executor.map(verify_paths, shards, [repeat] * len(shards)):
+            failures.extend(shard_failures)
+    return failures
+
+
+def replay_paths(targets: Sequence[str]) -> List[Path]:
+    paths: List[Path] = []
+    for target in targets:
+        path = Path(target)
+        paths.extend(sorted(path.glob("*.rpl")) if path.is_dir() else [path])
+    return paths
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Re-run recorded sessions and verify their state hashes.")
+    parser.add_argument("targets", nargs="+", help="replay files or directories of *.rpl files")
+    parser.add_argument("--repeat", type=int, default=1, help="run the corpus this many times (benchmarking)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    paths = replay_paths(args.targets)
+    repeat = max(1, args.repeat)
+    started = time.perf_counter()
+    failures = verify_corpus(paths, repeat, args.workers)
+    elapsed = time.perf_counter() - started
+    runs = len(paths) * repeat
+    rate = runs / elapsed if elapsed else 0.0
+    print(f"{runs} replays in {elapsed:.3f}s ({rate:.0f}/s), {len(failures)} mismatched")
+    for path in sorted(failures):
+        print(f"MISMATCH {path}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""Save files and write-behind autosave.
+
+A save holds the fields of ``docs/save_schema.json`` (the party leader as
+``player``, the inventory, win/loss progress and settings) plus the live
+party: every member's stats, current HP/ST and the front index.  Files are
+written in a compact binary format; a path ending in ``.json`` uses the
+schema's JSON layout instead, and :func:`load_save` reads either.
+
+Binary layout (little endian)::
+
+    magic "SAV1", u16 version, u16 section count,
+    per section: u8 tag, u32 payload size, payload
+
+Strings are a u16 byte length followed by UTF-8.  Unknown section tags are
+skipped on load.
+
+:class:`AutosaveWriter` does the file I/O on one background thread.
+:meth:`AutosaveWriter.submit` only records the latest snapshot for a path,
+so several autosaves that arrive before a flush collapse into one write.
+The writer keeps the encoded sections of the last file it wrote per path
+and re-encodes only the sections that changed; an unchanged snapshot
+writes nothing.  Each write goes to a temporary file, is fsynced once and
+renamed over the save.  A save that cannot be encoded or written is counted
+in :attr:`AutosaveWriter.stats` and skipped; the other paths in the batch
+are still written and the thread keeps running.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import json
+import os
+from pathlib import Path
+import struct
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Set, Tuple, Union
+
+from game import Party
+
+
+MAGIC = b"SAV1"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")
+SECTION = struct.Struct("<BI")
+STRING_SIZE = struct.Struct("<H")
+U32 = struct.Struct("<I")
+U32_PAIR = struct.Struct("<II")
+PLAYER_STATS = struct.Struct("<III")
+VOLUME = struct.Struct("<f")
+PARTY_HEADER = struct.Struct("<BB")
+MEMBER_STATS = struct.Struct("<6I")
+
+SECTION_PLAYER = 1
+SECTION_ITEMS = 2
+SECTION_PROGRESS = 3
+SECTION_SETTINGS = 4
+SECTION_PARTY = 5
+
+# Seconds the writer waits after the first pending autosave, so bursts
+# from many sessions share one pass.
+DEFAULT_FLUSH_DELAY = 0.2
+
+
+class SaveError(ValueError):
+    """Raised for files that are not valid saves."""
+
+
+# --- Save data ------------------------------------------------------------
+
+
+class MemberState(NamedTuple):
+    name: str
+    max_hp: int
+    max_st: int
+    attack: int
+    defense: int
+    current_hp: int
+    current_st: int
+
+
+class PartyState(NamedTuple):
+    label: str
+    front_index: int
+    members: Tuple[MemberState, ...]
+
+    @classmethod
+    def capture(cls, party: Party) -> "PartyState":
+        return cls(
+            party.label,
+            party.front_index,
+            tuple([MemberState(m.name, m.max_hp, m.max_st, m.attack, m.defense, m.current_hp, m.current_st) for m in party.members]),
+        )
+
+
+class SaveData(NamedTuple):
+    """An immutable snapshot, safe to hand to the writer thread."""
+
+    player_name: str
+    max_hp: int
+    attack: int
+    defense: int
+    items: Tuple[Tuple[str, int], ...] = ()
+    wins: int = 0
+    losses: int = 0
+    language: str = "ja"
+    volume: float = 1.0
+    party: Optional[PartyState] = None
+
+    @classmethod
+    def capture(
+        cls,
+        party: Party,
+        inventory: Dict[str, int],
+        wins: int = 0,
+        losses: int = 0,
+        language: str = "ja",
+        volume: float = 1.0,
+    ) -> "SaveData":
+        """Snapshot a live party (its first member is the schema's ``player``)."""
+
+        leader = party.members[0]
+        return cls(
+            leader.name,
+            leader.max_hp,
+            leader.attack,
+            leader.defense,
+            tuple(inventory.items()),
+            wins,
+            losses,
+            language,
+            volume,
+            PartyState.capture(party),
+        )
+
+    def sections(self) -> Dict[int, object]:
+        """Section tag -> comparable value; the writer diffs these."""
+
+        sections: Dict[int, object] = {
+            SECTION_PLAYER: (self.player_name, self.max_hp, self.attack, self.defense),
+            SECTION_ITEMS: self.items,
+            SECTION_PROGRESS: (self.wins, self.losses),
+            SECTION_SETTINGS: (self.language, self.volume),
+        }
+        if self.party is not None:
+            sections[SECTION_PARTY] = self.party
+        return sections
+
+    # --- Binary -----------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        sections = self.sections()
+        return assemble({tag: encode_section(tag, value) for tag, value in sections.items()})
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SaveData":
+        if len(data) < HEADER.size:
+            raise SaveError("save is truncated")
+        magic, version, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise SaveError(f"not a version {VERSION} save")
+        reader = _Reader(data, HEADER.size)
+        fields: Dict[str, object] = {}
+        for _ in range(count):
+            tag, size = reader.unpack(SECTION)
+            payload = _Reader(reader.take(size))
+            if tag == SECTION_PLAYER:
+                fields["player_name"] = payload.string()
+                fields["max_hp"], fields["attack"], fields["defense"] = payload.unpack(PLAYER_STATS)
+            elif tag == SECTION_ITEMS:
+                (item_count,) = payload.unpack(STRING_SIZE)
+                fields["items"] = tuple((payload.string(), payload.unpack(U32)[0]) for _ in range(item_count))
+            elif tag == SECTION_PROGRESS:
+                fields["wins"], fields["losses"] = payload.unpack(U32_PAIR)
+            elif tag == SECTION_SETTINGS:
+                fields["language"] = payload.string()
+                (fields["volume"],) = payload.unpack(VOLUME)
+            elif tag == SECTION_PARTY:
+                label = payload.string()
+                front_index, member_count = payload.unpack(PARTY_HEADER)
+                members = tuple(MemberState(payload.string(), *payload.unpack(MEMBER_STATS)) for _ in range(member_count))
+                fields["party"] = PartyState(label, front_index, members)
+        if reader.pos != len(data):
+            raise SaveError("save size does not match its sections")
+        if "player_name" not in fields:
+            raise SaveError("save has no player section")
+        return cls(**fields)  # type: ignore[arg-type]
+
+    # --- JSON -------------------------------------------------------------
+
+    def to_json(self) -> dict:
+        """The ``docs/save_schema.json`` layout, plus a ``party`` object."""
+
+        document: dict = {
+            "version": VERSION,
+            "player": {
+                "name": self.player_name,
+                "maxHP": self.max_hp,
+                "attack": self.attack,
+                "defense": self.defense,
+                "items": [{"id": item_id, "count": count} for item_id, count in self.items],
+            },
+            "progress": {"wins": self.wins, "losses": self.losses},
+            "settings": {"language": self.language, "volume": self.volume},
+        }
+        if self.party is not None:
+            document["party"] = {
+                "label": self.party.label,
+                "frontIndex": self.party.front_index,
+                "members": [
+                    {
+                        "name": m.name,
+                        "maxHP": m.max_hp,
+                        "maxST": m.max_st,
+                        "attack": m.attack,
+                        "defense": m.defense,
+                        "hp": m.current_hp,
+                        "st": m.current_st,
+                    }
+                    for m in self.party.members
+                ],
+            }
+        return document
+
+    @classmethod
+    def from_json(cls, document: dict) -> "SaveData":
+        try:
+            if document["version"] != VERSION:
+                raise SaveError(f"not a version {VERSION} save")
+            player = document["player"]
+            progress = document.get("progress", {})
+            settings = document.get("settings", {})
+            party = document.get("party")
+            return cls(
+                player_name=str(player["name"]),
+                max_hp=int(player["maxHP"]),
+                attack=int(player["attack"]),
+                defense=int(player["defense"]),
+                items=tuple((str(item["id"]), int(item["count"])) for item in player.get("items", [])),
+                wins=int(progress.get("wins", 0)),
+                losses=int(progress.get("losses", 0)),
+                language=str(settings.get("language", "ja")),
+                volume=float(settings.get("volume", 1.0)),
+                party=None
+                if party is None
+                else PartyState(
+                    label=str(party["label"]),
+                    front_index=int(party["frontIndex"]),
+                    members=tuple(
+                        MemberState(
+                            str(m["name"]),
+                            int(m["maxHP"]),
+                            int(m["maxST"]),
+                            int(m["attack"]),
+                            int(m["defense"]),
+                            int(m["hp"]),
+                            int(m["st"]),
+                        )
+                        for m in party["members"]
+                    ),
+                ),
+            )
+        except SaveError:
+            raise
+        except (KeyError, TypeError, ValueError) as exc:
+            raise SaveError(f"invalid save document: {exc}") from exc
+
+
+# --- Encoding -------------------------------------------------------------
+
+
+def _string(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    return STRING_SIZE.pack(len(raw)) + raw
+
+
+def encode_section(tag: int, value) -> bytes:
+    """One section's bytes, header included."""
+
+    if tag == SECTION_PLAYER:
+        name, max_hp, attack, defense = value
+        payload = _string(name) + PLAYER_STATS.pack(max_hp, attack, defense)
+    elif tag == SECTION_ITEMS:
+        payload = STRING_SIZE.pack(len(value)) + b"".join(_string(item_id) + U32.pack(count) for item_id, count in value)
+    elif tag == SECTION_PROGRESS:
+        payload = U32_PAIR.pack(*value)
+    elif tag == SECTION_SETTINGS:
+        language, volume = value
+        payload = _string(language) + VOLUME.pack(volume)
+    elif tag == SECTION_PARTY:
+        payload = b"".join(
+            [_string(value.label), PARTY_HEADER.pack(value.front_index, len(value.members))]
+            + [
+                _string(m.name)
+                + MEMBER_STATS.pack(m.max_hp, m.max_st, m.attack, m.defense, m.current_hp, m.current_st)
+                for m in value.members
+            ]
+        )
+    else:
+        raise SaveError(f"unknown section tag {tag}")
+    return SECTION.pack(tag, len(payload)) + payload
+
+
+def assemble(encoded: Dict[int, bytes]) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, len(encoded)) + b"".join(encoded[tag] for tag in sorted(encoded))
+
+
+class _Reader:
+    def __init__(self, data: bytes, pos: int = 0) -> None:
+        self.data = data
+        self.pos = pos
+
+    def take(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise SaveError("save is truncated")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        return fmt.unpack(self.take(fmt.size))
+
+    def string(self) -> str:
+        (size,) = self.unpack(STRING_SIZE)
+        try:
+            return self.take(size).decode("utf-8")
+        except UnicodeDecodeError as exc:
+            raise SaveError("save has an invalid string") from exc
+
+
+# --- Files ----------------------------------------------------------------
+
+
+def is_json_path(path: Union[str, Path]) -> bool:
+    return Path(path).suffix.lower() == ".json"
+
+
+def write_file(path: Union[str, Path], payload: bytes, fsync: bool = True) -> None:
+    """Write ``payload`` to a temporary file and rename it over ``path``."""
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(payload)
+        if fsync:
+            handle.flush()
+            os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def encode_json(data: SaveData) -> bytes:
+    return json.dumps(data.to_json(), ensure_ascii=False, indent=2).encode("utf-8") + b"\n"
+
+
+def write_save(path: Union[str, Path], data: SaveData, fsync: bool = True) -> None:
+    """Write ``data`` now, as JSON for ``.json`` paths and binary otherwise."""
+
+    write_file(path, encode_json(data) if is_json_path(path) else data.to_bytes(), fsync)
+
+
+def load_save(path: Union[str, Path]) -> SaveData:
+    """Read a binary or JSON save, whatever its file name."""
+
+    data = Path(path).read_bytes()
+    if data[:4] == MAGIC:
+        return SaveData.from_bytes(data)
+    try:
+        document = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise SaveError(f"{path} is neither a binary nor a JSON save") from exc
+    if not isinstance(document, dict):
+        raise SaveError(f"{path} is not a save document")
+    return SaveData.from_json(document)
+
+
+# --- Autosave -------------------------------------------------------------
+
+
+@dataclass
+class AutosaveStats:
+    submitted: int = 0
+    coalesced: int = 0
+    written: int = 0
+    unchanged: int = 0
+    sections_encoded: int = 0
+    sections_reused: int = 0
+    errors: int = 0
+    last_error: Optional[str] = None
+
+
+@dataclass
+class _Written:
+    sections: Dict[int, object] = field(default_factory=dict)
+    encoded: Dict[int, bytes] = field(default_factory=dict)
+
+
+class AutosaveWriter:
+    """Coalescing write-behind saver; see the module docstring."""
+
+    def __init__(self, flush_delay: float = DEFAULT_FLUSH_DELAY, fsync: bool = True) -> None:
+        self.flush_delay = flush_delay
+        self.fsync = fsync
+        self.stats = AutosaveStats()
+        self._pending: Dict[Path, SaveData] = {}
+        self._written: Dict[Path, _Written] = {}
+        self._busy = False
+        self._closed = False
+        self._flush_waiters = 0
+        self._forgotten: Set[Path] = set()
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Union[str, Path], data: SaveData) -> None:
+        """Queue ``data`` for ``path``, replacing any snapshot not yet written."""
+
+        path = Path(path)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("autosave writer is closed")
+            self.stats.submitted += 1
+            if path in self._pending:
+                self.stats.coalesced += 1
+            self._pending[path] = data
+            self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far is on disk."""
+
+        with self._condition:
+            self._flush_waiters += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+            finally:
+                self._flush_waiters -= 1
+
+    def forget(self, path: Union[str, Path]) -> None:
+        """Drop the cached sections for ``path`` once its queued save is written."""
+
+        with self._condition:
+            if self._busy or Path(path) in self._pending:
+                self._forgotten.add(Path(path))
+            else:
+                self._written.pop(Path(path), None)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                # Let more sessions' autosaves arrive and share this pass.
+                deadline = time.monotonic() + self.flush_delay
+                while not self._closed and not self._flush_waiters:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch, self._pending = self._pending, {}
+                self._busy = True
+            try:
+                for path, data in batch.items():
+                    self._write(path, data)
+            finally:
+                with self._condition:
+                    for path in self._forgotten - self._pending.keys():
+                        self._written.pop(path, None)
+                    self._forgotten &= self._pending.keys()
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _write(self, path: Path, data: SaveData) -> None:
+        written = self._written.setdefault(path, _Written())
+        sections = data.sections()
+        if sections == written.sections:
+            self.stats.unchanged += 1
+            return
+        try:
+            if is_json_path(path):
+                payload = encode_json(data)
+            else:
+                for tag, value in sections.items():
+                    if written.sections.get(tag) == value and tag in written.encoded:
+                        self.stats.sections_reused += 1
+                        continue
+                    written.encoded[tag] = encode_section(tag, value)
+                    self.stats.sections_encoded += 1
+                for tag in set(written.encoded) - set(sections):
+                    del written.encoded[tag]
+                payload = assemble(written.encoded)
+            write_file(path, payload, self.fsync)
+        except (OSError, struct.error, OverflowError, TypeError, ValueError) as exc:
+            self.stats.errors += 1
+            self.stats.last_error = f"{path}: {exc}"
+            self._written.pop(path, None)
+            return
+        written.sections = sections
+        self.stats.written += 1
+
+
+_writer: Optional[AutosaveWriter] = None
+_writer_lock = threading.Lock()
+
+
+def autosave_writer() -> AutosaveWriter:
+    """The process-wide writer shared by every session."""
+
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = AutosaveWriter()
+        return _writer
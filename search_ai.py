@@ -0,0 +1,449 @@
+"""Budgeted look-ahead search for enemy turns.
+
+:class:`SearchPolicy` plugs into ``BattleState(enemy_policy=...)`` and picks
+between attacking, guarding and voluntary swaps by expectimax over the
+existing :class:`game.BattleState` action methods:
+
+* enemy turns are *max* nodes over the legal enemy commands;
+* player turns are *chance* nodes that average over the legal player
+  commands, resolved exactly like :func:`simulation.run_battle` (a command
+  that does not consume a turn falls back to attacking, then resting);
+* leaves are scored by HP ratios, with wins and losses dominating.
+
+Search runs by iterative deepening (one depth step = one enemy turn plus
+the following player turn) until a per-move wall-clock deadline or node
+budget is hit; the answer from the deepest completed iteration is used.
+The deadline starts before any setup and keeps back :data:`DEADLINE_MARGIN`
+of the budget for unwinding, so a decision returns within ``budget_ms``.
+The search works on a detached copy of the battle, stepping forward with
+the real action methods and rolling back with ``BattleState.snapshot`` /
+``restore``.  The copy is made once per roster and re-synced from the live
+battle's snapshot on every decision.  Values are cached in a transposition
+table of fixed slots indexed by the state's Zobrist hash (a slot keeps the
+latest entry stored in it), so the table never resizes mid-search.  Its
+slots are flat arrays rather than tuples, so the cyclic garbage collector
+has nothing to traverse in them and dropping a table is a few frees.  The
+tables live on the policy, one per roster with the least recently used
+roster dropped past ``max_rosters``, so lines explored on one turn are
+reused on the next.  Each decision updates :class:`SearchStats` for
+nodes-per-second monitoring.
+"""
+from __future__ import annotations
+
+import argparse
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from battle_log import NullSink
+from game import ATTACK_ST_COST, VOLUNTARY_SWAP_COST, BattleState, EnemyAction, Party
+from preview import copy_party
+from simulation import (
+    ATTACK,
+    DEFEND,
+    POLICIES,
+    Action,
+    SimulationSummary,
+    battle_rng,
+    fallback_turn,
+    perform_action,
+    run_battle,
+)
+
+
+DEFAULT_BUDGET_MS = 20.0
+DEFAULT_MAX_DEPTH = 6
+DEFAULT_TABLE_SIZE = 1 << 18
+DEFAULT_MAX_ROSTERS = 4
+# Share of the budget held back from the search deadline: the node that
+# trips the deadline still has to unwind and the decision be recorded, and a
+# preempted process only sees the deadline at its next node (a scheduler
+# tick of a few ms on a busy host).
+DEADLINE_MARGIN = 0.4
+
+WIN_SCORE = 1000.0
+NULL_SINK = NullSink()
+
+# XORed into the state hash for player-to-move nodes.
+PLAYER_TO_MOVE = 0xD1B54A32D192ED03
+
+StateKey = Tuple[Hashable, ...]
+# Best enemy command as stored in a table: none, attack, defend, then swap to 0, 1, ...
+NO_MOVE, MOVE_ATTACK, MOVE_DEFEND, MOVE_SWAP = 0, 1, 2, 3
+
+
+class SearchBudgetExceeded(Exception):
+    """Raised inside the search when the deadline or node budget is spent."""
+
+
+class TranspositionTable:
+    """Fixed slots in parallel arrays; depth 0 marks an empty slot."""
+
+    __slots__ = ("keys", "depths", "values", "moves")
+
+    def __init__(self, size: int) -> None:
+        self.keys = array("Q", bytes(8 * size))
+        self.depths = array("H", bytes(2 * size))
+        self.values = array("d", bytes(8 * size))
+        self.moves = array("b", bytes(size))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def move_code(action: Optional[EnemyAction]) -> int:
+    if action is None:
+        return NO_MOVE
+    if action[0] == "swap":
+        return MOVE_SWAP + action[1]
+    return MOVE_ATTACK if action == ATTACK else MOVE_DEFEND
+
+
+def move_action(code: int) -> Optional[EnemyAction]:
+    if code == NO_MOVE:
+        return None
+    if code >= MOVE_SWAP:
+        return ("swap", code - MOVE_SWAP)
+    return ATTACK if code == MOVE_ATTACK else DEFEND
+
+
+@dataclass
+class SearchStats:
+    """Cumulative search counters; ``last_*`` describe the latest decision."""
+
+    decisions: int = 0
+    nodes: int = 0
+    seconds: float = 0.0
+    table_hits: int = 0
+    budget_stops: int = 0
+    depth_total: int = 0
+    max_seconds: float = 0.0
+    last_nodes: int = 0
+    last_seconds: float = 0.0
+    last_depth: int = 0
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_total / self.decisions if self.decisions else 0.0
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "decisions": self.decisions,
+            "nodes": self.nodes,
+            "seconds": self.seconds,
+            "nodes_per_second": self.nodes_per_second,
+            "mean_depth": self.mean_depth,
+            "table_hits": self.table_hits,
+            "budget_stops": self.budget_stops,
+            "max_decision_ms": self.max_seconds * 1000,
+        }
+
+
+# --- State helpers --------------------------------------------------------
+
+
+def clone_state(state: BattleState) -> BattleState:
+    """Detached, hashed copy of ``state`` that logs nothing."""
+
+    clone = BattleState(
+        player_party=copy_party(state.player_party),
+        enemy_party=copy_party(state.enemy_party),
+        player_inventory=dict(state.player_inventory),
+        sink=NULL_SINK,
+        items=state.items,
+        element_chart=state.element_chart,
+    )
+    clone.guard_flags = dict(state.guard_flags)
+    clone.enable_hashing()
+    return clone
+
+
+def roster_signature(state: BattleState) -> StateKey:
+    """Static stats of both parties; keys are only comparable under the same roster."""
+
+    return tuple(
+        (member.name, member.max_hp, member.max_st, member.attack, member.defense, member.magic, member.element)
+        for party in (state.player_party, state.enemy_party)
+        for member in party.members
+    )
+
+
+def enemy_actions(state: BattleState) -> List[EnemyAction]:
+    front = state.enemy_party.front()
+    if front is None:
+        return []
+    actions: List[EnemyAction] = []
+    if front.current_st >= ATTACK_ST_COST:
+        actions.append(ATTACK)
+    actions.append(DEFEND)
+    if front.current_st >= VOLUNTARY_SWAP_COST:
+        actions.extend(("swap", idx) for idx in state.enemy_party.available_backliner_indexes())
+    return actions
+
+
+def player_actions(state: BattleState) -> List[Action]:
+    actions: List[Action] = [ATTACK, DEFEND]
+    front = state.player_party.front()
+    if front is not None:
+        actions.extend(("item", item_id) for item_id, count in state.player_inventory.items() if count > 0)
+        if front.current_st >= VOLUNTARY_SWAP_COST:
+            actions.extend(("swap", idx) for idx in state.player_party.available_backliner_indexes())
+    return actions
+
+
+def _hp_ratio(party: Party) -> float:
+    return sum(member.current_hp / member.max_hp for member in party.members)
+
+
+def evaluate(state: BattleState, depth: int = 0) -> float:
+    """Score from the enemy's point of view; earlier wins score higher."""
+
+    if state.player_party.all_defeated():
+        return WIN_SCORE + depth
+    if state.enemy_party.all_defeated():
+        return -WIN_SCORE - depth
+    return 100.0 * (_hp_ratio(state.enemy_party) - _hp_ratio(state.player_party))
+
+
+# --- Policy ---------------------------------------------------------------
+
+
+@dataclass
+class SearchPolicy:
+    """Expectimax enemy policy with a per-move time and node budget.
+
+    ``budget_ms`` is a hard wall-clock deadline for one decision and
+    ``max_nodes`` (optional) caps the nodes expanded.  When a budget runs
+    out the deepest fully searched answer is returned, falling back to the
+    fixed attack-or-guard rule if not even depth 1 finished.
+
+    One transposition table of ``table_size`` slots (a power of two) is
+    kept per roster, for the ``max_rosters`` most recently seen rosters.
+    """
+
+    budget_ms: float = DEFAULT_BUDGET_MS
+    max_nodes: Optional[int] = None
+    max_depth: int = DEFAULT_MAX_DEPTH
+    table_size: int = DEFAULT_TABLE_SIZE
+    max_rosters: int = DEFAULT_MAX_ROSTERS
+    stats: SearchStats = field(default_factory=SearchStats)
+    tables: "OrderedDict[StateKey, TranspositionTable]" = field(default_factory=OrderedDict, repr=False)
+
+    def __post_init__(self) -> None:
+        self._deadline = 0.0
+        self._node_limit = 0
+        self._nodes = 0
+        if self.table_size <= 0 or self.table_size & (self.table_size - 1):
+            raise ValueError(f"table_size must be a power of two, got {self.table_size}")
+        self._mask = self.table_size - 1
+        self._table = TranspositionTable(0)
+        self._roots: Dict[StateKey, BattleState] = {}
+
+    def __getstate__(self) -> dict:
+        # Worker processes start with empty tables rather than a pickled copy.
+        state = dict(self.__dict__)
+        state["tables"] = OrderedDict()
+        state["_table"] = TranspositionTable(0)
+        state["_roots"] = {}
+        return state
+
+    def __call__(self, state: BattleState) -> EnemyAction:
+        return self.decide(state, self.budget_ms)
+
+    def decide(self, state: BattleState, budget_ms: float) -> EnemyAction:
+        """One decision within ``budget_ms`` instead of :attr:`budget_ms` (see :mod:`preview`)."""
+
+        # The deadline covers the setup too: a new roster's table and search copy.
+        started = time.perf_counter()
+        self._deadline = started + budget_ms * (1.0 - DEADLINE_MARGIN) / 1000
+        self._node_limit = self.max_nodes if self.max_nodes is not None else 1 << 62
+        self._nodes = 0
+        front = state.enemy_party.front()
+        best: EnemyAction = ATTACK if front is not None and front.current_st >= ATTACK_ST_COST else DEFEND
+        completed = 0
+        try:
+            signature = roster_signature(state)
+            self._table = self._roster_table(signature)
+            root = self._search_root(signature, state)
+            if time.perf_counter() >= self._deadline:
+                raise SearchBudgetExceeded
+            for depth in range(1, self.max_depth + 1):
+                _, action = self._enemy_node(root, depth)
+                if action is not None:
+                    best = action
+                completed = depth
+        except SearchBudgetExceeded:
+            self.stats.budget_stops += 1
+
+        elapsed = time.perf_counter() - started
+        stats = self.stats
+        stats.decisions += 1
+        stats.nodes += self._nodes
+        stats.seconds += elapsed
+        stats.depth_total += completed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+        stats.last_nodes = self._nodes
+        stats.last_seconds = elapsed
+        stats.last_depth = completed
+        return best
+
+    # ------------------------------------------------------------------
+    def _roster_table(self, signature: StateKey) -> TranspositionTable:
+        """Table for ``signature``, evicting the least recently used roster."""
+
+        table = self.tables.get(signature)
+        if table is not None:
+            self.tables.move_to_end(signature)
+            return table
+        table = self.tables[signature] = TranspositionTable(self.table_size)
+        while len(self.tables) > self.max_rosters:
+            evicted, _ = self.tables.popitem(last=False)
+            self._roots.pop(evicted, None)
+        return table
+
+    def _search_root(self, signature: StateKey, state: BattleState) -> BattleState:
+        """The roster's search copy, brought to ``state`` by ``restore``."""
+
+        root = self._roots.get(signature)
+        if (
+            root is None
+            or root.item_ids != state.item_ids
+            or root.items is not state.items
+            or root.element_chart is not state.element_chart
+        ):
+            root = self._roots[signature] = clone_state(state)
+        else:
+            root.restore(state.snapshot())
+        return root
+
+    def _store(self, key: int, depth: int, value: float, best: Optional[EnemyAction]) -> None:
+        table = self._table
+        slot = key & self._mask
+        table.keys[slot] = key
+        table.depths[slot] = depth
+        table.values[slot] = value
+        table.moves[slot] = move_code(best)
+
+    def _visit(self) -> None:
+        self._nodes += 1
+        if self._nodes > self._node_limit or time.perf_counter() >= self._deadline:
+            raise SearchBudgetExceeded
+
+    def _lookup(self, key: int, depth: int) -> Optional[int]:
+        """Slot holding ``key`` searched at least ``depth`` deep, or ``None``."""
+
+        table = self._table
+        slot = key & self._mask
+        if table.depths[slot] >= depth and table.keys[slot] == key:
+            self.stats.table_hits += 1
+            return slot
+        return None
+
+    def _enemy_node(self, state: BattleState, depth: int) -> Tuple[float, Optional[EnemyAction]]:
+        """Value of the enemy's turn in ``state`` with ``depth`` rounds left."""
+
+        if depth == 0 or state.is_battle_over():
+            return evaluate(state, depth), None
+        key = state.zobrist
+        slot = self._lookup(key, depth)
+        if slot is not None:
+            return self._table.values[slot], move_action(self._table.moves[slot])
+        self._visit()
+
+        entry_snapshot = state.snapshot()
+        if not state.ensure_actor_ready(state.enemy_party, "enemy"):
+            state.end_enemy_turn()
+            value, best = self._player_node(state, depth), None
+        else:
+            ready = state.snapshot()
+            value, best = float("-inf"), None
+            for action in enemy_actions(state):
+                if state.perform_enemy_action(action):
+                    state.end_enemy_turn()
+                    score = self._player_node(state, depth)
+                    if score > value:
+                        value, best = score, action
+                state.restore(ready)
+            if best is None:
+                value = evaluate(state, depth)
+        state.restore(entry_snapshot)
+        self._store(key, depth, value, best)
+        return value, best
+
+    def _player_node(self, state: BattleState, depth: int) -> float:
+        """Expected value over the player's commands, then the next enemy turn."""
+
+        if state.is_battle_over():
+            return evaluate(state, depth)
+        key = state.zobrist ^ PLAYER_TO_MOVE
+        slot = self._lookup(key, depth)
+        if slot is not None:
+            return self._table.values[slot]
+        self._visit()
+
+        total = 0.0
+        actions = player_actions(state)
+        before = state.snapshot()
+        for action in actions:
+            performed = perform_action(state, action) or fallback_turn(state, action)
+            if performed:
+                state.end_player_turn()
+            if not performed or state.is_battle_over():
+                total += evaluate(state, depth)
+            else:
+                total += self._enemy_node(state, depth - 1)[0]
+            state.restore(before)
+        value = total / len(actions)
+        self._store(key, depth, value, None)
+        return value
+
+
+# --- CLI ------------------------------------------------------------------
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare the search enemy AI against the fixed rule.")
+    parser.add_argument("--battles", type=int, default=200, help="battles per enemy AI")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy", help="player policy")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="search deadline per enemy move")
+    parser.add_argument("--max-nodes", type=int, default=None, help="node budget per enemy move")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH, help="deepest iteration (rounds)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for randomised policies")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from game import default_enemy_party, default_player_party
+
+    args = parse_args(argv)
+    policy = POLICIES[args.policy]
+    search = SearchPolicy(budget_ms=args.budget_ms, max_nodes=args.max_nodes, max_depth=args.max_depth)
+    for label, enemy_policy in (("rule", None), ("search", search)):
+        summary = SimulationSummary()
+        for index in range(args.battles):
+            summary.add(
+                run_battle(
+                    default_player_party(),
+                    default_enemy_party(),
+                    policy,
+                    rng=battle_rng(args.seed, index),
+                    enemy_policy=enemy_policy,
+                )
+            )
+        print(f"{label}: player win rate {summary.win_rate:.2%} ({summary.battles} battles)")
+    report = search.stats.report()
+    print(
+        f"search: {report['decisions']} decisions, {report['nodes_per_second']:.0f} nodes/s, "
+        f"mean depth {report['mean_depth']:.2f}, table hits {report['table_hits']}, "
+        f"budget stops {report['budget_stops']}, worst decision {report['max_decision_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
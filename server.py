@@ -0,0 +1,515 @@
+"""Asyncio battle server hosting many sessions in one process.
+
+Each connection gets its own :class:`game.Game`; its screens are driven
+through :meth:`Game.session`, which yields at every prompt instead of
+blocking on ``input()``.  Output is buffered per session and flushed,
+followed by the ``"> "`` prompt marker, whenever the game waits for input.
+
+Transports are pluggable (:class:`Transport`): a line-based TCP listener is
+built in, and a WebSocket listener is available when the optional
+``websockets`` package is installed.  On shutdown the server prints one JSON
+line with its counters (sessions, turns, CPU time, per-turn processing
+time) for load testing.
+
+With ``--save-dir`` every session autosaves to its own file there through
+the shared :mod:`savegame` write-behind writer, and saves are read on an
+executor thread, so the event loop never waits on disk.  Saves are keyed by
+player id: a WebSocket client may name itself in the connect path
+(``/play/<id>`` or ``?player=<id>``) together with a secret
+``token=<token>`` and gets its save back on every connection.  The first
+token seen for a new player is stored hashed in ``<id>.key`` next to the
+save; later connections must present the same token.  All other sessions
+(no id, an id already connected, a missing or wrong token) get a fresh
+server-issued id, so they never load or overwrite somebody else's file.
+
+With ``--hibernate-after`` a session left waiting at a prompt for that many
+seconds is packed into a :mod:`hibernation` image on disk and its ``Game``
+is dropped; the next input rebuilds it at the same prompt, so idle players
+only cost their connection.  ``--idle-timeout`` still closes it in the end.
+
+With ``--watch-data`` the :mod:`data_registry` polls ``data/`` and swaps in
+validated edits while sessions keep playing; each battle keeps the data it
+started with.  Reload counters and the last rejection are added to the
+shutdown line.
+
+With ``--enemy-ai yaml`` every battle's enemy follows the ``docs/ai.yaml``
+state machine, compiled once at startup into an :mod:`enemy_ai` decision
+table shared by all sessions.
+
+With ``--analytics-dir`` all sessions share one :mod:`analytics` emitter;
+its counters (written, dropped) are added to the shutdown line.
+
+With ``--metrics-port`` the :mod:`instrumentation` phase metrics are
+enabled and served over HTTP: ``/metrics`` in Prometheus text format and
+``/metrics.json`` as a JSON snapshot.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import re
+import signal
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import instrumentation
+from analytics import AnalyticsEmitter, open_emitter
+from data_registry import REGISTRY
+from enemy_ai import ENEMY_AIS, AIError, enemy_policy
+from game import EnemyPolicy, Game, Screen
+from hibernation import HibernationStore, SessionImage, rehydrate
+from savegame import SaveData, autosave_writer, load_save
+from seeds import SeedStream, random_seed
+from stages import get_stage
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - optional dependency
+    websockets = None
+
+
+PROMPT = "> "
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_IDLE_TIMEOUT = 300.0
+MAX_LINE = 256
+PLAYER_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+PLAYER_TOKEN = re.compile(r"[A-Za-z0-9_-]{16,128}")
+
+
+def credentials_from_path(path: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """``(player id, token)`` from a ``/play/<id>?token=<token>`` or ``?player=<id>&token=<token>`` path.
+
+    Either is ``None`` when absent or malformed.
+    """
+
+    if not path:
+        return None, None
+    parts = urlsplit(path)
+    query = parse_qs(parts.query)
+    candidates = query.get("player", [])
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if len(segments) == 2 and segments[0] == "play":
+        candidates.append(segments[1])
+    player_id = next((candidate for candidate in candidates if PLAYER_ID.fullmatch(candidate)), None)
+    token = next((candidate for candidate in query.get("token", []) if PLAYER_TOKEN.fullmatch(candidate)), None)
+    return player_id, token
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("ascii")).hexdigest()
+
+
+class Transport:
+    """Moves text between one connected client and its session."""
+
+    async def read_line(self) -> Optional[str]:
+        """Next input line without its newline, or ``None`` once the client left."""
+
+        raise NotImplementedError
+
+    async def send(self, text: str) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class StreamTransport(Transport):
+    """Newline-delimited text over an asyncio stream (TCP)."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    async def read_line(self) -> Optional[str]:
+        try:
+            line = await self.reader.readline()
+        except (ConnectionError, ValueError):
+            return None
+        if not line:
+            return None
+        return line[:MAX_LINE].decode("utf-8", "replace")
+
+    async def send(self, text: str) -> None:
+        self.writer.write(text.encode("utf-8"))
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class WebSocketTransport(Transport):
+    """One text message per prompt / input line over a WebSocket."""
+
+    def __init__(self, socket) -> None:
+        self.socket = socket
+
+    async def read_line(self) -> Optional[str]:
+        try:
+            message = await self.socket.recv()
+        except websockets.ConnectionClosed:
+            return None
+        if isinstance(message, bytes):
+            message = message.decode("utf-8", "replace")
+        return message[:MAX_LINE]
+
+    async def send(self, text: str) -> None:
+        await self.socket.send(text)
+
+    async def close(self) -> None:
+        await self.socket.close()
+
+
+@dataclass
+class ServerStats:
+    sessions_started: int = 0
+    sessions_finished: int = 0
+    active_sessions: int = 0
+    peak_sessions: int = 0
+    turns: int = 0
+    turn_seconds: float = 0.0
+    idle_timeouts: int = 0
+    hibernations: int = 0
+    rehydrations: int = 0
+    hibernated_sessions: int = 0
+    peak_hibernated: int = 0
+    hibernated_bytes: int = 0
+    hibernate_errors: int = 0
+    rejected_players: int = 0
+
+    def report(self) -> dict:
+        data = asdict(self)
+        data["cpu_seconds"] = time.process_time()
+        data["mean_turn_us"] = self.turn_seconds / self.turns * 1e6 if self.turns else 0.0
+        return data
+
+
+class BattleServer:
+    """Runs one :class:`Game` session per connected transport."""
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        stage: Optional[str] = None,
+        save_dir: Optional[str] = None,
+        analytics: Optional[AnalyticsEmitter] = None,
+        hibernate_after: Optional[float] = None,
+        store: Optional[HibernationStore] = None,
+        enemy_policy: Optional[EnemyPolicy] = None,
+    ) -> None:
+        self.seeds = SeedStream(random_seed() if seed is None else seed)
+        self.idle_timeout = idle_timeout
+        if hibernate_after is not None and store is None:
+            store = HibernationStore()
+        self.hibernate_after = hibernate_after
+        self.store = store
+        if stage is not None:
+            get_stage(stage)
+        self.stage = stage
+        self.save_dir = save_dir
+        self.analytics = analytics
+        self.enemy_policy = enemy_policy
+        self.stats = ServerStats()
+        self.active_players: Set[str] = set()
+
+    def claim_player(self, player_id: Optional[str]) -> str:
+        """Reserve a save key: the client's id, or a fresh one if absent or already connected."""
+
+        if player_id is None or player_id in self.active_players:
+            player_id = f"guest_{random_seed():016x}"
+        self.active_players.add(player_id)
+        return player_id
+
+    def save_path(self, player: str, suffix: str = ".sav") -> str:
+        assert self.save_dir is not None
+        return os.path.join(self.save_dir, f"{player}{suffix}")
+
+    def authorize(self, player: str, token: Optional[str]) -> bool:
+        """Whether ``token`` unlocks ``player``'s save; a new player's first token is registered.
+
+        Runs on an executor thread (it reads and may create ``<player>.key``).
+        A save without a key file is never handed out.
+        """
+
+        if token is None:
+            return False
+        digest = token_digest(token)
+        key_path = self.save_path(player, ".key")
+        try:
+            with open(key_path, encoding="ascii") as fh:
+                stored = fh.read().strip()
+        except FileNotFoundError:
+            if os.path.exists(self.save_path(player)):
+                return False
+            os.makedirs(self.save_dir, exist_ok=True)
+            try:
+                with open(key_path, "x", encoding="ascii") as fh:
+                    fh.write(digest + "\n")
+            except FileExistsError:
+                return False
+            return True
+        return hmac.compare_digest(stored, digest)
+
+    def open_save(self, player: str, token: Optional[str]) -> Tuple[bool, Optional[SaveData]]:
+        """``(authorized, save)`` for a returning player; runs on an executor thread."""
+
+        if not self.authorize(player, token):
+            return False, None
+        # The player's last session may still have a save queued.
+        autosave_writer().flush()
+        path = self.save_path(player)
+        return True, load_save(path) if os.path.exists(path) else None
+
+    async def serve_session(
+        self, transport: Transport, player_id: Optional[str] = None, token: Optional[str] = None
+    ) -> None:
+        stats = self.stats
+        stats.sessions_started += 1
+        stats.active_sessions += 1
+        stats.peak_sessions = max(stats.peak_sessions, stats.active_sessions)
+        key = f"session_{stats.sessions_started}"
+        player = self.claim_player(player_id)
+        output: List[str] = []
+        saved: Optional[SaveData] = None
+        if self.save_dir is not None and player == player_id:
+            authorized, saved = await asyncio.get_running_loop().run_in_executor(None, self.open_save, player, token)
+            if not authorized:
+                stats.rejected_players += 1
+                self.active_players.discard(player)
+                player = self.claim_player(None)
+        save_path = self.save_path(player) if self.save_dir is not None else None
+        # The save (if any) was read above, so Game itself never touches the disk here.
+        game: Optional[Game] = Game(
+            seed=self.seeds.split(stats.sessions_started).next_u64(),
+            write=output.append,
+            stage=self.stage,
+            analytics=self.analytics,
+            enemy_policy=self.enemy_policy,
+        )
+        if save_path is not None:
+            game.save_path = save_path
+            game.autosave_writer = autosave_writer()
+            if saved is not None:
+                game.apply_save(saved)
+        session = game.session()
+        hibernated = 0
+        try:
+            started = time.perf_counter()
+            try:
+                next(session)
+                while True:
+                    stats.turn_seconds += time.perf_counter() - started
+                    stats.turns += 1
+                    await self.flush(transport, output, PROMPT)
+                    read = asyncio.ensure_future(transport.read_line())
+                    try:
+                        if self.hibernate_after is None or self.hibernate_after >= self.idle_timeout:
+                            done, _ = await asyncio.wait((read,), timeout=self.idle_timeout)
+                        else:
+                            done, _ = await asyncio.wait((read,), timeout=self.hibernate_after)
+                            if not done:
+                                hibernated = await self.hibernate(key, game, session)
+                                if hibernated:
+                                    game = session = None
+                                done, _ = await asyncio.wait((read,), timeout=self.idle_timeout - self.hibernate_after)
+                    finally:
+                        if not read.done():
+                            read.cancel()
+                    if not done:
+                        stats.idle_timeouts += 1
+                        return
+                    line = read.result()
+                    if line is None:
+                        return
+                    started = time.perf_counter()
+                    if session is None:
+                        game, session = await self.wake(key, hibernated, output, save_path)
+                        hibernated = 0
+                    session.send(line.strip())
+            except StopIteration:
+                await self.flush(transport, output, "")
+        except ConnectionError:
+            pass
+        finally:
+            if session is not None:
+                session.close()
+            if game is not None:
+                game.release_parties()
+            if hibernated:
+                self.store.discard(key)
+                stats.hibernated_sessions -= 1
+                stats.hibernated_bytes -= hibernated
+            if save_path is not None:
+                autosave_writer().forget(save_path)
+            self.active_players.discard(player)
+            stats.active_sessions -= 1
+            stats.sessions_finished += 1
+            await transport.close()
+
+    async def hibernate(self, key: str, game: Game, session: Screen) -> int:
+        """Store ``game``'s image and free it; returns the image size (0 if it stays in memory)."""
+
+        try:
+            size = await asyncio.get_running_loop().run_in_executor(None, self.store.put, key, SessionImage.capture(game))
+        except OSError:
+            self.stats.hibernate_errors += 1
+            return 0
+        session.close()
+        game.release_parties()
+        stats = self.stats
+        stats.hibernations += 1
+        stats.hibernated_sessions += 1
+        stats.peak_hibernated = max(stats.peak_hibernated, stats.hibernated_sessions)
+        stats.hibernated_bytes += size
+        return size
+
+    async def wake(self, key: str, size: int, output: List[str], save_path: Optional[str]) -> Tuple[Game, Screen]:
+        """Rebuild a hibernated session at the prompt its player last saw."""
+
+        image = await asyncio.get_running_loop().run_in_executor(None, self.store.take, key)
+        game, session = rehydrate(image, output.append, save_path, self.analytics, self.enemy_policy)
+        output.clear()
+        stats = self.stats
+        stats.rehydrations += 1
+        stats.hibernated_sessions -= 1
+        stats.hibernated_bytes -= size
+        return game, session
+
+    @staticmethod
+    async def flush(transport: Transport, output: List[str], suffix: str) -> None:
+        text = "\n".join(output)
+        output.clear()
+        if text:
+            text += "\n"
+        await transport.send(text + suffix)
+
+    async def handle_stream(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await self.serve_session(StreamTransport(reader, writer))
+
+    async def handle_websocket(self, socket, *args: object) -> None:
+        # websockets < 10.1 passes the path; newer releases expose socket.request.
+        request = getattr(socket, "request", None)
+        path = args[0] if args else getattr(request, "path", None) or getattr(socket, "path", None)
+        await self.serve_session(WebSocketTransport(socket), *credentials_from_path(path))
+
+
+async def handle_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Minimal HTTP/1.0 responder for metrics scrapes."""
+
+    try:
+        request = await reader.readline()
+        while (await reader.readline()).strip():
+            pass
+        parts = request.decode("latin-1").split()
+        path = parts[1] if len(parts) > 1 else "/"
+        if path == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4", instrumentation.prometheus_text()
+        elif path == "/metrics.json":
+            status, content_type, body = "200 OK", "application/json", instrumentation.snapshot_json()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+        payload = body.encode("utf-8")
+        writer.write(
+            f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n\r\n".encode("latin-1")
+            + payload
+        )
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    try:
+        policy = enemy_policy(args.enemy_ai)
+    except AIError as exc:
+        raise SystemExit(f"--enemy-ai: {exc}") from None
+    emitter = open_emitter(args.analytics_dir) if args.analytics_dir is not None else None
+    server = BattleServer(
+        seed=args.seed,
+        idle_timeout=args.idle_timeout,
+        stage=args.stage,
+        save_dir=args.save_dir,
+        analytics=emitter,
+        hibernate_after=args.hibernate_after,
+        store=HibernationStore(args.hibernate_dir) if args.hibernate_dir is not None else None,
+        enemy_policy=policy,
+    )
+    listeners = []
+    if args.watch_data:
+        REGISTRY.watch()
+    if args.metrics_port is not None:
+        instrumentation.enable()
+        listeners.append(await asyncio.start_server(handle_metrics, args.host, args.metrics_port))
+    if args.websocket:
+        if websockets is None:
+            raise SystemExit("--websocket requires the 'websockets' package: pip install websockets")
+        listeners.append(await websockets.serve(server.handle_websocket, args.host, args.port))
+    else:
+        listeners.append(await asyncio.start_server(server.handle_stream, args.host, args.port, backlog=4096))
+    print(f"listening on {args.host}:{args.port} ({'websocket' if args.websocket else 'tcp'})", flush=True)
+    if args.metrics_port is not None:
+        print(f"metrics on http://{args.host}:{args.metrics_port}/metrics", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # pragma: no cover - Windows
+            pass
+    await stop.wait()
+    for listener in listeners:
+        listener.close()
+        await listener.wait_closed()
+    if args.save_dir is not None:
+        await loop.run_in_executor(None, autosave_writer().flush)
+    if server.store is not None:
+        server.store.close()
+    report = server.stats.report()
+    if args.watch_data:
+        REGISTRY.close()
+        report["data"] = REGISTRY.stats.report()
+    if emitter is not None:
+        await loop.run_in_executor(None, emitter.close)
+        report["analytics"] = emitter.stats.report()
+    print(json.dumps(report), flush=True)
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve battle sessions over TCP or WebSocket.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--websocket", action="store_true", help="listen for WebSocket clients instead of raw TCP")
+    parser.add_argument("--seed", type=int, default=None, help="root seed for all sessions")
+    parser.add_argument("--idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="seconds before idle sessions close")
+    parser.add_argument("--hibernate-after", type=float, default=None, help="seconds before idle sessions are moved to disk")
+    parser.add_argument("--hibernate-dir", default=None, help="keep hibernated sessions here (default: a temporary directory)")
+    parser.add_argument("--stage", default=None, help="play this stages.yaml stage in every session")
+    parser.add_argument("--enemy-ai", choices=ENEMY_AIS, default="rule", help="enemy turn logic (yaml: compiled docs/ai.yaml)")
+    parser.add_argument("--save-dir", default=None, help="autosave each player to <player id>.sav in this directory")
+    parser.add_argument("--watch-data", action="store_true", help="hot-reload validated edits to data/ while serving")
+    parser.add_argument("--analytics-dir", default=None, help="write analytics events as rotating gzip JSONL here")
+    parser.add_argument("--metrics-port", type=int, default=None, help="enable phase instrumentation and serve it over HTTP")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    asyncio.run(serve(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""Headless battle simulation for balance runs.
+
+The interactive CLI in :mod:`game` drives battles through ``input()`` and
+prints every log line.  This module runs the same :class:`game.BattleState`
+rules without any terminal I/O: a *player policy* picks each command, the
+enemy follows its normal turn logic, and the battle loop mirrors
+``Game.battle_screen``.  Large batches are fanned out across a
+``ProcessPoolExecutor`` and reduced into a single :class:`SimulationSummary`.
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+import json
+import os
+import random
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from battle_log import NullSink
+from game import (
+    VOLUNTARY_SWAP_COST,
+    BattleState,
+    EnemyPolicy,
+    Party,
+    default_enemy_party,
+    default_inventory,
+    default_player_party,
+)
+
+
+# --- Actions and policies -------------------------------------------------
+
+
+Action = Tuple  # ("attack",) / ("defend",) / ("item", item_id) / ("swap", index)
+PlayerPolicy = Callable[[BattleState, random.Random], Action]
+PartyFactory = Callable[[], Party]
+
+ATTACK: Action = ("attack",)
+DEFEND: Action = ("defend",)
+
+DEFAULT_MAX_TURNS = 200
+DEFAULT_CHUNK_SIZE = 5_000
+
+
+def perform_action(state: BattleState, action: Action) -> bool:
+    """Apply ``action`` to ``state`` and report whether a turn was consumed."""
+
+    kind = action[0]
+    if kind == "attack":
+        return state.player_attack()
+    if kind == "defend":
+        return state.player_defend()
+    if kind == "item":
+        return state.player_use_item(action[1])
+    if kind == "swap":
+        return state.player_swap(action[1])
+    raise ValueError(f"unknown action: {kind!r}")
+
+
+def fallback_turn(state: BattleState, action: Action) -> bool:
+    """After ``action`` was refused: attack (unless it was the attack), else guard.
+
+    Guarding only succeeds here when nobody can act, which rests the front.
+    Returns whether the turn was used.
+    """
+
+    return (action[0] != "attack" and state.player_attack()) or state.player_defend()
+
+
+def attack_policy(state: BattleState, rng: random.Random) -> Action:
+    """Always attack; the baseline every balance report is compared to."""
+
+    return ATTACK
+
+
+def greedy_policy(state: BattleState, rng: random.Random) -> Action:
+    """Heal when low, rotate out a tired front, otherwise attack."""
+
+    party = state.player_party
+    front = party.front()
+    if front is None:
+        return ATTACK
+    if front.current_hp * 3 < front.max_hp:
+        for item_id, count in state.player_inventory.items():
+            if count > 0:
+                return ("item", item_id)
+    if front.is_exhausted and front.current_st >= VOLUNTARY_SWAP_COST:
+        candidates = party.available_backliner_indexes()
+        if candidates:
+            best = max(candidates, key=lambda idx: party.members[idx].current_st)
+            return ("swap", best)
+    if front.is_exhausted:
+        return DEFEND
+    return ATTACK
+
+
+def random_policy(state: BattleState, rng: random.Random) -> Action:
+    """Pick uniformly among every command, including invalid swaps."""
+
+    roll = rng.randrange(3 + len(state.player_party.members))
+    if roll == 0:
+        return ATTACK
+    if roll == 1:
+        return DEFEND
+    if roll == 2:
+        return ("item", "potion_small")
+    return ("swap", roll - 3)
+
+
+POLICIES: Dict[str, PlayerPolicy] = {
+    "attack": attack_policy,
+    "greedy": greedy_policy,
+    "random": random_policy,
+}
+
+
+# --- Single battle --------------------------------------------------------
+
+
+@dataclass
+class BattleOutcome:
+    """Result of one headless battle."""
+
+    winner: str  # "player", "enemy" or "draw"
+    turns: int
+    player_hp: int
+    player_st: int
+    enemy_hp: int
+    enemy_st: int
+
+
+def _party_totals(party: Party) -> Tuple[int, int]:
+    hp = 0
+    st = 0
+    for member in party.members:
+        hp += member.current_hp
+        st += member.current_st
+    return hp, st
+
+
+def run_battle(
+    player_party: Party,
+    enemy_party: Party,
+    policy: PlayerPolicy,
+    *,
+    inventory: Optional[Dict[str, int]] = None,
+    rng: Optional[random.Random] = None,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    enemy_policy: Optional[EnemyPolicy] = None,
+) -> BattleOutcome:
+    """Run one battle to completion without any terminal I/O.
+
+    The loop follows ``Game.battle_screen``.  When the policy picks a command
+    that does not consume a turn, the player falls back to attacking, or to
+    guarding when nobody can act (see :func:`fallback_turn`); if that fails
+    as well the player side has no front and the battle ends in a draw
+    instead of re-prompting forever.  Battles still running after
+    ``max_turns`` player turns are also draws.  ``enemy_policy`` replaces
+    the fixed enemy rule (see :class:`game.BattleState`).
+    """
+
+    state = BattleState(
+        player_party=player_party,
+        enemy_party=enemy_party,
+        player_inventory=default_inventory() if inventory is None else dict(inventory),
+        sink=NullSink(),
+        enemy_policy=enemy_policy,
+    )
+    rng = rng or random.Random()
+    turns = 0
+    while not state.is_battle_over() and turns < max_turns:
+        action = policy(state, rng)
+        performed = perform_action(state, action)
+        if not performed:
+            performed = fallback_turn(state, action)
+        if not performed:
+            break
+        turns += 1
+        state.end_player_turn()
+        if state.is_battle_over():
+            break
+        state.enemy_take_turn()
+        state.end_enemy_turn()
+
+    if enemy_party.all_defeated():
+        winner = "player"
+    elif player_party.all_defeated():
+        winner = "enemy"
+    else:
+        winner = "draw"
+    player_hp, player_st = _party_totals(player_party)
+    enemy_hp, enemy_st = _party_totals(enemy_party)
+    return BattleOutcome(winner, turns, player_hp, player_st, enemy_hp, enemy_st)
+
+
+# --- Aggregation ----------------------------------------------------------
+
+
+@dataclass
+class SimulationSummary:
+    """Mergeable totals over many battles."""
+
+    battles: int = 0
+    player_wins: int = 0
+    enemy_wins: int = 0
+    draws: int = 0
+    total_turns: int = 0
+    min_turns: Optional[int] = None
+    max_turns: Optional[int] = None
+    player_hp: int = 0
+    player_st: int = 0
+    enemy_hp: int = 0
+    enemy_st: int = 0
+
+    def add(self, outcome: BattleOutcome) -> None:
+        self.battles += 1
+        if outcome.winner == "player":
+            self.player_wins += 1
+        elif outcome.winner == "enemy":
+            self.enemy_wins += 1
+        else:
+            self.draws += 1
+        self.total_turns += outcome.turns
+        if self.min_turns is None or outcome.turns < self.min_turns:
+            self.min_turns = outcome.turns
+        if self.max_turns is None or outcome.turns > self.max_turns:
+            self.max_turns = outcome.turns
+        self.player_hp += outcome.player_hp
+        self.player_st += outcome.player_st
+        self.enemy_hp += outcome.enemy_hp
+        self.enemy_st += outcome.enemy_st
+
+    def merge(self, other: "SimulationSummary") -> None:
+        self.battles += other.battles
+        self.player_wins += other.player_wins
+        self.enemy_wins += other.enemy_wins
+        self.draws += other.draws
+        self.total_turns += other.total_turns
+        for name, pick in (("min_turns", min), ("max_turns", max)):
+            theirs = getattr(other, name)
+            if theirs is None:
+                continue
+            ours = getattr(self, name)
+            setattr(self, name, theirs if ours is None else pick(ours, theirs))
+        self.player_hp += other.player_hp
+        self.player_st += other.player_st
+        self.enemy_hp += other.enemy_hp
+        self.enemy_st += other.enemy_st
+
+    def _mean(self, total: int) -> float:
+        return total / self.battles if self.battles else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self._mean(self.player_wins)
+
+    def report(self) -> Dict[str, object]:
+        data: Dict[str, object] = asdict(self)
+        data.update(
+            win_rate=self.win_rate,
+            mean_turns=self._mean(self.total_turns),
+            mean_player_hp=self._mean(self.player_hp),
+            mean_player_st=self._mean(self.player_st),
+            mean_enemy_hp=self._mean(self.enemy_hp),
+            mean_enemy_st=self._mean(self.enemy_st),
+        )
+        return data
+
+
+# --- Batch runs -----------------------------------------------------------
+
+
+def battle_rng(seed: int, index: int) -> random.Random:
+    """Return the RNG for battle ``index`` so results do not depend on chunking."""
+
+    return random.Random((seed << 32) ^ index)
+
+
+def run_chunk(
+    start: int,
+    count: int,
+    policy: PlayerPolicy,
+    player_factory: PartyFactory,
+    enemy_factory: PartyFactory,
+    inventory: Optional[Dict[str, int]],
+    seed: int,
+    max_turns: int,
+    enemy_policy: Optional[EnemyPolicy] = None,
+) -> SimulationSummary:
+    """Simulate battles ``start .. start + count`` and summarise them."""
+
+    summary = SimulationSummary()
+    for index in range(start, start + count):
+        summary.add(
+            run_battle(
+                player_factory(),
+                enemy_factory(),
+                policy,
+                inventory=inventory,
+                rng=battle_rng(seed, index),
+                max_turns=max_turns,
+                enemy_policy=enemy_policy,
+            )
+        )
+    return summary
+
+
+def _chunks(total: int, size: int) -> Iterator[Tuple[int, int]]:
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def simulate_many(
+    battles: int,
+    policy: PlayerPolicy = attack_policy,
+    *,
+    player_factory: PartyFactory = default_player_party,
+    enemy_factory: PartyFactory = default_enemy_party,
+    inventory: Optional[Dict[str, int]] = None,
+    seed: int = 0,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_turns: int = DEFAULT_MAX_TURNS,
+    enemy_policy: Optional[EnemyPolicy] = None,
+) -> SimulationSummary:
+    """Run ``battles`` headless battles, in parallel when ``workers != 1``.
+
+    ``policy``, ``enemy_policy`` and both factories are shipped to worker
+    processes, so they must be picklable (module-level functions are).
+    """
+
+    workers = workers or os.cpu_count() or 1
+    chunks = list(_chunks(battles, max(1, chunk_size)))
+    summary = SimulationSummary()
+    if workers == 1 or len(chunks) <= 1:
+        for start, count in chunks:
+            summary.merge(
+                run_chunk(
+                    start, count, policy, player_factory, enemy_factory, inventory, seed, max_turns, enemy_policy
+                )
+            )
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                run_chunk,
+                start,
+                count,
+                policy,
+                player_factory,
+                enemy_factory,
+                inventory,
+                seed,
+                max_turns,
+                enemy_policy,
+            )
+            for start, count in chunks
+        ]
+        for future in futures:
+            summary.merge(future.result())
+    return summary
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run headless balance simulations.")
+    parser.add_argument("--battles", type=int, default=10_000, help="number of battles to simulate")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="attack", help="player policy")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="battles per work unit")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for randomised policies")
+    parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS, help="turn cap before a draw")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    summary = simulate_many(
+        args.battles,
+        POLICIES[args.policy],
+        seed=args.seed,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        max_turns=args.max_turns,
+    )
+    report = summary.report()
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"battles: {summary.battles}")
+    print(f"win rate: {summary.win_rate:.2%} (wins {summary.player_wins} / losses {summary.enemy_wins} / draws {summary.draws})")
+    print(f"turns: mean {report['mean_turns']:.2f}, min {summary.min_turns}, max {summary.max_turns}")
+    print(f"remaining player HP/ST: {report['mean_player_hp']:.1f} / {report['mean_player_st']:.1f}")
+    print(f"remaining enemy HP/ST: {report['mean_enemy_hp']:.1f} / {report['mean_enemy_st']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Multi-wave stages from ``stages.yaml`` and ``enemies.yaml``.
+
+A stage is a sequence of waves; each wave is an enemy party made of
+``count`` copies of one enemy.  The player party keeps its HP, ST and items
+from one wave to the next, and the stage is cleared once the last wave
+falls.
+
+:class:`StageRun` prepares the next wave on a background thread while the
+current one is being played: the wave is validated against the enemy
+records and its party is taken from :data:`game.POOL`, so a long chain of
+waves recycles the same ``Combatant``/``Party`` objects instead of
+allocating new ones.  Stages and enemies come from the current
+:mod:`data_registry` snapshot; a run keeps the snapshot it started with, so
+a hot reload never changes a stage half way through.  ``Game(stage=...)``
+and ``GAME_STAGE`` play stages interactively; the CLI here runs them
+headless.
+"""
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import random
+import threading
+import time
+from typing import List, Mapping, Optional, Tuple
+
+from battle_log import NullSink
+from game import (
+    DEFAULT_PLAYER_LABEL,
+    DEFAULT_PLAYER_MEMBERS,
+    POOL,
+    BattleState,
+    CombatantPool,
+    MemberSpec,
+    Party,
+    default_inventory,
+)
+from data_registry import DataSnapshot, StageSpec, WaveSpec, current_data
+from simulation import DEFAULT_MAX_TURNS, POLICIES, PlayerPolicy, fallback_turn, perform_action
+
+
+MAX_WAVE_SIZE = 3
+MEMBER_SUFFIXES = "ABC"
+NULL_SINK = NullSink()
+
+
+class StageError(ValueError):
+    """Raised for stages or waves that cannot be played."""
+
+
+def load_stages(data: Optional[DataSnapshot] = None) -> Mapping[str, StageSpec]:
+    """Stages keyed by id, from ``data`` or the current snapshot."""
+
+    return (data or current_data()).stages
+
+
+def enemy_specs(data: Optional[DataSnapshot] = None) -> Mapping[str, MemberSpec]:
+    return (data or current_data()).enemies
+
+
+def get_stage(stage_id: str, data: Optional[DataSnapshot] = None) -> StageSpec:
+    stages = load_stages(data)
+    stage = stages.get(stage_id)
+    if stage is None:
+        raise StageError(f"unknown stage {stage_id!r}; known: {', '.join(sorted(stages))}")
+    if not stage.waves:
+        raise StageError(f"stage {stage_id!r} has no waves")
+    return stage
+
+
+def wave_members(wave: WaveSpec, enemies: Optional[Mapping[str, MemberSpec]] = None) -> Tuple[MemberSpec, ...]:
+    """Validate ``wave`` and return its member specs."""
+
+    spec = (enemy_specs() if enemies is None else enemies).get(wave.enemy)
+    if spec is None:
+        raise StageError(f"wave enemy {wave.enemy!r} is not defined in enemies.yaml")
+    if not 1 <= wave.count <= MAX_WAVE_SIZE:
+        raise StageError(f"wave count must be between 1 and {MAX_WAVE_SIZE}, got {wave.count}")
+    name, hp, st, atk, defense = spec
+    if hp <= 0 or st <= 0 or atk < 0 or defense < 0:
+        raise StageError(f"enemy {wave.enemy!r} has invalid stats")
+    if wave.count == 1:
+        return (spec,)
+    return tuple((f"{name} {MEMBER_SUFFIXES[idx]}", hp, st, atk, defense) for idx in range(wave.count))
+
+
+# --- Stage runs -----------------------------------------------------------
+
+
+_preloader: Optional[ThreadPoolExecutor] = None
+_preloader_lock = threading.Lock()
+
+
+def preloader() -> ThreadPoolExecutor:
+    """One shared background thread prepares waves for every run."""
+
+    global _preloader
+    with _preloader_lock:
+        if _preloader is None:
+            _preloader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="wave-preload")
+        return _preloader
+
+
+class StageRun:
+    """Hands out one stage's wave parties in order, preparing each ahead of time."""
+
+    def __init__(
+        self,
+        stage: StageSpec,
+        pool: CombatantPool = POOL,
+        preload: bool = True,
+        start: int = 0,
+        data: Optional[DataSnapshot] = None,
+    ) -> None:
+        self.stage = stage
+        self.pool = pool
+        self.preload = preload
+        self.enemies = enemy_specs(data)
+        self.wave_index = start - 1
+        self._pending: Optional[Future] = None
+        self._schedule(start)
+
+    @property
+    def wave_count(self) -> int:
+        return len(self.stage.waves)
+
+    def has_next_wave(self) -> bool:
+        return self.wave_index + 1 < self.wave_count
+
+    def wave_label(self, index: int) -> str:
+        return f"{self.stage.name} {index + 1}/{self.wave_count}"
+
+    def prepare(self, index: int) -> Party:
+        return self.pool.party(self.wave_label(index), wave_members(self.stage.waves[index], self.enemies))
+
+    def _schedule(self, index: int) -> None:
+        if index >= self.wave_count:
+            self._pending = None
+            return
+        if self.preload:
+            self._pending = preloader().submit(self.prepare, index)
+        else:
+            future: Future = Future()
+            try:
+                future.set_result(self.prepare(index))
+            except StageError as exc:
+                future.set_exception(exc)
+            self._pending = future
+
+    def next_wave(self) -> Party:
+        """The next wave's enemy party (raises :class:`StageError` if it is invalid)."""
+
+        if self._pending is None:
+            raise StageError(f"stage {self.stage.id!r} has no more waves")
+        party = self._pending.result()
+        self.wave_index += 1
+        self._schedule(self.wave_index + 1)
+        return party
+
+    def close(self) -> None:
+        """Return a prepared but unplayed wave to the pool."""
+
+        pending, self._pending = self._pending, None
+        if pending is not None and pending.exception() is None:
+            self.pool.release(pending.result())
+
+
+@dataclass
+class StageOutcome:
+    cleared: bool
+    waves_cleared: int
+    turns: int
+
+
+def play_stage(
+    stage: StageSpec,
+    policy: PlayerPolicy,
+    rng: random.Random,
+    pool: CombatantPool = POOL,
+    max_turns: int = DEFAULT_MAX_TURNS,
+) -> StageOutcome:
+    """Play ``stage`` headless with a :mod:`simulation` player policy."""
+
+    player = pool.party(DEFAULT_PLAYER_LABEL, DEFAULT_PLAYER_MEMBERS)
+    inventory = default_inventory()
+    run = StageRun(stage, pool)
+    turns = 0
+    cleared = 0
+    try:
+        while True:
+            enemy = run.next_wave()
+            state = BattleState(player, enemy, inventory, sink=NULL_SINK, rng=rng)
+            while not state.is_battle_over() and turns < max_turns:
+                action = policy(state, rng)
+                if not perform_action(state, action) and not fallback_turn(state, action):
+                    break
+                turns += 1
+                state.end_player_turn()
+                if state.is_battle_over():
+                    break
+                state.enemy_take_turn()
+                state.end_enemy_turn()
+            won = enemy.all_defeated()
+            pool.release(enemy)
+            if not won:
+                return StageOutcome(False, cleared, turns)
+            cleared += 1
+            if not run.has_next_wave():
+                return StageOutcome(True, cleared, turns)
+    finally:
+        run.close()
+        pool.release(player)
+
+
+# --- CLI ------------------------------------------------------------------
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Play stages from stages.yaml headless.")
+    parser.add_argument("--stage", default=None, help="stage id (default: every stage)")
+    parser.add_argument("--runs", type=int, default=1000, help="runs per stage")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy", help="player policy")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    stages = [get_stage(args.stage)] if args.stage else [get_stage(stage_id) for stage_id in load_stages()]
+    policy = POLICIES[args.policy]
+    for stage in stages:
+        rng = random.Random(args.seed)
+        created, reused = POOL.created, POOL.reused
+        started = time.perf_counter()
+        outcomes = [play_stage(stage, policy, rng) for _ in range(args.runs)]
+        elapsed = time.perf_counter() - started
+        clears = sum(outcome.cleared for outcome in outcomes)
+        print(
+            f"{stage.id} ({stage.name}, {len(stage.waves)} waves): cleared {clears}/{args.runs} "
+            f"({clears / max(args.runs, 1):.1%}), mean waves {sum(o.waves_cleared for o in outcomes) / max(args.runs, 1):.2f}, "
+            f"{args.runs / max(elapsed, 1e-9):.0f} runs/s"
+        )
+        print(f"  pooled combatants: {POOL.created - created} created, {POOL.reused - reused} reused")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,862 @@
+"""Exhaustive tablebase for fixed encounters.
+
+Against the fixed attack-or-guard enemy rule a battle is deterministic, so
+an encounter is a finite one-player game.  :func:`solve` enumerates every
+state reachable from the opening position by stepping a
+:class:`game.BattleState` through each player command (one command plus
+the enemy reply is one edge, exactly as ``Game.battle_screen`` plays it).
+It then labels every state by retrograde analysis:
+
+* *win* - the player can force a win; ``distance`` is the fewest commands;
+* *loss* - every line loses; ``distance`` is the longest the player can last;
+* *draw* - the player can avoid losing forever (or nobody can act).
+
+A :class:`StageEncounter` chains the waves of a ``stages.yaml`` stage the
+way :func:`stages.play_stage` plays them: clearing a wave carries the
+player's HP, ST, front and items into the next wave's opening, and only
+clearing the last wave wins.
+
+Every state is packed into one integer by :class:`StateCodec`: the wave
+index, the fronts, guards, every member's HP and ST and the item counts are
+the digits of a mixed-radix number.  Codes are exact, so the solver indexes
+states by their code and two different states can never be merged.
+
+Results are written to a memory-mapped open-addressing table keyed by the
+state's code, so :meth:`Tablebase.probe` is O(1) with nothing to decode up
+front.  Each slot stores its code (plus one, so 0 marks an empty slot) in
+as few bytes as the encounter's code range needs and, when the encounter
+has at most 256 distinct values, a one-byte index into a value palette.
+
+Binary layout (little endian)::
+
+    magic "TBL1", u16 version, u16 action count, u32 encounter fingerprint,
+    u8 value width (1 or 2), u8 key width, u16 palette size, u64 capacity,
+    u64 state count, u16 palette entry * palette size,
+    key per slot (code + 1, key width bytes), value per slot (u8 palette
+    index or u16 packed value)
+
+A packed value holds the result (2 bits), the best command's index in
+:meth:`Encounter.actions` (3 bits) and the distance (11 bits, saturating).
+
+Only small encounters can be solved: duels and one-against-many encounters
+take seconds, but the full 3-on-3 default encounter and the stages played
+by the whole party are far beyond ``DEFAULT_MAX_STATES`` (the 3-on-3
+frontier grows about fourfold with every command) and raise
+:class:`TablebaseTooLarge`.  For those :func:`find_win` answers whether the encounter is
+winnable by searching depth first, attack first, for any winning line; the
+CLI falls back to it.
+"""
+from __future__ import annotations
+
+import argparse
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from math import prod
+import mmap
+import os
+from pathlib import Path
+import struct
+import time
+import zlib
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from battle_log import NullSink
+from data_registry import current_data
+from game import (
+    ATTACK_ST_COST,
+    BACKLINE_ST_REGEN,
+    DEFEND_ST_REFUND,
+    MIN_ACTION_ST,
+    VOLUNTARY_SWAP_COST,
+    BattleState,
+    Combatant,
+    Party,
+    Snapshot,
+    default_enemy_party,
+    default_inventory,
+    default_player_party,
+    load_items,
+)
+from seeds import MASK64, splitmix64
+from simulation import ATTACK, DEFEND, Action, PlayerPolicy, perform_action
+from stages import StageError, get_stage, wave_members
+
+
+MAGIC = b"TBL1"
+VERSION = 3
+HEADER = struct.Struct("<4sHHIBBHQQ")
+PALETTE_LIMIT = 256
+
+TABLEBASE_DIR = Path(__file__).resolve().parent / ".cache"
+DEFAULT_MAX_STATES = 1_000_000
+MAX_LOAD = 0.75
+
+UNKNOWN, WIN, LOSS, DRAW = 0, 1, 2, 3
+RESULT_NAMES = {WIN: "win", LOSS: "loss", DRAW: "draw"}
+NO_ACTION = 7
+MAX_DISTANCE = (1 << 11) - 1
+
+# Edge targets that end the battle instead of reaching another state.
+WIN_EDGE = -1
+LOSS_EDGE = -2
+# play_command: the battle goes on.
+ONGOING = -3
+
+
+class TablebaseError(ValueError):
+    """Raised for files that are not tablebases of the requested encounter."""
+
+
+class TablebaseTooLarge(RuntimeError):
+    """Raised when an encounter has more reachable states than the budget."""
+
+
+class TablebaseEntry(NamedTuple):
+    result: str
+    distance: int
+    action: Optional[Action]
+
+
+# --- Encounters -----------------------------------------------------------
+
+
+def _select(party: Party, members: Tuple[int, ...]) -> Party:
+    party.members = [party.members[idx] for idx in members]
+    return party
+
+
+@dataclass(frozen=True)
+class Encounter:
+    """Opening position built from member subsets of the default parties."""
+
+    player_members: Tuple[int, ...] = (0, 1, 2)
+    enemy_members: Tuple[int, ...] = (0, 1, 2)
+
+    @property
+    def name(self) -> str:
+        return "p{}_e{}".format("".join(map(str, self.player_members)), "".join(map(str, self.enemy_members)))
+
+    def new_state(self) -> BattleState:
+        return BattleState(
+            player_party=_select(default_player_party(), self.player_members),
+            enemy_party=_select(default_enemy_party(), self.enemy_members),
+            player_inventory=default_inventory(),
+            sink=NullSink(),
+        )
+
+    def wave_states(self) -> List[BattleState]:
+        """One state per wave, each at its opening position."""
+
+        return [self.new_state()]
+
+    def actions(self) -> Tuple[Action, ...]:
+        """Every player command; packed values refer to them by index."""
+
+        actions: List[Action] = [ATTACK, DEFEND]
+        actions.extend(("item", item_id) for item_id in default_inventory())
+        actions.extend(("swap", idx) for idx in range(len(self.player_members)))
+        if len(actions) > NO_ACTION:
+            raise ValueError(f"{len(actions)} commands do not fit the packed action field")
+        return tuple(actions)
+
+    def fingerprint(self) -> int:
+        """Checksum of everything the solved values depend on."""
+
+        states = self.wave_states()
+        state = states[0]
+        items = load_items()
+        rules = (ATTACK_ST_COST, BACKLINE_ST_REGEN, DEFEND_ST_REFUND, MIN_ACTION_ST, VOLUNTARY_SWAP_COST)
+        roster = tuple(
+            tuple(
+                (member.name, member.max_hp, member.max_st, member.attack, member.defense, member.element)
+                for party in (wave.player_party, wave.enemy_party)
+                for member in party.members
+            )
+            for wave in states
+        )
+        inventory = tuple((item_id, count, items[item_id].heal_amount) for item_id, count in state.player_inventory.items())
+        chart = current_data().element_chart.half_steps.tobytes()
+        return zlib.crc32(repr((rules, roster, inventory, self.actions(), chart)).encode("utf-8"))
+
+    def default_path(self) -> Path:
+        return TABLEBASE_DIR / f"tablebase_{self.name}.bin"
+
+
+DEFAULT_ENCOUNTER = Encounter()
+
+
+@dataclass(frozen=True)
+class StageEncounter(Encounter):
+    """The waves of a ``stages.yaml`` stage against a subset of the default player party.
+
+    ``enemy_members`` is not used; the enemies come from the stage's waves.
+    """
+
+    stage_id: str = "stage1"
+
+    @property
+    def name(self) -> str:
+        return "stage_{}_p{}".format(self.stage_id, "".join(map(str, self.player_members)))
+
+    def new_state(self) -> BattleState:
+        return self.wave_states()[0]
+
+    def wave_states(self) -> List[BattleState]:
+        stage = get_stage(self.stage_id)
+        states = []
+        for index, wave in enumerate(stage.waves):
+            enemy = Party(
+                label=f"{stage.name} {index + 1}/{len(stage.waves)}",
+                members=[Combatant(*spec) for spec in wave_members(wave)],
+                front_index=0,
+            )
+            state = BattleState(
+                player_party=_select(default_player_party(), self.player_members),
+                enemy_party=enemy,
+                player_inventory=default_inventory(),
+                sink=NullSink(),
+            )
+            states.append(state)
+        return states
+
+
+def parse_members(text: str) -> Tuple[int, ...]:
+    """``"012"`` or ``"0,1,2"`` -> ``(0, 1, 2)``."""
+
+    return tuple(int(part) for part in (text.split(",") if "," in text else text))
+
+
+# --- State codes ----------------------------------------------------------
+
+
+class StateCodec:
+    """Exact mixed-radix integer codes for the states of an encounter.
+
+    The least significant digit is the wave index; the others are the
+    wave's snapshot fields (fronts, guards, HP and ST of every member, item
+    counts), each with its largest possible value plus one as the radix.
+    """
+
+    def __init__(self, states: Sequence[BattleState]) -> None:
+        self.waves = len(states)
+        self.item_ids = states[0].item_ids
+        self.radices: List[Tuple[int, ...]] = []
+        for state in states:
+            radices = [len(state.player_party.members), len(state.enemy_party.members), 2, 2]
+            for party in (state.player_party, state.enemy_party):
+                for member in party.members:
+                    radices += (member.max_hp + 1, member.max_st + 1)
+            radices.extend(state.player_inventory.get(item_id, 0) + 1 for item_id in self.item_ids)
+            self.radices.append(tuple(radices))
+        self.size = self.waves * max(prod(radices) for radices in self.radices)
+
+    @property
+    def key_width(self) -> int:
+        """Bytes needed to store ``code + 1`` for every code."""
+
+        return (self.size.bit_length() + 7) // 8
+
+    def fits(self, state: BattleState, wave: int = 0) -> bool:
+        """Whether ``state`` is a state of the encounter's ``wave`` (so :meth:`encode` is exact)."""
+
+        radices = self.radices[wave]
+        members = [*state.player_party.members, *state.enemy_party.members]
+        if (len(state.player_party.members), len(state.enemy_party.members)) != radices[:2]:
+            return False
+        if 2 * len(members) + 4 + len(self.item_ids) != len(radices):
+            return False
+        if any(count and item_id not in self.item_ids for item_id, count in state.player_inventory.items()):
+            return False
+        values = [
+            state.player_party.front_index,
+            state.enemy_party.front_index,
+            *(value for member in members for value in (member.current_hp, member.current_st)),
+            *(state.player_inventory.get(item_id, 0) for item_id in self.item_ids),
+        ]
+        return all(0 <= value < radix for value, radix in zip(values, radices[:2] + radices[4:]))
+
+    def encode(self, state: BattleState, wave: int = 0) -> int:
+        """Code of ``state`` in ``wave``, which must be a state of the encounter (see :meth:`fits`)."""
+
+        radices = self.radices[wave]
+        guards = state.guard_flags
+        code = ((state.player_party.front_index * radices[1] + state.enemy_party.front_index) * 2 + guards["player"]) * 2
+        code += guards["enemy"]
+        pos = 4
+        for party in (state.player_party, state.enemy_party):
+            for member in party.members:
+                code = (code * radices[pos] + member.current_hp) * radices[pos + 1] + member.current_st
+                pos += 2
+        inventory = state.player_inventory
+        for item_id in self.item_ids:
+            code = code * radices[pos] + inventory.get(item_id, 0)
+            pos += 1
+        return code * self.waves + wave
+
+    def decode(self, code: int) -> Tuple[int, Snapshot]:
+        """``(wave, snapshot)`` of ``code``; the snapshot carries no hash."""
+
+        code, wave = divmod(code, self.waves)
+        radices = self.radices[wave]
+        values: List[Optional[int]] = [0] * (len(radices) + 1)
+        values[-1] = None
+        for pos in range(len(radices) - 1, -1, -1):
+            code, values[pos] = divmod(code, radices[pos])
+        return wave, tuple(values)
+
+
+def code_hash(code: int) -> int:
+    """Well-mixed 64 bits of ``code``; the low bits pick its home slot."""
+
+    value = splitmix64(code & MASK64)
+    code >>= 64
+    while code:
+        value = splitmix64(value ^ (code & MASK64))
+        code >>= 64
+    return value
+
+
+# --- Solver ---------------------------------------------------------------
+
+
+def play_command(state: BattleState, action: Action) -> Optional[int]:
+    """Play one command and the enemy reply.
+
+    Returns ``WIN_EDGE``/``LOSS_EDGE`` when the battle ends, ``ONGOING``
+    when it goes on, or ``None`` when the command was refused (which may
+    still have changed the state, e.g. by a forced swap).
+    """
+
+    if not perform_action(state, action):
+        return None
+    state.end_player_turn()
+    if state.enemy_party.all_defeated():
+        return WIN_EDGE
+    state.enemy_take_turn()
+    state.end_enemy_turn()
+    if state.player_party.all_defeated():
+        return LOSS_EDGE
+    return ONGOING
+
+
+class WaveChain:
+    """One reusable state per wave of an encounter, stepped like a stage run."""
+
+    def __init__(self, encounter: Encounter) -> None:
+        self.states = encounter.wave_states()
+        self.codec = StateCodec(self.states)
+        self.openings = [state.snapshot() for state in self.states]
+        self.root = self.codec.encode(self.states[0])
+        # The last code decoded: a state's commands are all played from it.
+        self._decoded: Tuple[int, int, Snapshot] = (-1, 0, ())
+
+    def step(self, code: int, action: Action) -> Optional[int]:
+        """:func:`play_command` from the state ``code``, moving on when a wave that is not the last is cleared.
+
+        Returns the next state's code, ``WIN_EDGE``/``LOSS_EDGE``, or
+        ``None`` when the command was refused without changing anything
+        (the game would simply prompt again).
+        """
+
+        if code != self._decoded[0]:
+            self._decoded = (code, *self.codec.decode(code))
+        _, wave, snapshot = self._decoded
+        state = self.states[wave]
+        state.restore(snapshot)
+        outcome = play_command(state, action)
+        if outcome == WIN_EDGE and wave + 1 < len(self.states):
+            return self.carry_over(wave)
+        if outcome is None or outcome == ONGOING:
+            after = self.codec.encode(state, wave)
+            return None if outcome is None and after == code else after
+        return outcome
+
+    def carry_over(self, wave: int) -> int:
+        """Restore the next wave's opening with the player's party and items from ``wave``."""
+
+        state, following = self.states[wave], self.states[wave + 1]
+        after = state.snapshot()
+        opening = self.openings[wave + 1]
+        enemy_start = 4 + 2 * len(state.player_party.members)
+        enemy_end = enemy_start + 2 * len(following.enemy_party.members)
+        inventory = state.player_inventory
+        # A new BattleState per wave: guards are down and the enemy opens at its front.
+        following.restore(
+            (after[0], opening[1], 0, 0)
+            + after[4:enemy_start]
+            + opening[enemy_start:enemy_end]
+            + tuple(inventory.get(item_id, 0) for item_id in following.item_ids)
+            + (None,)
+        )
+        return self.codec.encode(following, wave + 1)
+
+
+@dataclass
+class StateGraph:
+    """Reachable states (index 0 is the opening) and their command edges."""
+
+    keys: List[int]  # state code per state
+    offsets: array  # edges of state i are offsets[i]:offsets[i + 1]
+    targets: array  # state index, WIN_EDGE or LOSS_EDGE
+    codes: array  # action index per edge
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def enumerate_states(encounter: Encounter, max_states: int = DEFAULT_MAX_STATES) -> StateGraph:
+    """Breadth-first walk over every state reachable from the opening.
+
+    States are numbered in the order they are found, so ``graph.keys`` is
+    also the queue: the loop reads it while new codes are appended.
+    """
+
+    chain = WaveChain(encounter)
+    actions = encounter.actions()
+    index: Dict[int, int] = {chain.root: 0}
+    graph = StateGraph([chain.root], array("q", [0]), array("q"), array("B"))
+    for key in graph.keys:
+        reached = set()
+        for command, action in enumerate(actions):
+            outcome = chain.step(key, action)
+            if outcome is None:
+                continue
+            if outcome >= 0:
+                target = index.get(outcome)
+                if target is None:
+                    if len(index) >= max_states:
+                        raise TablebaseTooLarge(
+                            f"{encounter.name} has more than {max_states} reachable states; "
+                            "solve a smaller encounter or raise --max-states"
+                        )
+                    target = index[outcome] = len(index)
+                    graph.keys.append(outcome)
+            else:
+                target = outcome
+            if target not in reached:
+                reached.add(target)
+                graph.targets.append(target)
+                graph.codes.append(command)
+        graph.offsets.append(len(graph.targets))
+    return graph
+
+
+def retrograde(graph: StateGraph) -> Tuple[bytearray, array, bytearray]:
+    """Label every state; returns ``(result, distance, best action)`` arrays."""
+
+    n = len(graph)
+    offsets, targets, codes = graph.offsets, graph.targets, graph.codes
+    result = bytearray(n)
+    distance = array("I", bytes(4 * n))
+    best = bytearray([NO_ACTION]) * n
+
+    # Predecessor lists in CSR form.
+    pred_offsets = array("q", bytes(8 * (n + 1)))
+    for target in targets:
+        if target >= 0:
+            pred_offsets[target + 1] += 1
+    for i in range(n):
+        pred_offsets[i + 1] += pred_offsets[i]
+    fill = array("q", pred_offsets)
+    preds = array("q", bytes(8 * pred_offsets[n]))
+    pred_codes = bytearray(pred_offsets[n])
+    for source in range(n):
+        for edge in range(offsets[source], offsets[source + 1]):
+            target = targets[edge]
+            if target >= 0:
+                preds[fill[target]] = source
+                pred_codes[fill[target]] = codes[edge]
+                fill[target] += 1
+
+    # Wins: breadth-first from states with a winning command gives the
+    # shortest forced win for every state that has one.
+    queue: deque = deque()
+    for source in range(n):
+        for edge in range(offsets[source], offsets[source + 1]):
+            if targets[edge] == WIN_EDGE:
+                result[source], distance[source], best[source] = WIN, 1, codes[edge]
+                queue.append(source)
+                break
+    while queue:
+        state = queue.popleft()
+        for p in range(pred_offsets[state], pred_offsets[state + 1]):
+            source = preds[p]
+            if result[source] == UNKNOWN:
+                result[source], distance[source], best[source] = WIN, distance[state] + 1, pred_codes[p]
+                queue.append(source)
+
+    # Losses: a state loses once all of its successors lose.  Successors
+    # resolve in order of distance, so the last one is the longest defence.
+    remaining = array("q", bytes(8 * n))
+    for source in range(n):
+        if result[source] != UNKNOWN or offsets[source] == offsets[source + 1]:
+            continue
+        for edge in range(offsets[source], offsets[source + 1]):
+            if targets[edge] >= 0:
+                remaining[source] += 1
+        if remaining[source] == 0:
+            result[source], distance[source], best[source] = LOSS, 1, codes[offsets[source]]
+            queue.append(source)
+    while queue:
+        state = queue.popleft()
+        for p in range(pred_offsets[state], pred_offsets[state + 1]):
+            source = preds[p]
+            if result[source] != UNKNOWN:
+                continue
+            remaining[source] -= 1
+            if remaining[source] == 0:
+                result[source], distance[source], best[source] = LOSS, distance[state] + 1, pred_codes[p]
+                queue.append(source)
+
+    # Everything else is a draw; prefer a command that keeps it one.
+    for source in range(n):
+        if result[source] == UNKNOWN:
+            result[source] = DRAW
+    for source in range(n):
+        if result[source] == DRAW:
+            for edge in range(offsets[source], offsets[source + 1]):
+                target = targets[edge]
+                if target >= 0 and result[target] == DRAW:
+                    best[source] = codes[edge]
+                    break
+    return result, distance, best
+
+
+def find_win(encounter: Encounter, max_states: int = DEFAULT_MAX_STATES) -> Tuple[Optional[List[Action]], int]:
+    """Depth-first search, attack first, for any line that wins the encounter.
+
+    Returns ``(commands, states searched)``; ``commands`` is ``None`` when
+    every reachable state was searched without finding a win.  Raises
+    :class:`TablebaseTooLarge` when the budget runs out first.
+    """
+
+    chain = WaveChain(encounter)
+    actions = encounter.actions()
+    seen = {chain.root}
+    stack = [(chain.root, 0)]  # state code, next command index
+    line: List[Action] = []
+    while stack:
+        key, command = stack[-1]
+        if command == len(actions):
+            stack.pop()
+            if stack:
+                line.pop()
+            continue
+        stack[-1] = (key, command + 1)
+        outcome = chain.step(key, actions[command])
+        if outcome is None or outcome == LOSS_EDGE:
+            continue
+        if outcome == WIN_EDGE:
+            return line + [actions[command]], len(seen)
+        if outcome in seen:
+            continue
+        if len(seen) >= max_states:
+            raise TablebaseTooLarge(f"no win found for {encounter.name} within {max_states} states; raise --max-states")
+        seen.add(outcome)
+        line.append(actions[command])
+        stack.append((outcome, 0))
+    return None, len(seen)
+
+
+def replay_line(encounter: Encounter, commands: List[Action]) -> str:
+    """Outcome (``"win"``, ``"loss"`` or ``"draw"``) of playing ``commands`` from the opening."""
+
+    chain = WaveChain(encounter)
+    key = chain.root
+    for action in commands:
+        outcome = chain.step(key, action)
+        if outcome == WIN_EDGE:
+            return "win"
+        if outcome == LOSS_EDGE:
+            return "loss"
+        if outcome is not None:
+            key = outcome
+    return "draw"
+
+
+def pack_value(result: int, action: int, distance: int) -> int:
+    return result | action << 2 | min(distance, MAX_DISTANCE) << 5
+
+
+def unpack_value(value: int) -> Tuple[int, int, int]:
+    return value & 3, value >> 2 & 7, value >> 5
+
+
+def place_keys(keys: List[int], capacity: int, width: int) -> Tuple[bytearray, array]:
+    """Open-addressing slots of every code as ``(slot bytes, slot per state)``."""
+
+    mask = capacity - 1
+    table = bytearray(width * capacity)
+    used = bytearray(capacity)
+    slots = array("Q")
+    for key in keys:
+        slot = code_hash(key) & mask
+        while used[slot]:
+            slot = (slot + 1) & mask
+        used[slot] = 1
+        table[slot * width:(slot + 1) * width] = (key + 1).to_bytes(width, "little")
+        slots.append(slot)
+    return table, slots
+
+
+def write_tablebase(encounter: Encounter, graph: StateGraph, solved: Tuple[bytearray, array, bytearray], path: Path) -> None:
+    result, distance, best = solved
+    capacity = 16
+    while capacity * MAX_LOAD < len(graph):
+        capacity <<= 1
+    key_width = StateCodec(encounter.wave_states()).key_width
+    keys, slots = place_keys(graph.keys, capacity, key_width)
+
+    packed = [pack_value(result[idx], best[idx], distance[idx]) for idx in range(len(graph))]
+    palette = sorted(set(packed))
+    if len(palette) <= PALETTE_LIMIT:
+        width = 1
+        codes = {value: code for code, value in enumerate(palette)}
+        values = array("B", bytes(capacity))
+        for slot, value in zip(slots, packed):
+            values[slot] = codes[value]
+    else:
+        width, palette = 2, []
+        values = array("H", bytes(2 * capacity))
+        for slot, value in zip(slots, packed):
+            values[slot] = value
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as fh:
+        fh.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                len(encounter.actions()),
+                encounter.fingerprint(),
+                width,
+                key_width,
+                len(palette),
+                capacity,
+                len(graph),
+            )
+        )
+        fh.write(array("H", palette).tobytes())
+        fh.write(keys)
+        fh.write(values.tobytes())
+    os.replace(tmp_path, path)
+
+
+def build_tablebase(
+    encounter: Encounter = DEFAULT_ENCOUNTER,
+    path: Optional[Path] = None,
+    max_states: int = DEFAULT_MAX_STATES,
+) -> Path:
+    path = encounter.default_path() if path is None else path
+    graph = enumerate_states(encounter, max_states)
+    write_tablebase(encounter, graph, retrograde(graph), path)
+    return path
+
+
+# --- Lookups --------------------------------------------------------------
+
+
+class Tablebase:
+    """Memory-mapped solved encounter with O(1) probes."""
+
+    def __init__(self, path: Path, encounter: Encounter = DEFAULT_ENCOUNTER) -> None:
+        self.encounter = encounter
+        self.actions = encounter.actions()
+        self.codec = StateCodec(encounter.wave_states())
+        with Path(path).open("rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        if len(view) < HEADER.size:
+            raise TablebaseError(f"{path} is truncated")
+        magic, version, action_count, fingerprint, width, key_width, palette_size, capacity, self.states = HEADER.unpack_from(
+            view, 0
+        )
+        if magic != MAGIC or version != VERSION:
+            raise TablebaseError(f"{path} is not a version {VERSION} tablebase")
+        if action_count != len(self.actions) or fingerprint != encounter.fingerprint() or key_width != self.codec.key_width:
+            raise TablebaseError(f"{path} was solved for different rules or parties than {encounter.name}")
+        if width not in (1, 2) or len(view) != HEADER.size + 2 * palette_size + (key_width + width) * capacity:
+            raise TablebaseError(f"{path} size does not match its header")
+        self._mask = capacity - 1
+        self._key_width = key_width
+        self._empty = bytes(key_width)
+        self.size = len(view)
+        keys_start = HEADER.size + 2 * palette_size
+        values_start = keys_start + key_width * capacity
+        self._palette = view[HEADER.size:keys_start].cast("H")
+        self._keys = view[keys_start:values_start]
+        self._values = view[values_start:].cast("B" if width == 1 else "H")
+
+    def probe_code(self, code: int) -> Optional[int]:
+        """Packed value stored for the state ``code``, or ``None`` if it is not in the table."""
+
+        width = self._key_width
+        key = (code + 1).to_bytes(width, "little")
+        keys = self._keys
+        slot = code_hash(code) & self._mask
+        while True:
+            stored = keys[slot * width:(slot + 1) * width]
+            if stored == key:
+                value = self._values[slot]
+                return self._palette[value] if self._palette else value
+            if stored == self._empty:
+                return None
+            slot = (slot + 1) & self._mask
+
+    def entry(self, code: int) -> Optional[TablebaseEntry]:
+        """Stored entry for the state ``code``."""
+
+        value = self.probe_code(code)
+        if value is None:
+            return None
+        result, action, distance = unpack_value(value)
+        return TablebaseEntry(RESULT_NAMES[result], distance, None if action == NO_ACTION else self.actions[action])
+
+    def probe(self, state: BattleState, wave: int = 0) -> Optional[TablebaseEntry]:
+        """Stored entry for ``state``; stage tablebases also need the wave index."""
+
+        if not self.codec.fits(state, wave):
+            return None
+        return self.entry(self.codec.encode(state, wave))
+
+    def best_action(self, state: BattleState, wave: int = 0) -> Optional[Action]:
+        entry = self.probe(state, wave)
+        return entry.action if entry is not None else None
+
+    def policy(self, fallback: Action = ATTACK) -> PlayerPolicy:
+        """Player policy for :mod:`simulation` that plays the stored best command.
+
+        It probes first-wave keys, so it plays single encounters.
+        """
+
+        def tablebase_policy(state: BattleState, rng: object) -> Action:
+            return self.best_action(state) or fallback
+
+        return tablebase_policy
+
+    def close(self) -> None:
+        self._palette.release()
+        self._keys.release()
+        self._values.release()
+        self._map.close()
+
+    def __enter__(self) -> "Tablebase":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def open_tablebase(
+    encounter: Encounter = DEFAULT_ENCOUNTER,
+    path: Optional[Path] = None,
+    max_states: int = DEFAULT_MAX_STATES,
+) -> Tablebase:
+    """Map the encounter's tablebase, solving it first if missing or stale."""
+
+    path = encounter.default_path() if path is None else path
+    if path.exists():
+        try:
+            return Tablebase(path, encounter)
+        except TablebaseError:
+            pass
+    build_tablebase(encounter, path, max_states)
+    return Tablebase(path, encounter)
+
+
+def play_out(table: Tablebase, limit: int = 10_000) -> Tuple[str, int]:
+    """Follow the stored best commands from the opening; returns (outcome, commands)."""
+
+    chain = WaveChain(table.encounter)
+    key = chain.root
+    for commands in range(1, limit + 1):
+        entry = table.entry(key)
+        if entry is None or entry.action is None:
+            return "draw", commands - 1
+        outcome = chain.step(key, entry.action)
+        if outcome == WIN_EDGE:
+            return "win", commands
+        if outcome == LOSS_EDGE:
+            return "loss", commands
+        if outcome is not None:
+            key = outcome
+    return "draw", limit
+
+
+# --- CLI ------------------------------------------------------------------
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Solve a fixed encounter into a memory-mapped tablebase.")
+    parser.add_argument("--player", type=parse_members, default=DEFAULT_ENCOUNTER.player_members, help="player members, e.g. 012 or 2")
+    parser.add_argument("--enemy", type=parse_members, default=DEFAULT_ENCOUNTER.enemy_members, help="enemy members, e.g. 012")
+    parser.add_argument("--stage", default=None, help="solve the waves of this stages.yaml stage instead (ignores --enemy)")
+    parser.add_argument("--max-states", type=int, default=DEFAULT_MAX_STATES, help="give up beyond this many states")
+    parser.add_argument("--output", type=Path, default=None, help="tablebase path (default .cache/tablebase_<name>.bin)")
+    parser.add_argument("--rebuild", action="store_true", help="solve even if an up-to-date tablebase exists")
+    parser.add_argument("--verify", action="store_true", help="play the best line and check it against the stored value")
+    return parser.parse_args(argv)
+
+
+def check_winnable(encounter: Encounter, max_states: int) -> None:
+    """Print whether ``encounter`` can be won, verifying the line that was found."""
+
+    started = time.perf_counter()
+    try:
+        commands, searched = find_win(encounter, max_states)
+    except TablebaseTooLarge as exc:
+        raise SystemExit(f"{encounter.name}: undecided, {exc}")
+    elapsed = time.perf_counter() - started
+    if commands is None:
+        print(f"{encounter.name}: not winnable ({searched} states searched, {elapsed:.2f}s)")
+        return
+    outcome = replay_line(encounter, commands)
+    print(f"{encounter.name}: winnable, found a {len(commands)}-command win ({searched} states searched, {elapsed:.2f}s)")
+    if outcome != "win":
+        print(f"replaying the line ended in a {outcome} (MISMATCH)")
+        raise SystemExit(1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.stage is not None:
+        encounter: Encounter = StageEncounter(args.player, stage_id=args.stage)
+        try:
+            get_stage(args.stage)
+        except StageError as exc:
+            raise SystemExit(str(exc))
+        # Answer the designer's question first; the full solve may not fit.
+        check_winnable(encounter, args.max_states)
+    else:
+        encounter = Encounter(args.player, args.enemy)
+    path = encounter.default_path() if args.output is None else args.output
+    started = time.perf_counter()
+    try:
+        if args.rebuild:
+            build_tablebase(encounter, path, args.max_states)
+        table = open_tablebase(encounter, path, args.max_states)
+    except TablebaseTooLarge as exc:
+        print(f"no tablebase: {exc}")
+        if args.stage is None:
+            # Too big to solve exactly; still answer whether it can be won.
+            check_winnable(encounter, args.max_states)
+        return
+    elapsed = time.perf_counter() - started
+
+    with table:
+        entry = table.probe(encounter.new_state())
+        assert entry is not None
+        print(f"{encounter.name}: {table.states} states, {table.size} bytes ({elapsed:.2f}s) -> {path}")
+        print(f"opening: player {entry.result} in {entry.distance} commands, best command {entry.action}")
+        if args.verify:
+            outcome, commands = play_out(table)
+            ok = outcome == entry.result and (outcome == "draw" or commands == entry.distance)
+            print(f"best line: {outcome} after {commands} commands ({'ok' if ok else 'MISMATCH'})")
+            if not ok:
+                raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Buffered, diff-based terminal output for the CLI.
+
+:class:`Terminal` collects everything a screen writes and sends it to the
+stream in a single ``write`` + ``flush`` when the game waits for input
+(prompt included), instead of one unbuffered ``print`` per line.  Over SSH
+or a serial console that turns dozens of small writes per turn into one.
+
+Status blocks such as the battle screen go through :meth:`Terminal.frame`.
+In ``diff`` mode the terminal remembers each frame's last lines and only
+queues the heading plus the lines that changed since then; a frame whose
+shape changed (or the first one after :meth:`Terminal.reset`) is shown in
+full.  In ``full`` mode every frame is shown and the output matches plain
+``print`` byte for byte.
+"""
+from __future__ import annotations
+
+import sys
+from typing import Dict, List, Optional, TextIO
+
+
+RENDER_MODES = ("full", "diff")
+
+
+class Terminal:
+    def __init__(self, stream: Optional[TextIO] = None, diff: bool = False) -> None:
+        self.stream = sys.stdout if stream is None else stream
+        self.diff = diff
+        self.pending: List[str] = []
+        self.frames: Dict[str, List[str]] = {}
+        self.writes = 0
+        self.lines_skipped = 0
+
+    def write(self, text: str) -> None:
+        """Queue one line (``print`` semantics: a newline is added on flush)."""
+
+        self.pending.append(text)
+
+    def frame(self, name: str, lines: List[str], keep: int = 1) -> None:
+        """Queue a status frame; the first ``keep`` lines are always shown."""
+
+        previous = self.frames.get(name)
+        self.frames[name] = lines
+        if not self.diff or previous is None or len(previous) != len(lines):
+            self.pending.extend(lines)
+            return
+        self.pending.extend(lines[:keep])
+        for old, line in zip(previous[keep:], lines[keep:]):
+            if line != old:
+                self.pending.append(line)
+            else:
+                self.lines_skipped += 1
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Forget the last frame (all frames if ``name`` is ``None``) so the next is shown in full."""
+
+        if name is None:
+            self.frames.clear()
+        else:
+            self.frames.pop(name, None)
+
+    def flush(self, prompt: str = "") -> None:
+        """Write everything queued, followed by ``prompt``, in one call."""
+
+        text = "\n".join(self.pending) + "\n" if self.pending else ""
+        self.pending.clear()
+        text += prompt
+        if text:
+            self.stream.write(text)
+            self.stream.flush()
+            self.writes += 1
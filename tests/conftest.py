@@ -0,0 +1,62 @@
+"""Shared helpers; the modules under test live at the repository root and in tools/."""
+from __future__ import annotations
+
+from pathlib import Path
+import random
+import sys
+from typing import List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+
+from battle_log import NullSink  # noqa: E402
+from game import BattleState, Game, default_enemy_party, default_inventory, default_player_party  # noqa: E402
+from replay import discard  # noqa: E402
+from seeds import SeedStream  # noqa: E402
+from simulation import fallback_turn, perform_action  # noqa: E402
+
+# Prompt answers for scripted sessions: mostly attacks, some guarding,
+# potions and swaps, an occasional invalid entry, and title/result choices.
+SESSION_INPUTS = "1111223445x"
+
+
+def new_battle(seed: int = 0) -> BattleState:
+    """A default battle with its own seeded random stream and no output."""
+
+    return BattleState(
+        default_player_party(),
+        default_enemy_party(),
+        default_inventory(),
+        sink=NullSink(),
+        rng=SeedStream(seed),
+    )
+
+
+def session_inputs(seed: int, count: int = 80) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(SESSION_INPUTS) for _ in range(count)]
+
+
+def play_turn(state: BattleState, action) -> None:
+    """Play ``action`` (or the usual fallback) and the enemy's reply."""
+
+    if perform_action(state, action) or fallback_turn(state, action):
+        state.end_player_turn()
+        if not state.is_battle_over():
+            state.enemy_take_turn()
+            state.end_enemy_turn()
+
+
+def playing_game(seed: int, steps: int, **kwargs) -> Game:
+    """A session that started a battle and is ``steps`` scripted inputs further (fewer if it ended)."""
+
+    game = Game(seed=seed, write=discard, **kwargs)
+    session = game.session()
+    next(session)
+    try:
+        for line in ["1", *session_inputs(seed, steps)]:
+            session.send(line)
+    except StopIteration:
+        pass
+    return game
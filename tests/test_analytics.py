@@ -0,0 +1,79 @@
+"""The analytics emitter never blocks, drops what does not fit and writes everything else."""
+from __future__ import annotations
+
+import pytest
+
+from analytics import AnalyticsConfig, AnalyticsEmitter, RotatingGzipSink, open_emitter, read_events
+
+EVENTS = frozenset({"start_game", "button_click"})
+
+
+def test_queued_events_are_written_in_order(tmp_path):
+    emitter = AnalyticsEmitter(RotatingGzipSink(tmp_path), EVENTS, batch_size=7, flush_interval=60.0)
+    for index in range(20):
+        emitter.emit("button_click", "s1", {"input": str(index)})
+    emitter.close()
+    records = read_events(tmp_path)
+    assert [record["data"]["input"] for record in records] == [str(index) for index in range(20)]
+    assert all(record["event"] == "button_click" and record["session"] == "s1" for record in records)
+    assert emitter.stats.written == 20 and emitter.stats.batches >= 3
+
+
+def test_payload_cannot_overwrite_the_envelope(tmp_path):
+    emitter = AnalyticsEmitter(RotatingGzipSink(tmp_path), EVENTS)
+    emitter.emit("start_game", "s1", {"ts": 0, "event": "forged", "session": "s2"})
+    emitter.close()
+    (record,) = read_events(tmp_path)
+    assert (record["event"], record["session"]) == ("start_game", "s1")
+    assert record["data"] == {"ts": 0, "event": "forged", "session": "s2"}
+
+
+def test_unserializable_events_are_dropped_without_stopping_the_worker(tmp_path):
+    emitter = AnalyticsEmitter(RotatingGzipSink(tmp_path), EVENTS, batch_size=2, flush_interval=60.0)
+    emitter.emit("button_click", "s1", {"input": object()})
+    emitter.emit("button_click", "s1", {"input": {1.5, 2.5}})
+    emitter.emit("button_click", "s1", {"input": "3"})
+    emitter.close()
+    assert [record["data"]["input"] for record in read_events(tmp_path)] == ["3"]
+    assert emitter.stats.dropped["unserializable"] == 2
+    assert emitter.stats.written == 1
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    emitter = AnalyticsEmitter(RotatingGzipSink(tmp_path), EVENTS, capacity=5, flush_interval=60.0)
+    for _ in range(8):
+        emitter.emit("button_click", "s1")
+    emitter.close()
+    assert emitter.stats.emitted + emitter.stats.dropped["button_click"] == 8
+    assert len(read_events(tmp_path)) == emitter.stats.written == emitter.stats.emitted
+
+
+def test_events_after_close_are_dropped(tmp_path):
+    emitter = AnalyticsEmitter(RotatingGzipSink(tmp_path), EVENTS)
+    emitter.close()
+    emitter.emit("start_game", "s1")
+    assert emitter.stats.dropped["start_game"] == 1
+
+
+def test_unknown_events_are_rejected(tmp_path):
+    emitter = AnalyticsEmitter(RotatingGzipSink(tmp_path), EVENTS)
+    try:
+        with pytest.raises(ValueError):
+            emitter.emit("nope", "s1")
+    finally:
+        emitter.close()
+
+
+def test_rotation_keeps_every_event_readable(tmp_path):
+    sink = RotatingGzipSink(tmp_path, max_bytes=200, backups=50)
+    emitter = AnalyticsEmitter(sink, EVENTS, batch_size=4, flush_interval=60.0)
+    for index in range(40):
+        emitter.emit("start_game", f"s{index}")
+    emitter.close()
+    assert sink.rotations > 0
+    assert [record["session"] for record in read_events(tmp_path)] == [f"s{index}" for index in range(40)]
+
+
+def test_disabled_or_consent_gated_config_gives_no_emitter(tmp_path):
+    assert open_emitter(tmp_path, AnalyticsConfig(enabled=False, events=EVENTS)) is None
+    assert open_emitter(tmp_path, AnalyticsConfig(enabled=True, events=EVENTS, consent_required=True)) is None
@@ -0,0 +1,20 @@
+"""The NumPy kernel must play every battle exactly like BattleState."""
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch_engine import default_parties, simulate_batch, typed_parties, verify_against_scalar  # noqa: E402
+
+
+@pytest.mark.parametrize("parties", [default_parties, typed_parties], ids=["default", "typed"])
+@pytest.mark.parametrize("policy", ["attack", "random"])
+def test_batch_matches_scalar(parties, policy):
+    assert verify_against_scalar(300, policy, seed=7, parties=parties) == []
+
+
+def test_batch_summary_counts_every_battle():
+    summary = simulate_batch(500, "random", seed=3).summary()
+    assert summary.battles == 500
+    assert summary.player_wins + summary.enemy_wins + summary.draws == 500
@@ -0,0 +1,60 @@
+"""BattleState.snapshot/restore and the incremental Zobrist hash."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from conftest import new_battle, play_turn
+from preview import candidate_actions
+from search_ai import clone_state
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_hash_matches_recomputed(seed):
+    rng = random.Random(seed)
+    state = new_battle(seed)
+    state.enable_hashing()
+    for _ in range(200):
+        if state.is_battle_over():
+            break
+        play_turn(state, rng.choice(candidate_actions(state)))
+        assert state.zobrist == state.compute_hash()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_restore_returns_to_snapshot(seed):
+    rng = random.Random(seed)
+    state = new_battle(seed)
+    state.enable_hashing()
+    while not state.is_battle_over():
+        before = state.snapshot()
+        zobrist = state.zobrist
+        inventory = dict(state.player_inventory)
+        for action in candidate_actions(state):
+            play_turn(state, action)
+            state.restore(before)
+            assert state.snapshot() == before
+            assert state.zobrist == zobrist == state.compute_hash()
+            assert state.player_inventory == inventory
+        play_turn(state, rng.choice(candidate_actions(state)))
+
+
+def test_restore_without_stored_hash_recomputes_it():
+    state = new_battle()
+    unhashed = state.snapshot()
+    assert unhashed[-1] is None
+    play_turn(state, ("attack",))
+    state.enable_hashing()
+    state.restore(unhashed)
+    assert state.zobrist == state.compute_hash() == new_battle().zobrist
+
+
+def test_equal_states_hash_equal_whatever_the_path():
+    state = new_battle()
+    clone = clone_state(state)
+    assert clone.zobrist == state.zobrist
+    play_turn(state, ("attack",))
+    clone.restore(state.snapshot())
+    assert clone.snapshot()[:-1] == state.snapshot()[:-1]
+    assert clone.zobrist == state.zobrist
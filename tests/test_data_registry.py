@@ -0,0 +1,73 @@
+"""Reloads swap in whole validated snapshots and leave the old one untouched."""
+from __future__ import annotations
+
+import os
+import shutil
+
+import pytest
+
+from data_registry import DataRegistry, DataValidationError
+from game_data import DATA_DIR, SOURCES
+
+
+@pytest.fixture
+def registry(tmp_path):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    for name in SOURCES:
+        shutil.copyfile(DATA_DIR / name, data_dir / name)
+    return DataRegistry(data_dir, tmp_path / "bundle.bin")
+
+
+def edit(registry: DataRegistry, name: str, old: str, new: str) -> None:
+    path = registry.data_dir / name
+    text = path.read_text(encoding="utf-8")
+    assert old in text
+    path.write_text(text.replace(old, new, 1), encoding="utf-8")
+    # Make sure the poller sees a new mtime even on coarse filesystems.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_valid_edit_swaps_in_a_new_snapshot(registry):
+    before = registry.current
+    assert not registry.reload()
+    edit(registry, "items.yaml", "healAmount: 20", "healAmount: 25")
+    assert registry.reload()
+    after = registry.current
+    assert after is not before and after.version == before.version + 1
+    assert after.items["potion_small"].heal_amount == 25
+    assert before.items["potion_small"].heal_amount == 20
+    assert registry.stats.reloads == 1
+
+
+def test_invalid_edit_keeps_the_running_snapshot(registry):
+    before = registry.current
+    edit(registry, "enemies.yaml", "hp: 50", "hp: -50")
+    with pytest.raises(DataValidationError) as excinfo:
+        registry.reload()
+    assert excinfo.value.errors == registry.stats.last_errors
+    assert registry.current is before
+    assert registry.stats.rejected == 1
+
+
+def test_unparsable_edit_is_rejected(registry):
+    before = registry.current
+    edit(registry, "stages.yaml", "stages:", "stages: [")
+    with pytest.raises(DataValidationError):
+        registry.reload()
+    assert registry.current is before
+
+
+def test_poll_only_reloads_changed_files(registry):
+    registry.current
+    registry._signature = registry.signature()
+    assert not registry.poll()
+    edit(registry, "enemies.yaml", "hp: 50", "hp: 55")
+    assert registry.poll()
+    assert registry.current.enemies["slime"][1] == 55
+    assert not registry.poll()
+    edit(registry, "enemies.yaml", "hp: 55", "hp: 0")
+    assert not registry.poll()
+    assert registry.current.enemies["slime"][1] == 55
+    assert registry.stats.checks == 4
@@ -0,0 +1,105 @@
+"""The compiled ai.yaml table decides exactly like walking the state machine."""
+from __future__ import annotations
+
+import pickle
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from enemy_ai import (
+    AI_PATH,
+    ATTACK,
+    ATTACK_CODE,
+    DEFEND_CODE,
+    RULE,
+    SWAP_CODE,
+    AIError,
+    compile_ai,
+    enemy_policy,
+    load_ai,
+)
+from game_data import parse_source
+
+ACTIONS = {"Attack": ATTACK_CODE, "HeavySkill": ATTACK_CODE, "Defend": DEFEND_CODE, "VoluntarySwap": SWAP_CODE, "ForcedSwap": RULE}
+
+
+def walk(document: dict, obs) -> int:
+    """Reference decision: evaluate the condition strings directly."""
+
+    hp, st, player_hp, backline, _, best_hp, best_st = obs
+    names = {
+        "hp": hp,
+        "st": st,
+        "player_front_hp": player_hp,
+        "backline_available": backline,
+        "current": SimpleNamespace(hp=hp, st=st),
+        "backline_best": SimpleNamespace(hp=best_hp, st=best_st),
+    }
+    states = {entry["name"]: entry.get("transitions") or [] for entry in document["ai"]["states"]}
+    state = "EvaluateFrontline"
+    while state not in ACTIONS:
+        for transition in states[state]:
+            condition = transition["condition"]
+            try:
+                taken = condition in ("otherwise", "else") or eval(condition, {}, names)
+            except TypeError:  # a missing backliner compares false
+                taken = False
+            if taken:
+                state = transition["to"]
+                break
+        else:
+            return RULE
+    return ACTIONS[state]
+
+
+def random_observation(rng: random.Random):
+    best = rng.random() < 0.6
+    return (
+        rng.randint(0, 80),
+        rng.randint(0, 60),
+        rng.randint(0, 120),
+        int(best or rng.random() < 0.5),
+        1 if best else None,
+        rng.randint(1, 80) if best else None,
+        rng.randint(20, 60) if best else None,
+    )
+
+
+def test_table_matches_the_state_machine():
+    document = parse_source(AI_PATH)
+    table = compile_ai(document)
+    rng = random.Random(0)
+    for _ in range(5_000):
+        obs = random_observation(rng)
+        assert table.lookup(obs) == walk(document, obs), obs
+
+
+def test_loaded_tables_pickle_as_their_source():
+    table = load_ai()
+    clone = pickle.loads(pickle.dumps(table))
+    assert clone.cells == table.cells and clone.version == table.version
+    with pytest.raises(TypeError):
+        pickle.dumps(compile_ai(parse_source(AI_PATH)))
+
+
+def test_policy_names():
+    assert enemy_policy("rule") is None
+    assert enemy_policy("yaml") is enemy_policy("yaml")
+    with pytest.raises(AIError):
+        enemy_policy("chess")
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        {},
+        {"ai": {"states": [{"name": "Other", "transitions": []}]}},
+        {"ai": {"states": [{"name": "EvaluateFrontline", "transitions": [{"to": "Nowhere", "condition": "else"}]}]}},
+        {"ai": {"states": [{"name": "EvaluateFrontline", "transitions": [{"to": "Attack", "condition": "turn_end"}]}, {"name": "Attack"}]}},
+        {"ai": {"states": [{"name": "EvaluateFrontline", "transitions": [{"to": "Attack", "condition": "mood > 3"}]}, {"name": "Attack"}]}},
+    ],
+)
+def test_bad_documents_are_rejected(document):
+    with pytest.raises(AIError):
+        compile_ai(document)
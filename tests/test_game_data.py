@@ -0,0 +1,45 @@
+"""The compiled bundle reads back the sources and rejects records it cannot store."""
+from __future__ import annotations
+
+import copy
+
+import pytest
+
+from game_data import DATA_DIR, SOURCES, DataRecordError, GameData, build_tables, compile_bundle, parse_source
+
+
+@pytest.fixture(scope="module")
+def documents():
+    return {name: parse_source(DATA_DIR / name) for name in SOURCES}
+
+
+def test_bundle_reads_back_every_source(tmp_path, documents):
+    path = tmp_path / "bundle.bin"
+    compile_bundle(DATA_DIR, path)
+    data = GameData(path)
+    try:
+        for name in ("moves.json", "monsters.json", "enemies.yaml", "items.yaml"):
+            assert data.document(name) == documents[name]
+        assert data.document("types.json")["effectiveness"] == documents["types.json"]["effectiveness"]
+    finally:
+        data.close()
+
+
+@pytest.mark.parametrize(
+    "source, edit, message",
+    [
+        ("monsters.json", lambda doc: doc["monsters"][1].pop("hp"), r"monsters\.json: monsters\[1\] \('\w+'\) has no 'hp'"),
+        ("moves.json", lambda doc: doc["moves"][0].update(power="strong"), r"moves\.json: moves\[0\].*'power'"),
+        ("items.yaml", lambda doc: doc["items"][0].update(healAmount=1 << 40), r"items\.yaml: items\[0\].*'healAmount'"),
+        ("types.json", lambda doc: doc["effectiveness"][2].update(multiplier=3.0), r"types\.json: effectiveness\[2\].*'multiplier'"),
+        ("types.json", lambda doc: doc["elements"][0].pop("icon"), r"types\.json: elements\[0\].*'icon'"),
+        ("stages.yaml", lambda doc: doc["stages"][0]["waves"][0].pop("count"), r"stages\.yaml: stages\[0\].*waves\[0\] has no 'count'"),
+        ("enemies.yaml", lambda doc: doc.update(enemies={"slime": {}}), r"enemies\.yaml: 'enemies' must be a list"),
+    ],
+)
+def test_bad_records_name_their_file_and_record(documents, source, edit, message):
+    broken = copy.deepcopy(documents)
+    edit(broken[source])
+    with pytest.raises(ValueError, match=message) as excinfo:
+        build_tables(broken)
+    assert isinstance(excinfo.value, DataRecordError)
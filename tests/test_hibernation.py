@@ -0,0 +1,55 @@
+"""Hibernated sessions wake up and carry on exactly like sessions that never slept."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import playing_game, session_inputs
+from game import Game, GameState
+from hibernation import HibernateError, SessionImage, rehydrate
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_hibernated_session_continues_identically(seed):
+    """Hibernate at every prompt and compare with a session that never slept."""
+
+    stage = "stage1" if seed % 3 == 0 else None
+    live_out: list = []
+    live = Game(seed=seed, write=live_out.append, stage=stage)
+    live_session = live.session()
+    next(live_session)
+    slept_out: list = []
+    slept = Game(seed=seed, write=slept_out.append, stage=stage)
+    slept_session = slept.session()
+    next(slept_session)
+    for line in session_inputs(seed):
+        data = SessionImage.capture(slept).to_bytes()
+        image = SessionImage.from_bytes(data)
+        assert image.to_bytes() == data
+        slept_session.close()
+        slept.release_parties()
+        slept, slept_session = rehydrate(image, slept_out.append)
+        live_out.clear()
+        slept_out.clear()
+        ended = False
+        try:
+            live_session.send(line)
+        except StopIteration:
+            ended = True
+        try:
+            slept_session.send(line)
+        except StopIteration:
+            assert ended
+        assert slept_out == live_out
+        if ended:
+            break
+        assert slept.state == live.state
+        if live.state == GameState.BATTLE:
+            assert slept.battle_state.snapshot() == live.battle_state.snapshot()
+
+
+def test_corrupt_image_is_rejected():
+    data = SessionImage.capture(playing_game(4, 6)).to_bytes()
+    with pytest.raises(HibernateError):
+        SessionImage.from_bytes(data[:-1])
+    with pytest.raises(HibernateError):
+        SessionImage.from_bytes(b"XXXX" + data[4:])
@@ -0,0 +1,51 @@
+"""Catalog templates compile to positional formatters with a Japanese fallback."""
+from __future__ import annotations
+
+import pytest
+
+from messages import MESSAGE_KEYS, Catalog, CatalogError, Msg, compile_template, load_catalog, read_table
+
+
+def test_named_fields_become_positions():
+    render = compile_template("{b}:{a!r}:{b:>4}{{x}}", ("a", "b"))
+    assert render("x", 7) == "7:'x':   7{x}"
+
+
+def test_every_message_formats_with_its_fields():
+    catalog = load_catalog()
+    assert catalog.format(Msg.MENU_OPTION, 1, "go") == "1) go"
+    assert catalog.format(Msg.LOG_ATTACK, "player", "A", "B", 5) == "Aのこうげき！ Bに5のダメージ！"
+    for message in MESSAGE_KEYS:
+        assert isinstance(catalog.format(message, *range(6)), str)
+
+
+@pytest.mark.parametrize("template", ["{nope}", "{index", "}{"])
+def test_bad_templates_are_rejected(template):
+    with pytest.raises(CatalogError):
+        compile_template(template, ("index",), "KEY")
+
+
+def test_missing_keys_fall_back_to_japanese():
+    japanese = load_catalog()
+    english = Catalog("en", {"TITLE_START": "Start", "MENU_OPTION": "[{index}] {label}"}, japanese)
+    assert english.text(Msg.TITLE_START) == "Start"
+    assert english.format(Msg.MENU_OPTION, 2, "x") == "[2] x"
+    assert english.text(Msg.TITLE_EXIT) == japanese.text(Msg.TITLE_EXIT)
+
+
+def test_missing_keys_without_fallback_are_reported():
+    with pytest.raises(CatalogError, match="TITLE_EXIT"):
+        Catalog("xx", {"TITLE_START": "Start"})
+
+
+def test_tables_need_key_and_text_columns(tmp_path):
+    path = tmp_path / "loc_xx.csv"
+    path.write_text("name,value\nA,b\n", encoding="utf-8")
+    with pytest.raises(CatalogError):
+        read_table(path)
+
+
+def test_unknown_language_is_rejected():
+    with pytest.raises(CatalogError):
+        load_catalog("zz")
+    assert load_catalog("ja") is load_catalog("ja")
@@ -0,0 +1,123 @@
+"""Every preview matches the same command played for real on a copy of the battle."""
+from __future__ import annotations
+
+import random
+import time
+
+import pytest
+
+from battle_log import ConsoleSink, NullSink
+from enemy_ai import enemy_policy
+from game import BattleState, default_enemy_party, default_inventory, default_player_party
+from preview import candidate_actions, detached_copy, preview_actions
+from search_ai import SearchPolicy
+from seeds import SeedStream
+from simulation import perform_action
+
+
+class BattleRngPolicy:
+    """Enemy policy that draws from the battle's random stream."""
+
+    def __call__(self, state: BattleState):
+        return ("attack",) if state.rng.random() < 0.7 else ("defend",)
+
+
+ENEMY_POLICIES = [lambda: None, lambda: enemy_policy("yaml"), BattleRngPolicy]
+
+
+def real_turn(state: BattleState, action):
+    """Snapshot after playing ``action`` and the enemy's reply on a copy, or None if refused."""
+
+    sim = detached_copy(state, NullSink())
+    if not perform_action(sim, action):
+        return None
+    sim.end_player_turn()
+    if not sim.is_battle_over():
+        sim.enemy_take_turn()
+        sim.end_enemy_turn()
+    return sim.snapshot(), sim.is_battle_over()
+
+
+@pytest.mark.parametrize("seed", range(24))
+def test_previews_match_real_turns(seed):
+    rng = random.Random(seed)
+    output: list = []
+    state = BattleState(
+        default_player_party(),
+        default_enemy_party(),
+        default_inventory(),
+        sink=ConsoleSink(output.append),
+        enemy_policy=ENEMY_POLICIES[seed % len(ENEMY_POLICIES)](),
+        rng=SeedStream(seed),
+    )
+    if seed % 2:
+        state.enable_hashing()
+    player_size = len(state.player_party.members)
+    while not state.is_battle_over():
+        before = state.snapshot()
+        logged = len(output)
+        rng_state = state.rng.getstate() if state.rng_started else None
+        previews = preview_actions(state)
+
+        # The live battle is untouched: state, log and random stream.
+        assert state.snapshot() == before
+        assert len(output) == logged
+        if rng_state is not None:
+            assert state.rng.getstate() == rng_state
+        if state.hasher is not None:
+            assert state.zobrist == state.compute_hash()
+
+        outcomes = {action: real_turn(state, action) for action in candidate_actions(state)}
+        assert [preview.action for preview in previews] == [a for a, outcome in outcomes.items() if outcome]
+        for preview in previews:
+            after, over = outcomes[preview.action]
+            assert (preview.player_front, preview.enemy_front) == (after[0], after[1])
+            assert preview.battle_over == over
+            deltas = preview.player_delta + preview.enemy_delta
+            for index, (hp, st) in enumerate(deltas):
+                pos = 4 + 2 * index
+                assert before[pos] + hp == after[pos]
+                assert before[pos + 1] + st == after[pos + 1]
+            assert len(preview.player_delta) == player_size
+
+        if not previews:
+            break
+        action = rng.choice(previews).action
+        expected = outcomes[action]
+        assert perform_action(state, action)
+        state.end_player_turn()
+        if not state.is_battle_over():
+            state.enemy_take_turn()
+            state.end_enemy_turn()
+        assert (state.snapshot()[:-1], state.is_battle_over()) == (expected[0][:-1], expected[1])
+
+
+def test_no_previews_once_the_battle_is_over():
+    state = BattleState(default_player_party(), default_enemy_party(), default_inventory(), sink=NullSink())
+    for member in state.enemy_party.members:
+        member.current_hp = 0
+    assert state.is_battle_over()
+    assert preview_actions(state) == []
+
+
+def test_search_enemy_replies_share_one_budget():
+    policy = SearchPolicy(budget_ms=50.0)
+    state = BattleState(
+        default_player_party(),
+        default_enemy_party(),
+        default_inventory(),
+        sink=NullSink(),
+        enemy_policy=policy,
+        rng=SeedStream(3),
+    )
+    before = state.snapshot()
+    started = time.perf_counter()
+    previews = preview_actions(state, budget_ms=10.0)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    # Several replies were searched, yet all of them together kept to about
+    # one budget rather than one per-move budget each (5 x 50 ms).
+    assert len(previews) > 1
+    assert policy.stats.decisions == len(previews)
+    assert elapsed_ms < 10.0 + 15.0
+    assert state.snapshot() == before
+    assert state.enemy_policy is policy
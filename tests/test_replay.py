@@ -0,0 +1,75 @@
+"""Recorded sessions replay to the same battle hashes."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import session_inputs
+from game import Game
+from replay import Replay, ReplayError, ReplayRecorder, discard, run_replay, verify_paths
+
+
+def record_session(seed: int) -> Replay:
+    """Play scripted inputs through a live session, as ``GAME_REPLAY`` would record it."""
+
+    recorder = ReplayRecorder(seed)
+    game = Game(seed=seed, recorder=recorder, write=discard)
+    session = game.session()
+    next(session)
+    try:
+        for line in session_inputs(seed):
+            session.send(line)
+    except StopIteration:
+        pass
+    session.close()
+    final_hash = game.battle_state.zobrist if game.battle_state is not None else 0
+    game.release_parties()
+    return recorder.replay(final_hash)
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_recorded_session_replays(seed):
+    replay = record_session(seed)
+    assert replay.choices
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert loaded == replay
+    assert run_replay(loaded).matches(replay)
+
+
+def test_altered_replays_do_not_match():
+    replay = next(r for r in map(record_session, range(50)) if r.battle_hashes and len(r.choices) > 10)
+    wrong_hash = Replay(replay.seed, replay.choices, replay.battle_hashes, replay.final_hash ^ 1)
+    truncated = Replay(replay.seed, replay.choices[:-2], replay.battle_hashes, replay.final_hash)
+    out_of_range = Replay(replay.seed, replay.choices[:1] + bytes([9]) + replay.choices[2:], replay.battle_hashes, replay.final_hash)
+    for altered in (wrong_hash, truncated, out_of_range):
+        assert not run_replay(altered).matches(altered)
+
+
+def test_verify_paths_reports_mismatches(tmp_path):
+    good = record_session(1)
+    bad = Replay(good.seed, good.choices, good.battle_hashes, good.final_hash ^ 1)
+    (tmp_path / "good.rpl").write_bytes(good.to_bytes())
+    (tmp_path / "bad.rpl").write_bytes(bad.to_bytes())
+    assert verify_paths(sorted(tmp_path.glob("*.rpl"))) == [tmp_path / "bad.rpl"]
+
+
+def test_corrupt_replay_is_rejected():
+    data = record_session(2).to_bytes()
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(data[:-1])
+    with pytest.raises(ReplayError):
+        Replay.from_bytes(b"XXXX" + data[4:])
+
+
+def test_headless_replays_format_no_text(monkeypatch):
+    import battle_log
+    import messages
+
+    replay = record_session(5)
+
+    def refuse(*args):
+        raise AssertionError("text was formatted during a headless replay")
+
+    monkeypatch.setattr(messages.Catalog, "format", refuse)
+    monkeypatch.setattr(messages.Catalog, "text", refuse)
+    monkeypatch.setattr(battle_log, "format_event", refuse)
+    assert run_replay(replay).matches(replay)
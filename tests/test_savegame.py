@@ -0,0 +1,67 @@
+"""Save files survive a trip through bytes, and autosave keeps the latest turn."""
+from __future__ import annotations
+
+import pytest
+
+from conftest import playing_game
+from savegame import AutosaveWriter, SaveData, SaveError, load_save, write_save
+
+
+def sample_save(seed: int = 3) -> SaveData:
+    game = playing_game(seed, 12)
+    assert game.player_party is not None
+    return SaveData.capture(game.player_party, game.inventory, game.wins, game.losses, "en", 0.5)
+
+
+def test_save_bytes_round_trip():
+    data = sample_save()
+    encoded = data.to_bytes()
+    assert SaveData.from_bytes(encoded) == data
+    assert SaveData.from_bytes(encoded).to_bytes() == encoded
+
+
+@pytest.mark.parametrize("name", ["save.bin", "save.json"])
+def test_save_file_round_trip(tmp_path, name):
+    data = sample_save()
+    path = tmp_path / name
+    write_save(path, data, fsync=False)
+    assert load_save(path) == data
+
+
+def test_autosave_writes_the_latest_turn(tmp_path):
+    path = str(tmp_path / "auto.sav")
+    writer = AutosaveWriter(flush_delay=0.0, fsync=False)
+    try:
+        game = playing_game(5, 30, save_path=path, autosave=writer)
+        assert writer.flush(timeout=5.0)
+    finally:
+        writer.close()
+    saved = load_save(path)
+    assert saved.wins == game.wins and saved.losses == game.losses
+    assert saved.party is not None and game.player_party is not None
+    assert [member.current_hp for member in saved.party.members] == [
+        member.current_hp for member in game.player_party.members
+    ]
+
+
+def test_truncated_save_is_rejected():
+    with pytest.raises(SaveError):
+        SaveData.from_bytes(sample_save().to_bytes()[:-3])
+
+
+@pytest.mark.parametrize("name", ["bad.sav", "bad.json"])
+def test_autosave_survives_saves_it_cannot_encode(tmp_path, name):
+    good = sample_save()
+    bad = good._replace(wins=-1) if name.endswith(".sav") else good._replace(volume=float("nan"), language=object())
+    writer = AutosaveWriter(flush_delay=0.0, fsync=False)
+    try:
+        writer.submit(tmp_path / name, bad)
+        writer.submit(tmp_path / "good.sav", good)
+        assert writer.flush(timeout=5.0)
+        assert writer.stats.errors == 1 and name in writer.stats.last_error
+        writer.submit(tmp_path / "later.sav", good)
+        assert writer.flush(timeout=5.0)
+    finally:
+        writer.close()
+    assert not (tmp_path / name).exists()
+    assert load_save(tmp_path / "good.sav") == load_save(tmp_path / "later.sav") == good
@@ -0,0 +1,29 @@
+"""SearchPolicy works on its own copy of the battle and keeps its tables bounded."""
+from __future__ import annotations
+
+from battle_log import NullSink
+from conftest import new_battle, play_turn
+from game import BattleState, Combatant, Party, default_inventory, default_player_party
+from search_ai import SearchPolicy
+
+
+def test_search_leaves_the_live_battle_untouched():
+    state = new_battle()
+    policy = SearchPolicy(budget_ms=50.0, max_nodes=400, table_size=1 << 10)
+    while not state.is_battle_over():
+        before = state.snapshot()
+        policy(state)
+        assert state.snapshot() == before
+        assert state.hasher is None
+        play_turn(state, ("attack",))
+
+
+def test_search_tables_are_bounded_per_roster():
+    policy = SearchPolicy(max_nodes=50, table_size=1 << 8, max_rosters=2)
+    for bonus in range(3):
+        enemy = Party("Enemy", [Combatant("Slime", 40 + bonus, 20, 8, 4)])
+        state = BattleState(default_player_party(), enemy, default_inventory(), sink=NullSink())
+        policy(state)
+        assert all(len(table) == 1 << 8 for table in policy.tables.values())
+    assert len(policy.tables) == 2
+    assert [signature[-1][1] for signature in policy.tables] == [41, 42]
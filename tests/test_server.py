@@ -0,0 +1,146 @@
+"""BattleServer drives sessions over any transport without blocking on input."""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import List, Optional
+
+import server as server_module
+from conftest import session_inputs
+from savegame import autosave_writer, load_save
+from server import PROMPT, BattleServer, Transport, credentials_from_path
+
+
+class ScriptedTransport(Transport):
+    """Feeds fixed input lines and keeps everything the server sends."""
+
+    def __init__(self, lines: List[str], stall: bool = False) -> None:
+        self.lines = list(lines)
+        self.stall = stall
+        self.sent: List[str] = []
+        self.closed = False
+
+    async def read_line(self) -> Optional[str]:
+        if not self.lines:
+            if self.stall:
+                await asyncio.sleep(3600)
+            return None
+        await asyncio.sleep(0)
+        return self.lines.pop(0)
+
+    async def send(self, text: str) -> None:
+        self.sent.append(text)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def run_sessions(server: BattleServer, transports: List[ScriptedTransport], *credentials) -> None:
+    async def serve_all() -> None:
+        await asyncio.gather(*(server.serve_session(transport, *credentials) for transport in transports))
+
+    asyncio.run(serve_all())
+
+
+def test_exit_from_the_title_ends_the_session():
+    server = BattleServer(seed=1)
+    transport = ScriptedTransport(["2"])
+    run_sessions(server, [transport])
+    assert transport.closed
+    assert transport.sent[0].endswith(PROMPT)
+    assert not transport.sent[-1].endswith(PROMPT)
+    assert server.stats.sessions_finished == 1 and server.stats.active_sessions == 0
+
+
+def test_concurrent_sessions_match_their_seeds():
+    def transcripts(seed: int) -> List[List[str]]:
+        transports = [ScriptedTransport(["1", *session_inputs(index)]) for index in range(6)]
+        server = BattleServer(seed=seed)
+        run_sessions(server, transports)
+        assert server.stats.sessions_started == server.stats.sessions_finished == 6
+        assert server.stats.peak_sessions == 6
+        return [transport.sent for transport in transports]
+
+    first = transcripts(7)
+    assert transcripts(7) == first
+    assert all(any("\n" in text for text in sent) for sent in first)
+
+
+def test_idle_sessions_time_out():
+    server = BattleServer(seed=2, idle_timeout=0.05)
+    transport = ScriptedTransport(["1"], stall=True)
+    run_sessions(server, [transport])
+    assert server.stats.idle_timeouts == 1
+    assert transport.closed
+
+
+def test_hibernated_session_plays_on_like_a_live_one(tmp_path):
+    lines = ["1", *session_inputs(3, 20)]
+    live = ScriptedTransport(lines)
+    run_sessions(BattleServer(seed=5), [live])
+
+    class SlowTransport(ScriptedTransport):
+        async def read_line(self) -> Optional[str]:
+            await asyncio.sleep(0.02)
+            return await super().read_line()
+
+    slow = SlowTransport(lines)
+    server = BattleServer(seed=5, hibernate_after=0.005)
+    run_sessions(server, [slow])
+    server.store.close()
+    assert server.stats.rehydrations > 0
+    assert server.stats.hibernated_sessions == server.stats.hibernated_bytes == 0
+    assert "".join(slow.sent) == "".join(live.sent)
+
+
+def test_credentials_from_path():
+    token = "s3cret-token-0123"
+    assert credentials_from_path(f"/play/alice?token={token}") == ("alice", token)
+    assert credentials_from_path(f"/?player=bob_2&token={token}") == ("bob_2", token)
+    assert credentials_from_path("/play/alice?token=short") == ("alice", None)
+    assert credentials_from_path("/play/../etc") == (None, None)
+    assert credentials_from_path("/play/a b") == (None, None)
+    assert credentials_from_path(None) == (None, None)
+
+
+TOKEN = "alice-secret-token-42"
+# Start a battle and attack until the connection ends.
+ATTACKS = ["1"] * 40
+
+
+def play_as(tmp_path, *credentials) -> BattleServer:
+    server = BattleServer(seed=11, save_dir=str(tmp_path))
+    run_sessions(server, [ScriptedTransport(ATTACKS)], *credentials)
+    assert autosave_writer().flush(timeout=5.0)
+    return server
+
+
+def test_saves_need_the_players_token(tmp_path):
+    play_as(tmp_path, "alice", TOKEN)
+    first = load_save(tmp_path / "alice.sav")
+    assert (tmp_path / "alice.key").read_text(encoding="ascii").strip() != TOKEN
+    assert first.wins + first.losses > 0
+
+    for token in ("someone-elses-token", None):
+        intruder = play_as(tmp_path, "alice", token)
+        assert intruder.stats.rejected_players == 1
+        assert load_save(tmp_path / "alice.sav") == first
+    assert len(list(tmp_path.glob("guest_*.sav"))) == 2
+
+    returning = play_as(tmp_path, "alice", TOKEN)
+    assert returning.stats.rejected_players == 0
+    second = load_save(tmp_path / "alice.sav")
+    assert second.wins + second.losses > first.wins + first.losses
+
+
+def test_saves_are_read_off_the_event_loop(tmp_path, monkeypatch):
+    play_as(tmp_path, "bob", TOKEN)
+    threads = []
+
+    def recording_load(path):
+        threads.append(threading.current_thread())
+        return load_save(path)
+
+    monkeypatch.setattr(server_module, "load_save", recording_load)
+    play_as(tmp_path, "bob", TOKEN)
+    assert threads and threading.main_thread() not in threads
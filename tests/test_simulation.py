@@ -0,0 +1,60 @@
+"""Headless battles are reproducible and batch totals do not depend on how they are split."""
+from __future__ import annotations
+
+import pytest
+
+from game import default_enemy_party, default_player_party
+from simulation import (
+    POLICIES,
+    SimulationSummary,
+    battle_rng,
+    run_battle,
+    run_chunk,
+    simulate_many,
+)
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+def test_same_seed_same_battle(policy):
+    outcomes = [
+        run_battle(default_player_party(), default_enemy_party(), POLICIES[policy], rng=battle_rng(4, 2))
+        for _ in range(2)
+    ]
+    assert outcomes[0] == outcomes[1]
+    assert outcomes[0].winner in ("player", "enemy", "draw")
+
+
+def test_turn_limit_ends_in_a_draw():
+    outcome = run_battle(default_player_party(), default_enemy_party(), POLICIES["attack"], max_turns=1)
+    assert outcome.turns <= 1
+    if outcome.winner == "draw":
+        assert outcome.enemy_hp > 0 and outcome.player_hp > 0
+
+
+def test_chunking_does_not_change_the_totals():
+    policy = POLICIES["random"]
+    whole = simulate_many(60, policy, seed=9, workers=1, chunk_size=60)
+    split = simulate_many(60, policy, seed=9, workers=1, chunk_size=7)
+    assert split == whole
+    merged = SimulationSummary()
+    for start, count in ((0, 25), (25, 35)):
+        merged.merge(
+            run_chunk(start, count, policy, default_player_party, default_enemy_party, None, 9, 200)
+        )
+    assert merged == whole
+
+
+def test_parallel_run_matches_sequential():
+    policy = POLICIES["greedy"]
+    sequential = simulate_many(40, policy, seed=2, workers=1, chunk_size=10)
+    parallel = simulate_many(40, policy, seed=2, workers=2, chunk_size=10)
+    assert parallel == sequential
+
+
+def test_summary_counts_every_battle():
+    summary = simulate_many(50, POLICIES["random"], seed=1, workers=1)
+    report = summary.report()
+    assert summary.battles == 50
+    assert summary.player_wins + summary.enemy_wins + summary.draws == 50
+    assert summary.min_turns <= report["mean_turns"] <= summary.max_turns
+    assert report["win_rate"] == summary.player_wins / 50
@@ -0,0 +1,58 @@
+"""Stage runs hand out validated waves in order and recycle their parties."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from data_registry import StageSpec, WaveSpec
+from game import CombatantPool
+from simulation import POLICIES
+from stages import MAX_WAVE_SIZE, StageError, StageRun, get_stage, play_stage, wave_members
+
+
+def test_waves_come_out_in_order():
+    stage = get_stage("stage1")
+    run = StageRun(stage, CombatantPool(), preload=False)
+    names = []
+    while run.has_next_wave():
+        names.append([member.name for member in run.next_wave().members])
+    run.close()
+    assert len(names) == run.wave_count == len(stage.waves)
+    with pytest.raises(StageError):
+        run.next_wave()
+
+
+def test_multi_member_waves_get_suffixed_names():
+    members = wave_members(WaveSpec("slime", 3))
+    assert [spec[0] for spec in members] == ["Slime A", "Slime B", "Slime C"]
+    assert len({spec[1:] for spec in members}) == 1
+
+
+@pytest.mark.parametrize("wave", [WaveSpec("nobody", 1), WaveSpec("slime", 0), WaveSpec("slime", MAX_WAVE_SIZE + 1)])
+def test_invalid_waves_are_rejected(wave):
+    with pytest.raises(StageError):
+        wave_members(wave)
+    run = StageRun(StageSpec("bad", "Bad", (wave,)), CombatantPool(), preload=True)
+    with pytest.raises(StageError):
+        run.next_wave()
+    run.close()
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(StageError):
+        get_stage("no-such-stage")
+
+
+def test_runs_are_reproducible_and_reuse_pooled_members():
+    stage = get_stage("stage1")
+    pool = CombatantPool()
+    policy = POLICIES["greedy"]
+    first = [play_stage(stage, policy, random.Random(seed), pool) for seed in range(10)]
+    created = pool.created
+    again = [play_stage(stage, policy, random.Random(seed), pool) for seed in range(10)]
+    assert again == first
+    assert pool.created == created
+    assert pool.reused > 0
+    assert all(outcome.waves_cleared <= len(stage.waves) for outcome in first)
+    assert all(outcome.cleared == (outcome.waves_cleared == len(stage.waves)) for outcome in first)
@@ -0,0 +1,64 @@
+"""Small encounters solve exactly and their stored best lines play out as promised."""
+from __future__ import annotations
+
+import pytest
+
+from game import Combatant
+from tablebase import (
+    Encounter,
+    StateCodec,
+    Tablebase,
+    TablebaseError,
+    TablebaseTooLarge,
+    build_tablebase,
+    open_tablebase,
+    play_out,
+)
+
+ENCOUNTERS = [Encounter((2,), (0,)), Encounter((0,), (0,)), Encounter((2,), (0, 1)), Encounter((2,), (0, 1, 2))]
+
+
+@pytest.mark.parametrize("encounter", ENCOUNTERS, ids=lambda encounter: encounter.name)
+def test_best_line_reaches_the_stored_result(tmp_path, encounter):
+    with open_tablebase(encounter, tmp_path / "table.tb") as table:
+        entry = table.probe(encounter.new_state())
+        assert entry is not None
+        outcome, commands = play_out(table)
+        assert outcome == entry.result
+        if outcome != "draw":
+            assert commands == entry.distance
+
+
+def test_codec_round_trips_snapshots():
+    encounter = ENCOUNTERS[-1]
+    state = encounter.new_state()
+    codec = StateCodec([state])
+    state.player_party.members[0].current_hp -= 3
+    state.enemy_party.front_index = 2
+    state.player_inventory[state.item_ids[0]] -= 1
+    assert codec.fits(state)
+    code = codec.encode(state)
+    assert 0 <= code < codec.size
+    wave, snapshot = codec.decode(code)
+    assert wave == 0
+    assert snapshot[:-1] == state.snapshot()[:-1]
+
+
+def test_foreign_states_are_not_found(tmp_path):
+    encounter = ENCOUNTERS[0]
+    with open_tablebase(encounter, tmp_path / "table.tb") as table:
+        assert table.probe(ENCOUNTERS[2].new_state()) is None
+        giant = encounter.new_state()
+        giant.player_party.members[0] = Combatant("Giant", 999, 999, 1, 1)
+        assert table.probe(giant) is None
+
+
+def test_table_of_another_encounter_is_rejected(tmp_path):
+    path = build_tablebase(ENCOUNTERS[0], tmp_path / "table.tb")
+    with pytest.raises(TablebaseError):
+        Tablebase(path, ENCOUNTERS[1])
+
+
+def test_state_budget_is_enforced(tmp_path):
+    with pytest.raises(TablebaseTooLarge):
+        build_tablebase(ENCOUNTERS[-1], tmp_path / "table.tb", max_states=50)
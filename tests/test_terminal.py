@@ -0,0 +1,91 @@
+"""Terminal output is one write per prompt, and diff frames only repeat changed lines."""
+from __future__ import annotations
+
+import io
+
+from conftest import session_inputs
+from game import Game
+from terminal import Terminal
+
+
+class CountingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls = 0
+
+    def write(self, text: str) -> int:
+        self.calls += 1
+        return super().write(text)
+
+
+def test_flush_writes_once_with_the_prompt():
+    stream = CountingStream()
+    terminal = Terminal(stream)
+    terminal.write("a")
+    terminal.write("b")
+    terminal.flush("> ")
+    terminal.flush()
+    assert stream.getvalue() == "a\nb\n> "
+    assert stream.calls == terminal.writes == 1
+
+
+def test_diff_frames_show_heading_and_changed_lines():
+    stream = io.StringIO()
+    terminal = Terminal(stream, diff=True)
+    terminal.frame("battle", ["head", "x=1", "y=1"])
+    terminal.frame("battle", ["head", "x=1", "y=2"])
+    terminal.frame("battle", ["head", "x=1", "y=2", "z=0"])
+    terminal.reset("battle")
+    terminal.frame("battle", ["head", "x=1", "y=2", "z=0"])
+    terminal.flush()
+    assert stream.getvalue().split("\n")[:-1] == [
+        "head", "x=1", "y=1",
+        "head", "y=2",
+        "head", "x=1", "y=2", "z=0",
+        "head", "x=1", "y=2", "z=0",
+    ]
+    assert terminal.lines_skipped == 1
+
+
+def play(seed: int, terminal: Terminal) -> None:
+    game = Game(seed=seed, terminal=terminal)
+    session = game.session()
+    next(session)
+    try:
+        for line in ["1", *session_inputs(seed)]:
+            terminal.flush("> ")
+            session.send(line)
+    except StopIteration:
+        pass
+    terminal.flush()
+    game.release_parties()
+
+
+def test_full_mode_matches_plain_writes():
+    for seed in range(5):
+        buffered = io.StringIO()
+        play(seed, Terminal(buffered))
+        plain: list = []
+        game = Game(seed=seed, write=plain.append)
+        session = game.session()
+        next(session)
+        chunks = []
+        try:
+            for line in ["1", *session_inputs(seed)]:
+                chunks.append("".join(text + "\n" for text in plain) + "> ")
+                plain.clear()
+                session.send(line)
+        except StopIteration:
+            pass
+        chunks.append("".join(text + "\n" for text in plain))
+        game.release_parties()
+        assert buffered.getvalue() == "".join(chunks)
+
+
+def test_diff_mode_writes_less_than_full_mode():
+    full, diff = io.StringIO(), io.StringIO()
+    play(3, Terminal(full))
+    terminal = Terminal(diff, diff=True)
+    play(3, terminal)
+    assert terminal.lines_skipped > 0
+    assert len(diff.getvalue()) < len(full.getvalue())
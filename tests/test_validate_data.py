@@ -0,0 +1,85 @@
+"""tools/validate_data.py reports the same thing in normal and --stream mode."""
+from __future__ import annotations
+
+import json
+import shutil
+import sys
+
+import pytest
+
+import validate_data
+from gen_dataset import generate
+
+DATASETS = ["types", "monsters", "moves"]
+
+
+def copy_data(directory):
+    for name in ("types.json", "monsters.json", "moves.json"):
+        shutil.copyfile(validate_data.DATA_DIR / name, directory / name)
+    return directory
+
+
+def edit_records(path, key, edit):
+    document = json.loads(path.read_text(encoding="utf-8"))
+    edit(document[key])
+    path.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def break_monsters(records):
+    records[0]["hp"] = -5
+    records[1]["type"] = "nope"
+    del records[2]["id"]
+
+
+def break_moves(records):
+    records[0]["power"] = -10
+    records[1]["element"] = "nope"
+
+
+def assert_same_report(data_dir):
+    normal = validate_data.validate(DATASETS, validate_data.ValidationContext(data_dir))
+    stream = validate_data.validate_stream(DATASETS, data_dir)
+    assert stream["ok"] == normal["ok"]
+    for target in DATASETS:
+        assert stream["datasets"][target]["records"] == normal["datasets"][target]["records"]
+        assert stream["datasets"][target]["errors"] == normal["datasets"][target]["errors"]
+        assert stream["datasets"][target]["status"] == normal["datasets"][target]["status"]
+    return normal
+
+
+def test_shipped_data_parity():
+    assert assert_same_report(validate_data.DATA_DIR)["ok"]
+
+
+def test_broken_data_parity(tmp_path):
+    data_dir = copy_data(tmp_path)
+    edit_records(data_dir / "monsters.json", "monsters", break_monsters)
+    edit_records(data_dir / "moves.json", "moves", break_moves)
+    report = assert_same_report(data_dir)
+    assert not report["ok"]
+    assert report["datasets"]["monsters"]["errors"]
+    assert report["datasets"]["moves"]["errors"]
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_generated_data_parity(tmp_path, seed):
+    generate(tmp_path, monsters=300, moves=2000, seed=seed)
+    assert assert_same_report(tmp_path)["ok"]
+
+
+def test_incremental_cache_is_keyed_by_validator(tmp_path, monkeypatch):
+    cache = tmp_path / "cache.json"
+    ctx = validate_data.ValidationContext(validate_data.DATA_DIR)
+    validate_data.validate(DATASETS, ctx, cache_path=cache)
+    again = validate_data.validate(DATASETS, validate_data.ValidationContext(validate_data.DATA_DIR), cache_path=cache)
+    assert all(result["cached"] for result in again["datasets"].values())
+    monkeypatch.setattr(validate_data, "VALIDATOR_DIGEST", "changed")
+    rerun = validate_data.validate(DATASETS, validate_data.ValidationContext(validate_data.DATA_DIR), cache_path=cache)
+    assert not any(result["cached"] for result in rerun["datasets"].values())
+
+
+def test_report_creates_missing_directories(tmp_path, monkeypatch):
+    report = tmp_path / "build" / "nested" / "validation.json"
+    monkeypatch.setattr(sys, "argv", ["validate_data.py", "--report", str(report)])
+    validate_data.main()
+    assert json.loads(report.read_text(encoding="utf-8"))["ok"]
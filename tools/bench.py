@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""Benchmark suite with JSON baselines and regression gates.
+
+Covers BattleState turn throughput, party construction, game-data loading,
+tools/validate_data.py, enemy AI decision latency, what-if action previews
+and per-turn allocation.
+Results are compared against a JSON baseline; the run fails when a metric
+regresses past the threshold or breaks a budget from docs/tests.yaml /
+docs/perf_budget.md.
+
+Every run also times a fixed pure-Python calibration loop.  Time-based
+metrics (per-second rates and milliseconds) are compared after scaling the
+baseline by how fast this host runs that loop relative to the host that
+wrote the baseline, so the committed baseline gates regressions on other
+machines too.  Budgets and byte counts are compared as measured.
+
+Each benchmark (and the calibration loop) runs a fixed number of times
+(``--repeat``) and every metric is the median of those runs.  The gate
+compares that median once; nothing is re-measured after a failure.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+
+import game_data  # noqa: E402
+import validate_data  # noqa: E402
+from battle_log import NullSink  # noqa: E402
+from game import BattleState, default_enemy_party, default_inventory, default_player_party  # noqa: E402
+from preview import preview_actions  # noqa: E402
+from search_ai import SearchPolicy  # noqa: E402
+
+BASELINE_PATH = REPO_ROOT / "tools" / "bench_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+
+# Absolute budgets from the design docs.
+BUDGETS = {
+  "cold_boot_ms": 3000.0,  # docs/tests.yaml cold_boot_under_ms
+  "turn_peak_alloc_bytes": 512.0,  # docs/perf_budget.md: < 0.5KB GC allocation per frame
+  "preview_p99_ms": 1000 / 60,  # docs/perf_budget.md: 60 FPS, so one frame
+  "preview_search_p99_ms": 1000 / 60,  # the same frame with a search enemy replying
+  "ai_decision_p99_of_budget": 1.0,  # search_ai: budget_ms is a hard per-move deadline
+}
+# Tail latencies are gated by their budgets only; regressions are judged on
+# the medians next to them.
+TAIL_METRICS = {"ai_decision_p99_of_budget", "preview_p99_ms", "preview_search_p99_ms"}
+
+
+class Metric(NamedTuple):
+  value: float
+  unit: str
+  higher_is_better: bool
+
+
+Results = Dict[str, Metric]
+
+
+def rate(fn: Callable[[], None], min_time: float) -> float:
+  """Calls-per-second of ``fn`` over one run of at least ``min_time``."""
+
+  calls = 0
+  started = time.perf_counter()
+  deadline = started + min_time
+  while True:
+    fn()
+    calls += 1
+    now = time.perf_counter()
+    if now >= deadline:
+      break
+  return calls / (now - started)
+
+
+def calibration_loop() -> None:
+  """Fixed interpreter-bound workload (dict, int and branch heavy, like a turn)."""
+
+  table: Dict[int, int] = {}
+  total = 0
+  for i in range(2000):
+    table[i & 63] = total
+    total = (total + i * 7) % 1009
+    if total & 1:
+      total += table.get((i + 1) & 63, 0) & 7
+
+
+def calibrate(args: argparse.Namespace) -> Metric:
+  return Metric(statistics.median(rate(calibration_loop, args.min_time) for _ in range(args.repeat)), "loops/s", True)
+
+
+def scales_with_host(metric: Metric) -> bool:
+  return metric.unit.endswith("/s") or metric.unit == "ms"
+
+
+def new_state() -> BattleState:
+  return BattleState(default_player_party(), default_enemy_party(), default_inventory(), sink=NullSink())
+
+
+def turn_runner(action: Callable[[BattleState], bool]) -> Callable[[], None]:
+  """One full round per call; the battle rewinds whenever the action cannot proceed."""
+
+  state = new_state()
+  start = state.snapshot()
+
+  def step() -> None:
+    if state.is_battle_over() or not action(state):
+      state.restore(start)
+      return
+    state.end_player_turn()
+    if state.is_battle_over():
+      return
+    state.enemy_take_turn()
+    state.end_enemy_turn()
+
+  return step
+
+
+def swap_action(state: BattleState) -> bool:
+  candidates = state.player_party.available_backliner_indexes()
+  return bool(candidates) and state.player_swap(candidates[0])
+
+
+# --- Benchmarks -------------------------------------------------------------
+
+
+def bench_turns(args: argparse.Namespace) -> Results:
+  results: Results = {}
+  actions = {
+    "attack": BattleState.player_attack,
+    "defend": BattleState.player_defend,
+    "swap": swap_action,
+  }
+  for name, action in actions.items():
+    results[f"turn_{name}_per_s"] = Metric(rate(turn_runner(action), args.min_time), "turns/s", True)
+
+  state = new_state()
+  state.enemy_party.members[0].current_hp = 1
+  ko_setup = state.snapshot()
+
+  def forced_swap() -> None:
+    state.restore(ko_setup)
+    state.player_attack()
+
+  results["turn_forced_swap_per_s"] = Metric(rate(forced_swap, args.min_time), "turns/s", True)
+  return results
+
+
+def bench_parties(args: argparse.Namespace) -> Results:
+  def build() -> None:
+    default_player_party()
+    default_enemy_party()
+
+  return {"party_build_per_s": Metric(rate(build, args.min_time), "pairs/s", True)}
+
+
+def bench_data(args: argparse.Namespace) -> Results:
+  game_data.open_game_data().close()
+  results: Results = {}
+
+  def open_bundle() -> None:
+    game_data.open_game_data().close()
+
+  def compile_bundle() -> None:
+    game_data.compile_bundle(bundle_path=scratch / "game_data.bin")
+
+  with tempfile.TemporaryDirectory() as tmp:
+    scratch = Path(tmp)
+    results["bundle_open_per_s"] = Metric(rate(open_bundle, args.min_time), "opens/s", True)
+    results["bundle_compile_per_s"] = Metric(rate(compile_bundle, args.min_time), "builds/s", True)
+
+  started = time.perf_counter()
+  subprocess.run(
+    [sys.executable, "-c", "import game; game.load_items(); game.default_player_party()"],
+    cwd=REPO_ROOT,
+    check=True,
+  )
+  results["cold_boot_ms"] = Metric((time.perf_counter() - started) * 1000, "ms", False)
+  return results
+
+
+def synthetic_dataset(target: Path, copies: int) -> None:
+  shutil.copy(validate_data.DATA_DIR / "types.json", target / "types.json")
+  for name, key in (("monsters.json", "monsters"), ("moves.json", "moves")):
+    records = validate_data.load_json(validate_data.DATA_DIR / name)[key]
+    payload = {key: [dict(record, id=f"{record['id']}_{i}") for i in range(copies) for record in records]}
+    (target / name).write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+
+
+def bench_validation(args: argparse.Namespace) -> Results:
+  targets = ["types", "monsters", "moves"]
+
+  def small() -> None:
+    validate_data.validate(targets, validate_data.ValidationContext())
+
+  results: Results = {"validate_small_per_s": Metric(rate(small, args.min_time), "runs/s", True)}
+  with tempfile.TemporaryDirectory() as tmp:
+    data_dir = Path(tmp)
+    synthetic_dataset(data_dir, args.large_copies)
+    started = time.perf_counter()
+    report = validate_data.validate(targets, validate_data.ValidationContext(data_dir))
+    seconds = time.perf_counter() - started
+    records = sum(result["records"] for result in report["datasets"].values())
+    stream_seconds = validate_data.validate_stream(targets, data_dir)["seconds"]
+  results["validate_large_records_per_s"] = Metric(records / seconds, "records/s", True)
+  results["validate_stream_records_per_s"] = Metric(records / stream_seconds, "records/s", True)
+  return results
+
+
+def bench_ai(args: argparse.Namespace) -> Results:
+  policy = SearchPolicy(budget_ms=args.ai_budget_ms)
+  latencies: List[float] = []
+  while len(latencies) < args.ai_decisions:
+    state = new_state()
+    while not state.is_battle_over() and len(latencies) < args.ai_decisions:
+      if not state.player_attack():
+        break
+      state.end_player_turn()
+      if state.is_battle_over():
+        break
+      if state.ensure_actor_ready(state.enemy_party, "enemy"):
+        started = time.perf_counter()
+        state.perform_enemy_action(policy(state))
+        latencies.append((time.perf_counter() - started) * 1000)
+      state.end_enemy_turn()
+  latencies.sort()
+  return {
+    # The search runs until its deadline, so latency is gated as a share of
+    # the budget rather than scaled by host speed.
+    "ai_decision_p50_of_budget": Metric(statistics.median(latencies) / args.ai_budget_ms, "budget", False),
+    "ai_decision_p99_of_budget": Metric(
+      latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] / args.ai_budget_ms, "budget", False
+    ),
+    "ai_nodes_per_s": Metric(policy.stats.nodes_per_second, "nodes/s", True),
+  }
+
+
+def preview_latencies(args: argparse.Namespace, policy=None) -> List[float]:
+  """Milliseconds per :func:`preview_actions` call, sampled on each turn of attacking battles."""
+
+  latencies: List[float] = []
+  while len(latencies) < args.ai_decisions:
+    state = new_state()
+    state.enemy_policy = policy
+    while not state.is_battle_over() and len(latencies) < args.ai_decisions:
+      started = time.perf_counter()
+      preview_actions(state)
+      latencies.append((time.perf_counter() - started) * 1000)
+      if not state.player_attack():
+        break
+      state.end_player_turn()
+      if state.is_battle_over():
+        break
+      state.enemy_take_turn()
+      state.end_enemy_turn()
+  latencies.sort()
+  return latencies
+
+
+def bench_preview(args: argparse.Namespace) -> Results:
+  """Preview latency with the fixed enemy rule and with a search enemy sharing the preview budget."""
+
+  results: Results = {}
+  for prefix, policy in (("preview", None), ("preview_search", SearchPolicy(budget_ms=args.ai_budget_ms))):
+    latencies = preview_latencies(args, policy)
+    results[f"{prefix}_p50_ms"] = Metric(statistics.median(latencies), "ms", False)
+    results[f"{prefix}_p99_ms"] = Metric(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], "ms", False)
+  return results
+
+
+def bench_allocation(args: argparse.Namespace) -> Results:
+  step = turn_runner(BattleState.player_attack)
+  for _ in range(100):
+    step()
+  peaks = []
+  tracemalloc.start()
+  try:
+    for _ in range(args.alloc_turns):
+      tracemalloc.reset_peak()
+      before, _ = tracemalloc.get_traced_memory()
+      step()
+      _, peak = tracemalloc.get_traced_memory()
+      peaks.append(peak - before)
+  finally:
+    tracemalloc.stop()
+  return {"turn_peak_alloc_bytes": Metric(statistics.mean(peaks), "bytes", False)}
+
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], Results]] = {
+  "turns": bench_turns,
+  "parties": bench_parties,
+  "data": bench_data,
+  "validation": bench_validation,
+  "ai": bench_ai,
+  "preview": bench_preview,
+  "allocation": bench_allocation,
+}
+
+
+def measure(name: str, args: argparse.Namespace) -> Results:
+  """Median of every metric of benchmark ``name`` over ``args.repeat`` runs."""
+
+  runs = [BENCHMARKS[name](args) for _ in range(args.repeat)]
+  return {
+    metric: runs[0][metric]._replace(value=statistics.median(run[metric].value for run in runs)) for metric in runs[0]
+  }
+
+
+# --- Baselines --------------------------------------------------------------
+
+
+def compare(results: Results, baseline: Dict[str, dict], threshold: float, speed: float = 1.0) -> List[str]:
+  """Budget and regression failures; ``speed`` is this host's calibration rate over the baseline's."""
+
+  failures = []
+  for name, metric in results.items():
+    budget = BUDGETS.get(name)
+    if budget is not None and metric.value > budget:
+      failures.append(f"{name} = {metric.value:.1f} {metric.unit} exceeds budget {budget:.1f}")
+    base = baseline.get(name)
+    if not base or not base.get("value") or name in TAIL_METRICS:
+      continue
+    expected = base["value"]
+    if scales_with_host(metric):
+      expected = expected * speed if metric.higher_is_better else expected / speed
+    ratio = metric.value / expected
+    if metric.higher_is_better and ratio < 1 - threshold:
+      failures.append(f"{name} regressed to {ratio:.0%} of baseline ({metric.value:.1f} vs {expected:.1f} {metric.unit})")
+    if not metric.higher_is_better and ratio > 1 + threshold:
+      failures.append(f"{name} regressed to {ratio:.0%} of baseline ({metric.value:.1f} vs {expected:.1f} {metric.unit})")
+  return failures
+
+
+def to_json(results: Results, calibration: Metric) -> dict:
+  return {
+    "python": platform.python_version(),
+    "machine": platform.machine(),
+    "calibration": calibration._asdict(),
+    "metrics": {name: metric._asdict() for name, metric in sorted(results.items())},
+  }
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Run benchmarks and compare them against a JSON baseline.")
+  parser.add_argument("--only", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+  parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Baseline JSON to compare against")
+  parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline")
+  parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed relative regression")
+  parser.add_argument("--output", type=Path, help="Also write the results as JSON here")
+  parser.add_argument("--quick", action="store_true", help="Shorter runs for smoke testing (budgets only)")
+  parser.add_argument("--min-time", type=float, default=0.5, help="Seconds per timed run")
+  parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark (the median is kept)")
+  parser.add_argument("--large-copies", type=int, default=2000, help="Dataset multiplier for the large validation run")
+  parser.add_argument("--ai-budget-ms", type=float, default=10.0)
+  parser.add_argument("--ai-decisions", type=int, default=200)
+  parser.add_argument("--alloc-turns", type=int, default=2000)
+  args = parser.parse_args()
+  if args.quick:
+    args.min_time, args.repeat, args.large_copies, args.ai_decisions, args.alloc_turns = 0.1, 3, 200, 40, 300
+  return args
+
+
+def main() -> None:
+  args = parse_args()
+  selected = args.only.split(",") if args.only else list(BENCHMARKS)
+  unknown = sorted(set(selected) - set(BENCHMARKS))
+  if unknown:
+    sys.exit(f"unknown benchmark(s): {', '.join(unknown)}")
+
+  calibration = calibrate(args)
+  results: Results = {}
+  for name in selected:
+    results.update(measure(name, args))
+  print(f"{'calibration':32} {calibration.value:14.2f} {calibration.unit}")
+  for name, metric in sorted(results.items()):
+    print(f"{name:32} {metric.value:14.2f} {metric.unit}")
+
+  payload = to_json(results, calibration)
+  if args.output:
+    args.output.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+  if args.update_baseline:
+    # Metrics are only comparable under one calibration, so partial runs
+    # keep the old entries only when they share the host speed closely.
+    existing = {}
+    if args.baseline.exists() and set(selected) != set(BENCHMARKS):
+      old = validate_data.load_json(args.baseline)
+      old_rate = old.get("calibration", {}).get("value")
+      if old_rate and abs(calibration.value / old_rate - 1) <= 0.05:
+        existing = old.get("metrics", {})
+    existing.update(payload["metrics"])
+    payload["metrics"] = dict(sorted(existing.items()))
+    args.baseline.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    print(f"Baseline written to {args.baseline}")
+    return
+
+  baseline: Dict[str, dict] = {}
+  speed = 1.0
+  # Quick runs are too short to compare against a full baseline; they only gate on budgets.
+  if args.baseline.exists() and not args.quick:
+    stored = validate_data.load_json(args.baseline)
+    baseline = stored.get("metrics", {})
+    base_rate = stored.get("calibration", {}).get("value")
+    if base_rate:
+      speed = calibration.value / base_rate
+      print(f"host speed vs baseline: {speed:.2f}x")
+  failures = compare(results, baseline, args.threshold, speed)
+  if failures:
+    print("Benchmark regressions:")
+    for failure in failures:
+      print(f"- {failure}")
+    sys.exit(1)
+  print("No regressions." if baseline else "No baseline compared; only budgets were checked.")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""Property-based fuzzer for BattleState.
+
+Each case is a pair of parties (random sizes and stats, or the default
+encounter with --default-parties), a potion count and a random sequence of
+player commands: attack, defend, items (held or unknown ids) and swaps to
+arbitrary indexes, including out-of-range ones.  The commands are played the
+way Game.battle_screen plays them, and these invariants are checked after
+every command:
+
+  bounds      every member has 0 <= HP <= max HP and 0 <= ST <= max ST
+  front       front_index is in range, and the front member is alive while
+              anyone in that party is
+  inventory   no item count is negative
+  guard       guard flags are booleans; a successful player swap drops guard
+  hash        the incremental Zobrist hash matches a full recompute (checked
+              when a case ends; the shrinker then finds the step)
+  progress    a battle that is not over always has some player command that
+              uses up the turn (otherwise the CLI would prompt forever)
+  crash       no command raises
+
+Invariants named with --skip are not reported (e.g. a known finding).  A
+failing case is shrunk (ddmin over the command list, then each command is
+simplified) and printed as a minimal repro.  Cases are spread across worker
+processes.
+"""
+
+from __future__ import annotations
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from battle_log import NullSink  # noqa: E402
+from game import (  # noqa: E402
+  DEFAULT_ENEMY_LABEL,
+  DEFAULT_ENEMY_MEMBERS,
+  DEFAULT_PLAYER_LABEL,
+  DEFAULT_PLAYER_MEMBERS,
+  BattleState,
+  Combatant,
+  MemberSpec,
+  Party,
+)
+from simulation import Action, perform_action  # noqa: E402
+
+NULL_SINK = NullSink()
+ITEM_IDS = ("potion_small", "unknown_item")
+MAX_SWAP_INDEX = 4
+DEFAULT_STEPS = 60
+SHRINK_BUDGET = 2000
+INVARIANTS = ("bounds", "front", "inventory", "guard", "hash", "progress", "crash")
+
+
+@dataclass(frozen=True)
+class Case:
+  player: Tuple[MemberSpec, ...]
+  enemy: Tuple[MemberSpec, ...]
+  potions: int
+  actions: Tuple[Action, ...]
+
+
+@dataclass
+class Failure:
+  invariant: str
+  step: int
+  message: str
+
+
+@dataclass
+class WorkerReport:
+  cases: int = 0
+  steps: int = 0
+  battles_finished: int = 0
+  failures: List[dict] = field(default_factory=list)
+  counts: Dict[str, int] = field(default_factory=dict)
+
+
+# --- Generation -------------------------------------------------------------
+
+
+def random_members(rng: random.Random, prefix: str) -> Tuple[MemberSpec, ...]:
+  """Random members within what the data validators accept (HP/ST > 0, ATK/DEF >= 0)."""
+
+  return tuple(
+    (f"{prefix}{idx}", rng.randint(1, 120), rng.randint(1, 60), rng.randint(0, 40), rng.randint(0, 30))
+    for idx in range(rng.randint(1, 3))
+  )
+
+
+def random_action(rng: random.Random) -> Action:
+  roll = rng.random()
+  if roll < 0.4:
+    return ("attack",)
+  if roll < 0.65:
+    return ("defend",)
+  if roll < 0.8:
+    return ("item", ITEM_IDS[rng.random() < 0.2])
+  return ("swap", rng.randint(-1, MAX_SWAP_INDEX))
+
+
+def random_case(seed: int, steps: int, default_parties: bool) -> Case:
+  rng = random.Random(seed)
+  if default_parties:
+    player, enemy = DEFAULT_PLAYER_MEMBERS, DEFAULT_ENEMY_MEMBERS
+  else:
+    player, enemy = random_members(rng, "P"), random_members(rng, "E")
+  return Case(player, enemy, rng.randint(0, 3), tuple(random_action(rng) for _ in range(steps)))
+
+
+# --- Execution --------------------------------------------------------------
+
+
+def new_state(case: Case) -> BattleState:
+  state = BattleState(
+    Party(DEFAULT_PLAYER_LABEL, [Combatant(*spec) for spec in case.player]),
+    Party(DEFAULT_ENEMY_LABEL, [Combatant(*spec) for spec in case.enemy]),
+    {"potion_small": case.potions},
+    sink=NULL_SINK,
+  )
+  state.enable_hashing()
+  return state
+
+
+def check_invariants(state: BattleState) -> Optional[Tuple[str, str]]:
+  for party in (state.player_party, state.enemy_party):
+    members = party.members
+    for member in members:
+      if not 0 <= member.current_hp <= member.max_hp:
+        return "bounds", f"{member.name} HP {member.current_hp}/{member.max_hp}"
+      if not 0 <= member.current_st <= member.max_st:
+        return "bounds", f"{member.name} ST {member.current_st}/{member.max_st}"
+    if not 0 <= party.front_index < len(members):
+      return "front", f"{party.label} front_index {party.front_index} of {len(members)}"
+    if not members[party.front_index].is_alive and not party.all_defeated():
+      return "front", f"{party.label} front {members[party.front_index].name} is down while others stand"
+  for item_id, count in state.player_inventory.items():
+    if count < 0:
+      return "inventory", f"{item_id} count {count}"
+  for label, flag in state.guard_flags.items():
+    if not isinstance(flag, bool):
+      return "guard", f"{label} guard flag {flag!r}"
+  return None
+
+
+def check_hash(state: BattleState, step: int) -> Optional[Failure]:
+  if state.hasher is not None and state.hasher.value != state.compute_hash():
+    return Failure("hash", step, "incremental hash differs from a full recompute")
+  return None
+
+
+def probe_actions(state: BattleState) -> List[Action]:
+  actions: List[Action] = [("attack",), ("defend",)]
+  actions += [("item", item_id) for item_id, count in state.player_inventory.items() if count > 0]
+  actions += [("swap", idx) for idx in range(len(state.player_party.members))]
+  return actions
+
+
+def can_progress(state: BattleState) -> bool:
+  """Whether any player command would use up the turn (state is left untouched)."""
+
+  snapshot = state.snapshot()
+  try:
+    for action in probe_actions(state):
+      if perform_action(state, action):
+        return True
+    return False
+  finally:
+    state.restore(snapshot)
+
+
+def play_turn(state: BattleState, action: Action) -> bool:
+  """One command as Game.battle_screen plays it; returns whether the turn was used."""
+
+  if not perform_action(state, action):
+    return False
+  state.end_player_turn()
+  if not state.is_battle_over():
+    state.enemy_take_turn()
+    state.end_enemy_turn()
+  return True
+
+
+def run_case(case: Case, skip: FrozenSet[str] = frozenset()) -> Tuple[Optional[Failure], int, bool]:
+  """Play ``case``; returns (first failure, commands played, battle finished)."""
+
+  state = new_state(case)
+  problem = check_invariants(state)
+  if problem:
+    return Failure(problem[0], 0, problem[1]), 0, False
+  step = 0
+  for step, action in enumerate(case.actions, start=1):
+    try:
+      used = play_turn(state, action)
+    except Exception as exc:  # noqa: BLE001 - any exception is a finding
+      return Failure("crash", step, f"{type(exc).__name__}: {exc}"), step, False
+    problem = check_invariants(state)
+    if problem and problem[0] not in skip:
+      return Failure(problem[0], step, problem[1]), step, False
+    if action[0] == "swap" and used and state.guard_flags["player"] and "guard" not in skip:
+      return Failure("guard", step, "player still guarding after a swap"), step, False
+    if state.is_battle_over():
+      return (None if "hash" in skip else check_hash(state, step)), step, True
+    if not used and "progress" not in skip and not can_progress(state):
+      return Failure("progress", step, "no player command can use the turn"), step, False
+  return (None if "hash" in skip else check_hash(state, step)), step, False
+
+
+# --- Shrinking --------------------------------------------------------------
+
+
+def simpler_actions(action: Action) -> List[Action]:
+  if action[0] == "attack":
+    return []
+  if action[0] == "swap" and action[1] != 0:
+    return [("attack",), ("swap", 0), ("swap", action[1] - 1 if action[1] > 0 else 0)]
+  return [("attack",)]
+
+
+def shrink(
+  case: Case,
+  failure: Failure,
+  skip: FrozenSet[str] = frozenset(),
+  budget: int = SHRINK_BUDGET,
+) -> Tuple[Case, Failure]:
+  """Delta-debug ``case`` to a short command list that still breaks ``failure.invariant``."""
+
+  invariant = failure.invariant
+  runs = 0
+
+  def fails(candidate: Case) -> Optional[Failure]:
+    nonlocal runs
+    runs += 1
+    found, _, _ = run_case(candidate, skip)
+    return found if found is not None and found.invariant == invariant else None
+
+  best, best_failure = Case(case.player, case.enemy, case.potions, case.actions[:failure.step]), failure
+  if best.potions:
+    candidate = Case(best.player, best.enemy, 0, best.actions)
+    found = fails(candidate)
+    if found:
+      best, best_failure = candidate, found
+  chunks = 2
+  while len(best.actions) >= 2 and runs < budget:
+    size = max(1, len(best.actions) // chunks)
+    reduced = False
+    for start in range(0, len(best.actions), size):
+      candidate = Case(best.player, best.enemy, best.potions, best.actions[:start] + best.actions[start + size:])
+      found = fails(candidate)
+      if found:
+        best, best_failure = Case(candidate.player, candidate.enemy, candidate.potions, candidate.actions[:found.step]), found
+        chunks = max(2, chunks - 1)
+        reduced = True
+        break
+    if not reduced:
+      if size == 1:
+        break
+      chunks = min(len(best.actions), chunks * 2)
+
+  changed = True
+  while changed and runs < budget:
+    changed = False
+    for idx, action in enumerate(best.actions):
+      for simpler in simpler_actions(action):
+        candidate = Case(best.player, best.enemy, best.potions, best.actions[:idx] + (simpler,) + best.actions[idx + 1:])
+        found = fails(candidate)
+        if found:
+          best, best_failure, changed = candidate, found, True
+          break
+  return Case(best.player, best.enemy, best.potions, best.actions[:best_failure.step]), best_failure
+
+
+# --- Workers ----------------------------------------------------------------
+
+
+def fuzz_range(
+  first_seed: int,
+  count: int,
+  steps: int,
+  default_parties: bool,
+  max_failures: int,
+  skip: FrozenSet[str] = frozenset(),
+) -> WorkerReport:
+  report = WorkerReport()
+  seen = set()
+  for seed in range(first_seed, first_seed + count):
+    case = random_case(seed, steps, default_parties)
+    failure, played, finished = run_case(case, skip)
+    report.cases += 1
+    report.steps += played
+    report.battles_finished += finished
+    if failure is None:
+      continue
+    report.counts[failure.invariant] = report.counts.get(failure.invariant, 0) + 1
+    if failure.invariant in seen or len(report.failures) >= max_failures:
+      continue
+    seen.add(failure.invariant)
+    small, small_failure = shrink(case, failure, skip)
+    report.failures.append({"seed": seed, "failure": asdict(small_failure), "case": asdict(small)})
+  return report
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Fuzz BattleState with random command sequences.")
+  parser.add_argument("--cases", type=int, default=20_000)
+  parser.add_argument("--steps", type=int, default=DEFAULT_STEPS, help="Commands per case")
+  parser.add_argument("--seed", type=int, default=0, help="Seed of the first case")
+  parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+  parser.add_argument("--default-parties", action="store_true", help="Only fuzz the default encounter")
+  parser.add_argument("--skip", action="append", default=[], choices=INVARIANTS, help="Invariant not to report")
+  parser.add_argument("--max-failures", type=int, default=5, help="Repros kept per worker")
+  parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+  return parser.parse_args()
+
+
+def main() -> None:
+  args = parse_args()
+  skip = frozenset(args.skip)
+  jobs = max(1, args.jobs)
+  per_job = -(-args.cases // jobs)
+  ranges = [(args.seed + start, min(per_job, args.cases - start)) for start in range(0, args.cases, per_job)]
+  started = time.perf_counter()
+  if jobs > 1 and len(ranges) > 1:
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+      futures = [
+        pool.submit(fuzz_range, first, count, args.steps, args.default_parties, args.max_failures, skip)
+        for first, count in ranges
+      ]
+      reports = [future.result() for future in futures]
+  else:
+    reports = [
+      fuzz_range(first, count, args.steps, args.default_parties, args.max_failures, skip) for first, count in ranges
+    ]
+  elapsed = time.perf_counter() - started
+
+  counts: Dict[str, int] = {}
+  for report in reports:
+    for name, count in report.counts.items():
+      counts[name] = counts.get(name, 0) + count
+  summary = {
+    "cases": sum(report.cases for report in reports),
+    "steps": sum(report.steps for report in reports),
+    "battles_finished": sum(report.battles_finished for report in reports),
+    "seconds": elapsed,
+    "steps_per_s": sum(report.steps for report in reports) / max(elapsed, 1e-9),
+    "failing_cases": counts,
+    "repros": [failure for report in reports for failure in report.failures],
+  }
+  if args.json:
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+  else:
+    print(
+      f"{summary['cases']} cases, {summary['steps']} steps in {elapsed:.2f}s "
+      f"({summary['steps_per_s']:.0f} steps/s, {jobs} jobs), {summary['battles_finished']} battles finished"
+    )
+    for name, count in sorted(counts.items()):
+      print(f"  {name}: {count} failing cases")
+    for repro in summary["repros"]:
+      failure, case = repro["failure"], repro["case"]
+      print(f"\n[{failure['invariant']}] seed {repro['seed']}, step {failure['step']}: {failure['message']}")
+      print(f"  player={case['player']} enemy={case['enemy']} potions={case['potions']}")
+      print(f"  actions={[list(action) for action in case['actions']]}")
+  sys.exit(1 if counts else 0)
+
+
+if __name__ == "__main__":
+  main()
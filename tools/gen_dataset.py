@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Generate large synthetic monsters/moves/types datasets for stress runs.
+
+Records are produced from a seeded stream and written to disk in batches, so
+memory stays flat however many records are asked for, and the same seed and
+counts always give byte-identical files.  The output passes
+tools/validate_data.py: every element gets monsters and physical / magical /
+support moves, and types.json is the shipped 8-element chart.
+
+  python tools/gen_dataset.py build/synthetic --monsters 100000 --moves 1000000
+  python tools/validate_data.py --stream --data-dir build/synthetic
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+
+import validate_data  # noqa: E402
+from seeds import SeedStream, parse_seed  # noqa: E402
+
+DEFAULT_MONSTERS = 100_000
+DEFAULT_MOVES = 1_000_000
+MIN_MONSTERS = 12
+# Every (element, kind) pair, neutral included, before validate_data.py passes.
+MIN_MOVES = 27
+WRITE_BATCH = 4096
+
+# Inclusive ranges, roughly the spread of the shipped data.
+MONSTER_STATS: Dict[str, Tuple[int, int]] = {
+  "hp": (60, 140),
+  "st": (18, 40),
+  "atk": (8, 26),
+  "def": (6, 24),
+  "mag": (6, 26),
+  "spd": (4, 22),
+}
+MOVE_KINDS = ("physical", "magical", "support")
+
+
+def monster_records(count: int, type_ids: Sequence[str], stream: SeedStream) -> Iterator[dict]:
+  """Monsters cycling through the elements, so each type is used once ``count`` >= 8."""
+
+  rng = stream.random()
+  for index in range(count):
+    element = type_ids[index % len(type_ids)]
+    record = {"id": f"mon_{element}_{index:07d}", "name": f"モンスター{index}"}
+    for stat, (low, high) in MONSTER_STATS.items():
+      record[stat] = rng.randint(low, high)
+    record["type"] = element
+    yield record
+
+
+def move_records(count: int, type_ids: Sequence[str], stream: SeedStream) -> Iterator[dict]:
+  """Moves cycling through (element, kind) pairs, neutral included."""
+
+  rng = stream.random()
+  elements = ["neutral", *type_ids]
+  for index in range(count):
+    element = elements[index % len(elements)]
+    kind = MOVE_KINDS[index // len(elements) % len(MOVE_KINDS)]
+    support = kind == "support"
+    yield {
+      "id": f"{element}_move_{index:07d}",
+      "name": f"わざ{index}",
+      "type": kind,
+      "power": 0 if support else rng.randint(10, 60),
+      "stCost": rng.randint(0, 8) if support else rng.randint(4, 24),
+      "element": element,
+      "hits": 0 if support else rng.choice((1, 1, 1, 2, 3)),
+    }
+
+
+def write_records(path: Path, key: str, records: Iterable[dict]) -> int:
+  """Stream ``{"<key>": [...]}`` to ``path``, one record per line; returns the count."""
+
+  count = 0
+  with path.open("w", encoding="utf-8", newline="\n") as fh:
+    fh.write(f'{{\n  "{key}": [\n')
+    batch = []
+    for record in records:
+      batch.append("    " + json.dumps(record, ensure_ascii=False))
+      if len(batch) >= WRITE_BATCH:
+        fh.write((",\n" if count else "") + ",\n".join(batch))
+        count += len(batch)
+        batch.clear()
+    if batch:
+      fh.write((",\n" if count else "") + ",\n".join(batch))
+      count += len(batch)
+    fh.write("\n  ]\n}\n")
+  return count
+
+
+def generate(out_dir: Path, monsters: int, moves: int, seed: int) -> Dict[str, int]:
+  """Write the three datasets into ``out_dir``; returns records written per file."""
+
+  out_dir.mkdir(parents=True, exist_ok=True)
+  shutil.copyfile(validate_data.DATA_DIR / "types.json", out_dir / "types.json")
+  type_ids = validate_data.element_ids(validate_data.load_json(out_dir / "types.json"))
+  root = SeedStream(seed)
+  return {
+    "types.json": len(type_ids),
+    "monsters.json": write_records(out_dir / "monsters.json", "monsters", monster_records(monsters, type_ids, root.split("monsters"))),
+    "moves.json": write_records(out_dir / "moves.json", "moves", move_records(moves, type_ids, root.split("moves"))),
+  }
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Generate seeded synthetic datasets of any size.")
+  parser.add_argument("out_dir", type=Path, help="Directory to write monsters.json, moves.json and types.json into")
+  parser.add_argument("--monsters", type=int, default=DEFAULT_MONSTERS, help="Number of monsters")
+  parser.add_argument("--moves", type=int, default=DEFAULT_MOVES, help="Number of moves")
+  parser.add_argument("--seed", default="0", help="Seed (integer, hex, or any text)")
+  args = parser.parse_args()
+  if args.monsters < MIN_MONSTERS or args.moves < MIN_MOVES:
+    parser.error(f"output needs at least {MIN_MONSTERS} monsters and {MIN_MOVES} moves to pass validate_data.py")
+  if args.out_dir.resolve() == validate_data.DATA_DIR.resolve():
+    parser.error("refusing to overwrite the shipped data/ directory")
+  return args
+
+
+def main() -> None:
+  args = parse_args()
+  started = time.perf_counter()
+  counts = generate(args.out_dir, args.monsters, args.moves, parse_seed(args.seed))
+  seconds = time.perf_counter() - started
+  records = sum(counts.values())
+  for name, count in counts.items():
+    size = (args.out_dir / name).stat().st_size
+    print(f"{name}: {count} records, {size / 1e6:.1f} MB")
+  print(f"wrote {records} records in {seconds:.2f}s ({records / seconds:,.0f} records/s)")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Load generator for server.py: many concurrent scripted sessions over TCP."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+PROMPT = b"> "
+TITLE_MARKER = "=== タイトル画面 ==="
+RESULT_MARKER = "=== リザルト ==="
+
+
+def percentile(samples: List[float], pct: float) -> float:
+  if not samples:
+    return 0.0
+  ordered = sorted(samples)
+  index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+  return ordered[index]
+
+
+async def run_session(host: str, port: int, battles: int, rng: random.Random, latencies: List[float]) -> bool:
+  """Play ``battles`` battles, then quit from the title screen.
+
+  "1" is valid on every screen (start / attack / first swap target / back to
+  title), so the script mostly sends it and sometimes guards with "2" in
+  battle.
+  """
+
+  reader, writer = await asyncio.open_connection(host, port)
+  played = 0
+  try:
+    screen = (await reader.readuntil(PROMPT)).decode("utf-8")
+    while True:
+      if TITLE_MARKER in screen:
+        if played >= battles:
+          writer.write(b"2\n")
+          await writer.drain()
+          await reader.read()
+          return True
+        played += 1
+        command = b"1\n"
+      elif RESULT_MARKER in screen:
+        command = b"1\n"
+      else:
+        command = b"2\n" if rng.random() < 0.15 else b"1\n"
+      sent = time.perf_counter()
+      writer.write(command)
+      await writer.drain()
+      screen = (await reader.readuntil(PROMPT)).decode("utf-8")
+      latencies.append(time.perf_counter() - sent)
+  except (asyncio.IncompleteReadError, ConnectionError):
+    return False
+  finally:
+    writer.close()
+
+
+async def generate_load(args: argparse.Namespace) -> dict:
+  latencies: List[float] = []
+  rng = random.Random(args.seed)
+  semaphore = asyncio.Semaphore(args.concurrency)
+
+  async def one(index: int) -> bool:
+    async with semaphore:
+      return await run_session(args.host, args.port, args.battles, random.Random(rng.getrandbits(64) ^ index), latencies)
+
+  started = time.perf_counter()
+  results = await asyncio.gather(*(one(i) for i in range(args.sessions)))
+  elapsed = time.perf_counter() - started
+  return {
+    "sessions": args.sessions,
+    "concurrency": args.concurrency,
+    "failed_sessions": results.count(False),
+    "turns": len(latencies),
+    "seconds": elapsed,
+    "turns_per_second": len(latencies) / elapsed if elapsed else 0.0,
+    "p50_ms": percentile(latencies, 50) * 1000,
+    "p99_ms": percentile(latencies, 99) * 1000,
+    "max_ms": max(latencies, default=0.0) * 1000,
+  }
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+  proc = subprocess.Popen(
+    [sys.executable, str(REPO_ROOT / "server.py"), "--port", str(port), "--seed", "0"],
+    cwd=REPO_ROOT,
+    stdout=subprocess.PIPE,
+    text=True,
+  )
+  assert proc.stdout is not None
+  proc.stdout.readline()  # "listening on ..."
+  return proc
+
+
+def stop_server(proc: subprocess.Popen) -> dict:
+  proc.send_signal(signal.SIGINT)
+  out, _ = proc.communicate(timeout=30)
+  lines = [line for line in out.splitlines() if line.startswith("{")]
+  return json.loads(lines[-1]) if lines else {}
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Drive concurrent sessions against server.py and report latency.")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8765)
+  parser.add_argument("--sessions", type=int, default=1000, help="Total sessions to play")
+  parser.add_argument("--concurrency", type=int, default=1000, help="Sessions connected at the same time")
+  parser.add_argument("--battles", type=int, default=1, help="Battles per session")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--spawn", action="store_true", help="Start server.py locally and report its CPU usage")
+  parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+  return parser.parse_args()
+
+
+def main() -> None:
+  args = parse_args()
+  proc: Optional[subprocess.Popen] = spawn_server(args.port) if args.spawn else None
+  try:
+    report = asyncio.run(generate_load(args))
+  finally:
+    server_stats = stop_server(proc) if proc else {}
+
+  if server_stats:
+    cpu = server_stats.get("cpu_seconds", 0.0)
+    report["server"] = server_stats
+    # Concurrent sessions one fully busy server core could sustain at this pace.
+    report["sessions_per_core"] = args.concurrency * report["seconds"] / cpu if cpu else 0.0
+    report["turns_per_cpu_second"] = report["turns"] / cpu if cpu else 0.0
+
+  if args.json:
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return
+  print(f"sessions: {report['sessions']} (concurrency {report['concurrency']}, failed {report['failed_sessions']})")
+  print(f"turns: {report['turns']} in {report['seconds']:.2f}s ({report['turns_per_second']:.0f}/s)")
+  print(f"turn latency: p50 {report['p50_ms']:.2f} ms, p99 {report['p99_ms']:.2f} ms, max {report['max_ms']:.2f} ms")
+  if server_stats:
+    print(f"server CPU: {server_stats['cpu_seconds']:.2f}s, mean turn {server_stats['mean_turn_us']:.0f} us")
+    print(f"sessions per core: {report['sessions_per_core']:.0f}, turns per CPU second: {report['turns_per_cpu_second']:.0f}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Roster-wide matchup matrix with per-pairing memoization.
+
+Every 3-monster combination from data/monsters.json (in roster order, first
+member leads) plays every other one on the NumPy batch kernel
+(batch_engine.py).  Each cell is keyed by the content hashes of the six
+monsters involved plus the simulation settings, and cached in
+.cache/matchup_cache.bin; after a data edit only cells whose key changed
+are simulated again.  The full matrix is written as a compact binary file.
+
+Matrix layout (little endian)::
+
+  magic "MUM1", u16 version, u16 battles per cell, u32 monster count,
+  u32 party count, u32 roster JSON size, roster ids as UTF-8 JSON,
+  u8 x 3 roster indexes per party,
+  u16 player wins per cell, row-major [player party][enemy party]
+"""
+
+from __future__ import annotations
+
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+from itertools import combinations
+import json
+import os
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "tools"))
+
+import numpy as np  # noqa: E402
+
+import validate_data  # noqa: E402
+from data_registry import current_data  # noqa: E402
+from batch_engine import WINNER_DRAW, WINNER_PLAYER, BatchBattle  # noqa: E402
+from damage_tables import monster_combatant  # noqa: E402
+from game import (  # noqa: E402
+  ATTACK_ST_COST,
+  BACKLINE_ST_REGEN,
+  DEFEND_ST_REFUND,
+  MIN_ACTION_ST,
+  VOLUNTARY_SWAP_COST,
+  default_inventory,
+  load_items,
+)
+from simulation import DEFAULT_MAX_TURNS  # noqa: E402
+
+MATRIX_PATH = REPO_ROOT / ".cache" / "matchup_matrix.bin"
+CACHE_PATH = REPO_ROOT / ".cache" / "matchup_cache.bin"
+MATRIX_MAGIC = b"MUM1"
+CACHE_MAGIC = b"MUC1"
+VERSION = 1
+MATRIX_HEADER = struct.Struct("<4sHHIII")
+CACHE_HEADER = struct.Struct("<4sHHI")
+
+PARTY_SIZE = 3
+# Fields of a monster record that affect a battle; renames keep their cells.
+BATTLE_FIELDS = ("hp", "st", "atk", "def", "mag", "type")
+# Cells simulated per kernel call.
+CHUNK_CELLS = 8192
+
+Cache = Dict[int, Tuple[int, int]]  # cell key -> (player wins, draws)
+
+
+# --- Keys -------------------------------------------------------------------
+
+
+def monster_digest(record: dict) -> bytes:
+  payload = json.dumps({name: record[name] for name in BATTLE_FIELDS}, sort_keys=True)
+  return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).digest()
+
+
+def settings_digest(args: argparse.Namespace) -> bytes:
+  items = load_items()
+  settings = {
+    "rules": [ATTACK_ST_COST, BACKLINE_ST_REGEN, DEFEND_ST_REFUND, MIN_ACTION_ST, VOLUNTARY_SWAP_COST],
+    "potions": args.potions,
+    "heal": items["potion_small"].heal_amount,
+    "elements": list(current_data().element_chart.half_steps),
+    "battles": args.battles,
+    "policy": args.policy,
+    "seed": args.seed,
+    "max_turns": args.max_turns,
+  }
+  return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode("utf-8"), digest_size=8).digest()
+
+
+def cell_key(settings: bytes, player: Sequence[bytes], enemy: Sequence[bytes]) -> int:
+  digest = hashlib.blake2b(settings + b"".join(player) + b"|" + b"".join(enemy), digest_size=8).digest()
+  return int.from_bytes(digest, "little")
+
+
+# --- Cache ------------------------------------------------------------------
+
+
+def load_cache(path: Path) -> Cache:
+  if not path.exists():
+    return {}
+  data = path.read_bytes()
+  if len(data) < CACHE_HEADER.size:
+    return {}
+  magic, version, _, count = CACHE_HEADER.unpack_from(data, 0)
+  if magic != CACHE_MAGIC or version != VERSION or len(data) != CACHE_HEADER.size + 12 * count:
+    return {}
+  pos = CACHE_HEADER.size
+  keys = array("Q", data[pos:pos + 8 * count])
+  pos += 8 * count
+  results = array("H", data[pos:pos + 4 * count])
+  return {key: (results[2 * i], results[2 * i + 1]) for i, key in enumerate(keys)}
+
+
+def write_atomic(path: Path, payload: bytes) -> None:
+  path.parent.mkdir(parents=True, exist_ok=True)
+  tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+  tmp_path.write_bytes(payload)
+  os.replace(tmp_path, path)
+
+
+def save_cache(path: Path, cache: Cache, keep: Sequence[int]) -> None:
+  """Store the entries for ``keep`` (the current matrix); stale cells are dropped."""
+
+  keys = array("Q", keep)
+  results = array("H")
+  for key in keep:
+    results.extend(cache[key])
+  write_atomic(path, CACHE_HEADER.pack(CACHE_MAGIC, VERSION, 0, len(keys)) + keys.tobytes() + results.tobytes())
+
+
+# --- Simulation -------------------------------------------------------------
+
+
+def simulate_cells(
+  roster: Sequence,
+  parties: np.ndarray,
+  cells: Sequence[Tuple[int, int, int]],
+  args: argparse.Namespace,
+) -> List[Tuple[int, int]]:
+  """(player wins, draws) for each ``(player party, enemy party, key)`` cell."""
+
+  battles = args.battles
+  player = np.repeat(parties[[cell[0] for cell in cells]], battles, axis=0)
+  enemy = np.repeat(parties[[cell[1] for cell in cells]], battles, axis=0)
+  # Each battle's command stream depends only on its cell, never on batching.
+  keys = np.array([cell[2] for cell in cells], dtype=np.uint64)
+  streams = np.repeat(keys, battles) + np.tile(np.arange(battles, dtype=np.uint64), len(cells))
+  batch = BatchBattle.from_lineups(roster, player, enemy, args.potions, streams)
+  batch.run(args.policy, args.seed, args.max_turns)
+  winner = batch.winner.reshape(len(cells), battles)
+  wins = (winner == WINNER_PLAYER).sum(axis=1)
+  draws = (winner == WINNER_DRAW).sum(axis=1)
+  return list(zip(wins.tolist(), draws.tolist()))
+
+
+def build_matrix(args: argparse.Namespace) -> dict:
+  monsters = validate_data.load_json(args.data_dir / "monsters.json")["monsters"]
+  roster = [monster_combatant(record) for record in monsters]
+  digests = [monster_digest(record) for record in monsters]
+  parties = np.array(list(combinations(range(len(monsters)), PARTY_SIZE)), dtype=np.intp)
+  settings = settings_digest(args)
+
+  started = time.perf_counter()
+  cache = {} if args.rebuild else load_cache(args.cache)
+  party_digests = [[digests[idx] for idx in party] for party in parties.tolist()]
+  keys: List[int] = []
+  missing: List[Tuple[int, int, int]] = []
+  for p, player in enumerate(party_digests):
+    for e, enemy in enumerate(party_digests):
+      key = cell_key(settings, player, enemy)
+      keys.append(key)
+      if key not in cache:
+        missing.append((p, e, key))
+  hashed = time.perf_counter()
+
+  chunks = [missing[start:start + CHUNK_CELLS] for start in range(0, len(missing), CHUNK_CELLS)]
+  if args.jobs > 1 and len(chunks) > 1:
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+      results = list(pool.map(simulate_cells, *zip(*((roster, parties, chunk, args) for chunk in chunks))))
+  else:
+    results = [simulate_cells(roster, parties, chunk, args) for chunk in chunks]
+  for chunk, chunk_results in zip(chunks, results):
+    for cell, result in zip(chunk, chunk_results):
+      cache[cell[2]] = result
+  simulated = time.perf_counter()
+
+  wins = array("H", (cache[key][0] for key in keys))
+  roster_ids = json.dumps([record["id"] for record in monsters]).encode("utf-8")
+  write_atomic(
+    args.output,
+    MATRIX_HEADER.pack(MATRIX_MAGIC, VERSION, args.battles, len(monsters), len(parties), len(roster_ids))
+    + roster_ids
+    + parties.astype(np.uint8).tobytes()
+    + wins.tobytes(),
+  )
+  save_cache(args.cache, cache, keys)
+  return {
+    "monsters": len(monsters),
+    "parties": len(parties),
+    "cells": len(keys),
+    "recomputed_cells": len(missing),
+    "battles": len(missing) * args.battles,
+    "hash_seconds": hashed - started,
+    "simulate_seconds": simulated - hashed,
+    "total_seconds": time.perf_counter() - started,
+    "output": str(args.output),
+    "monster_win_rates": monster_win_rates(monsters, parties, wins, args.battles),
+  }
+
+
+def monster_win_rates(monsters: List[dict], parties: np.ndarray, wins: array, battles: int) -> Dict[str, float]:
+  """Mean win rate of the parties each monster appears in."""
+
+  count = len(parties)
+  party_rates = np.frombuffer(wins, dtype=np.uint16).reshape(count, count).mean(axis=1) / battles
+  rates = {}
+  for idx, record in enumerate(monsters):
+    rates[record["id"]] = float(party_rates[(parties == idx).any(axis=1)].mean())
+  return rates
+
+
+def parse_args() -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Win rates for every 3-monster party against every other.")
+  parser.add_argument("--data-dir", type=Path, default=validate_data.DATA_DIR, help="Directory holding monsters.json")
+  parser.add_argument("--output", type=Path, default=MATRIX_PATH, help="Matrix file to write")
+  parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Per-cell result cache")
+  parser.add_argument("--rebuild", action="store_true", help="Ignore the cache and simulate every cell")
+  parser.add_argument("--battles", type=int, default=8, help="Battles per cell")
+  parser.add_argument("--policy", choices=["attack", "random"], default="random", help="Player policy (batch_engine)")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--max-turns", type=int, default=DEFAULT_MAX_TURNS)
+  parser.add_argument("--potions", type=int, default=default_inventory().get("potion_small", 0))
+  parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes for simulation")
+  parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+  return parser.parse_args()
+
+
+def main() -> None:
+  args = parse_args()
+  if not 0 < args.battles < 1 << 16:
+    sys.exit("--battles must be between 1 and 65535")
+  report = build_matrix(args)
+  if args.json:
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return
+  print(
+    f"{report['parties']} parties, {report['cells']} cells: recomputed {report['recomputed_cells']} "
+    f"({report['battles']} battles) in {report['total_seconds']:.2f}s -> {report['output']}"
+  )
+  ranked = sorted(report["monster_win_rates"].items(), key=lambda item: item[1], reverse=True)
+  for monster_id, rate in ranked:
+    print(f"  {monster_id:24} {rate:6.1%}")
+
+
+if __name__ == "__main__":
+  main()
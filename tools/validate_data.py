@@ -4,11 +4,17 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
+import multiprocessing
+import os
 import sys
+import threading
+import time
 from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List, Sequence
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = REPO_ROOT / "data"
@@ -17,6 +23,18 @@ MONSTER_KEYS = ["id", "name", "hp", "st", "atk", "def", "mag", "spd", "type"]
 MOVE_KEYS = ["id", "name", "type", "power", "stCost", "element", "hits"]
 MOVE_TYPES = {"physical", "magical", "support"}
 
+CACHE_PATH = REPO_ROOT / ".cache" / "validate_data.json"
+CACHE_VERSION = 1
+# Cached results are only reused by the exact validator code that produced them.
+VALIDATOR_DIGEST = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+# Per-record checks only fan out to worker processes for datasets this large.
+PARALLEL_MIN_RECORDS = 20_000
+RECORD_CHUNK_SIZE = 5_000
+# Streaming mode (--stream): read size, largest single record, errors kept.
+STREAM_CHUNK_SIZE = 1 << 16
+MAX_RECORD_CHARS = 1 << 20
+MAX_STREAM_ERRORS = 100
+
 
 def load_json(path: Path) -> dict:
   with path.open(encoding="utf-8") as fh:
@@ -28,96 +46,238 @@ def require(condition: bool, message: str, errors: List[str]) -> None:
     errors.append(message)
 
 
-def validate_monsters(type_ids: Sequence[str]) -> List[str]:
-  data = load_json(DATA_DIR / "monsters.json")
-  monsters = data.get("monsters", [])
-  errors: List[str] = []
+def element_ids(types_data: dict) -> List[str]:
+  return [element["id"] for element in types_data.get("elements", [])]
 
-  require(len(monsters) >= 12, f"monsters.json must contain at least 12 entries (found {len(monsters)})", errors)
 
-  type_usage = set()
-  for idx, monster in enumerate(monsters):
-    prefix = f"monsters[{idx}]"
-    keys = list(monster.keys())
-    require(keys == MONSTER_KEYS, f"{prefix} keys must match {MONSTER_KEYS}", errors)
-
-    for stat in ("hp", "st", "atk", "def", "mag", "spd"):
-      value = monster.get(stat)
-      require(isinstance(value, int), f"{prefix}.{stat} must be an integer", errors)
-      if stat in ("hp", "st"):
-        require(value is not None and value > 0, f"{prefix}.{stat} must be > 0", errors)
-      else:
-        require(value is not None and value >= 0, f"{prefix}.{stat} must be >= 0", errors)
+# --- Shared context ---------------------------------------------------------
 
-    monster_type = monster.get("type")
-    require(isinstance(monster_type, str) and monster_type, f"{prefix}.type must be a non-empty string", errors)
-    if isinstance(monster_type, str):
-      require(monster_type in type_ids, f"{prefix}.type '{monster_type}' must exist in types.json", errors)
-      type_usage.add(monster_type)
 
-    require(isinstance(monster.get("id"), str) and monster["id"], f"{prefix}.id must be a non-empty string", errors)
-    require(isinstance(monster.get("name"), str) and monster["name"], f"{prefix}.name must be a non-empty string", errors)
+class ValidationContext:
+  """Reads, hashes and parses each data file at most once per run."""
 
-  missing_types = sorted(set(type_ids) - type_usage)
-  require(not missing_types, f"monsters.json is missing entries for types: {', '.join(missing_types)}", errors)
-  return errors
+  def __init__(self, data_dir: Path = DATA_DIR) -> None:
+    self.data_dir = data_dir
+    self._raw: Dict[str, bytes] = {}
+    self._parsed: Dict[str, dict] = {}
+    self._lock = threading.Lock()
 
+  def raw(self, name: str) -> bytes:
+    with self._lock:
+      if name not in self._raw:
+        self._raw[name] = (self.data_dir / name).read_bytes()
+      return self._raw[name]
 
-def validate_moves(type_ids: Sequence[str]) -> List[str]:
-  data = load_json(DATA_DIR / "moves.json")
-  moves = data.get("moves", [])
+  def digest(self, name: str) -> str:
+    return hashlib.sha256(self.raw(name)).hexdigest()
+
+  def document(self, name: str) -> dict:
+    raw = self.raw(name)
+    with self._lock:
+      if name not in self._parsed:
+        self._parsed[name] = json.loads(raw)
+      return self._parsed[name]
+
+  def type_ids(self) -> List[str]:
+    return element_ids(self.document("types.json"))
+
+
+# --- Per-record checks ------------------------------------------------------
+
+
+RecordResult = Tuple[List[str], Optional[Tuple[str, ...]]]
+
+
+def check_monster(idx: int, monster: dict, type_ids: Sequence[str]) -> RecordResult:
+  """Return the record's errors and the type it contributes to coverage."""
+
+  prefix = f"monsters[{idx}]"
   errors: List[str] = []
+  used = None
+  keys = list(monster.keys())
+  require(keys == MONSTER_KEYS, f"{prefix} keys must match {MONSTER_KEYS}", errors)
+
+  for stat in ("hp", "st", "atk", "def", "mag", "spd"):
+    value = monster.get(stat)
+    require(isinstance(value, int), f"{prefix}.{stat} must be an integer", errors)
+    if stat in ("hp", "st"):
+      require(value is not None and value > 0, f"{prefix}.{stat} must be > 0", errors)
+    else:
+      require(value is not None and value >= 0, f"{prefix}.{stat} must be >= 0", errors)
 
-  require(len(moves) >= 24, f"moves.json must contain at least 24 entries (found {len(moves)})", errors)
+  monster_type = monster.get("type")
+  require(isinstance(monster_type, str) and monster_type, f"{prefix}.type must be a non-empty string", errors)
+  if isinstance(monster_type, str):
+    require(monster_type in type_ids, f"{prefix}.type '{monster_type}' must exist in types.json", errors)
+    used = (monster_type,)
+
+  require(isinstance(monster.get("id"), str) and monster["id"], f"{prefix}.id must be a non-empty string", errors)
+  require(isinstance(monster.get("name"), str) and monster["name"], f"{prefix}.name must be a non-empty string", errors)
+  return errors, used
 
-  coverage = defaultdict(set)
 
-  for idx, move in enumerate(moves):
-    prefix = f"moves[{idx}]"
-    keys = list(move.keys())
-    require(keys == MOVE_KEYS, f"{prefix} keys must match {MOVE_KEYS}", errors)
+def check_move(idx: int, move: dict, type_ids: Sequence[str]) -> RecordResult:
+  """Return the record's errors and the (element, type) pair it covers."""
+
+  prefix = f"moves[{idx}]"
+  errors: List[str] = []
+  covered = None
+  keys = list(move.keys())
+  require(keys == MOVE_KEYS, f"{prefix} keys must match {MOVE_KEYS}", errors)
 
-    move_type = move.get("type")
-    require(move_type in MOVE_TYPES, f"{prefix}.type must be one of {sorted(MOVE_TYPES)}", errors)
+  move_type = move.get("type")
+  require(move_type in MOVE_TYPES, f"{prefix}.type must be one of {sorted(MOVE_TYPES)}", errors)
 
-    power = move.get("power")
-    require(isinstance(power, int), f"{prefix}.power must be an integer", errors)
-    if move_type == "support":
-      require(power == 0, f"{prefix}.power must be 0 for support moves", errors)
+  power = move.get("power")
+  require(isinstance(power, int), f"{prefix}.power must be an integer", errors)
+  if move_type == "support":
+    require(power == 0, f"{prefix}.power must be 0 for support moves", errors)
+  else:
+    require(power is not None and 0 < power <= 120, f"{prefix}.power must be between 1 and 120", errors)
+
+  st_cost = move.get("stCost")
+  require(isinstance(st_cost, int) and st_cost >= 0, f"{prefix}.stCost must be an integer >= 0", errors)
+
+  hits = move.get("hits")
+  require(isinstance(hits, int), f"{prefix}.hits must be an integer", errors)
+  if move_type == "support":
+    require(hits == 0, f"{prefix}.hits must be 0 for support moves", errors)
+  else:
+    require(1 <= hits <= 3, f"{prefix}.hits must be between 1 and 3 for offensive moves", errors)
+
+  element = move.get("element")
+  require(isinstance(element, str) and element, f"{prefix}.element must be a non-empty string", errors)
+  if isinstance(element, str):
+    if element == "neutral":
+      pass
     else:
-      require(power is not None and 0 < power <= 120, f"{prefix}.power must be between 1 and 120", errors)
+      require(element in type_ids, f"{prefix}.element '{element}' must exist in types.json", errors)
+      covered = (element, move_type)
+
+  require(isinstance(move.get("id"), str) and move["id"], f"{prefix}.id must be a non-empty string", errors)
+  require(isinstance(move.get("name"), str) and move["name"], f"{prefix}.name must be a non-empty string", errors)
+  return errors, covered
+
+
+RECORD_CHECKS: Dict[str, Callable[[int, dict, Sequence[str]], RecordResult]] = {
+  "monsters": check_monster,
+  "moves": check_move,
+}
+
+
+def check_chunk(kind: str, start: int, records: Sequence[dict], type_ids: Sequence[str]) -> List[RecordResult]:
+  check = RECORD_CHECKS[kind]
+  return [check(start + offset, record, type_ids) for offset, record in enumerate(records)]
+
 
-    st_cost = move.get("stCost")
-    require(isinstance(st_cost, int) and st_cost >= 0, f"{prefix}.stCost must be an integer >= 0", errors)
+# Records published before the worker pool forks; workers read them from
+# their inherited memory so only index ranges cross the process boundary.
+_SHARED_RECORDS: Dict[str, Sequence[dict]] = {}
 
-    hits = move.get("hits")
-    require(isinstance(hits, int), f"{prefix}.hits must be an integer", errors)
-    if move_type == "support":
-      require(hits == 0, f"{prefix}.hits must be 0 for support moves", errors)
+
+def check_range(kind: str, start: int, stop: int, type_ids: Sequence[str]) -> List[RecordResult]:
+  return check_chunk(kind, start, _SHARED_RECORDS[kind][start:stop], type_ids)
+
+
+def check_records(
+  kind: str,
+  records: Sequence[dict],
+  type_ids: Sequence[str],
+  pool: Optional[Executor] = None,
+) -> List[RecordResult]:
+  """Run the per-record checks, split across ``pool`` for large datasets.
+
+  Results come back in record order, so error output does not depend on the
+  number of workers.
+  """
+
+  if pool is None or len(records) < PARALLEL_MIN_RECORDS:
+    return check_chunk(kind, 0, records, type_ids)
+  shared = _SHARED_RECORDS.get(kind) is records
+  futures = []
+  for start in range(0, len(records), RECORD_CHUNK_SIZE):
+    stop = min(start + RECORD_CHUNK_SIZE, len(records))
+    if shared:
+      futures.append(pool.submit(check_range, kind, start, stop, type_ids))
     else:
-      require(1 <= hits <= 3, f"{prefix}.hits must be between 1 and 3 for offensive moves", errors)
+      futures.append(pool.submit(check_chunk, kind, start, records[start:stop], type_ids))
+  results: List[RecordResult] = []
+  for future in futures:
+    results.extend(future.result())
+  return results
 
-    element = move.get("element")
-    require(isinstance(element, str) and element, f"{prefix}.element must be a non-empty string", errors)
-    if isinstance(element, str):
-      if element == "neutral":
-        pass
-      else:
-        require(element in type_ids, f"{prefix}.element '{element}' must exist in types.json", errors)
-        coverage[element].add(move_type)
 
-    require(isinstance(move.get("id"), str) and move["id"], f"{prefix}.id must be a non-empty string", errors)
-    require(isinstance(move.get("name"), str) and move["name"], f"{prefix}.name must be a non-empty string", errors)
+# --- Dataset validators -----------------------------------------------------
 
+
+def summarize_monsters(results: Iterable[RecordResult], type_ids: Sequence[str], errors: List[str]) -> int:
+  """Fold per-record results into ``errors``; returns the record count."""
+
+  count = 0
+  type_usage = set()
+  for record_errors, used in results:
+    count += 1
+    errors.extend(record_errors)
+    if used is not None:
+      type_usage.add(used[0])
+
+  header: List[str] = []
+  require(count >= 12, f"monsters.json must contain at least 12 entries (found {count})", header)
+  errors[0:0] = header
+  missing_types = sorted(set(type_ids) - type_usage)
+  require(not missing_types, f"monsters.json is missing entries for types: {', '.join(missing_types)}", errors)
+  return count
+
+
+def summarize_moves(results: Iterable[RecordResult], type_ids: Sequence[str], errors: List[str]) -> int:
+  """Fold per-record results into ``errors``; returns the record count."""
+
+  count = 0
+  coverage = defaultdict(set)
+  for record_errors, covered in results:
+    count += 1
+    errors.extend(record_errors)
+    if covered is not None:
+      coverage[covered[0]].add(covered[1])
+
+  header: List[str] = []
+  require(count >= 24, f"moves.json must contain at least 24 entries (found {count})", header)
+  errors[0:0] = header
   for element in type_ids:
     missing = sorted(MOVE_TYPES - coverage[element])
     require(not missing, f"moves.json is missing {', '.join(missing)} move(s) for element '{element}'", errors)
+  return count
+
 
+def validate_monsters(
+  type_ids: Sequence[str],
+  data: Optional[dict] = None,
+  pool: Optional[Executor] = None,
+) -> List[str]:
+  if data is None:
+    data = load_json(DATA_DIR / "monsters.json")
+  monsters = data.get("monsters", [])
+  errors: List[str] = []
+  summarize_monsters(check_records("monsters", monsters, type_ids, pool), type_ids, errors)
+  return errors
+
+
+def validate_moves(
+  type_ids: Sequence[str],
+  data: Optional[dict] = None,
+  pool: Optional[Executor] = None,
+) -> List[str]:
+  if data is None:
+    data = load_json(DATA_DIR / "moves.json")
+  moves = data.get("moves", [])
+  errors: List[str] = []
+  summarize_moves(check_records("moves", moves, type_ids, pool), type_ids, errors)
   return errors
 
 
-def validate_types() -> List[str]:
-  data = load_json(DATA_DIR / "types.json")
+def validate_types(data: Optional[dict] = None) -> List[str]:
+  if data is None:
+    data = load_json(DATA_DIR / "types.json")
   elements = data.get("elements", [])
   errors: List[str] = []
 
@@ -149,13 +309,343 @@ def validate_types() -> List[str]:
   return errors
 
 
+# --- Streaming --------------------------------------------------------------
+
+
+NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class StreamError(ValueError):
+  """Raised when a streamed file is not the expected JSON shape."""
+
+
+class JSONStream:
+  """Incremental reader over one JSON document.
+
+  Only the unread tail of the current chunk is buffered; values are decoded
+  with ``json.JSONDecoder.raw_decode`` as soon as they are complete.
+  """
+
+  def __init__(self, fh: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> None:
+    self.fh = fh
+    self.chunk_size = chunk_size
+    self.decoder = json.JSONDecoder()
+    self.buffer = ""
+    self.pos = 0
+    self.consumed = 0
+    self.eof = False
+
+  @property
+  def offset(self) -> int:
+    return self.consumed + self.pos
+
+  def fill(self) -> bool:
+    if self.eof:
+      return False
+    chunk = self.fh.read(self.chunk_size)
+    if not chunk:
+      self.eof = True
+      return False
+    self.consumed += self.pos
+    self.buffer = self.buffer[self.pos:] + chunk
+    self.pos = 0
+    return True
+
+  def peek(self) -> str:
+    """Next non-whitespace character ('' at the end of the file)."""
+
+    while True:
+      buffer, pos = self.buffer, self.pos
+      while pos < len(buffer) and buffer[pos] in " \t\r\n":
+        pos += 1
+      self.pos = pos
+      if pos < len(buffer):
+        return buffer[pos]
+      if not self.fill():
+        return ""
+
+  def expect(self, char: str) -> None:
+    if self.peek() != char:
+      raise StreamError(f"expected {char!r} at offset {self.offset}")
+    self.pos += 1
+
+  def value(self, limit: Optional[int] = None) -> object:
+    """Decode the next value, reading more while it is incomplete.
+
+    ``limit`` caps how far the buffer may grow while the value is still
+    incomplete, which bounds memory for oversized or unterminated records.
+    """
+
+    self.peek()
+    while True:
+      try:
+        value, end = self.decoder.raw_decode(self.buffer, self.pos)
+      except json.JSONDecodeError as exc:
+        if limit is not None and len(self.buffer) - self.pos > limit:
+          raise StreamError(f"value at offset {self.offset} is larger than {limit} characters") from None
+        if not self.fill():
+          raise StreamError(f"{exc.msg} at offset {self.offset}") from None
+        continue
+      # A number cut by the chunk boundary ("1." + "0") decodes early; read on.
+      if type(value) in (int, float) and (end == len(self.buffer) or self.buffer[end] in NUMBER_CHARS):
+        if self.fill():
+          continue
+      self.pos = end
+      return value
+
+
+def iter_records(
+  path: Path,
+  key: str,
+  chunk_size: int = STREAM_CHUNK_SIZE,
+  max_record_chars: int = MAX_RECORD_CHARS,
+) -> Iterator[dict]:
+  """Yield the records of ``{"<key>": [...]}`` in ``path`` one at a time.
+
+  Other top-level values are decoded whole and skipped.  A missing ``key``
+  yields nothing, like ``data.get(key, [])``.
+  """
+
+  with path.open(encoding="utf-8") as fh:
+    stream = JSONStream(fh, chunk_size)
+    stream.expect("{")
+    if stream.peek() == "}":
+      return
+    while True:
+      name = stream.value()
+      if not isinstance(name, str):
+        raise StreamError(f"{path.name}: object keys must be strings (offset {stream.offset})")
+      stream.expect(":")
+      if name != key:
+        stream.value()
+      else:
+        stream.expect("[")
+        if stream.peek() == "]":
+          stream.pos += 1
+        else:
+          while True:
+            yield stream.value(max_record_chars)
+            if stream.peek() == "]":
+              stream.pos += 1
+              break
+            stream.expect(",")
+      if stream.peek() == "}":
+        return
+      stream.expect(",")
+
+
+class ErrorLog(list):
+  """Error list that keeps the first ``limit`` messages and counts the rest."""
+
+  def __init__(self, limit: int) -> None:
+    super().__init__()
+    self.limit = limit
+    self.dropped = 0
+
+  def append(self, message: str) -> None:
+    if len(self) < self.limit:
+      super().append(message)
+    else:
+      self.dropped += 1
+
+  def extend(self, messages: Iterable[str]) -> None:
+    for message in messages:
+      self.append(message)
+
+  def messages(self) -> List[str]:
+    tail = [f"... {self.dropped} more error(s) not shown"] if self.dropped else []
+    return list(self) + tail
+
+
+RECORD_SUMMARIES: Dict[str, Callable[[Iterable[RecordResult], Sequence[str], List[str]], int]] = {
+  "monsters": summarize_monsters,
+  "moves": summarize_moves,
+}
+
+
+def stream_validator(target: str, data_dir: Path, type_ids: Sequence[str], max_errors: int) -> Tuple[List[str], int]:
+  """Validate one record dataset without loading it; returns (errors, record count)."""
+
+  check = RECORD_CHECKS[target]
+  errors = ErrorLog(max_errors)
+  results = (check(idx, record, type_ids) for idx, record in enumerate(iter_records(data_dir / f"{target}.json", target)))
+  try:
+    count = RECORD_SUMMARIES[target](results, type_ids, errors)
+  except StreamError as exc:
+    return errors.messages() + [f"{target}.json: {exc}"], 0
+  return errors.messages(), count
+
+
+def validate_stream(
+  selected: Sequence[str],
+  data_dir: Path = DATA_DIR,
+  max_errors: int = MAX_STREAM_ERRORS,
+) -> Dict[str, object]:
+  """Like :func:`validate`, but monsters/moves are checked record by record.
+
+  Memory stays bounded by the read chunk, the largest record and
+  ``max_errors``, so multi-million record files can be checked.  Each
+  dataset reports its throughput in records per second.
+  """
+
+  started = time.perf_counter()
+  types_data = load_json(data_dir / "types.json")
+  type_ids = element_ids(types_data)
+  datasets: Dict[str, dict] = {}
+  for target in selected:
+    t0 = time.perf_counter()
+    if target == "types":
+      errors, records = validate_types(types_data), len(types_data.get("elements", []))
+    else:
+      errors, records = stream_validator(target, data_dir, type_ids, max_errors)
+    seconds = time.perf_counter() - t0
+    datasets[target] = {
+      "records": records,
+      "errors": errors,
+      "seconds": round(seconds, 6),
+      "records_per_s": round(records / seconds, 1) if seconds else 0.0,
+      "status": "failed" if errors else "passed",
+    }
+  seconds = time.perf_counter() - started
+  records = sum(result["records"] for result in datasets.values())
+  return {
+    "ok": not any(result["errors"] for result in datasets.values()),
+    "mode": "stream",
+    "datasets": datasets,
+    "records": records,
+    "records_per_s": round(records / seconds, 1) if seconds else 0.0,
+    "seconds": round(seconds, 6),
+  }
+
+
+# --- Runner -----------------------------------------------------------------
+
+
+# Dataset name -> files whose content decides its result.
+DATASET_INPUTS: Dict[str, Tuple[str, ...]] = {
+  "types": ("types.json",),
+  "monsters": ("monsters.json", "types.json"),
+  "moves": ("moves.json", "types.json"),
+}
+
+
+def run_validator(target: str, ctx: ValidationContext, pool: Optional[Executor]) -> Tuple[List[str], int]:
+  """Validate one dataset from the shared context; returns (errors, record count)."""
+
+  if target == "types":
+    data = ctx.document("types.json")
+    return validate_types(data), len(data.get("elements", []))
+  if target == "monsters":
+    data = ctx.document("monsters.json")
+    return validate_monsters(ctx.type_ids(), data, pool), len(data.get("monsters", []))
+  data = ctx.document("moves.json")
+  return validate_moves(ctx.type_ids(), data, pool), len(data.get("moves", []))
+
+
+def load_cache(path: Path) -> Dict[str, dict]:
+  try:
+    cache = load_json(path)
+  except (OSError, ValueError):
+    return {}
+  if cache.get("version") != CACHE_VERSION or cache.get("validator") != VALIDATOR_DIGEST:
+    return {}
+  return cache.get("datasets", {})
+
+
+def save_cache(path: Path, datasets: Dict[str, dict]) -> None:
+  path.parent.mkdir(parents=True, exist_ok=True)
+  tmp_path = path.with_name(f"{path.name}.tmp")
+  tmp_path.write_text(json.dumps({"version": CACHE_VERSION, "validator": VALIDATOR_DIGEST, "datasets": datasets}, indent=2), encoding="utf-8")
+  os.replace(tmp_path, path)
+
+
+def validate(
+  selected: Sequence[str],
+  ctx: ValidationContext,
+  jobs: int = 1,
+  cache_path: Optional[Path] = None,
+) -> Dict[str, object]:
+  """Validate ``selected`` datasets and return a JSON-serialisable report.
+
+  With ``cache_path`` set, a dataset whose input files hash the same as in
+  the cache reuses the cached result instead of being parsed again.
+  """
+
+  started = time.perf_counter()
+  cache = load_cache(cache_path) if cache_path else {}
+  results: Dict[str, dict] = {}
+  pending = []
+  for target in selected:
+    inputs = {name: ctx.digest(name) for name in DATASET_INPUTS[target]}
+    cached = cache.get(target)
+    if cached is not None and cached.get("inputs") == inputs:
+      results[target] = dict(cached, cached=True, seconds=0.0)
+    else:
+      pending.append((target, inputs))
+
+  def run(target: str, inputs: Dict[str, str], pool: Optional[Executor]) -> dict:
+    t0 = time.perf_counter()
+    errors, records = run_validator(target, ctx, pool)
+    return {
+      "inputs": inputs,
+      "records": records,
+      "errors": errors,
+      "cached": False,
+      "seconds": round(time.perf_counter() - t0, 6),
+    }
+
+  if jobs > 1 and len(pending) > 0:
+    for target, _ in pending:
+      ctx.document(DATASET_INPUTS[target][0])
+    if "fork" in multiprocessing.get_all_start_methods():
+      mp_context = multiprocessing.get_context("fork")
+      _SHARED_RECORDS.update(
+        (target, ctx.document(f"{target}.json").get(target, [])) for target in RECORD_CHECKS if target in dict(pending)
+      )
+    else:
+      mp_context = None
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as pool, \
+        ThreadPoolExecutor(max_workers=len(pending)) as threads:
+      futures = {target: threads.submit(run, target, inputs, pool) for target, inputs in pending}
+      for target, future in futures.items():
+        results[target] = future.result()
+    _SHARED_RECORDS.clear()
+  else:
+    for target, inputs in pending:
+      results[target] = run(target, inputs, None)
+
+  if cache_path:
+    cache.update({target: {k: v for k, v in result.items() if k in ("inputs", "records", "errors")}
+                  for target, result in results.items()})
+    save_cache(cache_path, cache)
+
+  datasets = {target: results[target] for target in selected}
+  for result in datasets.values():
+    result["status"] = "failed" if result["errors"] else "passed"
+  return {
+    "ok": not any(result["errors"] for result in datasets.values()),
+    "datasets": datasets,
+    "seconds": round(time.perf_counter() - started, 6),
+  }
+
+
 def parse_args() -> argparse.Namespace:
   parser = argparse.ArgumentParser(description="Validate monsters, moves, and type datasets.")
   parser.add_argument("--monsters", action="store_true", help="Validate data/monsters.json")
   parser.add_argument("--moves", action="store_true", help="Validate data/moves.json")
   parser.add_argument("--types", action="store_true", help="Validate data/types.json")
   parser.add_argument("--all", action="store_true", help="Validate all datasets (default)")
-  return parser.parse_args()
+  parser.add_argument("--incremental", action="store_true", help="Skip datasets whose files are unchanged since the last run")
+  parser.add_argument("--cache", type=Path, default=CACHE_PATH, help="Result cache used by --incremental")
+  parser.add_argument("--jobs", type=int, default=1, help="Validate datasets and large record sets in parallel")
+  parser.add_argument("--report", metavar="PATH", help="Write a JSON report to PATH ('-' for stdout)")
+  parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="Directory holding the JSON datasets")
+  parser.add_argument("--stream", action="store_true", help="Check records incrementally with bounded memory and report records/s")
+  parser.add_argument("--max-errors", type=int, default=MAX_STREAM_ERRORS, help="Errors kept per dataset in --stream mode")
+  args = parser.parse_args()
+  if args.stream and (args.incremental or args.jobs > 1):
+    parser.error("--stream cannot be combined with --incremental or --jobs")
+  return args
 
 
 def main() -> None:
@@ -171,28 +661,35 @@ def main() -> None:
     if args.moves:
       selected.append("moves")
 
-  type_ids: Iterable[str]
-  types_data = load_json(DATA_DIR / "types.json")
-  type_ids = [element["id"] for element in types_data.get("elements", [])]
-
-  errors: List[str] = []
-  for target in selected:
-    if target == "types":
-      errors.extend(validate_types())
-      types_data = load_json(DATA_DIR / "types.json")
-      type_ids = [element["id"] for element in types_data.get("elements", [])]
-    elif target == "monsters":
-      errors.extend(validate_monsters(type_ids))
-    elif target == "moves":
-      errors.extend(validate_moves(type_ids))
-
+  if args.stream:
+    report = validate_stream(selected, args.data_dir, max(1, args.max_errors))
+  else:
+    report = validate(
+      selected,
+      ValidationContext(args.data_dir),
+      jobs=max(1, args.jobs),
+      cache_path=args.cache if args.incremental else None,
+    )
+
+  if args.report == "-":
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+  elif args.report:
+    Path(args.report).parent.mkdir(parents=True, exist_ok=True)
+    Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+  errors = [err for result in report["datasets"].values() for err in result["errors"]]
   if errors:
-    print("Validation failed:")
-    for err in errors:
-      print(f"- {err}")
+    if args.report != "-":
+      print("Validation failed:")
+      for err in errors:
+        print(f"- {err}")
     sys.exit(1)
 
-  print("All selected datasets are valid.")
+  if args.report != "-":
+    print("All selected datasets are valid.")
+    if args.stream:
+      for target, result in report["datasets"].items():
+        print(f"{target}: {result['records']} records in {result['seconds']:.2f}s ({result['records_per_s']:,.0f} records/s)")
 
 
 if __name__ == "__main__":